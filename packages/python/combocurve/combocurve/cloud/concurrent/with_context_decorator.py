@@ -22,8 +22,8 @@ class _ConcurrentContextDecorator():
         @wraps(handler)
         def decorated(request, *args, **kwargs):
             tenant_info = get_tenant_info(request.headers)
-            context = self._context_provider.get_context(tenant_info)
-            return handler(request, context=context, *args, **kwargs)
+            with self._context_provider.use_context(tenant_info) as context:
+                return handler(request, context=context, *args, **kwargs)
 
         return decorated
 
@@ -33,9 +33,16 @@ class DAL:
     monthly_production: MonthlyProduction
 
     def __init__(self, channel: Channel) -> None:
+        self._channel = channel
         self.daily_production = DailyProduction(channel)
         self.monthly_production = MonthlyProduction(channel)
 
+    def close(self) -> None:
+        '''
+            Close the channel to the DAL server, cancelling any call in progress.
+        '''
+        self._channel.close()
+
     @staticmethod
     def connect(tenant_id: str, dal_url: str, dal_service_account: Optional[str] = None) -> 'DAL':
         '''
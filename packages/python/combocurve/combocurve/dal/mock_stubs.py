@@ -3,11 +3,13 @@ from datetime import date
 from collections.abc import Iterable
 from combocurve.services.production.helpers import get_production_pipeline
 from combocurve.services.cc_to_aries.query_helper import index_to_date
-from combocurve.dal.stubs import capture
+from combocurve.dal.stubs import ProductionByWellMixin, capture
 from combocurve.dal.v1.monthly_production_pb2 import (MonthlyProductionServiceFetchResponse,
-                                                      MonthlyProductionServiceFetchByWellResponse)
+                                                      MonthlyProductionServiceFetchByWellResponse,
+                                                      MonthlyProductionServiceSumByWellResponse)
 from combocurve.dal.v1.daily_production_pb2 import (DailyProductionServiceFetchResponse,
-                                                    DailyProductionServiceFetchByWellResponse)
+                                                    DailyProductionServiceFetchByWellResponse,
+                                                    DailyProductionServiceSumByWellResponse)
 from typing import Union
 from combocurve.dal.types import to_timestamp_from_index, to_timestamp
 import numpy as np
@@ -47,6 +49,32 @@ def fetch_by_well_from_production_collection(
     return production_response_by_well
 
 
+def sum_by_well_from_production_collection(
+    production_collection,
+    response_class: Union[DailyProductionServiceSumByWellResponse, MonthlyProductionServiceSumByWellResponse],
+    field_mask: List[str] = None,
+    wells: List[str] = None,
+    start_date: date = None,
+    end_date: date = None,
+    only_physical_wells: bool = None,
+):
+    pipeline = get_production_pipeline(wells)[:2]
+    pipeline.append({'$sort': {'well': 1, 'index': 1}})
+    production = list(production_collection.aggregate(pipeline))
+
+    sum_response_by_well = []
+    for well, well_group in groupby(production, key=lambda x: x['well']):
+        well_sums = {'oil': 0., 'gas': 0., 'water': 0.}
+        for well_data in well_group:
+            # nulls are skipped, as in the DAL server
+            for phase in well_sums:
+                well_sums[phase] += sum(value for index, value in zip(well_data['index'], well_data[phase])
+                                        if index is not None and value is not None)
+
+        sum_response_by_well.append(response_class(well=str(well), **well_sums))
+    return sum_response_by_well
+
+
 def fetch_from_production_collection(
     production_collection,
     response_class: Union[DailyProductionServiceFetchResponse, MonthlyProductionServiceFetchResponse],
@@ -80,7 +108,7 @@ def fetch_from_production_collection(
     return [item for sublist in production for item in sublist]  # flatten the lists of fetch responses
 
 
-class DailyProduction:
+class DailyProduction(ProductionByWellMixin):
     def __init__(self, production_collection):
         self.production_collection = production_collection
 
@@ -112,8 +140,22 @@ class DailyProduction:
         return fetch_by_well_from_production_collection(self.production_collection,
                                                         DailyProductionServiceFetchByWellResponse, **kwargs)
 
+    @capture
+    def sum_by_well(
+        self,
+        *,
+        field_mask: List[str] = None,
+        wells: List[str] = None,
+        start_date: date = None,
+        end_date: date = None,
+        only_physical_wells: bool = None,
+    ) -> Iterable:
+        kwargs: dict = capture.vars
+        return sum_by_well_from_production_collection(self.production_collection,
+                                                      DailyProductionServiceSumByWellResponse, **kwargs)
+
 
-class MonthlyProduction:
+class MonthlyProduction(ProductionByWellMixin):
     def __init__(self, production_collection):
         self.production_collection = production_collection
 
@@ -144,3 +186,17 @@ class MonthlyProduction:
         kwargs: dict = capture.vars
         return fetch_by_well_from_production_collection(self.production_collection,
                                                         MonthlyProductionServiceFetchByWellResponse, **kwargs)
+
+    @capture
+    def sum_by_well(
+        self,
+        *,
+        field_mask: List[str] = None,
+        wells: List[str] = None,
+        start_date: date = None,
+        end_date: date = None,
+        only_physical_wells: bool = None,
+    ) -> Iterable:
+        kwargs: dict = capture.vars
+        return sum_by_well_from_production_collection(self.production_collection,
+                                                      MonthlyProductionServiceSumByWellResponse, **kwargs)
@@ -42,11 +42,13 @@ from combocurve.dal.v1.monthly_production_pb2 import (
     MonthlyProductionServiceFetchByWellResponse,
 )
 
-from combocurve.dal.types import to_field_mask, to_timestamp, to_index_from_timestamp, UNUSED_FIELDS
-from typing import Callable, List, Union
+from combocurve.dal.types import to_field_mask, to_timestamp, to_index_array_from_timestamps, UNUSED_FIELDS
+from typing import Callable, Iterator, List, Union
 from datetime import date
 from collections.abc import Iterable
+from itertools import groupby
 from bson import ObjectId
+import numpy as np
 from combocurve.shared.constants import PHASES
 
 import pickle
@@ -59,15 +61,63 @@ with open(os.path.join(__location__, 'field_masks.pickle'), 'rb') as f:
 def production_from_response(well_response: Union[DailyProductionServiceFetchByWellResponse,
                                                   MonthlyProductionServiceFetchByWellResponse],
                              field_list: List[str] = PHASES):
+    '''
+    Decodes a single FetchByWell response into NumPy arrays: an int32 `index` and a float64 array per field. Fields
+    left out of the response (e.g. by the field mask) are filled with NaN.
+    '''
     well_data = {}
     well_id = ObjectId(getattr(well_response, 'well'))
     well_data['_id'] = well_id
-    well_data['index'] = list(map(lambda x: to_index_from_timestamp(x), getattr(well_response, 'date')))
+    well_data['index'] = to_index_array_from_timestamps(getattr(well_response, 'date'))
+    n_dates = len(well_data['index'])
     for field in field_list:
-        well_data[field] = getattr(well_response, field)
+        values = getattr(well_response, field)
+        if len(values) == n_dates:
+            well_data[field] = np.fromiter(values, dtype=np.float64, count=n_dates)
+        else:
+            well_data[field] = np.full(n_dates, np.nan)
     return well_data
 
 
+def production_by_well(fetch_by_well_response: Iterable, field_list: List[str] = PHASES) -> Iterator[dict]:
+    '''
+    Decodes a whole FetchByWell stream, yielding one `production_from_response` dict per well. The stream is sorted by
+    well, so a well split over consecutive responses is concatenated into a single dict.
+    '''
+    for _, well_responses in groupby(fetch_by_well_response, key=lambda well_response: well_response.well):
+        well_data, *rest = (production_from_response(well_response, field_list) for well_response in well_responses)
+        if rest:
+            for key in ['index', *field_list]:
+                well_data[key] = np.concatenate([well_data[key], *(chunk[key] for chunk in rest)])
+        yield well_data
+
+
+def sums_by_well(sum_by_well_response: Iterable, field_list: List[str] = PHASES) -> Iterator[dict]:
+    '''
+    Decodes a SumByWell stream, yielding a dict with the well `_id` and the float sum of each field per well.
+    '''
+    for well_response in sum_by_well_response:
+        yield {
+            '_id': ObjectId(well_response.well),
+            **{field: float(getattr(well_response, field))
+               for field in field_list}
+        }
+
+
+def last_index_by_well(fetch_by_well_response: Iterable) -> Iterator[dict]:
+    '''
+    Decodes a FetchByWell stream fetched with the `['well', 'date']` field mask, yielding a dict with the well `_id` and
+    its last production day `index` per well. Wells without production are skipped.
+    '''
+    for well, well_responses in groupby(fetch_by_well_response, key=lambda well_response: well_response.well):
+        last_indexes = [
+            to_index_array_from_timestamps(well_response.date).max() for well_response in well_responses
+            if len(well_response.date)
+        ]
+        if last_indexes:
+            yield {'_id': ObjectId(well), 'index': int(max(last_indexes))}
+
+
 def fields_from_class(cls) -> List[str]:
     return list(set(cls.__dict__.keys()) - set(UNUSED_FIELDS))
 
@@ -96,7 +146,81 @@ def capture(f: Callable) -> Callable:
     return inner
 
 
-class DailyProduction:
+def _set_kwargs(**kwargs) -> dict:
+    # fetch_by_well and sum_by_well pass their keyword arguments through to the request, only forward what was set
+    return {key: value for key, value in kwargs.items() if value is not None}
+
+
+class ProductionByWellMixin:
+    '''
+    Decoded `fetch_by_well` and `sum_by_well` of the daily and monthly production stubs.
+    '''
+    def fetch_production_by_well(
+        self,
+        *,
+        fields: List[str] = PHASES,
+        wells: List[str] = None,
+        start_date: date = None,
+        end_date: date = None,
+        only_physical_wells: bool = None,
+    ) -> Iterator[dict]:
+        '''
+        `fetch_by_well` restricted to `fields` and decoded with `production_by_well` into NumPy arrays per well.
+        '''
+        fetch_response = self.fetch_by_well(field_mask=['well', 'date', *fields],
+                                            wells=wells,
+                                            **_set_kwargs(start_date=start_date,
+                                                          end_date=end_date,
+                                                          only_physical_wells=only_physical_wells))
+        return production_by_well(fetch_response, fields)
+
+    def fetch_sums_by_well(
+        self,
+        *,
+        fields: List[str] = PHASES,
+        wells: List[str] = None,
+        start_date: date = None,
+        end_date: date = None,
+        only_physical_wells: bool = None,
+    ) -> Iterator[dict]:
+        '''
+        `sum_by_well` restricted to `fields` and decoded with `sums_by_well`, the sums are computed by the DAL server.
+        '''
+        sum_response = self.sum_by_well(field_mask=['well', *fields],
+                                        wells=wells,
+                                        **_set_kwargs(start_date=start_date,
+                                                      end_date=end_date,
+                                                      only_physical_wells=only_physical_wells))
+        return sums_by_well(sum_response, fields)
+
+    def fetch_last_index_by_well(
+        self,
+        *,
+        wells: List[str] = None,
+        only_physical_wells: bool = None,
+        recent_start_date: date = None,
+    ) -> Iterator[dict]:
+        '''
+        `fetch_by_well` restricted to the dates and decoded with `last_index_by_well`. With `recent_start_date`, only
+        the dates from it on are streamed first, and all the dates only for the wells without production since then.
+        '''
+        kwargs = _set_kwargs(only_physical_wells=only_physical_wells)
+        if recent_start_date is not None:
+            recent_response = self.fetch_by_well(field_mask=['well', 'date'],
+                                                 wells=wells,
+                                                 start_date=recent_start_date,
+                                                 end_date=date.max,
+                                                 **kwargs)
+            recent_wells = set()
+            for last_index in last_index_by_well(recent_response):
+                recent_wells.add(str(last_index['_id']))
+                yield last_index
+            wells = [well for well in wells if well not in recent_wells]
+
+        yield from last_index_by_well(self.fetch_by_well(field_mask=['well', 'date'], wells=wells, **kwargs))
+
+
+class DailyProduction(ProductionByWellMixin):
     daily_production_stub: DailyProductionServiceStub
 
     def __init__(self, channel: Channel):
@@ -259,7 +383,7 @@ class DailyProduction:
         return self.daily_production_stub.DeleteByManyWells(DailyProductionServiceDeleteByManyWellsRequest(**kwargs))
 
 
-class MonthlyProduction:
+class MonthlyProduction(ProductionByWellMixin):
     monthly_production_stub: MonthlyProductionServiceStub
 
     def __init__(self, channel: Channel):
@@ -1,6 +1,7 @@
 from google.protobuf.field_mask_pb2 import FieldMask
 from google.protobuf.timestamp_pb2 import Timestamp
-from typing import List
+from typing import List, Sequence
+import numpy as np
 from datetime import date, datetime, timedelta
 from combocurve.science.econ.general_functions import py_date_to_index
 
@@ -17,6 +18,15 @@ def to_index_from_timestamp(timestamp: Timestamp) -> int:
     return int((timestamp.seconds / 86400)) + EPOCH_INDEX
 
 
+def to_index_array_from_timestamps(timestamps: Sequence[Timestamp]) -> np.ndarray:
+    '''
+    Vectorized `to_index_from_timestamp`, returns the int32 day indexes of a repeated Timestamp field.
+    '''
+    seconds = np.fromiter((timestamp.seconds for timestamp in timestamps), dtype=np.int64, count=len(timestamps))
+    # astype truncates towards zero, same as int()
+    return ((seconds / 86400).astype(np.int64) + EPOCH_INDEX).astype(np.int32)
+
+
 def to_timestamp_from_index(index: int) -> Timestamp:
     return Timestamp(seconds=(index - EPOCH_INDEX) * 86400, nanos=0)
 
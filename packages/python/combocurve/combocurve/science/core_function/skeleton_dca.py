@@ -4,7 +4,7 @@ from typing import Tuple
 
 import numpy as np
 
-from combocurve.science.optimization_module.optimizers import optimizers
+from combocurve.science.optimization_module.optimizers import evaluates_population, optimizers
 from combocurve.science.core_function.setting_parameters import error_type
 from combocurve.science.core_function.error_funcs import errorfunc_s
 from combocurve.science.forecast_models.model_manager import mm
@@ -28,6 +28,8 @@ class get_dca:
         self.random_seed = random_seed
         self.random_seeds = []
         self.max_ite = None
+        self.vectorized = False
+        self.seed_workers = 1
 
     def get_optimization_para_dict(self):
         """get_optimization_para_dict
@@ -38,7 +40,9 @@ class get_dca:
             "popsize": self.pop_size,
             "seed": self.random_seed,
             "maxiter": self.max_ite,
-            'random_seeds': self.random_seeds
+            'random_seeds': self.random_seeds,
+            'vectorized': self.vectorized,
+            'seed_workers': self.seed_workers
         }
 
     def set_optimizer(self, optimizer):
@@ -53,6 +57,14 @@ class get_dca:
     def set_maxite(self, max_ite):
         self.max_ite = max_ite
 
+    def set_vectorized(self, vectorized):
+        '''Evaluate whole differential evolution populations at once, this implies updating='deferred' '''
+        self.vectorized = vectorized
+
+    def set_seed_workers(self, seed_workers):
+        '''Number of processes running the seeds of repeated_differential_evolution'''
+        self.seed_workers = seed_workers
+
     def set_errortype(self, errortype):
         self.error_type = errortype
 
@@ -130,7 +142,7 @@ class get_dca:
             }
 
             optimization_para_dict['args'] = (
-                this_model.func,
+                this_model.func_population if self.vectorized else this_model.func,
                 penalize_func,
                 errorfunc_s[self.error_type],
                 data_transformed,
@@ -148,7 +160,11 @@ class get_dca:
             if len(data_transformed) == 0:
                 continue
             # Feed parameters to optimizer for optimizing... and get result.
-            result = optimizers[self.optimizer](self.diff_evo_callback, optimization_para_dict)
+            if self.vectorized:
+                loss = evaluates_population(self.diff_evo_population_callback)
+            else:
+                loss = self.diff_evo_callback
+            result = optimizers[self.optimizer](loss, optimization_para_dict)
             # Parameter state needs one last update.
             for i, p_idx in enumerate(p_idxx):
                 p_state[p_idx] = result.x[i]
@@ -203,6 +219,48 @@ class get_dca:
         loss_penalized = penalize_func(loss, p_state, fixed_p)
         return loss_penalized
 
+    def diff_evo_population_callback(self, p_population_segment, *args):
+        '''
+        'self.diff_evo_callback' for a (n_parameters, n_candidates) population, with the model's func_population in
+        place of func. Returns the penalized loss of each candidate.
+        '''
+        (
+            func_population,
+            penalize_func,
+            err_func,
+            transformed_data,
+            fixed_p,
+            using_weight,
+            p_state,
+            p_idxx,
+            regression_type,
+            p2seg_dict,
+            cum_params,
+        ) = args
+
+        p_population = np.tile(np.array(p_state, dtype=float), (p_population_segment.shape[1], 1))
+        p_population[:, p_idxx] = p_population_segment.T
+
+        if using_weight:
+            weight = transformed_data[:, 2]
+        else:
+            weight = None
+
+        resolution = cum_params.get('resolution')
+
+        if regression_type == RegressionType.CUM and resolution == 'monthly':
+            cum_true = np.cumsum(cum_params.get('cum_true'))
+            predict_cum_volume_func = cum_params.get('predict_cum_volume')
+            losses = [
+                err_func(cum_true, np.cumsum(predict_cum_volume_func(transformed_data[:, 0], p, fixed_p, p2seg_dict)),
+                         weight) for p in p_population
+            ]
+        else:
+            pred_population = func_population(transformed_data[:, 0], p_population, fixed_p)
+            losses = [err_func(transformed_data[:, 1], pred, weight) for pred in pred_population]
+
+        return np.array([penalize_func(loss, p, fixed_p) for loss, p in zip(losses, p_population)])
+
     def update_para(self, p, p_fixed, model_name, para_name, para_value):
         """update_para takes in both lists of parameters ( optimizable and fixed )
         as well as the name and value of the parameter to update.
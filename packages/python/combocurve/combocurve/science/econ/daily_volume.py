@@ -1,6 +1,5 @@
 # import time
 import numpy as np
-from combocurve.science.segment_models.multiple_segments import MultipleSegments
 from combocurve.science.econ.general_functions import (
     get_py_date,
     py_date_to_index,
@@ -12,11 +11,10 @@ from combocurve.science.econ.general_functions import (
 from combocurve.shared.econ_tools.default_econ_fields import EconModelDefaults
 from combocurve.science.econ.helpers import BASE_DATE_NP, days_in_month
 from combocurve.science.econ.pre_process import PreProcess
+from combocurve.science.econ.econ_use_forecast import shared_predictions
 from combocurve.science.econ.econ_use_forecast.use_forecast import (get_pct_key_by_phase, get_main_phase,
                                                                     get_main_phase_date, get_after_prod_idx)
 
-MULTI_SEGMENT = MultipleSegments()
-
 def get_start_pred_index(
     phase_actual_forecast,
     phase_forecast,
@@ -141,7 +139,7 @@ def get_daily_forecast(start_idx, end_idx, forecast_data, phase, phase_pct_key,
                 if has_phase_pct_seg(base_phase_data_dict, 'best'):
                     base_phase_seg = base_phase_data_dict['P_dict']['best']['segments']
 
-        daily_forecast = MULTI_SEGMENT.predict_time_ratio(idx_array, ratio_seg, base_phase_seg)
+        daily_forecast = shared_predictions.predict_time_ratio(idx_array, ratio_seg, base_phase_seg)
 
     else:
         forecast_seg = []
@@ -149,7 +147,7 @@ def get_daily_forecast(start_idx, end_idx, forecast_data, phase, phase_pct_key,
         if has_phase_pct_seg(phase_forecast, phase_pct_key):
             forecast_seg = phase_forecast['P_dict'][phase_pct_key]['segments']
 
-        daily_forecast = MULTI_SEGMENT.predict(idx_array, forecast_seg)
+        daily_forecast = shared_predictions.predict(idx_array, forecast_seg)
 
     if phase_risk is not None:
         phase_start_date = index_to_py_date(start_idx)
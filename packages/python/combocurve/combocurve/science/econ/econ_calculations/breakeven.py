@@ -23,7 +23,10 @@ def breakeven_results(simple_economics, well_input: WellInput, unecon_bool):
             price_unit = None
         else:
             phase_key = breakeven_key.replace('_breakeven', '')
-            breakeven, price_unit = calculate_phase_breakeven(simple_economics, copy.deepcopy(well_input), phase_key)
+            # share the product streams with the final pass so its well head volumes are reused by simple_economics
+            products = getattr(well_input, 'products', None)
+            phase_well_input = copy.deepcopy(well_input, {id(products): products})
+            breakeven, price_unit = calculate_phase_breakeven(simple_economics, phase_well_input, phase_key)
 
         breakeven_dict[breakeven_key] = breakeven
         breakeven_unit_dict[breakeven_key] = price_unit
@@ -20,6 +20,9 @@ class EconCalculation(ABC):
         'pct_of_drip_condensate_rev',
         'pct_of_total_rev',
     ]
+    # result only depends on the constructor and result() arguments and is never modified by later calculations, so
+    # it can be reused by the next economics pass of the same well when those arguments are unchanged
+    REUSABLE = False
 
     @abstractclassmethod
     def result(self):
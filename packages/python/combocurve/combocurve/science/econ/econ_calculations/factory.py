@@ -1,6 +1,9 @@
 from queue import Queue
+from functools import lru_cache
 import inspect
-from typing import Optional
+import operator
+from typing import Callable, NamedTuple, Optional
+import numpy as np
 
 from combocurve.science.econ.econ_calculations.calculation import EconCalculation
 from combocurve.science.econ.econ_calculations.wellhead import WellheadMonthly, WellheadDaily, GroupWellheadMonthly
@@ -98,7 +101,104 @@ GROUP_CALCULATIONS = {
 }
 
 
-def calculation_function_on_queue(q: Queue, well_result_class):
+class CalculationStep(NamedTuple):
+    '''A calculation class with the getters of its constructor and result() arguments, read from its signatures once
+    per process instead of on every well and pass
+    '''
+    calculation_class: type
+    input_params: tuple[tuple[str, Callable], ...]
+    result_params: tuple[tuple[str, Callable], ...]
+    takes_feature_flags: bool
+
+
+def _param_getter(param: inspect.Parameter) -> Callable:
+    # required parameters raise the WellInputError/WellResultError of __getitem__ when missing
+    if param.default is inspect.Parameter.empty:
+        return operator.itemgetter(param.name)
+
+    def get_with_default(source, name=param.name, default=param.default):
+        return source.get(name, default)
+
+    return get_with_default
+
+
+@lru_cache(maxsize=None)
+def compile_calculation(calculation_class) -> CalculationStep:
+    input_params = inspect.signature(calculation_class.__init__).parameters
+    result_params = inspect.signature(calculation_class.result).parameters
+    return CalculationStep(
+        calculation_class=calculation_class,
+        input_params=tuple((name, _param_getter(param)) for name, param in input_params.items()
+                           if name not in {'self', 'args', 'kwargs', 'feature_flags'}),
+        result_params=tuple((name, _param_getter(param)) for name, param in result_params.items() if name != 'self'),
+        # Hack to get feature flags in econ calculations
+        # To use it, just declare "feature flags" as one of the parameters in the constructor.
+        takes_feature_flags='feature_flags' in input_params,
+    )
+
+
+@lru_cache(maxsize=None)
+def compile_plan(calculation_classes: tuple) -> tuple[CalculationStep, ...]:
+    return tuple(compile_calculation(calculation_class) for calculation_class in calculation_classes)
+
+
+def _snapshot(value):
+    # copy the containers so later in place updates (e.g. of date_dict) are seen as changes
+    if isinstance(value, dict):
+        return {key: _snapshot(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_snapshot(item) for item in value)
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    return value
+
+
+def _unchanged(snapshot, value):
+    if isinstance(snapshot, dict):
+        return (isinstance(value, dict) and snapshot.keys() == value.keys()
+                and all(_unchanged(item, value[key]) for key, item in snapshot.items()))
+    if isinstance(snapshot, (list, tuple)):
+        return (type(value) is type(snapshot) and len(value) == len(snapshot)
+                and all(_unchanged(item, value_item) for item, value_item in zip(snapshot, value)))
+    if isinstance(snapshot, np.ndarray):
+        return isinstance(value, np.ndarray) and snapshot.dtype == value.dtype and np.array_equal(snapshot, value)
+    if snapshot is value:
+        return True
+    try:
+        return bool(snapshot == value)
+    except Exception:
+        return False
+
+
+class StageCache():
+    '''Results of the REUSABLE calculations of the last economics pass with the arguments they were computed from.
+
+    Reversion, cutoff, the final pass and breakeven run the same queue on the same well, only changing ownership,
+    dates or prices. A calculation is rerun only when one of its arguments differs from the previous pass.
+    '''
+    def __init__(self):
+        self.stages = {}
+
+    def get(self, calculation_class, input_params: dict, result_params: dict) -> Optional[dict]:
+        cached = self.stages.get(calculation_class)
+        if cached is None:
+            return None
+        cached_input_params, cached_result_params, result_dict = cached
+        if _unchanged(cached_input_params, input_params) and _unchanged(cached_result_params, result_params):
+            return result_dict
+        return None
+
+    def put(self, calculation_class, input_params: dict, result_params: dict, result_dict: dict):
+        self.stages[calculation_class] = (_snapshot(input_params), _snapshot(result_params), result_dict)
+
+
+def calculation_function_on_queue(q: Queue, well_result_class, reuse_stages: bool = False):
+    '''reuse_stages: keep REUSABLE calculation results between calls of the returned function, only to be used when
+    all calls are for the same well
+    '''
+    plan = compile_plan(tuple(q.queue))
+    stage_cache = StageCache() if reuse_stages else None
+
     def calculation_function(well_input: WellInput,
                              well_result_params: dict,
                              feature_flags: Optional[dict[str, bool]] = None):
@@ -106,11 +206,17 @@ def calculation_function_on_queue(q: Queue, well_result_class):
             feature_flags = {}
         well_result: WellResult = well_result_class(well_input, well_result_params)
         calculation_input_factory = CalculationInputFactory(well_input, well_result, feature_flags)
-        for calculation_class in q.queue:
-            this_calculation: EconCalculation = calculation_class(
-                **calculation_input_factory.params_from_input(calculation_class))
-            this_result_dict = this_calculation.result(
-                **calculation_input_factory.params_from_result(calculation_class))
+        for step in plan:
+            calculation_class = step.calculation_class
+            input_params = calculation_input_factory.input_kwargs(step)
+            result_params = calculation_input_factory.result_kwargs(step)
+            use_cache = stage_cache is not None and calculation_class.REUSABLE
+            this_result_dict = stage_cache.get(calculation_class, input_params, result_params) if use_cache else None
+            if this_result_dict is None:
+                this_calculation: EconCalculation = calculation_class(**input_params)
+                this_result_dict = this_calculation.result(**result_params)
+                if use_cache:
+                    stage_cache.put(calculation_class, input_params, result_params, this_result_dict)
             well_result.update_result_by_dict(this_result_dict)
         return well_result
 
@@ -131,6 +237,7 @@ GROUP_LEVEL_CALCULATIONS = [
     CAPEX,
     GroupBeforeIncomeTaxCashFlow,
 ]
+GROUP_LEVEL_PLAN = compile_plan(tuple(GROUP_LEVEL_CALCULATIONS))
 
 
 def group_level_calculation_function(well_input_dict,
@@ -142,11 +249,10 @@ def group_level_calculation_function(well_input_dict,
     can be used for reversion, cutoff, allocation
     '''
     calculation_input_factory = CalculationInputFactory(well_input_dict, well_result_dict)
-    calculation_pipeline = GROUP_LEVEL_CALCULATIONS if calculate_bfit else GROUP_LEVEL_CALCULATIONS[:-1]
-    for calculation_class in calculation_pipeline:
-        this_calculation: EconCalculation = calculation_class(
-            **calculation_input_factory.params_from_input(calculation_class))
-        this_result_dict = this_calculation.result(**calculation_input_factory.params_from_result(calculation_class))
+    calculation_plan = GROUP_LEVEL_PLAN if calculate_bfit else GROUP_LEVEL_PLAN[:-1]
+    for step in calculation_plan:
+        this_calculation: EconCalculation = step.calculation_class(**calculation_input_factory.input_kwargs(step))
+        this_result_dict = this_calculation.result(**calculation_input_factory.result_kwargs(step))
         well_result_dict.update(this_result_dict)
     return well_result_dict
 
@@ -166,6 +272,7 @@ GROUP_CASE_CALCULATIONS = [
     GroupCaseBeforeIncomeTaxCashFlow,
     BeforeIncomeTaxDiscountedCashflow,
 ]
+GROUP_CASE_PLAN = compile_plan(tuple(GROUP_CASE_CALCULATIONS))
 
 
 def group_level_calculation_function_for_group_case(well_input_dict,
@@ -176,10 +283,9 @@ def group_level_calculation_function_for_group_case(well_input_dict,
     the most important part is when not allocation, BFIT CF will be negative due to expense, capex or tax
     '''
     calculation_input_factory = CalculationInputFactory(well_input_dict, well_result_dict)
-    for calculation_class in GROUP_CASE_CALCULATIONS:
-        this_calculation: EconCalculation = calculation_class(
-            **calculation_input_factory.params_from_input(calculation_class))
-        this_result_dict = this_calculation.result(**calculation_input_factory.params_from_result(calculation_class))
+    for step in GROUP_CASE_PLAN:
+        this_calculation: EconCalculation = step.calculation_class(**calculation_input_factory.input_kwargs(step))
+        this_result_dict = this_calculation.result(**calculation_input_factory.result_kwargs(step))
         well_result_dict.update(this_result_dict)
     return well_result_dict
 
@@ -217,38 +323,19 @@ class CalculationInputFactory():
         self.well_result = well_result
         self.feature_flags = feature_flags or {}
 
-    def params_from_input(self, calculation_class):
-        # find parameters of the constructor, excepting self
-        constructor_params_dict = dict(inspect.signature(calculation_class.__init__).parameters)
-        param_names = list(constructor_params_dict.keys())
-        params = list(constructor_params_dict.values())
-        kwargs = {}
-        for param_name, param in zip(param_names, params):
-            if param_name in {'self', 'args', 'kwargs', 'feature_flags'}:
-                continue
-            default = param.default
-            if default == inspect._empty:
-                kwargs[param_name] = self.well_input[param_name]
-            else:
-                kwargs[param_name] = self.well_input.get(param_name, default)
-        if 'feature_flags' in param_names:
-            # Hack to get feature flags in econ calculations
-            # To use it, just declare "feature flags" as one of the parameters in the constructor.
+    def input_kwargs(self, step: CalculationStep) -> dict:
+        kwargs = {name: getter(self.well_input) for name, getter in step.input_params}
+        if step.takes_feature_flags:
             kwargs['feature_flags'] = self.feature_flags
         return kwargs
 
+    def result_kwargs(self, step: CalculationStep) -> dict:
+        return {name: getter(self.well_result) for name, getter in step.result_params}
+
+    def params_from_input(self, calculation_class):
+        # find parameters of the constructor, excepting self
+        return self.input_kwargs(compile_calculation(calculation_class))
+
     def params_from_result(self, calculation_class):
         # find parameters of result(), excepting self
-        result_params_dict = dict(inspect.signature(calculation_class.result).parameters)
-        param_names = list(result_params_dict.keys())
-        params = list(result_params_dict.values())
-        kwargs = {}
-        for param_name, param in zip(param_names, params):
-            if param_name == 'self':
-                continue
-            default = param.default
-            if default == inspect._empty:
-                kwargs[param_name] = self.well_result[param_name]
-            else:
-                kwargs[param_name] = self.well_result.get(param_name, default)
-        return kwargs
+        return self.result_kwargs(compile_calculation(calculation_class))
@@ -221,6 +221,8 @@ def _diff_pre(diff_input_dic, date_dict):
 
 
 class Price(EconCalculation):
+    REUSABLE = True
+
     def __init__(self, date_dict, pricing_model, differential_model, compositional_economics_pricing):
         self.date_dict = date_dict
         self.pricing_model = pricing_model
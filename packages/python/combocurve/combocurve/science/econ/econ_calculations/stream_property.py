@@ -36,6 +36,8 @@ def _process_compositional_economics_yield(
 
 
 class StreamProperty(EconCalculation):
+    REUSABLE = True
+
     def __init__(self):
         # interface
         pass
@@ -1,7 +1,7 @@
 from combocurve.science.econ.econ_input.well_input import WellInput
 import numpy as np
 import datetime
-import collections
+import collections.abc
 
 
 def get_str_date_dict(date_dict):
@@ -21,7 +21,7 @@ def deep_update(source, overrides):
     Modify ``source`` in place.
     """
     for key, value in overrides.items():
-        if isinstance(value, collections.Mapping) and value:
+        if isinstance(value, collections.abc.Mapping) and value:
             returned = deep_update(source.get(key, {}), value)
             source[key] = returned
         else:
@@ -64,6 +64,8 @@ class Wellhead:
 
 
 class WellheadMonthly(Wellhead, EconCalculation):
+    REUSABLE = True
+
     def __init__(self,
                  date_dict,
                  products,
@@ -132,6 +134,8 @@ class WellheadMonthly(Wellhead, EconCalculation):
 
 
 class WellheadDaily(EconCalculation, Wellhead):
+    REUSABLE = True
+
     def __init__(self,
                  date_dict,
                  products,
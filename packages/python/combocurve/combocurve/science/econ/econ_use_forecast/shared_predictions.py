@@ -0,0 +1,59 @@
+'''
+    Daily forecast volumes shared by the calculations of the same well.
+
+    The roll-up computes the stitched, production-only and forecast-only volumes of a well, each with and without
+    risk, so the same forecast segments are predicted over overlapping ranges of days several times. Inside
+    `shared_forecast_predictions` the segments are predicted once, over the union of the ranges asked for, and every
+    calculation gets its slice of it. The segments are predicted day by day, so the slices are identical to predicting
+    the ranges one at a time.
+'''
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+
+from combocurve.science.segment_models.multiple_segments import MultipleSegments
+
+multi_seg = MultipleSegments()
+
+# segments -> (first day index, daily volumes) of the well being calculated, None outside `shared_forecast_predictions`
+_shared_predictions: ContextVar = ContextVar('shared_predictions', default=None)
+
+
+@contextmanager
+def shared_forecast_predictions():
+    token = _shared_predictions.set({})
+    try:
+        yield
+    finally:
+        _shared_predictions.reset(token)
+
+
+def predict(idx_array, forecast_segments):
+    return _shared_predict(idx_array, ('rate', forecast_segments),
+                           lambda days: multi_seg.predict(days, forecast_segments))
+
+
+def predict_time_ratio(idx_array, ratio_segments, base_segments):
+    return _shared_predict(idx_array, ('ratio', ratio_segments, base_segments),
+                           lambda days: multi_seg.predict_time_ratio(days, ratio_segments, base_segments))
+
+
+def _shared_predict(idx_array, segments, predict_days):
+    predictions = _shared_predictions.get()
+    if predictions is None or len(idx_array) == 0 or idx_array[-1] - idx_array[0] + 1 != len(idx_array):
+        return predict_days(idx_array)
+
+    # the segments of the calculations are copies of each other when the forecast is adjusted, e.g. for shut-ins
+    key = repr(segments)
+    start, end = int(idx_array[0]), int(idx_array[-1])
+    predicted_start, volumes = predictions.get(key, (start, None))
+
+    if volumes is None or start < predicted_start or end >= predicted_start + len(volumes):
+        if volumes is not None:
+            end = max(end, predicted_start + len(volumes) - 1)
+            predicted_start = min(start, predicted_start)
+        volumes = predict_days(np.arange(predicted_start, end + 1))
+        predictions[key] = (predicted_start, volumes)
+
+    return volumes[start - predicted_start:int(idx_array[-1]) - predicted_start + 1].copy()
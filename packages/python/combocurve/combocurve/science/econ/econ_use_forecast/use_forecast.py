@@ -4,8 +4,8 @@ import datetime
 import numpy as np
 from calendar import monthrange
 from dateutil.relativedelta import relativedelta
-from combocurve.science.segment_models.multiple_segments import MultipleSegments
 from combocurve.science.econ.pre_process import PreProcess
+from combocurve.science.econ.econ_use_forecast import shared_predictions
 from combocurve.science.econ.general_functions import (
     get_py_date,
     has_forecast,
@@ -25,8 +25,6 @@ from typing import List
 
 WH_KEY = 'first_prod_date'
 
-multi_seg = MultipleSegments()
-
 
 class WellHeaderError(Exception):
     expected = True
@@ -328,12 +326,14 @@ def generate_forecast_volumes(idx_array, forecast_data_dict, phase, phase_pct_ke
                 if has_phase_pct_seg(base_phase_data_dict, 'best'):
                     base_phase_seg = base_phase_data_dict['P_dict']['best']['segments']
 
-        forecast_datas = np.concatenate((multi_seg.predict_time_ratio(need_forecast_idxs, ratio_seg,
-                                                                      base_phase_seg), np.zeros(len(zero_idxs))))
+        forecast_datas = np.concatenate((shared_predictions.predict_time_ratio(need_forecast_idxs, ratio_seg,
+                                                                               base_phase_seg),
+                                         np.zeros(len(zero_idxs))))
 
     else:
         forecast_seg = phase_data_dict['P_dict'][phase_pct_key]['segments']
-        forecast_datas = np.concatenate((multi_seg.predict(need_forecast_idxs, forecast_seg), np.zeros(len(zero_idxs))))
+        forecast_datas = np.concatenate((shared_predictions.predict(need_forecast_idxs, forecast_seg),
+                                         np.zeros(len(zero_idxs))))
 
     if phase_risk is not None:
         monthly_risk = PreProcess.phase_risk_pre(phase_risk, risk_date_dict, index_to_py_date(idx_array[0]),
@@ -1,11 +1,10 @@
-import copy
 import numpy as np
-from typing import Callable
 from datetime import datetime, date
 
 from combocurve.science.econ.group_econ.parameter_allocation import (allocate_fixed_expense, allocate_production_tax,
                                                                      allocate_variable_expenses,
-                                                                     allocate_water_disposals, allocate_capex_model)
+                                                                     allocate_water_disposals, allocate_capex_model,
+                                                                     recursively_create_new_params)
 from combocurve.science.econ.group_econ.group_econ_query import DEFAULT_COMBO_NAME
 from combocurve.science.econ.group_econ.group_econ_defaults import (GROUP_INDEPENDENT, CANNOT_EXCEED_GROUP,
                                                                     MUST_BE_GROUP, get_group_properties,
@@ -14,6 +13,8 @@ from combocurve.science.econ.group_econ.group_econ_defaults import (GROUP_INDEPE
 from combocurve.science.econ.group_econ.general_functions import ECON_GROUP, filter_group_df, cut_group_df
 
 ALLOCATION_RESULT_KEY = 'group_well_result_dict_for_allocation'
+# number of cells of the upper triangles summed at once for allocation by remaining
+REMAINING_CHUNK_CELLS = 2_000_000
 ZERO_GROUP_WELL_COUNT = {
     'gross_well_count': 0,
     'wi_well_count': 0,
@@ -63,18 +64,6 @@ def find_cropping_indices(well_date_list, group_date_list, cutoff_date):
     return group_start_idx, group_end_idx
 
 
-def crop_well_values(well_values, group_start_idx, group_end_idx):
-    # well start idx is always 0
-    well_end_idx = group_end_idx - group_start_idx
-    cropped_well_values = well_values[:well_end_idx]
-    if well_end_idx > len(well_values):
-        cropped_well_values = cropped_well_values + [0] * (well_end_idx - len(well_values))
-    cropped_well_values = np.array(cropped_well_values)
-    cropped_well_values[cropped_well_values < 0] = 0  # negative won't get allocation
-
-    return cropped_well_values
-
-
 def get_remaining_list(input_list):
     ret_list = [np.nan] * len(input_list)
     for i in range(len(input_list)):
@@ -113,447 +102,355 @@ def get_allocation_ratios(well_values, reference_values, reference_values_for_re
     return allocation_ratios
 
 
-def allocate(
-    well_date_list,
-    well_t_all,
-    well_values,
-    well_ownership,
-    allocation_date_list,
-    reference_values,
-    cutoff_date,
-    unecon_bool,
-    original_well_result_params,
-    group_result,
-    allocation_bool,
-    allocation_basis,
-    allocation_timing,
-    allocate_by_well_count=False,
-    allocate_by_well_count_capex_ratio=0,
-):
-    allocated_group_params = {
-        'final_cutoff_date': cutoff_date,
-        'rev_dates_detail': original_well_result_params['rev_dates_detail'],
-        'unecon_bool': unecon_bool,
-        'is_complete': True,
-        # ownership t_list doesn't need to be consistent with well's t_list
-        't_ownership': original_well_result_params['t_ownership'],
-        'ownership_params': original_well_result_params['ownership_params'],
-    }
-
-    # crop both values to same length and date range
-    allocation_start_idx, allocation_end_idx = find_cropping_indices(well_date_list, allocation_date_list, cutoff_date)
-    cropped_reference_values = reference_values[allocation_start_idx:allocation_end_idx]
-    reference_values_for_remaining = reference_values[allocation_start_idx:]
-
-    cropped_well_values = crop_well_values(well_values, allocation_start_idx, allocation_end_idx)
-    allocation_ratios = get_allocation_ratios(cropped_well_values, cropped_reference_values,
-                                              reference_values_for_remaining, allocation_bool, allocation_timing,
-                                              unecon_bool)
-    allocation_ratios_tax = allocation_ratios
-
-    # CAPEX is allocated based on total amount over the life of well, but for allocate by well count, it uses monthly
-    capex_well_ratio = 0  # for 1. no allocation, 2. unecon
-    if allocation_bool and not unecon_bool:
-        if allocate_by_well_count:
-            capex_well_ratio = allocate_by_well_count_capex_ratio
-        else:
-            capex_well_ratio = sum(cropped_well_values) / sum(reference_values) if sum(reference_values) > 0 else 0
-
-    allocation_ratio_capex = np.repeat(capex_well_ratio, len(cropped_well_values))
+def allocate_group_result(group_result, group_start_idx, group_end_idx, allocation_bool, allocation_ratios,
+                          allocation_ratios_tax, allocation_ratio_capex):
+    allocation_result = group_result[ALLOCATION_RESULT_KEY]
+    allocated_group_params = {}
 
-    if allocation_bool and allocation_basis == 'gross' and not unecon_bool:
-        '''
-        when allocation basis is gross, pass in gross (100% WI) group level assumption
-        and multiple by well WI when allocate (for tax multiply well NRI)
-        check `get_econ_models` in `one_group_calculation` function for the first part of the logic
-        '''
-        cropped_well_wi = crop_well_values(well_ownership['wi'], allocation_start_idx, allocation_end_idx)
-        cropped_well_nri = crop_well_values(well_ownership['nri'], allocation_start_idx,
-                                            allocation_end_idx)  # for production tax
-
-        # the order for the following calculation matters allocation_ratios_tax need to be calculated first
-        allocation_ratios_tax = np.multiply(allocation_ratios, cropped_well_nri)
-        allocation_ratios = np.multiply(allocation_ratios, cropped_well_wi)
-        allocation_ratio_capex = np.multiply(allocation_ratio_capex, cropped_well_wi)
-
-    # crop group params, allocate group params to well by allocation_ratios and add to allocated_group_params
-    '''
-    start_idx and end_idx are used to crop group result
-    allocation_start_idx and allocation_end_idx are used to crop allocation df
-    group result date range can be different with allocation df due to CF prior to as of date
-    '''
-    group_start_idx, group_end_idx = find_cropping_indices(well_date_list,
-                                                           group_result[ALLOCATION_RESULT_KEY]['date_list'].astype(str),
-                                                           cutoff_date)
     # fixed expense
-    group_fixed_expenses = group_result[ALLOCATION_RESULT_KEY]['fixed_expenses']
     allocated_group_params['group_fixed_expenses'] = allocate_fixed_expense(group_start_idx, group_end_idx,
-                                                                            allocation_ratios, group_fixed_expenses)
+                                                                            allocation_ratios,
+                                                                            allocation_result['fixed_expenses'])
     # variable expense
-    group_variable_expenses = group_result[ALLOCATION_RESULT_KEY]['variable_expenses']
-    allocated_group_params['group_variable_expenses'] = allocate_variable_expenses(group_start_idx, group_end_idx,
-                                                                                   allocation_ratios,
-                                                                                   group_variable_expenses)
+    allocated_group_params['group_variable_expenses'] = allocate_variable_expenses(
+        group_start_idx, group_end_idx, allocation_ratios, allocation_result['variable_expenses'])
     # water disposal
-    group_water_disposals = group_result[ALLOCATION_RESULT_KEY]['water_disposal']
     allocated_group_params['group_water_disposals'] = allocate_water_disposals(group_start_idx, group_end_idx,
-                                                                               allocation_ratios, group_water_disposals)
+                                                                               allocation_ratios,
+                                                                               allocation_result['water_disposal'])
     # production tax
-    group_production_tax_dict = group_result[ALLOCATION_RESULT_KEY]['production_tax_dict']
-    allocated_group_params['group_production_tax_dict'] = allocate_production_tax(group_start_idx, group_end_idx,
-                                                                                  allocation_ratios_tax,
-                                                                                  group_production_tax_dict)
+    allocated_group_params['group_production_tax_dict'] = allocate_production_tax(
+        group_start_idx, group_end_idx, allocation_ratios_tax, allocation_result['production_tax_dict'])
     # capex
     if allocation_bool:
         allocated_group_params['allocated_group_capex_model'] = allocate_capex_model(
             group_start_idx,
             group_end_idx,
             allocation_ratio_capex,
-            group_result[ALLOCATION_RESULT_KEY]['capex_dict'],
-            group_result[ALLOCATION_RESULT_KEY]['all_capex'],
+            allocation_result['capex_dict'],
+            allocation_result['all_capex'],
         )
     else:
         allocated_group_params['allocated_group_capex_model'] = []
 
-    # group params start date
-    allocated_group_params['t_allocation'] = well_t_all[0:allocation_end_idx - allocation_start_idx]
-
     return allocated_group_params
 
 
-def allocate_by_oil_volume(flat_output, original_well_result_params, well_t_all, group_result, cutoff_date, unecon_bool,
-                           allocation_df, group_properties):
-    allocation_method_type, allocation_bool, allocation_basis, allocation_timing = get_allocation_info(group_properties)
+# allocation df column of every allocation method, by whether the allocation method type is gross
+ALLOCATION_COLUMNS = {
+    'gas-volume': {True: 'gross_gas_well_head_volume', False: 'net_gas_well_head_volume'},
+    'oil-volume': {True: 'gross_oil_well_head_volume', False: 'net_oil_well_head_volume'},
+    'boe': {True: 'gross_boe_well_head_volume', False: 'net_boe_well_head_volume'},
+    'well-count': {True: 'gross_well_count', False: 'wi_well_count'},
+    'revenue': {True: 'total_100_pct_wi_revenue', False: 'total_revenue'},
+    'income': {True: 'net_income', False: 'net_income'},
+}
 
-    if allocation_method_type == 'gross':
-        reference_values = np.array(allocation_df['gross_oil_well_head_volume'])
-        well_values = flat_output['gross_oil_well_head_volume']
-    else:
-        reference_values = np.array(allocation_df['net_oil_well_head_volume'])
-        well_values = flat_output['net_oil_well_head_volume']
-
-    well_date_list = flat_output['date']
-
-    well_ownership = {
-        'wi': flat_output['wi_oil'],  # use oil wi for well wi for now, pass out original wi in future
-        'nri': flat_output['nri_oil']  # use oil nri for well nri for now, pass out original nri in future
-    }
-
-    allocated_group_params = allocate(
-        well_date_list,
-        well_t_all,
-        well_values,
-        well_ownership,
-        allocation_df['date'].to_list(),
-        reference_values,
-        cutoff_date,
-        unecon_bool,
-        original_well_result_params,
-        group_result,
-        allocation_bool,
-        allocation_basis,
-        allocation_timing,
-    )
-    return allocated_group_params
 
+def allocate_params_to_wells(group_starts, group_ends, lengths, ratio_matrix, original_dict):
+    '''
+    `recursively_create_new_params` of every well with its allocation ratios in a row of ratio_matrix, the arrays
+    are allocated to all the wells at once
+    '''
+    new_dicts = [{} for _ in lengths]
+    for key, value in original_dict.items():
+        if type(value) == dict:
+            new_values = allocate_params_to_wells(group_starts, group_ends, lengths, ratio_matrix, value)
+        elif type(value) == np.ndarray and key not in ['time'] and value.ndim == 1 and len(value):
+            # wells with more months than the array after their start are cropped and padded one by one
+            in_value = (group_ends - group_starts == lengths) & (group_ends <= len(value))
+            value_idx = np.minimum(group_starts[:, np.newaxis] + np.arange(ratio_matrix.shape[1]), len(value) - 1)
+            allocated = np.nan_to_num(value[value_idx] * ratio_matrix)
+            new_values = [
+                allocated[w, :lengths[w]] if in_value[w] else recursively_create_new_params(
+                    group_starts[w], group_ends[w], ratio_matrix[w, :lengths[w]], {key: value}, {})[key]
+                for w in range(len(lengths))
+            ]
+        else:
+            new_values = [
+                recursively_create_new_params(group_starts[w], group_ends[w], ratio_matrix[w, :lengths[w]],
+                                              {key: value}, {})[key] for w in range(len(lengths))
+            ]
 
-def allocate_by_gas_volume(flat_output, original_well_result_params, well_t_all, group_result, cutoff_date, unecon_bool,
-                           allocation_df, group_properties):
-    allocation_method_type, allocation_bool, allocation_basis, allocation_timing = get_allocation_info(group_properties)
+        for new_dict, new_value in zip(new_dicts, new_values):
+            new_dict[key] = new_value
 
-    if allocation_method_type == 'gross':
-        reference_values = np.array(allocation_df['gross_gas_well_head_volume'])
-        well_values = flat_output['gross_gas_well_head_volume']
-    else:
-        reference_values = np.array(allocation_df['net_gas_well_head_volume'])
-        well_values = flat_output['net_gas_well_head_volume']
-
-    well_date_list = flat_output['date']
-    well_ownership = {
-        'wi': flat_output['wi_oil'],  # use oil wi for well wi for now, pass out original wi in future
-        'nri': flat_output['nri_oil']  # use oil nri for well nri for now, pass out original nri in future
-    }
-
-    allocated_group_params = allocate(
-        well_date_list,
-        well_t_all,
-        well_values,
-        well_ownership,
-        allocation_df['date'].to_list(),
-        reference_values,
-        cutoff_date,
-        unecon_bool,
-        original_well_result_params,
-        group_result,
-        allocation_bool,
-        allocation_basis,
-        allocation_timing,
-    )
-    return allocated_group_params
+    return new_dicts
 
 
-def allocate_by_boe(flat_output, original_well_result_params, well_t_all, group_result, cutoff_date, unecon_bool,
-                    allocation_df, group_properties):
-    allocation_method_type, allocation_bool, allocation_basis, allocation_timing = get_allocation_info(group_properties)
+def allocate_group_result_to_wells(group_result, group_starts, group_ends, lengths, allocation_bool, ratio_matrix,
+                                   tax_matrix, capex_ratios):
+    '''
+    `allocate_group_result` of every well with its allocation and tax ratios in the rows of ratio_matrix and tax_matrix
+    '''
+    allocation_result = group_result[ALLOCATION_RESULT_KEY]
+
+    def allocate_list(params_list):
+        allocated = [
+            allocate_params_to_wells(group_starts, group_ends, lengths, ratio_matrix, params) for params in params_list
+        ]
+        return [list(well_params) for well_params in zip(*allocated)] if allocated else [[] for _ in lengths]
+
+    fixed_expenses = allocate_list(allocation_result['fixed_expenses'])
+    variable_expenses = allocate_list(allocation_result['variable_expenses'])
+    water_disposals = allocate_list(allocation_result['water_disposal'])
+    production_tax = allocate_params_to_wells(group_starts, group_ends, lengths, tax_matrix,
+                                              allocation_result['production_tax_dict'])
+
+    return [{
+        'group_fixed_expenses': fixed_expenses[w],
+        'group_variable_expenses': variable_expenses[w],
+        'group_water_disposals': water_disposals[w],
+        'group_production_tax_dict': production_tax[w],
+        'allocated_group_capex_model': allocate_capex_model(
+            group_starts[w],
+            group_ends[w],
+            capex_ratios[w],
+            allocation_result['capex_dict'],
+            allocation_result['all_capex'],
+        ) if allocation_bool else [],
+    } for w in range(len(lengths))]
+
+
+def get_well_cutoff(original_cutoff_info, original_cf_start_date, group_properties, group_ecl):
+    original_cutoff_date = original_cutoff_info['cutoff_date']
+    cutoff_date = original_cutoff_date
+    ecl_link = get_group_ecl_option(group_properties)
 
-    if allocation_method_type == 'gross':
-        reference_values = np.array(allocation_df['gross_boe_well_head_volume'])
-        well_values = flat_output['gross_boe_well_head_volume']
+    if group_properties['econLimit'] == CANNOT_EXCEED_GROUP:
+        cutoff_date = min(original_cutoff_date, group_ecl)
+    elif group_properties['econLimit'] == MUST_BE_GROUP:
+        cutoff_date = group_ecl
+
+    # group cutoff earlier than well start date, make well unecon
+    if cutoff_date <= original_cf_start_date:
+        updated_well_unecon_bool = True
     else:
-        reference_values = np.array(allocation_df['net_boe_well_head_volume'])
-        well_values = flat_output['net_boe_well_head_volume']
-
-    well_date_list = flat_output['date']
-    well_ownership = {
-        'wi': flat_output['wi_oil'],  # use oil wi for well wi for now, pass out original wi in future
-        'nri': flat_output['nri_oil']  # use oil nri for well nri for now, pass out original nri in future
-    }
-
-    allocated_group_params = allocate(
-        well_date_list,
-        well_t_all,
-        well_values,
-        well_ownership,
-        allocation_df['date'].to_list(),
-        reference_values,
-        cutoff_date,
-        unecon_bool,
-        original_well_result_params,
-        group_result,
-        allocation_bool,
-        allocation_basis,
-        allocation_timing,
-    )
-    return allocated_group_params
+        unecon_bool = original_cutoff_info['unecon_bool']
+        updated_well_unecon_bool = update_unecon_bool(unecon_bool, ecl_link)
 
+    return cutoff_date, updated_well_unecon_bool
 
-def allocate_by_well_count(
-    flat_output,
-    original_well_result_params,
-    well_t_all,
-    group_result,
-    cutoff_date,
-    unecon_bool,
-    allocation_df,
-    group_properties,
-    well_one_liner_well_count,
-    group_well_count,
-):
-    allocation_method_type, allocation_bool, allocation_basis, allocation_timing = get_allocation_info(group_properties)
 
-    if allocation_timing == 'remaining':  # to match PHDWin well count remaining calculation
-        allocation_timing = 'monthly'
+class ParsedDates:
+    '''
+    date strings of a group parsed once for `find_cropping_indices` of all its wells
+    '''
+    def __init__(self, date_list):
+        self.date_list = date_list
+        self.dates = [datetime.fromisoformat(d).date() for d in date_list]
+        self.index = {}
+        for idx, d in enumerate(self.dates):
+            self.index.setdefault(d, idx)
+
+    def find_cropping_indices(self, well_date_list, cutoff_date):
+        '''
+        same as `find_cropping_indices(well_date_list, self.date_list, cutoff_date)`
+        '''
+        if not len(self.dates):
+            return 0, 1
 
-    if allocation_method_type == 'gross':
-        reference_values = np.array(allocation_df['gross_well_count'])
-        well_values = flat_output['gross_well_count']
-        capex_ratio = well_one_liner_well_count['gross_well_count'] / group_well_count['gross_well_count']
-    else:
-        reference_values = np.array(allocation_df['wi_well_count'])
-        well_values = flat_output['wi_well_count']
-        capex_ratio = well_one_liner_well_count['wi_well_count'] / group_well_count['wi_well_count']
-
-    well_date_list = flat_output['date']
-    well_ownership = {
-        'wi': flat_output['wi_oil'],  # use oil wi for well wi for now, pass out original wi in future
-        'nri': flat_output['nri_oil']  # use oil nri for well nri for now, pass out original nri in future
-    }
-
-    allocated_group_params = allocate(
-        well_date_list,
-        well_t_all,
-        well_values,
-        well_ownership,
-        allocation_df['date'].to_list(),
-        reference_values,
-        cutoff_date,
-        unecon_bool,
-        original_well_result_params,
-        group_result,
-        allocation_bool,
-        allocation_basis,
-        allocation_timing,
-        allocate_by_well_count=True,
-        allocate_by_well_count_capex_ratio=capex_ratio,
-    )
-    return allocated_group_params
+        start_date = datetime.fromisoformat(well_date_list[0]).date()
+        well_cutoff_date = min(cutoff_date, datetime.fromisoformat(well_date_list[-1]).date())
 
+        if start_date == well_cutoff_date or start_date < self.dates[0]:
+            return 0, 1  # unecon case
 
-def allocate_by_revenue(flat_output, original_well_result_params, well_t_all, group_result, cutoff_date, unecon_bool,
-                        allocation_df, group_properties):
-    allocation_method_type, allocation_bool, allocation_basis, allocation_timing = get_allocation_info(group_properties)
+        last_date = self.dates[-1]
+        if well_cutoff_date.year == last_date.year and well_cutoff_date.month == last_date.month:
+            group_end_idx = len(self.dates)
+        elif well_cutoff_date.month == 12:
+            group_end_idx = self.index.get(date(well_cutoff_date.year + 1, 1, 1))
+        else:
+            group_end_idx = self.index.get(date(well_cutoff_date.year, well_cutoff_date.month + 1, 1))
 
-    if allocation_method_type == 'gross':
-        reference_values = np.array(allocation_df['total_100_pct_wi_revenue'])
-        well_values = flat_output['total_100_pct_wi_revenue']
-    else:
-        reference_values = np.array(allocation_df['total_revenue'])
-        well_values = flat_output['total_revenue']
-
-    well_date_list = flat_output['date']
-    well_ownership = {
-        'wi': flat_output['wi_oil'],  # use oil wi for well wi for now, pass out original wi in future
-        'nri': flat_output['nri_oil']  # use oil nri for well nri for now, pass out original nri in future
-    }
-
-    allocated_group_params = allocate(
-        well_date_list,
-        well_t_all,
-        well_values,
-        well_ownership,
-        allocation_df['date'].to_list(),
-        reference_values,
-        cutoff_date,
-        unecon_bool,
-        original_well_result_params,
-        group_result,
-        allocation_bool,
-        allocation_basis,
-        allocation_timing,
-    )
-    return allocated_group_params
+        group_start_idx = self.index.get(start_date)
+        if group_start_idx is None or group_end_idx is None:
+            # dates missing in the group dates, raise the same error
+            return find_cropping_indices(well_date_list, self.date_list, cutoff_date)
 
+        return group_start_idx, group_end_idx
 
-def allocate_by_income(flat_output, original_well_result_params, well_t_all, group_result, cutoff_date, unecon_bool,
-                       allocation_df, group_properties):
-    allocation_method_type, allocation_bool, allocation_basis, allocation_timing = get_allocation_info(group_properties)
 
-    if allocation_method_type == 'gross':
-        reference_values = np.array(allocation_df['net_income'])
-        well_values = flat_output['net_income']
-    else:
-        reference_values = np.array(allocation_df['net_income'])
-        well_values = flat_output['net_income']
-
-    well_date_list = flat_output['date']
-    well_ownership = {
-        'wi': flat_output['wi_oil'],  # use oil wi for well wi for now, pass out original wi in future
-        'nri': flat_output['nri_oil']  # use oil nri for well nri for now, pass out original nri in future
-    }
-
-    allocated_group_params = allocate(
-        well_date_list,
-        well_t_all,
-        well_values,
-        well_ownership,
-        allocation_df['date'].to_list(),
-        reference_values,
-        cutoff_date,
-        unecon_bool,
-        original_well_result_params,
-        group_result,
-        allocation_bool,
-        allocation_basis,
-        allocation_timing,
-    )
-    return allocated_group_params
+def stack_cropped_values(values_list, lengths):
+    '''
+    the values of every well cropped to its length in the rows of a (wells x months) matrix, the rows are padded
+    with 0 after the length of the well
+    '''
+    matrix = np.zeros((len(values_list), max(lengths, default=0)))
+    for row, values, length in zip(matrix, values_list, lengths):
+        values = values[:length]
+        row[:len(values)] = values
+    matrix[matrix < 0] = 0  # negative won't get allocation
 
+    return matrix
 
-ALLOCATION_FUNCTIONS = {
-    'gas-volume': allocate_by_gas_volume,
-    'oil-volume': allocate_by_oil_volume,
-    'boe': allocate_by_boe,
-    'well-count': allocate_by_well_count,
-    'revenue': allocate_by_revenue,
-    'income': allocate_by_income,
-}
+
+def row_sums(matrix):
+    '''
+    `sum` of every row, adding the values from left to right
+    '''
+    if not matrix.shape[1]:
+        return np.zeros(len(matrix))
+    return np.cumsum(matrix, axis=1)[:, -1]
 
 
-def allocate_one_well(
-    flat_output,
-    original_cutoff_info,
-    original_well_result_params,
-    original_cf_start_date,
-    well_t_all,
-    well_one_liner_well_count,
-    group_properties,
-    group_result,
-    allocation_df,
-    group_well_count,
-):
+def remaining_sums(matrix):
     '''
-    if not allocate, still need to use a allocation function to run through the pipeline,
-    the result will be same for each allocation function, use well-count as default
+    `get_remaining_list` of every row of the matrix. The sum of every remaining list is the row sum of the upper
+    triangle of the row, done for chunks of rows to bound the size of the triangles.
     '''
-    allocation_method = get_allocation_method(group_properties)
-    allocation_function: Callable = ALLOCATION_FUNCTIONS[allocation_method]
+    num_rows, num_cols = matrix.shape
+    if not num_cols:
+        return np.zeros(matrix.shape)
 
-    group_ecl = group_result['group_cutoff'].get('cutoff_date')
-    original_cutoff_date = original_cutoff_info['cutoff_date']
-    cutoff_date = original_cutoff_date
-    ecl_link = get_group_ecl_option(group_properties)
+    upper_triangle = np.triu(np.ones((num_cols, num_cols), dtype=bool))
+    chunk_rows = max(REMAINING_CHUNK_CELLS // max(num_cols * num_cols, 1), 1)
 
-    if group_properties['econLimit'] == CANNOT_EXCEED_GROUP:
-        cutoff_date = min(original_cutoff_date, group_ecl)
-    elif group_properties['econLimit'] == MUST_BE_GROUP:
-        cutoff_date = group_ecl
+    remaining = np.zeros(matrix.shape)
+    for start in range(0, num_rows, chunk_rows):
+        triangles = np.where(upper_triangle, matrix[start:start + chunk_rows, np.newaxis, :], 0.)
+        remaining[start:start + chunk_rows] = row_sums(triangles.reshape(-1, num_cols)).reshape(-1, num_cols)
 
-    # group cutoff earlier than well start date, make well unecon
-    if cutoff_date <= original_cf_start_date:
-        updated_well_unecon_bool = True
-    else:
-        unecon_bool = original_cutoff_info['unecon_bool']
-        updated_well_unecon_bool = update_unecon_bool(unecon_bool, ecl_link)
+    return remaining
 
-    # cut group_allocation_df to group cutoff date for remaining allocation basis and capex allocation
-    allocation_df = cut_group_df(allocation_df, max_date=group_ecl)
 
-    if allocation_method == 'well-count':
-        allocated_group_params = allocation_function(
-            flat_output,
-            original_well_result_params,
-            well_t_all,
-            group_result,
-            cutoff_date,
-            updated_well_unecon_bool,
-            allocation_df,
-            group_properties,
-            well_one_liner_well_count,
-            group_well_count,
-        )
-    else:
-        allocated_group_params = allocation_function(
-            flat_output,
-            original_well_result_params,
-            well_t_all,
-            group_result,
-            cutoff_date,
-            updated_well_unecon_bool,
-            allocation_df,
-            group_properties,
-        )
+def annual_sums(matrix, size=12):
+    '''
+    `get_annual_list` of every row of the matrix, the rows are padded with 0 to full years
+    '''
+    num_rows, num_cols = matrix.shape
+    num_years = -(-num_cols // size)
+    padded = np.zeros((num_rows, num_years * size))
+    padded[:, :num_cols] = matrix
+    sums = row_sums(padded.reshape(-1, size)).reshape(num_rows, num_years)
+
+    return np.repeat(sums, size, axis=1)[:, :num_cols]
 
-    return allocated_group_params
 
+def allocate_one_group(wells, group_properties, group_result, allocation_df, group_well_count):
+    '''
+    allocate group params to all the wells of one group
 
-def allocate_one_batch(result_by_combo_by_group, one_batch_output, group_settings, allocation_df,
-                       well_count_by_combo_by_group):
-    for combo_output in one_batch_output:
-        combo_name = combo_output['combo']['name']
-        combo_group_result = result_by_combo_by_group[combo_name]
-        for well in combo_output['outputs']:
-            # skip well with error
-            if well.get('error') is not None or combo_group_result.get(well[ECON_GROUP], {}).get('error') is not None:
-                continue
-
-            econ_group = well[ECON_GROUP]
-            group_result = combo_group_result[econ_group]
-            group_allocation_df = filter_group_df(allocation_df, combo_name, econ_group)
-
-            allocated_group_params = allocate_one_well(
-                well['all_flat_output'],
-                well['original_cutoff_info'],
-                well['original_well_result_params'],
-                well['well_input'].date_dict['cf_start_date'],
-                well['t_all'],
-                well['one_liner_well_count'],
-                # TODO: group case doesn't consider combo now, always use default, change after combo implemented
-                get_group_properties(group_settings, econ_group, DEFAULT_COMBO_NAME),
-                group_result,
-                group_allocation_df,
-                well_count_by_combo_by_group.get(combo_name, {}).get(econ_group, ZERO_GROUP_WELL_COUNT))
-
-            well['group_params'] = allocated_group_params
+    the cropped well values of all the wells are stacked in a (wells x months) matrix to calculate the allocation
+    ratios at once, the group dates are parsed and the allocation df is cut once for the group
+    '''
+    allocation_method = get_allocation_method(group_properties)
+    allocation_method_type, allocation_bool, allocation_basis, allocation_timing = get_allocation_info(group_properties)
+    allocation_column = ALLOCATION_COLUMNS[allocation_method][allocation_method_type == 'gross']
+
+    if allocation_method == 'well-count' and allocation_timing == 'remaining':
+        allocation_timing = 'monthly'  # to match PHDWin well count remaining calculation
+
+    group_ecl = group_result['group_cutoff'].get('cutoff_date')
+    allocation_df = cut_group_df(allocation_df, max_date=group_ecl)
+    reference_values = np.array(allocation_df[allocation_column])
+    reference_total = sum(reference_values)
+
+    allocation_dates = ParsedDates(allocation_df['date'].to_list())
+    group_dates = ParsedDates(group_result[ALLOCATION_RESULT_KEY]['date_list'].astype(str))
+
+    flat_outputs = [well['all_flat_output'] for well in wells]
+    cutoffs = [
+        get_well_cutoff(well['original_cutoff_info'], well['well_input'].date_dict['cf_start_date'], group_properties,
+                        group_ecl) for well in wells
+    ]
+    allocation_indices = [
+        allocation_dates.find_cropping_indices(flat_output['date'], cutoff_date)
+        for flat_output, (cutoff_date, _) in zip(flat_outputs, cutoffs)
+    ]
+    starts = np.array([start_idx for start_idx, _ in allocation_indices], dtype=int)
+    lengths = np.array([end_idx - start_idx for start_idx, end_idx in allocation_indices], dtype=int)
+    allocated = np.array([allocation_bool and not unecon_bool for _, unecon_bool in cutoffs], dtype=bool)
+
+    well_values = stack_cropped_values([flat_output[allocation_column] for flat_output in flat_outputs], lengths)
+    width = well_values.shape[1]
+    in_length = np.arange(width) < lengths[:, np.newaxis]
+    # wells with more months than the allocation df after their start can't be stacked with the reference values
+    stacked = starts + lengths <= len(reference_values)
+
+    def crop_reference(values):
+        # values from the start of every well for its months, padded with 0
+        reference_idx = np.minimum(starts[:, np.newaxis] + np.arange(width), max(len(values) - 1, 0))
+        return np.where(in_length & stacked[:, np.newaxis], values[reference_idx] if len(values) else 0., 0.)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if allocation_timing == 'remaining':
+            # the remaining reference values are the whole array after the start of the well, not cut at its ECL
+            reference_remaining = remaining_sums(reference_values[np.newaxis, :])[0]
+            ratio_matrix = np.nan_to_num(np.divide(remaining_sums(well_values), crop_reference(reference_remaining)))
+        elif allocation_timing == 'annual':
+            ratio_matrix = np.nan_to_num(
+                np.divide(annual_sums(well_values), annual_sums(crop_reference(reference_values))))
+        else:
+            ratio_matrix = np.nan_to_num(np.divide(well_values, crop_reference(reference_values)))
+    ratio_matrix[~allocated] = 0
+
+    tax_matrix = ratio_matrix
+    if allocation_bool and allocation_basis == 'gross':
+        wi_matrix = stack_cropped_values([flat_output['wi_oil'] for flat_output in flat_outputs], lengths)
+        nri_matrix = stack_cropped_values([flat_output['nri_oil'] for flat_output in flat_outputs], lengths)
+        # the order for the following calculation matters allocation_ratios_tax need to be calculated first
+        tax_matrix = np.where(allocated[:, np.newaxis], ratio_matrix * nri_matrix, ratio_matrix)
+        ratio_matrix = np.where(allocated[:, np.newaxis], ratio_matrix * wi_matrix, ratio_matrix)
+
+    well_totals = row_sums(well_values)
+    capex_ratios = []
+    for w, well in enumerate(wells):
+        capex_well_ratio = 0  # for 1. no allocation, 2. unecon
+        if allocation_method == 'well-count':
+            capex_ratio = well['one_liner_well_count'][allocation_column] / group_well_count[allocation_column]
+            if allocated[w]:
+                capex_well_ratio = capex_ratio
+        elif allocated[w]:
+            capex_well_ratio = well_totals[w] / reference_total if reference_total > 0 else 0
+
+        allocation_ratio_capex = np.repeat(capex_well_ratio, lengths[w])
+        if allocated[w] and allocation_basis == 'gross':
+            allocation_ratio_capex = np.multiply(allocation_ratio_capex, wi_matrix[w, :lengths[w]])
+        capex_ratios.append(allocation_ratio_capex)
+
+    group_indices = [
+        group_dates.find_cropping_indices(flat_output['date'], cutoff_date)
+        for flat_output, (cutoff_date, _) in zip(flat_outputs, cutoffs)
+    ]
+    group_starts = np.array([start_idx for start_idx, _ in group_indices], dtype=int)
+    group_ends = np.array([end_idx for _, end_idx in group_indices], dtype=int)
+
+    matrix_wells = np.flatnonzero(~allocated | stacked)
+    allocated_params = dict(
+        zip(
+            matrix_wells,
+            allocate_group_result_to_wells(group_result, group_starts[matrix_wells], group_ends[matrix_wells],
+                                           lengths[matrix_wells], allocation_bool, ratio_matrix[matrix_wells],
+                                           tax_matrix[matrix_wells], [capex_ratios[w] for w in matrix_wells])))
+
+    for w in np.flatnonzero(allocated & ~stacked):
+        start_idx, end_idx = allocation_indices[w]
+        allocation_ratios = get_allocation_ratios(well_values[w, :lengths[w]], reference_values[start_idx:end_idx],
+                                                  reference_values[start_idx:], allocation_bool, allocation_timing,
+                                                  False)
+        allocation_ratios_tax = allocation_ratios
+        if allocation_basis == 'gross':
+            allocation_ratios_tax = np.multiply(allocation_ratios, nri_matrix[w, :lengths[w]])
+            allocation_ratios = np.multiply(allocation_ratios, wi_matrix[w, :lengths[w]])
+        allocated_params[w] = allocate_group_result(group_result, group_starts[w], group_ends[w], allocation_bool,
+                                                    allocation_ratios, allocation_ratios_tax, capex_ratios[w])
+
+    for w, well in enumerate(wells):
+        cutoff_date, unecon_bool = cutoffs[w]
+        original_well_result_params = well['original_well_result_params']
+        well['group_params'] = {
+            'final_cutoff_date': cutoff_date,
+            'rev_dates_detail': original_well_result_params['rev_dates_detail'],
+            'unecon_bool': unecon_bool,
+            'is_complete': True,
+            # ownership t_list doesn't need to be consistent with well's t_list
+            't_ownership': original_well_result_params['t_ownership'],
+            'ownership_params': original_well_result_params['ownership_params'],
+            **allocated_params[w],
+            't_allocation': well['t_all'][0:lengths[w]],
+        }
 
 
 def allocate_to_wells(result_by_combo_by_group, individual_well_batch_outputs, group_settings, allocation_df):
@@ -561,8 +458,27 @@ def allocate_to_wells(result_by_combo_by_group, individual_well_batch_outputs, g
     add allocation result as 'group_params' to individual_well_batch_outputs
     '''
     well_count_by_combo_by_group = get_well_count_by_combo_by_group(individual_well_batch_outputs, group_settings)
+
+    wells_by_combo_by_group = {}
     for batch in individual_well_batch_outputs:
-        allocate_one_batch(result_by_combo_by_group, batch, group_settings, allocation_df, well_count_by_combo_by_group)
+        for combo_output in batch:
+            combo_name = combo_output['combo']['name']
+            combo_group_result = result_by_combo_by_group[combo_name]
+            for well in combo_output['outputs']:
+                # skip well with error
+                if well.get('error') is not None or combo_group_result.get(well[ECON_GROUP],
+                                                                            {}).get('error') is not None:
+                    continue
+                wells_by_combo_by_group.setdefault((combo_name, well[ECON_GROUP]), []).append(well)
+
+    for (combo_name, econ_group), wells in wells_by_combo_by_group.items():
+        allocate_one_group(
+            wells,
+            # TODO: group case doesn't consider combo now, always use default, change after combo implemented
+            get_group_properties(group_settings, econ_group, DEFAULT_COMBO_NAME),
+            result_by_combo_by_group[combo_name][econ_group],
+            filter_group_df(allocation_df, combo_name, econ_group),
+            well_count_by_combo_by_group.get(combo_name, {}).get(econ_group, ZERO_GROUP_WELL_COUNT))
 
 
 def update_unecon_bool(independent_well_unecon_bool, ecl_link):
@@ -593,7 +509,7 @@ def get_well_count_by_combo_by_group(individual_well_batch_outputs, group_settin
                 ecl_link = get_group_ecl_option(one_group_setting)
                 updated_well_unecon_bool = update_unecon_bool(well_unecon_bool, ecl_link)
 
-                one_liner_well_count = copy.deepcopy(well_output['one_liner_well_count'])
+                one_liner_well_count = dict(well_output['one_liner_well_count'])
 
                 if updated_well_unecon_bool:
                     one_liner_well_count = {k: 0 for k in one_liner_well_count}
@@ -35,18 +35,14 @@ from combocurve.shared.contexts import with_feature_flag_context
 
 
 def batch_outputs_to_pldf(individual_batch_outputs, group_settings, run_data, from_cutoff=False):
-    if len(individual_batch_outputs) == 0:
-        flat_monthly_rows = []
-    else:
-        # individual_batch_outputs has all well error will also result in flat_monthly_rows = []
-        all_monthly_rows = Parallel(n_jobs=len(individual_batch_outputs))(
-            delayed(get_monthly_rows)(batch_output, group_settings, run_data, from_cutoff)
-            for batch_output in individual_batch_outputs)
-        flat_monthly_rows = [item for sublist in all_monthly_rows for item in sublist]
-
-    if len(flat_monthly_rows) > 0:
-        all_df = pl.from_dicts(flat_monthly_rows,
-                               infer_schema_length=len(flat_monthly_rows)).select(GROUP_PL_DF_SCHEMA.keys())
+    # individual_batch_outputs has all well error will also result in no well df
+    well_dfs = [
+        well_df for batch_outputs in individual_batch_outputs
+        for well_df in get_monthly_dfs(batch_outputs, group_settings, run_data, from_cutoff)
+    ]
+
+    if len(well_dfs) > 0:
+        all_df = pl.concat(well_dfs)
     else:
         all_df = pl.DataFrame(schema=GROUP_PL_DF_SCHEMA)
 
@@ -59,23 +55,39 @@ def get_well_result_pldfs(individual_batch_outputs, group_settings, run_data):
     return well_result_df, gross_well_result_df
 
 
-def get_monthly_rows(batch_outputs, group_settings, run_data, from_cutoff):
-    monthly_rows = []
+def get_monthly_dfs(batch_outputs, group_settings, run_data, from_cutoff):
+    monthly_dfs = []
     for combo in batch_outputs:
         for output in combo['outputs']:
             if output.get('error') is None:  # skip well with error
-                rows = build_monthly_rows(output, combo['combo'], group_settings, run_data, from_cutoff)
-                '''
-                the append method will auto create new column if 'rows' has more columns than 'monthly_rows'
-                this can happen for example: the first well error out (less cols) but the second well not (all cols)
-                '''
-                monthly_rows += rows
-    return monthly_rows
+                well_df = build_monthly_df(output, combo['combo'], group_settings, run_data, from_cutoff)
+                if well_df is not None:
+                    monthly_dfs.append(well_df)
+    return monthly_dfs
+
+
+def schema_series(name, values, dtype):
+    if isinstance(values, np.ndarray) and values.dtype == object:
+        values = values.tolist()
+    return pl.Series(name, values, dtype=dtype)
 
 
-def build_monthly_rows(output, combo, group_settings, run_data, from_cutoff):
+def monthly_df(base, data_dict, num_rows):
     '''
-        Returns multiple rows with the schema for the monthly table in BigQuery
+        Returns the first num_rows of data_dict with the columns of GROUP_PL_DF_SCHEMA, the base columns are the same
+        for all the rows and the columns missing in data_dict are null
+    '''
+    return pl.DataFrame([
+        pl.Series(col, [base[col]] * num_rows, dtype=dtype) if col in base else
+        schema_series(col, data_dict[col][:num_rows], dtype) if col in data_dict else pl.Series(
+            col, [None] * num_rows, dtype=dtype) for col, dtype in GROUP_PL_DF_SCHEMA.items()
+    ])
+
+
+def build_monthly_df(output, combo, group_settings, run_data, from_cutoff):
+    '''
+        Returns the monthly rows of a well for the group df, built from the arrays of its output, or None if the well
+        is skipped for allocation
     '''
     base = build_monthly_one_liner_base_columns(output, combo, run_data)
     base[ECON_GROUP] = output[ECON_GROUP]  # all output should have ECON_GROUP field
@@ -91,40 +103,27 @@ def build_monthly_rows(output, combo, group_settings, run_data, from_cutoff):
 
     if 'error' in output:
         '''
-        return a list of dict also make append to whole df work
+        one row with only the base columns, the other wells can still be concatenated
         '''
-        return [base]
+        return monthly_df(base, {}, 1)
+
+    if from_cutoff and output['original_cutoff_info']['cutoff_well_result'] is not None:
+        data_dict = group_econ_data_from_well_result(output['original_cutoff_info']['cutoff_well_result'],
+                                                     output[ECON_GROUP], combo['name'])
     else:
-        if from_cutoff and output['original_cutoff_info']['cutoff_well_result'] is not None:
-            data_dict = group_econ_data_from_well_result(output['original_cutoff_info']['cutoff_well_result'],
-                                                         output[ECON_GROUP], combo['name'])
-        else:
-            data_dict = output['all_flat_output']
+        data_dict = output['all_flat_output']
 
-        data = np.array(list(data_dict.values()), dtype='O')
-        date_array = data_dict['date']
+    date_array = data_dict['date']
+    num_rows = len(date_array)
 
+    if cut:
+        well_unecon_bool = output['original_cutoff_info']['unecon_bool']
+        if well_unecon_bool:  # for unecon well and meet 'cut' condition, skip well for allocation
+            return None
         if cut_date_str in date_array:
-            cut_index = list(date_array).index(cut_date_str)
-        else:
-            cut_index = None
-
-        if cut:
-            well_unecon_bool = output['original_cutoff_info']['unecon_bool']
-            if well_unecon_bool:  # for unecon well and meet 'cut' condition, skip well for allocation
-                return []
-            if cut_index is not None:
-                data = data[:, :cut_index]
-
-        keys = data_dict.keys()
-        num_rows = data.shape[1]
-        records = []
-        for row_idx in range(num_rows):
-            row_dict = dict(zip(keys, data[:, row_idx]))
-            row_dict.update(base)
-            records.append(row_dict)
-
-        return records
+            num_rows = list(date_array).index(cut_date_str)
+
+    return monthly_df(base, data_dict, num_rows)
 
 
 def batch_econ_final(batch, is_fiscal_month):
@@ -6,6 +6,7 @@ from calendar import monthrange
 from combocurve.science.econ.general_functions import get_py_date, index_to_py_date, py_date_to_index
 from combocurve.science.econ.econ_model_rows_process import rows_process
 from combocurve.science.econ.helpers import date_to_t, date_to_t_daily, days_in_month
+from combocurve.shared.date import date_object_array
 
 ECL_CAPEX_CATEGORY = ['abandonment', 'salvage']
 
@@ -359,7 +360,8 @@ class PreProcess:
                 if key not in ['time', 'date']:
                     volume_dict['monthly'][key] = np.append(volume_dict['monthly'][key], np.zeros(len(add_time)))
                 elif key == 'date':
-                    volume_dict['monthly'][key] = np.append(volume_dict['monthly'][key], add_date)
+                    volume_dict['monthly'][key] = np.append(date_object_array(volume_dict['monthly'][key]),
+                                                            date_object_array(add_date))
                 elif key == 'time':
                     volume_dict['monthly'][key] = np.append(volume_dict['monthly'][key], add_time)
         else:
@@ -389,7 +391,8 @@ class PreProcess:
                 if key not in ['time', 'date']:
                     volume_dict['monthly'][key] = np.append(np.zeros(len(add_time)), volume_dict['monthly'][key])
                 elif key == 'date':
-                    volume_dict['monthly'][key] = np.append(add_date, volume_dict['monthly'][key])
+                    volume_dict['monthly'][key] = np.append(date_object_array(add_date),
+                                                            date_object_array(volume_dict['monthly'][key]))
                 elif key == 'time':
                     volume_dict['monthly'][key] = np.append(add_time, volume_dict['monthly'][key])
         else:
@@ -407,7 +410,8 @@ class PreProcess:
 
         # transform each list to be np.array
         for key in volume_dict['monthly'].keys():
-            volume_dict['monthly'][key] = np.array(volume_dict['monthly'][key])
+            values = volume_dict['monthly'][key]
+            volume_dict['monthly'][key] = np.array(date_object_array(values) if key == 'date' else values)
 
         # append zeros from cut_off to report end
         PreProcess.append_zeros(volume_dict['monthly'], t_cut_off, t_cf_end)
@@ -175,14 +175,15 @@ class Well:
 
     def simple_econ_func(self):
         '''Return a function that executes all calculations in a queue of EconCalculation objects, based on the queue
-        specified in the create_queue method.
+        specified in the create_queue method. Calculations whose inputs are unchanged since the previous call (e.g.
+        well head volumes between reversion, cutoff, final and breakeven passes) are reused instead of recomputed.
         '''
         calculation_factory = CalculationFactory(CALCULATIONS)
         income_tax = self.well_input.tax_option
 
         calculation_queue = calculation_factory.econ_calculation_queue(self.is_fiscal_month, income_tax)
 
-        return calculation_function_on_queue(calculation_queue, WellResult)
+        return calculation_function_on_queue(calculation_queue, WellResult, reuse_stages=True)
 
     def group_simple_econ_func(self):
         '''Return a function that executes all calculations in a queue of EconCalculation objects, based on the queue
@@ -193,7 +194,7 @@ class Well:
 
         calculation_queue = calculation_factory.econ_calculation_queue(self.is_fiscal_month, income_tax)
 
-        return calculation_function_on_queue(calculation_queue, WellResult)
+        return calculation_function_on_queue(calculation_queue, WellResult, reuse_stages=True)
 
     def calculate_reversion(self):
         (ownership_params, t_ownership,
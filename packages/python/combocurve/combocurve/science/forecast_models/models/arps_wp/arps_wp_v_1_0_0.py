@@ -29,6 +29,17 @@ class model_arps_wp(model_parent):
         ret_list[range_1] = pred_arps(t[range_1], t_peak, q_peak, D, b)
         return ret_list
 
+    def func_population(self, t, p_population, p_fixed):
+        # func with one (D_eff, b) row per candidate broadcast against t
+        D_eff, b = p_population[:, [0]], p_population[:, [1]]
+        [t_first, minus_t_peak_t_first, q_peak] = p_fixed
+        t_peak = t_first + minus_t_peak_t_first
+        ret = np.zeros((p_population.shape[0], *t.shape))
+        D = arps_D_eff_2_D(D_eff, b)
+        range_1 = (t >= t_peak)
+        ret[:, range_1] = pred_arps(t[range_1], t_peak, q_peak, D, b)
+        return ret
+
     def predict(self, t, p, p_fixed):
         return self.func(t, p, p_fixed)
 
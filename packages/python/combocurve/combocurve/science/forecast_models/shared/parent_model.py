@@ -524,6 +524,20 @@ class model_parent:
         """
         raise NotImplementedError
 
+    def func_population(self, t: np.ndarray, p_population: np.ndarray, p_fixed: List[Any]) -> np.ndarray:
+        """func_population evaluates func for a whole population of parameters, as used by vectorized differential
+        evolution. Models that can broadcast their parameters override it.
+
+        Args:
+            t (np.ndarray): times to predict
+            p_population (np.ndarray): (n_candidates, n_parameters) optimizable parameters, one candidate per row
+            p_fixed (List[Any]): fixed parameters shared by every candidate
+
+        Returns: (n_candidates, len(t)) predictions
+
+        """
+        return np.array([self.func(t, p, p_fixed) for p in p_population]).reshape(len(p_population), *np.shape(t))
+
     def predict_cum_volume(self, t, p, p_fixed, p2seg_dict):
         if np.any(np.isnan(p)):
             return np.full(t.shape, np.nan)
@@ -1,4 +1,7 @@
+from functools import wraps
+
 import numpy as np
+from joblib import Parallel, delayed
 from scipy.optimize import differential_evolution, minimize
 
 
@@ -11,13 +14,48 @@ def get_use_para_dict(valid_parameter_names, parameter_dictionary):
     return use_para_dictionary
 
 
+def evaluates_population(population_fun):
+    '''
+    Decorates a loss following the `vectorized=True` contract of differential_evolution: called with a
+    (n_parameters, n_candidates) population it returns the n_candidates losses. The polishing step still calls it with
+    a single (n_parameters,) candidate, which gets its loss as a scalar.
+    '''
+    @wraps(population_fun)
+    def fun(population, *args):
+        population = np.asarray(population)
+        if population.ndim == 1:
+            return population_fun(population[:, np.newaxis], *args)[0]
+        return population_fun(population, *args)
+
+    return fun
+
+
+def population_loss(target_fun):
+    '''
+    Evaluates a loss of one candidate for each candidate of a population, for losses without a population version.
+    '''
+    @evaluates_population
+    def loss(population, *args):
+        return np.array([target_fun(x, *args) for x in population.T])
+
+    return loss
+
+
+def _vectorized_para_dict(use_para_dictionary):
+    # scipy evaluates a vectorized population only after the whole generation is mutated, which is the 'deferred'
+    # updating. A scalar loss with updating='deferred' and the same seed gives the same result
+    if use_para_dictionary.get('vectorized'):
+        use_para_dictionary['updating'] = 'deferred'
+    return use_para_dictionary
+
+
 def my_differential_evolution(target_fun, parameter_dictionary):
     valid_parameter_names = [
         'bounds', 'args', 'strategy', 'maxiter', 'popsize', 'tol', 'mutation', 'recombination', 'seed', 'disp',
-        'callback', 'polish', 'init', 'atol', 'updating', 'workers', 'constraints'
+        'callback', 'polish', 'init', 'atol', 'updating', 'workers', 'constraints', 'vectorized'
     ]
 
-    use_para_dictionary = get_use_para_dict(valid_parameter_names, parameter_dictionary)
+    use_para_dictionary = _vectorized_para_dict(get_use_para_dict(valid_parameter_names, parameter_dictionary))
     # scipy.optimize.Bounds
     # lower_bounds = [bound[0] for bound in use_para_dictionary['bounds']]
     # upper_bounds = [bound[1] for bound in use_para_dictionary['bounds']]
@@ -28,20 +66,25 @@ def my_differential_evolution(target_fun, parameter_dictionary):
 
 
 def repeated_differential_evolution(target_fun, parameter_dictionary):
+    '''
+    Runs differential_evolution once per seed of `random_seeds` and returns the best fit. With `seed_workers` > 1 (or
+    -1 for all CPUs) the seeds run in a process pool, target_fun and args must then be picklable.
+    '''
     random_seeds = parameter_dictionary.get('random_seeds')
     if random_seeds:
         valid_parameter_names = [
             'bounds', 'args', 'strategy', 'maxiter', 'popsize', 'tol', 'mutation', 'recombination', 'disp', 'callback',
-            'polish', 'init', 'atol', 'updating', 'workers', 'constraints'
+            'polish', 'init', 'atol', 'updating', 'workers', 'constraints', 'vectorized'
         ]
-        use_para_dictionary = get_use_para_dict(valid_parameter_names, parameter_dictionary)
-        err = []
-        fits = []
-        for seed in random_seeds:
-            use_para_dictionary['seed'] = seed
-            this_fit = differential_evolution(target_fun, **use_para_dictionary)
-            err += [this_fit.fun]
-            fits += [this_fit]
+        use_para_dictionary = _vectorized_para_dict(get_use_para_dict(valid_parameter_names, parameter_dictionary))
+        seed_workers = parameter_dictionary.get('seed_workers') or 1
+        if seed_workers == 1 or len(random_seeds) == 1:
+            fits = [differential_evolution(target_fun, seed=seed, **use_para_dictionary) for seed in random_seeds]
+        else:
+            n_jobs = seed_workers if seed_workers < 0 else min(seed_workers, len(random_seeds))
+            fits = Parallel(n_jobs=n_jobs)(delayed(differential_evolution)(target_fun, seed=seed, **use_para_dictionary)
+                                           for seed in random_seeds)
+        err = [this_fit.fun for this_fit in fits]
 
         min_err_idx = np.argmin(err)
         return fits[min_err_idx]
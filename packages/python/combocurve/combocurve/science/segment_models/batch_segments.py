@@ -0,0 +1,316 @@
+from typing import Callable, Optional, Sequence
+import numpy as np
+
+from combocurve.shared.constants import BASE_TIME_NPDATETIME64
+from .shared.helper import pred_arps, pred_exp, pred_linear
+
+SEGMENT_MODELS = ('empty', 'flat', 'exp_inc', 'exp_dec', 'arps', 'arps_inc', 'arps_modified', 'linear')
+MODEL_CODES = {name: code for code, name in enumerate(SEGMENT_MODELS)}
+
+PARAM_COLUMNS = ('model', 'start_idx', 'end_idx', 'q_start', 'D', 'b', 'D_exp', 'sw_idx', 'q_sw', 'k')
+(MODEL, START_IDX, END_IDX, Q_START, D, B, D_EXP, SW_IDX, Q_SW, K) = range(len(PARAM_COLUMNS))
+
+# number of points evaluated together, large batches are cut so the working arrays stay in cache
+POINT_CHUNK_SIZE = 1 << 16
+
+# segment fields read by each model when predicting, every other column of the packed row stays 0
+MODEL_FIELDS = {
+    'empty': (),
+    'flat': ('q_start', ),
+    'exp_inc': ('q_start', 'D'),
+    'exp_dec': ('q_start', 'D'),
+    'arps': ('q_start', 'D', 'b'),
+    'arps_inc': ('q_start', 'D', 'b'),
+    'arps_modified': ('q_start', 'D', 'b', 'D_exp', 'sw_idx', 'q_sw'),
+    'linear': ('q_start', 'k'),
+}
+
+
+def run_index(counts: np.ndarray) -> np.ndarray:
+    """Index of the run each element belongs to, np.repeat(np.arange(len(counts)), counts) without its per-run copies
+
+    Args:
+      counts: non-negative lengths of the runs
+
+    Returns:
+      np.ndarray: the run index of every element
+    """
+    counts = np.asarray(counts, dtype=int)
+    ends = np.cumsum(counts)
+    if len(ends) == 0:
+        return np.zeros(0, dtype=int)
+    return np.cumsum(np.bincount(ends[:-1], minlength=ends[-1] + 1)[:-1])
+
+
+def ragged_arange(counts: np.ndarray, point_run: Optional[np.ndarray] = None) -> np.ndarray:
+    """Concatenation of np.arange(c) for every c in counts, without a Python loop
+
+    Args:
+      counts: non-negative lengths of the ranges
+      point_run: run_index(counts), when already known
+
+    Returns:
+      np.ndarray: the concatenated ranges
+    """
+    counts = np.asarray(counts, dtype=int)
+    if point_run is None:
+        point_run = run_index(counts)
+    starts = np.cumsum(counts) - counts
+    return np.arange(point_run.size) - starts[point_run]
+
+
+class BatchSegments(object):
+    def __init__(self, params: np.ndarray, well_offsets: np.ndarray):
+        """Packed forecast segments of several wells
+
+        Args:
+          params: (n_segments, len(PARAM_COLUMNS)) array, one row per segment, wells stored contiguously
+          well_offsets: (n_wells + 1,) array, segments of well i are params[well_offsets[i]:well_offsets[i + 1]]
+
+        Returns:
+          None
+        """
+        self.well_offsets = well_offsets
+        self.segment_well = np.repeat(np.arange(self.n_wells), np.diff(well_offsets))
+
+        # a single sorted key over all wells lets one searchsorted map every (well, time) point to its segment
+        if params.shape[0] > 0:
+            self._low = params[:, START_IDX].min()
+            self._high = params[:, END_IDX].max()
+        else:
+            self._low = self._high = 0
+        self._span = self._high - self._low + 3
+        order = np.argsort(self._key(params[:, START_IDX], self.segment_well), kind='stable')
+        self.params = params[order]
+        self.segment_well = self.segment_well[order]
+        self._start_key = self._key(self.params[:, START_IDX], self.segment_well)
+        self._end_key = self._key(self.params[:, END_IDX], self.segment_well)
+
+    @classmethod
+    def from_segments(cls, wells_segments: Sequence[Sequence[dict]]) -> 'BatchSegments':
+        """Compile the forecast segments of several wells into packed parameter arrays
+
+        Args:
+          wells_segments: one list of forecast segment dictionaries per well, each sorted by start_idx
+
+        Returns:
+          BatchSegments: the packed segments
+        """
+        rows = []
+        well_offsets = [0]
+        for segments in wells_segments:
+            for seg in segments or []:
+                # segments with no days never predict anything, drop them so they can not shadow their neighbors
+                if seg['end_idx'] < seg['start_idx']:
+                    continue
+                row = [0.0] * len(PARAM_COLUMNS)
+                row[MODEL] = MODEL_CODES[seg['name']]
+                row[START_IDX] = seg['start_idx']
+                row[END_IDX] = seg['end_idx']
+                for field in MODEL_FIELDS[seg['name']]:
+                    row[PARAM_COLUMNS.index(field)] = seg[field]
+                rows.append(row)
+            well_offsets.append(len(rows))
+
+        params = np.array(rows, dtype=float).reshape(-1, len(PARAM_COLUMNS))
+        return cls(params, np.array(well_offsets, dtype=int))
+
+    @property
+    def n_wells(self) -> int:
+        return len(self.well_offsets) - 1
+
+    def _key(self, t: np.ndarray, well_idx: np.ndarray) -> np.ndarray:
+        # times outside of all segments are clipped so their key stays within the range of their own well
+        return well_idx * self._span + (np.minimum(np.maximum(t, self._low - 1), self._high + 1) - self._low)
+
+    def segment_runs(self, t_key: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Find the run of sorted points covered by each segment
+
+        Args:
+          t_key: sorted keys of the (well, time) points
+
+        Returns:
+          (np.ndarray, np.ndarray): first point and number of points of each segment (row of self.params)
+        """
+        run_start = np.searchsorted(t_key, self._start_key, side='left')
+        run_end = np.searchsorted(t_key, self._end_key, side='right')
+        # a day shared by two consecutive segments belongs to the later one
+        run_end[:-1] = np.minimum(run_end[:-1], run_start[1:])
+        return run_start, np.maximum(run_end - run_start, 0)
+
+    def predict_flat(self,
+                     t: np.ndarray,
+                     well_idx: np.ndarray,
+                     to_fill: float = 0,
+                     base: Optional['BatchSegments'] = None) -> np.ndarray:
+        """Predict the daily rates of (well, time) points
+
+        Args:
+          t: flat array of time indexes
+          well_idx: well of each time index
+          to_fill: value of the points not covered by any segment
+          base: base phase segments, when given the packed segments are ratio segments and base * ratio is returned
+
+        Returns:
+          np.ndarray: the predicted rates
+        """
+        if base is not None:
+            return base.predict_flat(t, well_idx, to_fill) * self.predict_flat(t, well_idx, to_fill)
+
+        t = np.asarray(t, dtype=float)
+        well_idx = np.asarray(well_idx, dtype=int)
+        ret = np.full(t.shape, to_fill, dtype=float)
+        if self.params.shape[0] == 0 or t.size == 0:
+            return ret
+
+        t_key = self._key(t, well_idx)
+        order = None
+        if np.any(t_key[1:] < t_key[:-1]):
+            order = np.argsort(t_key, kind='stable')
+            t, t_key = t[order], t_key[order]
+        # sorted points are evaluated in chunks that stay in cache, each chunk is still a single pass over all wells
+        sorted_ret = np.full(t.shape, to_fill, dtype=float)
+        for lo in range(0, t.size, POINT_CHUNK_SIZE):
+            hi = min(lo + POINT_CHUNK_SIZE, t.size)
+            sorted_ret[lo:hi] = self._predict_sorted(t[lo:hi], t_key[lo:hi], to_fill)
+
+        if order is None:
+            return sorted_ret
+        ret[order] = sorted_ret
+        return ret
+
+    def _predict_sorted(self, t: np.ndarray, t_key: np.ndarray, to_fill: float) -> np.ndarray:
+        ret = np.full(t.shape, to_fill, dtype=float)
+        run_start, run_len = self.segment_runs(t_key)
+        active = np.flatnonzero(run_len)
+        active_codes = self.params[active, MODEL].astype(int)
+        for code in set(active_codes.tolist()):
+            runs = active[active_codes == code]
+            name = SEGMENT_MODELS[code]
+            if runs.size == 1:
+                # a single run is a contiguous slice with scalar parameters, the usual case for one well
+                row = self.params[runs[0]]
+                idx = slice(run_start[runs[0]], run_start[runs[0]] + run_len[runs[0]])
+                ret[idx] = self._predict_model(name, t[idx], lambda col: row[col])
+                continue
+            counts = run_len[runs]
+            point_run = run_index(counts)
+            idx = run_start[runs][point_run] + ragged_arange(counts, point_run)
+            rows = self.params[runs]
+            ret[idx] = self._predict_model(name, t[idx], lambda col: rows[:, col][point_run])
+
+        return ret
+
+    @staticmethod
+    def _predict_model(name: str, t: np.ndarray, param: Callable[[int], np.ndarray]) -> np.ndarray:
+        if name == 'empty':
+            return np.zeros(t.shape)
+        if name == 'flat':
+            return np.ones(t.shape) * param(Q_START)
+        if name in ('exp_inc', 'exp_dec'):
+            return pred_exp(t, param(START_IDX), param(Q_START), param(D))
+        if name in ('arps', 'arps_inc'):
+            return pred_arps(t, param(START_IDX), param(Q_START), param(D), param(B))
+        if name == 'linear':
+            return pred_linear(t, param(Q_START), param(START_IDX), param(K))
+
+        # arps_modified
+        ret = np.zeros(t.shape)
+        sw_idx = param(SW_IDX)
+        range_1 = t <= sw_idx
+        range_2 = ~range_1
+
+        def masked(col, mask):
+            value = param(col)
+            return value if np.ndim(value) == 0 else value[mask]
+
+        ret[range_1] = pred_arps(t[range_1], masked(START_IDX, range_1), masked(Q_START, range_1), masked(D, range_1),
+                                 masked(B, range_1))
+        ret[range_2] = pred_exp(t[range_2], masked(SW_IDX, range_2), masked(Q_SW, range_2), masked(D_EXP, range_2))
+        return ret
+
+    def predict(self,
+                t_per_well: Sequence[Sequence[float]],
+                to_fill: float = 0,
+                base: Optional['BatchSegments'] = None) -> list[np.ndarray]:
+        """Predict the daily rates of every well for its own time indexes
+
+        Args:
+          t_per_well: one array of time indexes per well
+          to_fill: value of the points not covered by any segment
+          base: base phase segments, when given the packed segments are ratio segments and base * ratio is returned
+
+        Returns:
+          list[np.ndarray]: the predicted daily rates of each well
+        """
+        t_arrays = [np.asarray(t, dtype=float).reshape(-1) for t in t_per_well]
+        counts = np.array([t.size for t in t_arrays], dtype=int)
+        flat_t = np.concatenate(t_arrays) if t_arrays else np.zeros(0)
+        well_idx = np.repeat(np.arange(len(t_arrays)), counts)
+        ret = self.predict_flat(flat_t, well_idx, to_fill, base)
+        return np.split(ret, np.cumsum(counts)[:-1])
+
+    def predict_shared(self, t: Sequence[float], to_fill: float = 0,
+                       base: Optional['BatchSegments'] = None) -> np.ndarray:
+        """Predict the daily rates of every well on the same time indexes
+
+        Args:
+          t: time indexes shared by all wells
+          to_fill: value of the points not covered by any segment
+          base: base phase segments, when given the packed segments are ratio segments and base * ratio is returned
+
+        Returns:
+          np.ndarray: (n_wells, len(t)) array of predicted daily rates
+        """
+        t = np.asarray(t, dtype=float).reshape(-1)
+        flat_t = np.tile(t, self.n_wells)
+        well_idx = np.repeat(np.arange(self.n_wells), t.size)
+        return self.predict_flat(flat_t, well_idx, to_fill, base).reshape(self.n_wells, t.size)
+
+    def predict_monthly_volumes(self, raw_t_per_well: Sequence[Sequence[int]],
+                                base: Optional['BatchSegments'] = None) -> list[np.ndarray]:
+        """Predict the monthly volumes of every well for its own monthly indexes
+
+        Args:
+          raw_t_per_well: one array of monthly indexes (15th of the month) per well
+          base: base phase segments, when given the packed segments are ratio segments and base * ratio is summed
+
+        Returns:
+          list[np.ndarray]: the predicted monthly volumes of each well, for the months in its raw_t
+        """
+        t_arrays = [np.asarray(t).reshape(-1) for t in raw_t_per_well]
+        counts = np.array([t.size for t in t_arrays], dtype=int)
+        if counts.sum() == 0:
+            return [np.zeros(0) for _ in t_arrays]
+
+        wells = np.flatnonzero(counts > 0)
+        first_idx = np.array([t_arrays[w][0] for w in wells], dtype=int)
+        last_idx = np.array([t_arrays[w][-1] for w in wells], dtype=int)
+        first_month = (BASE_TIME_NPDATETIME64 + first_idx).astype('datetime64[M]')
+        last_month = (BASE_TIME_NPDATETIME64 + last_idx).astype('datetime64[M]')
+
+        n_months = (last_month - first_month).astype(int) + 1
+        month_well = np.repeat(wells, n_months)
+        months = np.repeat(first_month, n_months) + ragged_arange(n_months)
+        month_start = (months.astype('datetime64[D]') - BASE_TIME_NPDATETIME64).astype(int)
+        month_days = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(int)
+
+        # expand to days a block of months at a time, each block holding about POINT_CHUNK_SIZE days
+        monthly = np.zeros(month_start.size)
+        month_end_day = np.cumsum(month_days)
+        block_bounds = np.searchsorted(month_end_day, np.arange(1, month_end_day[-1] // POINT_CHUNK_SIZE + 1) *
+                                       POINT_CHUNK_SIZE)
+        for lo, hi in zip(np.concatenate([[0], block_bounds]), np.concatenate([block_bounds, [month_start.size]])):
+            if lo == hi:
+                continue
+            block_days = month_days[lo:hi]
+            days = np.repeat(month_start[lo:hi], block_days) + ragged_arange(block_days)
+            daily = self.predict_flat(days, np.repeat(month_well[lo:hi], block_days), base=base)
+            monthly[lo:hi] = np.add.reduceat(daily, np.cumsum(block_days) - block_days)
+
+        # keep only the months asked for, as an isin per well
+        span = max(month_start.max(), max(t.max() for t in t_arrays if t.size)) + 15
+        asked_key = np.repeat(np.arange(len(t_arrays)), counts) * span + np.concatenate(t_arrays)
+        month_mask = np.isin(month_well * span + month_start + 14, asked_key)
+        ret_counts = np.bincount(month_well[month_mask], minlength=len(t_arrays))
+        return np.split(monthly[month_mask], np.cumsum(ret_counts)[:-1])
@@ -1,3 +1,4 @@
+import math
 from datetime import date
 from typing import Iterable, List
 import numpy as np
@@ -12,6 +13,11 @@ from typing import Any
 
 RATIO_EUR_INTERVAL = 30
 
+# days at the start of each arps curve summed one by one before switching to closed form integrals, with it the
+# monthly volumes of predict_monthly_volumes stay within MONTHLY_INTEGRAL_RTOL of the daily sums
+INTEGRAL_HEAD_DAYS = 30
+MONTHLY_INTEGRAL_RTOL = 1e-8
+
 base_time = np.datetime64('1900-01-01')
 
 
@@ -151,6 +157,9 @@ class MultipleSegments(object):
     def predict_monthly_volumes(self, raw_t: list, forecast_segments: list[dict]) -> np.ndarray:
         """Predict the monthly forecast volumes for indexes in raw_t, not for daily volumes
 
+        Each segment is summed over a month from its closed form integral instead of day by day, the monthly volumes
+        stay within MONTHLY_INTEGRAL_RTOL of the sums of the daily volumes.
+
         Args:
           raw_t: A list of indexes
           forecast_segments: A list of dictionaries contain forecast segments
@@ -158,18 +167,86 @@ class MultipleSegments(object):
         Returns:
           np.ndarray: The predicted monthly forecast volumes
         """
-        # Use this function to predict monthly volumes.
-        first_date: date = date_from_index(raw_t[0])
-        last_date: date = date_from_index(raw_t[-1])
-        start_of_first_month = days_from_1900(date(first_date.year, first_date.month, 1))
-        end_of_last_month = days_from_1900(last_day_of_month(last_date))
-        t = np.arange(start_of_first_month, end_of_last_month + 1)
-        daily_volumes = self.predict(t, forecast_segments)
-        monthly_volumes, forecast_month = sum_forecast_by_month(daily_volumes, t)
-        ret_mask = np.isin(date_array_to_idx_array(forecast_month, 'monthly'), raw_t)
-
+        first_month = (base_time + int(raw_t[0])).astype('datetime64[M]')
+        last_month = (base_time + int(raw_t[-1])).astype('datetime64[M]')
+        months = np.arange(first_month, last_month + 1)
+        month_start = (months.astype('datetime64[D]') - base_time).astype(int)
+        month_end = ((months + 1).astype('datetime64[D]') - base_time).astype(int) - 1
+
+        first_month_day, last_month_day = int(month_start[0]), int(month_end[-1])
+        monthly_volumes = np.zeros(months.size)
+        segments = [seg for seg in forecast_segments if seg['start_idx'] <= seg['end_idx']]
+        for seg, next_seg in zip(segments, segments[1:] + [None]):
+            first_day = max(math.ceil(seg['start_idx']), first_month_day)
+            last_day = min(math.floor(seg['end_idx']), last_month_day)
+            if next_seg is not None:
+                # a day shared with the next segment belongs to the next one
+                last_day = min(last_day, math.ceil(next_seg['start_idx']) - 1)
+            if last_day < first_day:
+                continue
+            for curve, curve_first_day, curve_last_day in self._smooth_curves(seg, first_day, last_day):
+                self._sum_by_month(monthly_volumes, curve, curve_first_day, curve_last_day, month_start, month_end)
+
+        # np.isin of the monthly indexes (15th of the month) and raw_t
+        monthly_idx = month_start + 14
+        raw_t = np.asarray(raw_t)
+        raw_t_month = np.minimum(np.searchsorted(monthly_idx, raw_t), months.size - 1)
+        ret_mask = np.zeros(months.size, dtype=bool)
+        ret_mask[raw_t_month[monthly_idx[raw_t_month] == raw_t]] = True
         return monthly_volumes[ret_mask]
 
+    def _smooth_curves(self, segment: dict, first_day: float, last_day: float) -> list[tuple]:
+        """Split the days of a segment into the curves it is made of, arps_modified is an arps curve until the switch
+        and an exponential curve after it
+
+        Returns:
+          list[tuple]: (segment object, first day, last day) of each curve
+        """
+        if segment['name'] != 'arps_modified':
+            return [(self.get_segment_object(segment), first_day, last_day)]
+
+        sw_day = math.floor(segment['sw_idx'])
+        arps_curve = arps.ArpsSegment({
+            'start_idx': segment['start_idx'],
+            'q_start': segment['q_start'],
+            'D': segment['D'],
+            'b': segment['b']
+        })
+        exp_curve = exp_dec.ExpDecSegment({
+            'start_idx': segment['sw_idx'],
+            'q_start': segment['q_sw'],
+            'D': segment['D_exp']
+        })
+        return [(arps_curve, first_day, min(last_day, sw_day)), (exp_curve, max(first_day, sw_day + 1), last_day)]
+
+    @staticmethod
+    def _sum_by_month(monthly_volumes: np.ndarray, curve: SegmentParent, first_day: float, last_day: float,
+                      month_start: np.ndarray, month_end: np.ndarray) -> None:
+        """Add the daily volumes of days first_day..last_day of a smooth curve to their months
+
+        The first INTEGRAL_HEAD_DAYS days of arps curves, where the rate bends the most, are summed day by day. The
+        rest is split at the month boundaries and the days of each piece are summed with Euler-Maclaurin, the integral
+        from the first day to the first day of the next piece, the trapezoid ends and the first derivative term.
+        """
+        if isinstance(curve, arps.ArpsSegment) and first_day <= last_day:
+            head_days = np.arange(first_day, min(last_day, first_day + INTEGRAL_HEAD_DAYS - 1) + 1)
+            head_months = np.searchsorted(month_start, head_days, side='right') - 1
+            monthly_volumes += np.bincount(head_months,
+                                           weights=curve.predict(head_days),
+                                           minlength=monthly_volumes.size)
+            first_day += head_days.size
+
+        if last_day < first_day:
+            return
+
+        first_month = np.searchsorted(month_end, first_day)
+        end_month = np.searchsorted(month_start, last_day, side='right')
+        bounds = np.concatenate([[first_day], month_start[first_month + 1:end_month], [last_day + 1]])
+        rates = curve.predict(bounds)
+        slopes = curve.slope(bounds)
+        monthly_volumes[first_month:end_month] += (curve.integral(bounds[:-1], bounds[1:]) -
+                                                   (rates[1:] - rates[:-1]) / 2 + (slopes[1:] - slopes[:-1]) / 12)
+
     def predict_monthly_volumes_relative(self, raw_t: Iterable, forecast_segments: list[dict]) -> np.array:
         """
         Predict the monthly forecast volumes for the relative indexes in raw_t.
@@ -1,10 +1,11 @@
 ### fit percentiles
 from typing import Any, AnyStr, Dict, List
 import numpy as np
-from combocurve.science.optimization_module.optimizers import optimizers
+from combocurve.science.optimization_module.optimizers import evaluates_population, optimizers
 from combocurve.science.core_function.setting_parameters import cum_error_type
 from combocurve.science.core_function.skeleton_dca import RegressionType, get_dca
 from combocurve.science.segment_models.multiple_segments import MultipleSegments
+from combocurve.science.segment_models.batch_segments import BatchSegments
 from combocurve.science.core_function.helper import jsonify_segments, my_round_to_decimal
 from combocurve.science.type_curve.TC_helper import classify, get_cum_data, get_eur_data, get_aligned_prod_data
 from combocurve.science.forecast_models.model_manager import mm, RATE_CUM_MODEL_MAPPING
@@ -21,17 +22,41 @@ ARPS_INC_ADJUST_DATA_IDX_THRES = 1000
 Segment = Dict[AnyStr, Any]
 
 
+def shifted_sum(pred: np.ndarray, offset_hist: np.ndarray) -> np.ndarray:
+    '''
+    Sum of copies of `pred` shifted by each well's start offset, i.e. the convolution of `pred` with the histogram of
+    offsets. NaN predictions count as 0, as in a nansum over the wells.
+    '''
+    pred = np.where(np.isnan(pred), 0, pred)
+    if np.isfinite(pred).all():
+        return np.convolve(offset_hist, pred)
+    # inf * 0 would be NaN for offsets without wells, only add the shifts that are there
+    ret = np.zeros(offset_hist.shape[0] + pred.shape[0] - 1)
+    for offset in np.flatnonzero(offset_hist):
+        ret[offset:offset + pred.shape[0]] += offset_hist[offset] * pred
+    return ret
+
+
 class fit_tc:
     def __init__(self, context):
         self.optimizer = 'my_differential_evolution'
         self.random_seed = None
         self.random_seeds = []
         self.maxite = 5
+        self.vectorized = False
+        self.seed_workers = 1
         self.losses = {'cum': self.cum, 'sum': self.sum}
+        self.population_losses = {'cum': self.cum_population, 'sum': self.sum_population}
         self.type_curve_service: TypeCurveService = context.type_curve_service
 
     def get_optimization_para_dict(self):
-        return {"seed": self.random_seed, 'random_seeds': self.random_seeds, 'maxiter': self.maxite}
+        return {
+            "seed": self.random_seed,
+            'random_seeds': self.random_seeds,
+            'maxiter': self.maxite,
+            'vectorized': self.vectorized,
+            'seed_workers': self.seed_workers
+        }
 
     def set_optimizer(self, optimizer):
         self.optimizer = optimizer
@@ -45,6 +70,14 @@ class fit_tc:
     def set_maxite(self, maxite):
         self.maxite = maxite
 
+    def set_vectorized(self, vectorized):
+        '''Evaluate whole differential evolution populations at once, this implies updating='deferred' '''
+        self.vectorized = vectorized
+
+    def set_seed_workers(self, seed_workers):
+        '''Number of processes running the seeds of repeated_differential_evolution'''
+        self.seed_workers = seed_workers
+
     def T1_percentile(self, fit_percentile_input):  # noqa: C901
         ret = {}
         phaseType = fit_percentile_input['phaseType']
@@ -426,12 +459,8 @@ class fit_tc:
             det.set_seed(1)
 
             target = np.array(T1_ret['cum_dict'][target_name])
-            ### generate cum_vecind
-            n_wells = cum_subind.shape[0]
-            cum_length = target.shape[0]
-            cum_vecind = np.zeros(n_wells * cum_length, dtype=bool)
-            for i in range(cum_subind.shape[0]):
-                cum_vecind[(i * cum_length + cum_subind[i, 0]):(i * cum_length + cum_subind[i, 1])] = True
+            ### number of wells starting at each offset, the losses sum the shifted predictions by convolving with it
+            offset_hist = np.bincount(cum_subind[:, 0].astype(int)).astype(float)
             ##### TC_para_dict
             TC_para_dict = T1_ret['TC_para_dict']
             ##### fit_para
@@ -529,10 +558,11 @@ class fit_tc:
             }
 
             args = (compare_range, benchmark_p, benchmark_p_fixed, benchmark_model_name, para_insert_list,
-                    cum_pred_t_vec, target, cum_vecind, p2_seg_para, T1_ret['buildup'], percentile_fit['t_peak'])
+                    cum_pred_t_vec, target, offset_hist, p2_seg_para, T1_ret['buildup'], percentile_fit['t_peak'])
             optimization_para_dict = self.get_optimization_para_dict()
             optimization_para_dict.update({'args': args, 'bounds': this_range})
-            result = optimizers[self.optimizer](self.losses[target_name], optimization_para_dict)
+            losses = self.population_losses if self.vectorized else self.losses
+            result = optimizers[self.optimizer](losses[target_name], optimization_para_dict)
             this_para = result.x
             this_p = deepcopy(benchmark_p)
             this_p_fixed = deepcopy(benchmark_p_fixed)
@@ -541,9 +571,9 @@ class fit_tc:
                                                                   p2_seg_para)
             return this_segments
 
-    def cum(self, para, *args):
-        compare_range, benchmark_p, benchmark_p_fixed, TC_model, para_insert_list, cum_pred_t_vec, target, cum_vecind, p2_seg_para, buildup_dict, t_peak = args  # noqa: E501
-        nr = int(cum_vecind.shape[0] / target.shape[0])
+    @staticmethod
+    def cum(para, *args):
+        compare_range, benchmark_p, benchmark_p_fixed, TC_model, para_insert_list, cum_pred_t_vec, target, offset_hist, p2_seg_para, buildup_dict, t_peak = args  # noqa: E501
         this_p = deepcopy(benchmark_p)
         this_p_fixed = deepcopy(benchmark_p_fixed)
         this_segments = mm.models[TC_model].TC_cum_p2seg(para, this_p, this_p_fixed, para_insert_list, t_peak,
@@ -551,19 +581,15 @@ class fit_tc:
 
         this_pred = multi_seg.predict(cum_pred_t_vec, this_segments)
         #######################
-        this_pred_rep = np.tile(this_pred, nr)
-        this_pred_vec = np.zeros(cum_vecind.shape)
-        this_pred_vec[cum_vecind] = this_pred_rep
-        this_pred_mat = this_pred_vec.reshape((nr, -1))
-        this_cum = np.nancumsum(np.nansum(this_pred_mat, axis=0))
+        this_cum = np.nancumsum(shifted_sum(this_pred, offset_hist))
         loss = np.nanmean(
             np.abs(target[compare_range[0]:compare_range[1]] - this_cum[compare_range[0]:compare_range[1]]))
 
         return loss
 
-    def sum(self, para, *args):
-        compare_range, benchmark_p, benchmark_p_fixed, TC_model, para_insert_list, cum_pred_t_vec, target, cum_vecind, p2_seg_para, buildup_dict, t_peak = args  # noqa: E501
-        nr = int(cum_vecind.shape[0] / target.shape[0])
+    @staticmethod
+    def sum(para, *args):
+        compare_range, benchmark_p, benchmark_p_fixed, TC_model, para_insert_list, cum_pred_t_vec, target, offset_hist, p2_seg_para, buildup_dict, t_peak = args  # noqa: E501
         this_p = deepcopy(benchmark_p)
         this_p_fixed = deepcopy(benchmark_p_fixed)
         this_segments = mm.models[TC_model].TC_cum_p2seg(para, this_p, this_p_fixed, para_insert_list, t_peak,
@@ -571,16 +597,54 @@ class fit_tc:
 
         this_pred = multi_seg.predict(cum_pred_t_vec, this_segments)
         #######################
-        this_pred_rep = np.tile(this_pred, nr)
-        this_pred_vec = np.zeros(cum_vecind.shape)
-        this_pred_vec[cum_vecind] = this_pred_rep
-        this_pred_mat = this_pred_vec.reshape((nr, -1))
-        this_sum = np.nansum(this_pred_mat, axis=0)
+        this_sum = shifted_sum(this_pred, offset_hist)
         loss = np.nanmean(
             np.abs(target[compare_range[0]:compare_range[1]] - this_sum[compare_range[0]:compare_range[1]]))
 
         return loss
 
+    @staticmethod
+    def predict_population(population, *args):
+        '''
+        Predictions of every candidate of a (n_parameters, n_candidates) population, one row per candidate. The
+        segments of all the candidates are evaluated together.
+        '''
+        _, benchmark_p, benchmark_p_fixed, TC_model, para_insert_list, cum_pred_t_vec, _, _, p2_seg_para, buildup_dict, t_peak = args  # noqa: E501
+        population_segments = [
+            mm.models[TC_model].TC_cum_p2seg(para, deepcopy(benchmark_p), deepcopy(benchmark_p_fixed),
+                                             para_insert_list, t_peak, buildup_dict, p2_seg_para)
+            for para in population.T
+        ]
+        return BatchSegments.from_segments(population_segments).predict_shared(cum_pred_t_vec)
+
+    @staticmethod
+    @evaluates_population
+    def cum_population(population, *args):
+        '''`cum` of each candidate of a population, for vectorized differential evolution'''
+        compare_range, target, offset_hist = args[0], args[6], args[7]
+        loss = []
+        for this_pred in fit_tc.predict_population(population, *args):
+            this_cum = np.nancumsum(shifted_sum(this_pred, offset_hist))
+            loss += [
+                np.nanmean(
+                    np.abs(target[compare_range[0]:compare_range[1]] - this_cum[compare_range[0]:compare_range[1]]))
+            ]
+        return np.array(loss)
+
+    @staticmethod
+    @evaluates_population
+    def sum_population(population, *args):
+        '''`sum` of each candidate of a population, for vectorized differential evolution'''
+        compare_range, target, offset_hist = args[0], args[6], args[7]
+        loss = []
+        for this_pred in fit_tc.predict_population(population, *args):
+            this_sum = shifted_sum(this_pred, offset_hist)
+            loss += [
+                np.nanmean(
+                    np.abs(target[compare_range[0]:compare_range[1]] - this_sum[compare_range[0]:compare_range[1]]))
+            ]
+        return np.array(loss)
+
     def body(self, fit_percentile_input):
         phase_enabled_dict: Dict[AnyStr, bool] = fit_percentile_input['phases']
         enabled_phases: List[AnyStr] = [p for p, f in phase_enabled_dict.items() if f]
@@ -1,4 +1,4 @@
-from typing import List, Iterable
+from typing import Dict, List, Iterable, Mapping
 from io import TextIOBase, StringIO, BytesIO, TextIOWrapper
 
 from bson import ObjectId
@@ -42,6 +42,11 @@ class ArchiveStoreService:
     def store_ids_to_gcs(self, ids: List[ObjectId], file_name: str):
         self._store_to_gcs(file_name, lambda file: self.store_ids_to_file(ids, file))
 
+    def store_manifest_to_gcs(self, manifest: Mapping[str, List[str]], file_name: str):
+        '''stores the ids held by every archived file, one line per file'''
+        rows = ({'fileName': archived_file_name, 'ids': ids} for archived_file_name, ids in manifest.items())
+        self._store_to_gcs(file_name, lambda file: self._write_lines(file, rows))
+
     def load_docs_from_file(self, file: TextIOBase) -> Iterable[dict]:
         return (loads(line) for line in file)
 
@@ -59,6 +64,9 @@ class ArchiveStoreService:
             # archived so the file for that collection doesn't exist in google storage
             return []
 
+    def load_manifest_from_gcs(self, file_name: str) -> Dict[str, List[str]]:
+        return {doc['fileName']: doc['ids'] for doc in self.load_docs_from_gcs(file_name)}
+
     def _write_lines(self, file: TextIOBase, rows):
         file.writelines(dumps(row, separators=(',', ':')) + '\n' for row in rows)
 
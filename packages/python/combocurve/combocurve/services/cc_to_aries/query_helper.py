@@ -18,7 +18,6 @@ from combocurve.utils.constants import USER_NOTIFICATION_UPDATE_EVENT_NAME
 from combocurve.shared.econ_tools.econ_model_tools import ALL_PHASES
 
 from combocurve.dal.client import DAL
-from combocurve.dal.stubs import production_from_response
 
 QUERY_DOC_LIMIT = 480000  # daily data: 12 month * 4000 wells
 
@@ -75,12 +74,13 @@ def get_monthly_daily_dict(context, sort_well_ids, sort_forecasts, phases, well_
     daily_production_dict = {}
     monthly_daily_dict = {}
     if len(daily_batch) > 0:
-        daily_production_response = dal.daily_production.fetch_by_well(wells=[str(well_id) for well_id in daily_batch])
-        daily_production_dict = get_production_data_from_dal_fetch(daily_production_response, phases)
+        daily_production = dal.daily_production.fetch_production_by_well(
+            wells=[str(well_id) for well_id in daily_batch], fields=phases)
+        daily_production_dict = get_production_data_from_dal_fetch(daily_production)
     if len(month_batch) > 0:
-        monthly_production_response = dal.monthly_production.fetch_by_well(
-            wells=[str(well_id) for well_id in month_batch])
-        monthly_production_dict = get_production_data_from_dal_fetch(monthly_production_response, phases)
+        monthly_production = dal.monthly_production.fetch_production_by_well(
+            wells=[str(well_id) for well_id in month_batch], fields=phases)
+        monthly_production_dict = get_production_data_from_dal_fetch(monthly_production)
 
     daily_prod_count = sum_index_lengths(daily_production_dict)
     if daily_prod_count > QUERY_DOC_LIMIT:
@@ -202,30 +202,24 @@ def _get_sort_forecasts(context, assignment_df, sort_well_forecast_pair, user_id
     return sort_forecasts
 
 
-def get_production_data_from_dal_fetch(fetch_by_well_response, phases):
+def get_production_data_from_dal_fetch(production):
     """
         Retrieve production data from a DAL fetch.
 
         Args:
-            fetch_by_well_response (iterable): An iterable of FetchByWell responses.
-            phases (list): A list of strings representing the different production phases to retrieve.
+            production (iterable): The decoded production of each well, from `fetch_production_by_well`.
 
         Returns:
             dict: A dictionary where the keys are well IDs and the values are dictionaries containing production
                   data for each well.
             Each well dictionary contains the following keys:
                 - '_id': The well ID.
-                - 'index': A list of integers representing the production dates.
-                - For each production phase in 'phases', a list of floats representing the production values for that
+                - 'index': An int32 array representing the production dates.
+                - For each fetched production phase, a float64 array representing the production values for that
                   phase.
-            The 'index' list and each production phase list are sorted by date in ascending order.
+            The 'index' array and each production phase array are sorted by date in ascending order.
     """
-    production_dict = {}
-    for well_response in fetch_by_well_response:
-        well_id = ObjectId(getattr(well_response, 'well'))
-        production_dict[well_id] = production_from_response(well_response, field_list=phases)
-
-    return production_dict
+    return {well_data['_id']: well_data for well_data in production}
 
 
 def get_production_pipeline(wells, phases=["oil", "gas", "water"], filter={}):
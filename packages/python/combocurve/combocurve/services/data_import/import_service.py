@@ -21,7 +21,7 @@ from combocurve.shared.header_conversion import convert_headers, parse_float
 from combocurve.shared.production_constants import (MONTHLY_PROD_FIELDS, DAILY_PROD_FIELDS, SURVEY_FIELDS,
                                                     SURVEY_LATITUDE_FIELD, SURVEY_LONGITUDE_FIELD,
                                                     SURVEY_MEASURED_DEPTH_FIELD, DAL_FIELD_NAME_MAP)
-from combocurve.shared.directional_survey_calculations import get_missing_columns, is_valid_survey_data
+from combocurve.shared.directional_survey_calculations import get_missing_columns_batch, is_valid_survey_data
 from combocurve.shared.map_calculations import transform_to_wgs84
 from combocurve.utils.exceptions import get_exception_info
 from combocurve.services.data_import.import_data import ImportData, WellDataRow, DataSettings
@@ -420,11 +420,11 @@ class ImportService:
         all_survey_rows = (survey_row for r in import_data.rows for survey_row in r.get_survey_rows())
         survey_rows_dict = (r.get_dict() for r in all_survey_rows)
         by_well_id = self._group_by_well_id(survey_rows_dict, import_data.data_settings.id)
-        ready_data = {
-            well_id: self._get_survey_well_data(well_survey_row_dicts, wells_surface_locations.get(well_id),
-                                                import_data.data_settings)
-            for well_id, well_survey_row_dicts in by_well_id.items()
-        }
+        ready_data = dict(
+            zip(by_well_id,
+                self._get_surveys_well_data(by_well_id.values(),
+                                            [wells_surface_locations.get(well_id) for well_id in by_well_id],
+                                            import_data.data_settings)))
         by_well_ready_data = {
             well: data
             for (well_id, (data, _)) in ready_data.items() for well in well_ids_dict.get(well_id, [])
@@ -587,16 +587,20 @@ class ImportService:
 
         return well_data, valid_rows
 
-    def _get_survey_well_data(self, well_survey_row_dicts: Collection[Mapping[str, Any]],
-                              surface_location: Optional[tuple[float, float]], data_settings: DataSettings):
-        well_data, valid_rows = self._get_survey_well_data_dict(well_survey_row_dicts, data_settings)
+    def _get_surveys_well_data(self, surveys_row_dicts: Collection[Collection[Mapping[str, Any]]],
+                               surface_locations: list[Optional[tuple[float, float]]], data_settings: DataSettings):
+        wells_data = [self._get_survey_well_data_dict(row_dicts, data_settings) for row_dicts in surveys_row_dicts]
+        completed_data = get_missing_columns_batch([well_data for well_data, _ in wells_data], surface_locations)
 
-        try:
-            well_data = get_missing_columns(well_data, surface_location)
-        except ValueError as e:
-            return None, {'total_rows': len(well_survey_row_dicts), 'valid_rows': 0, 'errors': [get_exception_info(e)]}
+        results = []
+        for row_dicts, (_, valid_rows), (well_data, error) in zip(surveys_row_dicts, wells_data, completed_data):
+            if error:
+                stats = {'total_rows': len(row_dicts), 'valid_rows': 0, 'errors': [get_exception_info(error)]}
+            else:
+                stats = {'total_rows': len(row_dicts), 'valid_rows': valid_rows, 'errors': []}
+            results.append((well_data, stats))
 
-        return well_data, {'total_rows': len(well_survey_row_dicts), 'valid_rows': valid_rows, 'errors': []}
+        return results
 
     def _get_survey_row_data(self, survey_dict: Mapping[str, Any], data_settings: DataSettings):
         survey_fields = self.context.well_directional_survey_model._fields
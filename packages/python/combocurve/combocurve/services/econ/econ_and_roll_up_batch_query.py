@@ -8,9 +8,8 @@ from bson import ObjectId
 from combocurve.science.econ.general_functions import has_phase_forecast, create_empty_forecast, validate_forecast_data
 from combocurve.science.econ.helpers import BASE_DATE_NP
 from combocurve.shared.econ_tools.default_econ_fields import EconModelDefaults
-from combocurve.science.econ.general_functions import py_date_to_index
 from combocurve.shared.econ_tools.econ_model_tools import ALL_PHASES
-from combocurve.dal.stubs import DailyProduction, MonthlyProduction, production_from_response
+from combocurve.dal.stubs import DailyProduction, MonthlyProduction, production_by_well
 from combocurve.dal.client import DAL
 from typing import Union
 
@@ -108,40 +107,20 @@ def _batch_get_production(context, sort_well_ids, sort_forecasts, phases, well_d
         for phase in freq:
             phase_freq = freq[phase]
             if this_well_id in has_daily_monthly[phase_freq]:
-
-                flat_index_w_none = np.array(
-                    monthly_daily_dict[phase_freq][this_well_id]['index']).reshape(-1).astype(int)
-                flat_value_w_none = np.array(monthly_daily_dict[phase_freq][this_well_id][phase]).reshape(-1)
-
-                filter_index = flat_index_w_none != None  # noqa: E711
-
-                flat_index = flat_index_w_none[filter_index].tolist()
+                well_production = monthly_daily_dict[phase_freq][this_well_id]
+                flat_index = np.asarray(well_production['index'], dtype=int).reshape(-1)
 
                 if len(flat_index) == 0:
                     this_well_prod[phase] = None
                     continue
 
-                flat_value = flat_value_w_none[filter_index].tolist()
+                flat_value = np.asarray(well_production[phase], dtype=float).reshape(-1)
 
                 # fill in missing dates with 0 production
                 if phase_freq == 'daily':
-                    all_index = np.arange(flat_index[0], flat_index[-1] + 1)
-                    all_value = np.zeros(len(all_index))
-                    mask = flat_index - np.int64(flat_index[0])
-                    all_value[mask] = flat_value
-                    flat_value = list(all_value)
-                    flat_index = list(all_index)
+                    flat_index, flat_value = _fill_daily_gaps(flat_index, flat_value)
                 else:
-                    start_month = (np.datetime64('1900-01-01') + flat_index[0]).astype('datetime64[M]')
-                    end_month = (np.datetime64('1900-01-01') + flat_index[-1]).astype('datetime64[M]')
-                    monthly_dates = np.arange(start_month, end_month + 1).astype(datetime.datetime)
-                    # set day in month to 15th
-                    monthly_dates = list(map(lambda date: date.replace(day=15), monthly_dates))
-                    month_index = list(map(py_date_to_index, monthly_dates))
-                    flat_index = set(flat_index)
-                    flat_value = [flat_value.pop(0) if index in flat_index else 0 for index in month_index]
-                    flat_value = [value if value is not None else 0 for value in flat_value]
-                    flat_index = list(month_index)
+                    flat_index, flat_value = _fill_monthly_gaps(flat_index, flat_value)
 
                 this_well_prod[phase] = {'index': flat_index, 'value': flat_value, 'data_freq': phase_freq}
             else:
@@ -152,6 +131,28 @@ def _batch_get_production(context, sort_well_ids, sort_forecasts, phases, well_d
     return output
 
 
+def _fill_daily_gaps(index, value):
+    all_index = np.arange(index[0], index[-1] + 1)
+    all_value = np.zeros(len(all_index))
+    all_value[index - index[0]] = value
+    return all_index, all_value
+
+
+def _fill_monthly_gaps(index, value):
+    '''
+        Monthly production is indexed on the 15th of the month, returns the index of every month between the first and
+        last production months with 0 production for the months not in `index`
+    '''
+    months = (BASE_DATE_NP + index).astype('datetime64[M]')
+    all_months = np.arange(months[0], months[-1] + 1)
+    all_index = (all_months.astype('datetime64[D]') + 14 - BASE_DATE_NP).astype(int)
+    all_value = np.zeros(len(all_index))
+    position = np.minimum(np.searchsorted(all_index, index), len(all_index) - 1)
+    on_15th = all_index[position] == index
+    all_value[position[on_15th]] = value[on_15th]
+    return all_index, all_value
+
+
 def _batch_get_forecast_data(context, batch_assignment_df):
     project_dict = {
         '_id': 0,
@@ -639,12 +640,12 @@ def get_production_data_from_dal(
     if not well_ids:
         return production_dict
 
-    fetch_response = production_service_stub.fetch_by_well(wells=[str(well_id) for well_id in well_ids])
+    fetch_response = production_service_stub.fetch_by_well(field_mask=['well', 'date', *phases],
+                                                           wells=[str(well_id) for well_id in well_ids])
 
     try:
-        for well_response in fetch_response:
-            well_id = ObjectId(getattr(well_response, 'well'))
-            production_dict[well_id] = production_from_response(well_response, field_list=phases)
+        for well_data in production_by_well(fetch_response, phases):
+            production_dict[well_data['_id']] = well_data
 
     except Exception:
         fetch_response.details()
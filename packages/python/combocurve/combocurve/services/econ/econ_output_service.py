@@ -4,9 +4,10 @@ from datetime import datetime
 import numpy as np
 import pandas as pd
 import polars as pl
-from joblib import Parallel, delayed
-from combocurve.shared.parquet_types import (MAX_NUMERIC_DIGIT, to_date, build_pyarrow_schema, df_to_parquet,
-                                             table_to_parquet)
+import pyarrow as pa
+import requests
+from combocurve.shared.parquet_types import (MAX_NUMERIC_DIGIT, PA_TYPE_MAP, to_date, build_pyarrow_schema,
+                                             df_to_parquet, df_to_table, cast_to_schema, write_parquet_tables)
 from combocurve.services.econ.econ_output_fields import (WELL_HEADER_NAME_MAP)
 from combocurve.services.scenario_well_assignments_service import QUALIFIER_FIELDS
 from combocurve.services.econ.econ_big_query_schema import (MONTHLY_SCHEMA, ONE_LINER_SCHEMA, AGGREGATION_SCHEMA,
@@ -20,6 +21,13 @@ AGGREGATION_TABLE_NAME = 'econ_v2_aggregation'
 
 FILE_TYPE = 'parquet'
 
+# resumable uploads are sent in chunks of a multiple of 256 KiB
+UPLOAD_CHUNK_SIZE_MULTIPLE = 256 * 1024
+UPLOAD_CHUNK_SIZE = 40 * 1024 * 1024
+
+# outputs converted to one arrow table, and so written as one or more parquet row groups, when streaming monthly files
+MONTHLY_OUTPUTS_PER_TABLE = 100
+
 RUN_DATA_FIELDS = [
     'run_date', 'run_id', 'project_id', 'user_id', 'scenario_id', 'project_name', 'scenario_name', 'user_name',
     'general_options_name'
@@ -27,6 +35,7 @@ RUN_DATA_FIELDS = [
 
 TIMESTAMP_COLS = ['created_at', 'run_at', 'inserted_at']
 BOOLEAN_COLS = ['generic', 'has_daily', 'has_monthly']
+FLOAT_TYPES = ('NUMERIC', 'FLOAT')
 
 # TODO: add 'network', 'emission' qualifier field to Econ Big Query table
 QUALIFIER_FIELDS = copy.deepcopy(QUALIFIER_FIELDS)
@@ -128,29 +137,105 @@ def _build_one_liner_row(output, combo, run_data):
     }
 
 
-def _build_monthly_rows(output, combo, run_data):
+def _to_date_array(values):
     '''
-        Returns multiple rows with the schema for the monthly table in BigQuery
+        Returns a date32 array, plain ISO date strings are parsed by numpy and anything else goes through to_date once
+        per distinct value
     '''
+    values = np.asarray(values)
+    if values.dtype.kind == 'U':
+        try:
+            return pa.array(values.astype('datetime64[D]'))
+        except ValueError:
+            pass
+    codes, uniques = pd.factorize(values)
+    dates = pa.array([to_date(value) for value in uniques], pa.date32())
+    return dates.take(pa.array(codes, mask=codes < 0))
+
+
+def _to_arrow_array(values, bq_type):
+    if bq_type == 'DATE':
+        return _to_date_array(values)
+    if bq_type in FLOAT_TYPES:
+        return pa.array(np.asarray(values, dtype=np.float64), from_pandas=True)
+    return pa.array(values, PA_TYPE_MAP.get(bq_type), from_pandas=True)
 
-    base = build_monthly_one_liner_base_columns(output, combo, run_data)
 
-    if 'error' in output:
-        '''
-        return a list of dict also make append to whole df work
-        '''
-        return [base]
-    else:
-        data = np.array(list(output['all_flat_output'].values()))
-        keys = output['all_flat_output'].keys()
-        num_rows = data.shape[1]
-        records = []
-        for row_idx in range(num_rows):
-            row_dict = dict(zip(keys, data[:, row_idx]))
-            row_dict.update(base)
-            records.append(row_dict)
+def build_monthly_table(batch_outputs, run_data, schema):
+    '''
+        Returns the monthly table of all outputs as a pyarrow table
+
+        NUMERIC and FLOAT columns of `all_flat_output` are copied into one float64 matrix, one block per output, and the
+        base columns are converted once per output and repeated for its months. Errored outputs get a single row with
+        the base columns only. NUMERIC columns stay float64, `cast_to_schema` casts them to the BigQuery types.
+    '''
+    lengths = []
+    base_rows = []
+    float_names = {}
+    other_names = {}
+    for combo in batch_outputs:
+        for output in combo['outputs']:
+            base_rows.append(build_monthly_one_liner_base_columns(output, combo['combo'], run_data))
+            if 'error' in output:
+                lengths.append(1)
+                continue
+            flat_output = output['all_flat_output']
+            lengths.append(len(flat_output['date']))
+            for name in flat_output:
+                names = float_names if schema.get(name) in FLOAT_TYPES else other_names
+                names.setdefault(name, len(names))
+
+    offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+    float_matrix = np.full((len(float_names), offsets[-1]), np.nan)
+    other_columns = {name: [] for name in other_names}
+    output_index = 0
+    for combo in batch_outputs:
+        for output in combo['outputs']:
+            start, end = offsets[output_index], offsets[output_index + 1]
+            output_index += 1
+            flat_output = {} if 'error' in output else output['all_flat_output']
+            float_keys = [name for name in flat_output if name in float_names]
+            if float_keys:
+                rows = [float_names[name] for name in float_keys]
+                float_matrix[rows, start:end] = np.array([flat_output[name] for name in float_keys], dtype=np.float64)
+            for name, column in other_columns.items():
+                column.extend(flat_output.get(name, [None] * (end - start)))
+
+    columns = {name: pa.array(float_matrix[row], from_pandas=True) for name, row in float_names.items()}
+    columns.update({name: _to_arrow_array(column, schema.get(name)) for name, column in other_columns.items()})
+
+    base_names = {name: None for row in base_rows for name in row}
+    row_to_output = pa.array(np.repeat(np.arange(len(lengths)), lengths))
+    for name in base_names:
+        base_column = [row.get(name) for row in base_rows]
+        if schema.get(name) == 'DATE':
+            base_column = _to_date_array(base_column)
+        else:
+            base_column = pa.array(base_column, from_pandas=True)
+        columns[name] = base_column.take(row_to_output)
+
+    return pa.table(columns)
+
+
+def get_monthly_column_names(batch_outputs, run_data):
+    names = {}
+    for combo in batch_outputs:
+        for output in combo['outputs']:
+            if 'error' not in output:
+                names.update(dict.fromkeys(output['all_flat_output']))
+            names.update(dict.fromkeys(build_monthly_one_liner_base_columns(output, combo['combo'], run_data)))
+    return list(names)
 
-        return records
+
+def iter_monthly_tables(batch_outputs, run_data, schema, outputs_per_table):
+    '''
+        Yields the monthly table `outputs_per_table` outputs at a time, the tables can have different columns
+    '''
+    for combo in batch_outputs:
+        outputs = combo['outputs']
+        for start in range(0, len(outputs), outputs_per_table):
+            chunk = {**combo, 'outputs': outputs[start:start + outputs_per_table]}
+            yield build_monthly_table([chunk], run_data, schema)
 
 
 def to_decimal(x):
@@ -189,19 +274,6 @@ def get_one_liner_rows(batch_outputs, run_data):
     return rows
 
 
-def get_monthly_rows(batch_outputs, run_data):
-    monthly_rows = []
-    for combo in batch_outputs:
-        for output in combo['outputs']:
-            rows = _build_monthly_rows(output, combo['combo'], run_data)
-            '''
-            the append method will auto create new column if 'rows' has more columns than 'monthly_rows'
-            this can happen for example: the first well error out (less cols) but the second well not (all cols)
-            '''
-            monthly_rows += rows
-    return monthly_rows
-
-
 def get_header_rows(batch_outputs, run_data, well_header_fields, include_econ_group=False):
     header_rows = []
 
@@ -247,6 +319,72 @@ BQ_BATCH_ROWS = 250
 # Also there's a 10,485,760 bytes request limit to consider
 
 
+class ResumableUploadFile():
+    '''
+        Writable file uploading to a resumable upload session of cloud storage, in chunks of `chunk_size` bytes.
+
+        The object is only created by `close`, `abort` cancels the session instead so nothing written so far is ever
+        committed. A file neither closed nor aborted is never committed either, its session expires.
+        https://cloud.google.com/storage/docs/performing-resumable-uploads
+    '''
+    def __init__(self, session_url, chunk_size=None, timeout=60):
+        chunk_size = UPLOAD_CHUNK_SIZE if chunk_size is None else chunk_size
+        if chunk_size % UPLOAD_CHUNK_SIZE_MULTIPLE:
+            raise ValueError(f'chunk_size must be a multiple of {UPLOAD_CHUNK_SIZE_MULTIPLE} bytes')
+        self.session_url = session_url
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.closed = False
+        self._buffer = bytearray()
+        # bytes persisted by the session, the buffer holds the ones after them
+        self._persisted = 0
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError('write to a closed file')
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_size:
+            self._send(self.chunk_size)
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        total = self._persisted + len(self._buffer)
+        # the last chunk, with the total size, is the one committing the object
+        while self._send(len(self._buffer), total) == 308:
+            pass
+        self.closed = True
+
+    def abort(self):
+        self.closed = True
+        self._buffer = bytearray()
+        # cancelled sessions answer 499
+        requests.delete(self.session_url, timeout=self.timeout)
+
+    def _send(self, size, total=None):
+        first = self._persisted
+        last = first + size - 1
+        content_range = f'bytes {first}-{last}/{"*" if total is None else total}' if size else f'bytes */{total}'
+        response = requests.put(self.session_url,
+                                data=bytes(self._buffer[:size]),
+                                headers={'Content-Range': content_range},
+                                timeout=self.timeout)
+        if response.status_code == 308:
+            # the session might persist only part of the chunk, the rest is sent again
+            persisted_range = response.headers.get('Range')
+            persisted = int(persisted_range.split('-')[1]) + 1 if persisted_range else 0
+            del self._buffer[:persisted - self._persisted]
+            self._persisted = persisted
+        elif response.status_code in (200, 201):
+            del self._buffer[:size]
+            self._persisted += size
+        else:
+            response.raise_for_status()
+            raise ValueError(f'Unexpected resumable upload response: {response.status_code}')
+        return response.status_code
+
+
 class EconOutputService(object):
     def __init__(self, context):
         self.context = context
@@ -271,25 +409,51 @@ class EconOutputService(object):
         # upload as string
         blob.upload_from_string(str_to_write, content_type=f'application/{FILE_TYPE}', timeout=timeout)
 
-    def upload_parquet_to_batch_bucket(self, file_name, df, pa_schema, chunk_size=None, timeout=60):
+    def open_batch_bucket_file(self, file_name, chunk_size=None, timeout=60):
+        '''
+            Returns a `ResumableUploadFile` of the blob, buffering at most `chunk_size` bytes (40 MiB by default, must
+            be a multiple of 256 KiB)
+        '''
         storage_client = self.context.cloud_storage_client.client
         bucket_name = self.context.tenant_info['batch_storage_bucket']
         bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(file_name, chunk_size=chunk_size)
-        str_to_write = table_to_parquet(df, pa_schema)
-        # upload as string
-        blob.upload_from_string(str_to_write, content_type=f'application/{FILE_TYPE}', timeout=timeout)
+        blob = bucket.blob(file_name)
+        session_url = blob.create_resumable_upload_session(content_type=f'application/{FILE_TYPE}', timeout=timeout)
+        return ResumableUploadFile(session_url, chunk_size=chunk_size, timeout=timeout)
+
+    def upload_parquet_to_batch_bucket(self, file_name, df, pa_schema, chunk_size=None, timeout=60):
+        '''
+            Streams `df` to the batch bucket as parquet, `df` can be a pandas dataframe, a pyarrow table or an iterable
+            of pyarrow tables, whose row groups are uploaded as they are written
+        '''
+        if isinstance(df, pd.DataFrame):
+            tables = [df_to_table(df, pa_schema)]
+        elif isinstance(df, pa.Table):
+            tables = [df]
+        else:
+            tables = df
+        f = self.open_batch_bucket_file(file_name, chunk_size=chunk_size, timeout=timeout)
+        try:
+            write_parquet_tables(f, tables, pa_schema)
+        except BaseException:
+            f.abort()
+            raise
+        f.close()
 
     def upload_df_to_table(self, df, table_name):
         # write result to big query table
         table_path = self.context.big_query_client.table_path(self.get_dataset(), table_name)
         table_id = self.context.big_query_client.get_table(table_path)
+        if isinstance(df, pa.Table):
+            df = df.to_pandas()
         self.context.big_query_client.insert_rows_df(table_id, df)
 
+    def get_monthly_table(self, batch_outputs, run_data):
+        monthly_table = build_monthly_table(batch_outputs, run_data, self.monthly_schema)
+        return cast_to_schema(monthly_table, build_pyarrow_schema(self.monthly_schema, monthly_table))
+
     def get_monthly_df(self, batch_outputs, run_data):
-        monthly_rows = pd.DataFrame(get_monthly_rows(batch_outputs, run_data))
-        monthly_df = monthly_rows.apply(lambda col: process_output_type(col, self.monthly_schema[col.name]))
-        return monthly_df
+        return self.get_monthly_table(batch_outputs, run_data).to_pandas()
 
     def get_well_header_df(self, batch_outputs, run_data):
         header_rows = pd.DataFrame(get_header_rows(batch_outputs, run_data, self.well_header_fields))
@@ -309,13 +473,10 @@ class EconOutputService(object):
 
     def get_group_dfs(self, batch_outputs, run_data):
 
-        all_monthly_rows = Parallel(n_jobs=len(batch_outputs))(delayed(get_monthly_rows)(batch_output, run_data)
-                                                               for batch_output in batch_outputs)
-        flat_monthly_rows = [item for sublist in all_monthly_rows for item in sublist]
-        monthly_pldf = pl.from_dicts(flat_monthly_rows, infer_schema_length=len(flat_monthly_rows))
-
         flat_batch_outputs = [item for sublist in batch_outputs for item in sublist]
 
+        monthly_pldf = pl.from_arrow(build_monthly_table(flat_batch_outputs, run_data, self.monthly_schema))
+
         one_liner_rows = get_one_liner_rows(flat_batch_outputs, run_data)
         header_rows = get_header_rows(flat_batch_outputs, run_data, self.well_header_fields, True)
         metadata_rows = get_metadata_rows(run_data)
@@ -341,15 +502,12 @@ class EconOutputService(object):
         to_date_v = np.vectorize(to_date)
 
         run_id = run_data['run_id']
-        monthly_rows = pd.DataFrame(get_monthly_rows(batch_outputs, run_data))
         header_rows = pd.DataFrame(get_header_rows(batch_outputs, run_data, self.well_header_fields))
         one_liner_rows = pd.DataFrame(get_one_liner_rows(batch_outputs, run_data))
 
-        monthly_date_cols = [col for col in monthly_rows if self.monthly_schema[col] == 'DATE']
         wh_date_cols = [col for col in header_rows if self.well_header_schema[col] == 'DATE']
         one_line_date_cols = [col for col in one_liner_rows if self.one_liner_schema[col] == 'DATE']
 
-        monthly_rows[monthly_date_cols] = monthly_rows[monthly_date_cols].apply(to_date_v)
         header_rows[wh_date_cols] = header_rows[wh_date_cols].apply(to_date_v)
         one_liner_rows[one_line_date_cols] = one_liner_rows[one_line_date_cols].apply(to_date_v)
 
@@ -363,10 +521,11 @@ class EconOutputService(object):
         file_name = 'econ-runs/{}/well-header-{}/{}.{}'.format(run_id, FILE_TYPE, batch_index, FILE_TYPE)
         self.upload_parquet_to_batch_bucket(file_name, header_rows, pa_schema)
 
-        # output monthly
-        pa_schema = build_pyarrow_schema(self.monthly_schema, monthly_rows)
+        # output monthly, streamed as the tables of each chunk of outputs are built
+        pa_schema = build_pyarrow_schema(self.monthly_schema, get_monthly_column_names(batch_outputs, run_data))
+        monthly_tables = iter_monthly_tables(batch_outputs, run_data, self.monthly_schema, MONTHLY_OUTPUTS_PER_TABLE)
         file_name = 'econ-runs/{}/monthly-{}/{}.{}'.format(run_id, FILE_TYPE, batch_index, FILE_TYPE)
-        self.upload_parquet_to_batch_bucket(file_name, monthly_rows, pa_schema)
+        self.upload_parquet_to_batch_bucket(file_name, monthly_tables, pa_schema)
 
     def write_group_econ_files(self, batch_index, run_data, monthly_pldf, header_pldf, one_liner_pldf):
 
@@ -409,8 +568,8 @@ class EconOutputService(object):
         self.upload_df_to_table(one_liner_df, ONE_LINER_TABLE_NAME)
 
     def write_monthly_to_table(self, batch_outputs, run_data):
-        monthly_df = self.get_monthly_df(batch_outputs, run_data)
-        self.upload_df_to_table(monthly_df, MONTHLY_TABLE_NAME)
+        monthly_table = self.get_monthly_table(batch_outputs, run_data)
+        self.upload_df_to_table(monthly_table, MONTHLY_TABLE_NAME)
 
     def write_aggregation_result_to_table(self, df, run_id, run_date, add_aggregation_group=True):
         # add columns not in df
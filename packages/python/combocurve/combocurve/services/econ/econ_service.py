@@ -1,7 +1,11 @@
+import hashlib
 import logging
+import os
+import pickle
 from typing import Optional
 
 from bson import ObjectId
+from joblib import Parallel, delayed
 
 from combocurve.services.feature_flags.feature_flag_list import EnabledFeatureFlags
 from combocurve.services.feature_flags.feature_flags_service import evaluate_boolean_flag, LaunchDarklyContext, \
@@ -20,102 +24,82 @@ from combocurve.services.econ.econ_output_fields import (ECON_PRMS_RESOURCES_CLA
                                                          PRMS_RESERVES_CATEGORY, PRMS_RESERVES_SUB_CATEGORY)
 from combocurve.science.econ.well import economics, ghg, group_economics_individual_well
 from combocurve.services.econ_v10.input import econ_inputs
+from combocurve.shared.contexts import with_feature_flag_context
 
 UNGROUPED = 'ungrouped'
-
-
-def combo_batch_econ(run, params, combo_econ_inputs, combo_inc_inputs, feature_flags: Optional[dict[str, bool]] = None):
-    batch_index = params['batch_index']
-    batch_size = run['batchSize']
-    output_params = run['outputParams']
-    is_fiscal_month = output_params.get("prodAnalyticsType", 'calendar') == 'daysOn'
-
-    combo_outputs = []
-
-    index = 0
-    for well_input in combo_econ_inputs:
-        reserves_category = get_assumption(well_input['assumptions'], 'reserves_category')['reserves_category']
-        base_ret = {
-            'well': well_input['well'],
-            'well_index': get_well_index(batch_index, batch_size, index),
-            'incremental_name': '',
-            'incremental_index': 0,
-            'reserves_category': {
-                ECON_PRMS_RESOURCES_CLASS: reserves_category[PRMS_RESOURCES_CLASS],
-                ECON_PRMS_RESERVES_CATEGORY: reserves_category[PRMS_RESERVES_CATEGORY],
-                ECON_PRMS_RESERVES_SUB_CATEGORY: reserves_category[PRMS_RESERVES_SUB_CATEGORY]
-            }
+ECON_BATCH_WORKERS_ENV = 'ECON_BATCH_WORKERS'
+
+
+def get_econ_workers(output_params) -> int:
+    '''Number of processes running the wells of a batch, from outputParams.batchWorkers or the ECON_BATCH_WORKERS
+    environment variable. 1 (serial) when not set or invalid, any negative value uses all CPUs (-1).
+    '''
+    workers = output_params.get('batchWorkers')
+    if workers is None:
+        workers = os.environ.get(ECON_BATCH_WORKERS_ENV) or 1
+
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        logging.warning('invalid econ batch workers, running serially', extra={'metadata': {'workers': workers}})
+        return 1
+
+    return -1 if workers < 0 else max(workers, 1)
+
+
+def run_econ_tasks(tasks, n_workers=1, tenant_info=None):
+    '''Run (function, args) tasks serially or across a process pool, results are in the order of tasks'''
+    if 0 <= n_workers <= 1 or len(tasks) <= 1:
+        return [function(*args) for function, args in tasks]
+
+    n_jobs = -1 if n_workers < 0 else min(n_workers, len(tasks))
+    # joblib pickles the tasks once and sends them to the workers in automatically sized batches
+    return Parallel(n_jobs=n_jobs)(delayed(with_feature_flag_context)(function, tenant_info or {}, *args)
+                                   for function, args in tasks)
+
+
+def _base_output(well_input, well_index, incremental_index):
+    reserves_category = get_assumption(well_input['assumptions'], 'reserves_category')['reserves_category']
+    # incremental names are only given to incremental cases
+    incremental_name = ''
+    if incremental_index:
+        incremental_name = get_incremental_name(well_input['well']['well_name'], incremental_index)
+    return {
+        'well': well_input['well'],
+        'well_index': well_index,
+        'incremental_name': incremental_name,
+        'incremental_index': incremental_index,
+        'reserves_category': {
+            ECON_PRMS_RESOURCES_CLASS: reserves_category[PRMS_RESOURCES_CLASS],
+            ECON_PRMS_RESERVES_CATEGORY: reserves_category[PRMS_RESERVES_CATEGORY],
+            ECON_PRMS_RESERVES_SUB_CATEGORY: reserves_category[PRMS_RESERVES_SUB_CATEGORY]
         }
+    }
 
-        try:
-            if params['is_ghg']:
-                emission_nodes = ghg(well_input)
-                ret = {
-                    **base_ret,
-                    'emission_nodes': emission_nodes,
-                }
-            else:
-                (selected_flat_output, all_flat_output, one_liner, all_one_liner, nested_output_paras, warning_message,
-                 _, _) = economics(well_input, 0, None, is_fiscal_month, feature_flags=feature_flags)
-                ret = {
-                    **base_ret,
-                    'flat_output': selected_flat_output,
-                    'one_liner': one_liner,
-                    # these two are all columns that need to be written to bq
-                    'all_flat_output': all_flat_output,
-                    'all_one_liner': all_one_liner,
-                    'nested_output_paras': nested_output_paras,
-                    'warning': warning_message,
-                    'econ_group': UNGROUPED,
-                }
-
-            combo_outputs.append(ret)
 
-        except Exception as e:
-            calculation_error = get_exception_info(e)
-            col_number = None
+def base_case_key(well_input):
+    '''Key of the base case economics of a well input, the well id and a hash of the whole input so that a base case is
+    only shared by inputs with identical assumptions
+    '''
+    fingerprint = hashlib.sha1(pickle.dumps(well_input, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+    return str(well_input['well'].get('_id')), fingerprint
 
-            if params['is_ghg']:
-                add_to_logging_metadata({'ghg_run': params, 'error': e})
 
-            else:
-                columns = well_input['columns']
-                general_options = output_params['generalOptions']
-                col_number = PostProcess.get_col_number(columns, general_options)
+def well_batch_econ(well_input, well_index, params, output_params, is_fiscal_month, feature_flags, keep_flat_log=False):
+    '''Returns the output of the well and, when keep_flat_log, its flat econ log to be used as incremental base case'''
+    base_ret = _base_output(well_input, well_index, 0)
 
-                if not calculation_error['expected']:
-                    logging.error('econ batch calculation error', extra={'metadata': calculation_error})
-
-            combo_outputs.append({
+    try:
+        if params['is_ghg']:
+            emission_nodes = ghg(well_input)
+            return {
                 **base_ret,
-                'error': calculation_error,
-                'col_number': col_number,
-            })
-
-        index += 1
-
-    for base_input, inc_input in combo_inc_inputs:
-        reserves_category = get_assumption(inc_input['assumptions'], 'reserves_category')['reserves_category']
-        incremental_name = get_incremental_name(inc_input['well']['well_name'], 1)
-        base_ret = {
-            'well': inc_input['well'],
-            'well_index': get_well_index(batch_index, batch_size, index),
-            'incremental_name': incremental_name,
-            'incremental_index': 1,
-            'reserves_category': {
-                ECON_PRMS_RESOURCES_CLASS: reserves_category[PRMS_RESOURCES_CLASS],
-                ECON_PRMS_RESERVES_CATEGORY: reserves_category[PRMS_RESERVES_CATEGORY],
-                ECON_PRMS_RESERVES_SUB_CATEGORY: reserves_category[PRMS_RESERVES_SUB_CATEGORY]
-            }
-        }
-        (_, _, _, _, _, _, base_case_flat_log, _) = economics(base_input,
-                                                              0,
-                                                              None,
-                                                              is_fiscal_month,
-                                                              feature_flags=feature_flags)
-        (selected_flat_output, all_flat_output, one_liner, all_one_liner, nested_output_paras, warning_message, _,
-         _) = economics(inc_input, 1, base_case_flat_log, is_fiscal_month, feature_flags=feature_flags)
-        ret = {
+                'emission_nodes': emission_nodes,
+            }, None
+
+        (selected_flat_output, all_flat_output, one_liner, all_one_liner, nested_output_paras, warning_message,
+         flat_econ_log, _) = economics(well_input, 0, None, is_fiscal_month, feature_flags=feature_flags)
+        return {
             **base_ret,
             'flat_output': selected_flat_output,
             'one_liner': one_liner,
@@ -125,11 +109,140 @@ def combo_batch_econ(run, params, combo_econ_inputs, combo_inc_inputs, feature_f
             'nested_output_paras': nested_output_paras,
             'warning': warning_message,
             'econ_group': UNGROUPED,
-        }
-        combo_outputs.append(ret)
-        index += 1
+        }, flat_econ_log if keep_flat_log else None
 
-    return combo_outputs
+    except Exception as e:
+        calculation_error = get_exception_info(e)
+        col_number = None
+
+        if params['is_ghg']:
+            add_to_logging_metadata({'ghg_run': params, 'error': e})
+
+        else:
+            columns = well_input['columns']
+            general_options = output_params['generalOptions']
+            col_number = PostProcess.get_col_number(columns, general_options)
+
+            if not calculation_error['expected']:
+                logging.error('econ batch calculation error', extra={'metadata': calculation_error})
+
+        return {
+            **base_ret,
+            'error': calculation_error,
+            'col_number': col_number,
+        }, None
+
+
+def base_case_econ(base_input, is_fiscal_month, feature_flags):
+    (_, _, _, _, _, _, base_case_flat_log, _) = economics(base_input,
+                                                          0,
+                                                          None,
+                                                          is_fiscal_month,
+                                                          feature_flags=feature_flags)
+    return base_case_flat_log
+
+
+def incremental_batch_econ(base_input, inc_input, well_index, is_fiscal_month, feature_flags, base_case_flat_log=None):
+    '''base_input is only run when base_case_flat_log is not given'''
+    base_ret = _base_output(inc_input, well_index, 1)
+    if base_case_flat_log is None:
+        base_case_flat_log = base_case_econ(base_input, is_fiscal_month, feature_flags)
+    (selected_flat_output, all_flat_output, one_liner, all_one_liner, nested_output_paras, warning_message, _,
+     _) = economics(inc_input, 1, base_case_flat_log, is_fiscal_month, feature_flags=feature_flags)
+    return {
+        **base_ret,
+        'flat_output': selected_flat_output,
+        'one_liner': one_liner,
+        # these two are all columns that need to be written to bq
+        'all_flat_output': all_flat_output,
+        'all_one_liner': all_one_liner,
+        'nested_output_paras': nested_output_paras,
+        'warning': warning_message,
+        'econ_group': UNGROUPED,
+    }
+
+
+def batch_econ_outputs(run,
+                       params,
+                       econ_inputs_by_combo,
+                       inc_inputs_by_combo,
+                       feature_flags: Optional[dict[str, bool]] = None,
+                       n_workers=1,
+                       tenant_info=None):
+    '''Outputs of the wells then the incremental cases of each combo, in input order.
+
+    The base case flat logs needed by incremental cases are memoized for the batch by base_case_key: a base case that
+    was run as a well of any combo is not run again, and other base cases are run once however many incremental cases
+    share them.
+    '''
+    batch_index = params['batch_index']
+    batch_size = run['batchSize']
+    output_params = run['outputParams']
+    is_fiscal_month = output_params.get("prodAnalyticsType", 'calendar') == 'daysOn'
+
+    inc_base_keys = [[base_case_key(base_input) for base_input, _ in combo_inc_inputs]
+                     for combo_inc_inputs in inc_inputs_by_combo]
+    needed_keys = {key for combo_keys in inc_base_keys for key in combo_keys}
+    needed_well_ids = {well_id for well_id, _ in needed_keys}
+
+    # the wells, followed by the base cases not run as a well
+    tasks, well_keys = [], []
+    for combo_econ_inputs in econ_inputs_by_combo:
+        for index, well_input in enumerate(combo_econ_inputs):
+            key = None
+            if str(well_input['well'].get('_id')) in needed_well_ids:
+                key = base_case_key(well_input)
+            well_keys.append(key)
+            tasks.append((well_batch_econ, (well_input, get_well_index(batch_index, batch_size, index), params,
+                                            output_params, is_fiscal_month, feature_flags, key in needed_keys)))
+    n_wells = len(tasks)
+
+    base_inputs = {}
+    run_well_keys = set(well_keys)
+    for combo_inc_inputs, combo_keys in zip(inc_inputs_by_combo, inc_base_keys):
+        for (base_input, _), key in zip(combo_inc_inputs, combo_keys):
+            if key not in run_well_keys:
+                base_inputs.setdefault(key, base_input)
+    tasks += [(base_case_econ, (base_input, is_fiscal_month, feature_flags)) for base_input in base_inputs.values()]
+
+    results = run_econ_tasks(tasks, n_workers, tenant_info)
+    well_outputs = [ret for ret, _ in results[:n_wells]]
+    flat_logs = dict(zip(base_inputs.keys(), results[n_wells:]))
+    for key, (_, flat_econ_log) in zip(well_keys, results[:n_wells]):
+        if flat_econ_log is not None:
+            flat_logs.setdefault(key, flat_econ_log)
+
+    # a base case whose well errored is run again by its incremental case, raising the error as before
+    inc_tasks = []
+    for combo_econ_inputs, combo_inc_inputs, combo_keys in zip(econ_inputs_by_combo, inc_inputs_by_combo,
+                                                               inc_base_keys):
+        for index, ((base_input, inc_input), key) in enumerate(zip(combo_inc_inputs, combo_keys),
+                                                               start=len(combo_econ_inputs)):
+            flat_log = flat_logs.get(key)
+            well_index = get_well_index(batch_index, batch_size, index)
+            inc_tasks.append((incremental_batch_econ, (base_input if flat_log is None else None, inc_input, well_index,
+                                                       is_fiscal_month, feature_flags, flat_log)))
+    inc_outputs = run_econ_tasks(inc_tasks, n_workers, tenant_info)
+
+    outputs_by_combo = []
+    well_start, inc_start = 0, 0
+    for combo_econ_inputs, combo_inc_inputs in zip(econ_inputs_by_combo, inc_inputs_by_combo):
+        well_end, inc_end = well_start + len(combo_econ_inputs), inc_start + len(combo_inc_inputs)
+        outputs_by_combo.append(well_outputs[well_start:well_end] + inc_outputs[inc_start:inc_end])
+        well_start, inc_start = well_end, inc_end
+
+    return outputs_by_combo
+
+
+def combo_batch_econ(run,
+                     params,
+                     combo_econ_inputs,
+                     combo_inc_inputs,
+                     feature_flags: Optional[dict[str, bool]] = None,
+                     n_workers=1,
+                     tenant_info=None):
+    return batch_econ_outputs(run, params, [combo_econ_inputs], [combo_inc_inputs], feature_flags, n_workers,
+                              tenant_info)[0]
 
 
 class EconCalculationError(Exception):
@@ -267,17 +380,11 @@ class EconService(object):
                                                                 e)
             return batch_outputs
 
-        batch_outputs = []
-
-        for combo in combos:
-            combo_name = combo['name']
-
-            combo_econ_inputs = inputs_by_combo[combo_name]
-            combo_inc_inputs = inc_inputs_by_combo[combo_name]
-
-            combo_outputs = combo_batch_econ(run, params, combo_econ_inputs, combo_inc_inputs, feature_flags)
-
-            batch_outputs.append({'combo': combo, 'outputs': combo_outputs})
+        # wells of all combos share one pool and one memo of base case flat logs
+        outputs_by_combo = batch_econ_outputs(run, params, [inputs_by_combo[combo['name']] for combo in combos],
+                                              [inc_inputs_by_combo[combo['name']] for combo in combos], feature_flags,
+                                              get_econ_workers(output_params), self.context.tenant_info)
+        batch_outputs = [{'combo': combo, 'outputs': outputs} for combo, outputs in zip(combos, outputs_by_combo)]
 
         return batch_outputs
 
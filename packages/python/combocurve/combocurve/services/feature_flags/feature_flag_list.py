@@ -9,6 +9,7 @@ from functools import lru_cache
 
 class EnabledFeatureFlags:
     roll_out_compositional_economics = "roll-out-compositional-economics"
+    roll_out_dal_production_archive_batches = "roll-out-dal-production-archive-batches"
 
 
 @lru_cache(maxsize=1)
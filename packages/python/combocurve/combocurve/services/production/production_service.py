@@ -1,16 +1,19 @@
+from datetime import date, timedelta
 from typing import Any, Dict, Iterable, Union, TYPE_CHECKING
 
 from bson import ObjectId
+from grpc import RpcError, StatusCode
 import numpy as np
 from pymongo.collection import Collection
 
 from combocurve.dal.client import DAL
-from combocurve.dal.stubs import production_from_response
 from combocurve.shared.constants import DAYS_IN_MONTH
 from combocurve.shared.mongo_utils import put_items_together
 
 DAILY_BUCKET_SIZE = 31
 MONTHLY_BUCKET_SIZE = 12
+# only the wells without production in these last days stream all their dates for their last prods
+LAST_PROD_RECENT_DAYS = 366
 
 if TYPE_CHECKING:
     from apps.python_apis.api.context import APIContext
@@ -39,14 +42,11 @@ class ProductionService(object):
             return []
 
         if daily:
-            production = self.dal.daily_production.fetch_by_well(wells=wells_strs)
-            field_list = fields + daily_custom_fields
+            yield from self.dal.daily_production.fetch_production_by_well(wells=wells_strs,
+                                                                          fields=fields + daily_custom_fields)
         else:
-            production = self.dal.monthly_production.fetch_by_well(wells=wells_strs)
-            field_list = fields + monthly_custom_fields
-
-        for well_response in production:
-            yield production_from_response(well_response, field_list)
+            yield from self.dal.monthly_production.fetch_production_by_well(wells=wells_strs,
+                                                                            fields=fields + monthly_custom_fields)
 
     def get_well_peak_rates(self, wells, daily=False, fields=['oil', 'gas', 'water']):
         '''
@@ -580,30 +580,62 @@ class ProductionService(object):
                 }
             }
         """
-        daily_data = []
-        monthly_data = []
+        cum_phases = list(cum_phases)
+        ret = {'daily': {}, 'monthly': {}}
 
         if len(daily_wells):
-            daily_data = self.dal.daily_production.fetch_by_well(wells=daily_wells)
+            ret['daily'] = self._get_cums_and_last_prods(self.dal.daily_production, list(daily_wells), cum_phases)
 
         if len(monthly_wells):
-            monthly_data = self.dal.monthly_production.fetch_by_well(wells=monthly_wells)
+            ret['monthly'] = self._get_cums_and_last_prods(self.dal.monthly_production, list(monthly_wells),
+                                                           cum_phases)
 
-        ret = {'daily': {}, 'monthly': {}}
+        return ret
 
-        for daily_response in daily_data:
-            daily_well = production_from_response(daily_response)
-            well_id = str(daily_well['_id'])
-            cum_dict = {phase: sum(daily_well[phase]) for phase in cum_phases}
-            ret['daily'][well_id] = {'last_prod': max(daily_well['index']), **cum_dict}
+    @staticmethod
+    def _get_cums_and_last_prods(production_client, wells: list[str], cum_phases: list[str]):
+        # the DAL server sums the phases and only the dates are streamed for the last prods. Older DAL servers without
+        # SumByWell fall back to fetching the whole production
+        try:
+            cums = {str(well_sums.pop('_id')): well_sums
+                    for well_sums in production_client.fetch_sums_by_well(wells=wells, fields=cum_phases)}
+        except RpcError as e:
+            if e.code() != StatusCode.UNIMPLEMENTED:
+                raise
+            return cums_and_last_prods_from_production(
+                production_client.fetch_production_by_well(wells=wells, fields=cum_phases), cum_phases)
+
+        ret = {}
+        recent_start_date = date.today() - timedelta(days=LAST_PROD_RECENT_DAYS)
+        for last_index in production_client.fetch_last_index_by_well(wells=wells, recent_start_date=recent_start_date):
+            well_id = str(last_index['_id'])
+            ret[well_id] = {'last_prod': last_index['index'], **cums.get(well_id, dict.fromkeys(cum_phases, 0.))}
+        return ret
 
-        for monthly_response in monthly_data:
-            monthly_well = production_from_response(monthly_response)
-            well_id = str(monthly_well['_id'])
-            cum_dict = {phase: sum(monthly_well[phase]) for phase in cum_phases}
-            ret['monthly'][well_id] = {'last_prod': max(monthly_well['index']), **cum_dict}
 
-        return ret
+def cums_and_last_prods_from_production(production: Iterable[dict], cum_phases: list[str]) -> Dict[str, Dict[str, Any]]:
+    """Client side `ProductionService.get_cums_and_last_prods` of one resolution, from the production decoded by
+    `production_by_well`. The wells are reduced together, missing values are skipped as in the DAL SumByWell.
+    """
+    production = [well for well in production if len(well['index'])]
+    if not production:
+        return {}
+
+    well_starts = np.cumsum([0] + [len(well['index']) for well in production[:-1]])
+    last_prods = np.maximum.reduceat(np.concatenate([well['index'] for well in production]), well_starts)
+    cums = {}
+    for phase in cum_phases:
+        values = np.concatenate([well[phase] for well in production])
+        cums[phase] = np.add.reduceat(np.where(np.isnan(values), 0., values), well_starts)
+
+    return {
+        str(well['_id']): {
+            'last_prod': int(last_prods[i]),
+            **{phase: float(cums[phase][i])
+               for phase in cum_phases}
+        }
+        for i, well in enumerate(production)
+    }
 
 
 def reformat_forecast_group_data(well_forecast):
@@ -0,0 +1,220 @@
+from collections import defaultdict
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from combocurve.science.core_function.helper import shift_idx
+from combocurve.science.diagnostics.diagnostics import ops as scalar_ops
+from combocurve.science.type_curve.skeleton_normalize import ops as arr_ops
+from combocurve.services.proximity_forecast.proximity_headers_listing import date_headers_list
+from combocurve.shared.date import days_from_1900, index_from_date_str
+
+
+class CandidateWellIndex:
+    '''
+    Candidate wells of the proximity neighbor search, built once per candidate set and shared by the searches of all
+    the target wells: the parsed headers as columns, the criteria columns converted on first use, and a KD-tree of the
+    surface locations on the unit sphere for the radius queries.
+    '''
+    def __init__(self, candidate_well_data: dict):
+        well_headers = candidate_well_data['well_headers']
+        self.well_forecast_pairs = candidate_well_data['well_forecast_pairs']
+        self.well_ids = np.array([str(well['_id']) for well in well_headers], dtype=object)
+        self.headers = pd.DataFrame(list(map(parse_well_header, well_headers)))
+        self.locations = np.radians(
+            np.array([[well.get('surfaceLatitude'), well.get('surfaceLongitude')] for well in well_headers],
+                     dtype=float).reshape(-1, 2))
+        # wells without a location are never in the search radius
+        self.located = np.flatnonzero(np.isfinite(self.locations).all(axis=1))
+        self.tree = cKDTree(to_unit_vectors(self.locations[self.located]))
+        self._criteria_columns = {}
+        self._well_forecast_dicts = {}
+
+    def __len__(self):
+        return len(self.well_ids)
+
+    def criteria_mask(self, field: str, field_criteria: dict, parsed_target_well_info: dict) -> np.ndarray:
+        '''
+        `get_valid_mask` over all the candidate wells.
+        '''
+        column_key = (field, field_criteria['type'])
+        if column_key not in self._criteria_columns:
+            self._criteria_columns[column_key] = get_criteria_column(self.headers, field_criteria, field)
+        return get_valid_mask_from_column(self._criteria_columns[column_key], field_criteria, parsed_target_well_info,
+                                          field)
+
+    def query_radius(self, target_in_radians: np.ndarray, radius_in_haversine_distance: float):
+        '''
+        Candidate wells within the haversine distance of the target location, in `well_ids` order.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: positions of the wells in `well_ids` and their haversine distances.
+        '''
+        # the chord between two points of the unit sphere grows with the angle between them, the query is a bit wider
+        # so that the haversine distance alone decides the wells on the boundary
+        chord = 2 * np.sin(min(radius_in_haversine_distance, np.pi) / 2)
+        tree_positions = self.tree.query_ball_point(to_unit_vectors(target_in_radians)[0], chord * (1 + 1e-9))
+        positions = np.sort(self.located[np.array(tree_positions, dtype=int)])
+        dist = my_haversine_distances(self.locations[positions], target_in_radians)
+        in_radius = dist <= radius_in_haversine_distance
+        return positions[in_radius], dist[in_radius]
+
+    def well_forecast_dict(self, selected_forecasts: list[str]) -> dict[str, str]:
+        '''
+        Maps each candidate well to the first forecast of `selected_forecasts` it belongs to.
+        '''
+        selected_forecasts = tuple(selected_forecasts)
+        if selected_forecasts not in self._well_forecast_dicts:
+            wells_by_forecast = defaultdict(list)
+            for pair in self.well_forecast_pairs:
+                wells_by_forecast[str(pair['forecast'])].append(str(pair['well']))
+
+            well_forecast_dict = {}
+            for forecast in selected_forecasts:
+                for well in wells_by_forecast[forecast]:
+                    if not well_forecast_dict.get(well):
+                        well_forecast_dict[well] = forecast
+            self._well_forecast_dicts[selected_forecasts] = well_forecast_dict
+        return dict(self._well_forecast_dicts[selected_forecasts])
+
+
+def to_unit_vectors(locations_in_radians: np.ndarray) -> np.ndarray:
+    lat, long = locations_in_radians[:, 0], locations_in_radians[:, 1]
+    return np.stack([np.cos(lat) * np.cos(long), np.cos(lat) * np.sin(long), np.sin(lat)], axis=1)
+
+
+def parse_well_header(well):
+    updates = {}
+    for k in date_headers_list:
+        if header_value := well.get(k):
+            if type(header_value) in [str]:
+                try:
+                    updates[k] = index_from_date_str(header_value)
+                except Exception:
+                    pass
+            elif type(header_value) in [datetime, date]:
+                updates[k] = days_from_1900(header_value)
+            elif type(header_value) in [np.datetime64]:
+                updates[k] = np.datetime_as_string(header_value)
+            else:
+                # Unsure what other value types we could have.  Possibly indices?  If it is an index,
+                #  no modification would be needed.
+                pass
+
+    return {**well, **updates}
+
+
+def check_for_number(value):
+    return value != '' and type(value) not in [
+        type(None), str
+    ] and (not np.isnan(value)) and (not np.isinf(value)) and type(value) in [
+        int, float, np.int8, np.int16, np.int32, np.int64, np.float16, np.float32, np.float64
+    ]
+
+
+def check_for_date_str(v):
+    return type(v) == str and len(v) > 10
+
+
+def merge_range(range_1, range_2):
+    left_values = []
+    right_values = []
+    if check_for_number(range_1[0]):
+        left_values += [range_1[0]]
+
+    if check_for_number(range_1[1]):
+        right_values += [range_1[1]]
+
+    if check_for_number(range_2[0]):
+        left_values += [range_2[0]]
+
+    if check_for_number(range_2[1]):
+        right_values += [range_2[1]]
+
+    return [
+        None if len(left_values) == 0 else max(left_values),
+        None if len(right_values) == 0 else min(right_values),
+    ]
+
+
+def get_criteria_column(neighbor_well_df, field_criteria, field):
+    fields = field.split('/')
+
+    if len(fields) == 1:
+        dtype_map = {'number': float, 'string': str, 'date': float}
+        return np.array(neighbor_well_df.get(fields[0], [None] * neighbor_well_df.shape[0]),
+                        dtype=dtype_map[field_criteria['type']])
+
+    numerator_arr = np.array(neighbor_well_df.get(fields[0], [None] * neighbor_well_df.shape[0]), dtype=float)
+    denominator_arr = np.array(neighbor_well_df.get(fields[1], [None] * neighbor_well_df.shape[0]), dtype=float)
+    return arr_ops['/'](numerator_arr, denominator_arr)
+
+
+def get_valid_mask(neighbor_well_df, field_criteria, parsed_target_well_info, field):
+    this_col = get_criteria_column(neighbor_well_df, field_criteria, field)
+    return get_valid_mask_from_column(this_col, field_criteria, parsed_target_well_info, field)
+
+
+def get_valid_mask_from_column(this_col, field_criteria, parsed_target_well_info, field):
+    fields = field.split('/')
+
+    if len(fields) == 1:
+        target_well_value = parsed_target_well_info.get(fields[0])
+    else:
+        target_well_value = scalar_ops['/'](parsed_target_well_info.get(fields[0]),
+                                            parsed_target_well_info.get(fields[1]))
+
+    valid_mask = np.ones(this_col.shape[0], dtype=bool)
+    if field_criteria['type'] == 'string':
+        if type(target_well_value) == str or target_well_value is None:
+            valid_mask = this_col == target_well_value
+    elif field_criteria['type'] == 'number':
+        absolute_range = field_criteria.get('absoluteRange', {})
+        relative_value = field_criteria.get('relativeValue')
+        relative_percentage = field_criteria.get('relativePercentage')
+        this_col_range = [None, None]
+        if check_for_number(target_well_value):
+            if check_for_number(relative_value):
+                relative_value_range = [target_well_value - relative_value, target_well_value + relative_value]
+                this_col_range = merge_range(this_col_range, relative_value_range)
+
+            if check_for_number(relative_percentage):
+                relative_percentage_range = [
+                    target_well_value * (1 - relative_percentage / 100), target_well_value *
+                    (1 + relative_percentage / 100)
+                ]
+                this_col_range = merge_range(this_col_range, relative_percentage_range)
+        this_col_range = merge_range(this_col_range, [absolute_range.get('start'), absolute_range.get('end')])
+        if check_for_number(this_col_range[0]):
+            valid_mask = valid_mask & (this_col.astype(float) >= this_col_range[0])
+
+        if check_for_number(this_col_range[1]):
+            valid_mask = valid_mask & (this_col.astype(float) <= this_col_range[1])
+    elif field_criteria['type'] == 'date':
+        relative_value = field_criteria.get('relativeValue')
+        absolute_range = [
+            field_criteria.get('absoluteRange', {}).get('start'),
+            field_criteria.get('absoluteRange', {}).get('end')
+        ]
+        date_range = [index_from_date_str(str(x)) if check_for_date_str(x) else None for x in absolute_range]
+        if check_for_number(target_well_value):
+            if check_for_number(relative_value):
+                date_range = merge_range(date_range, [shift_idx(target_well_value, -relative_value, 'month'), None])
+                date_range = merge_range(date_range, [None, shift_idx(target_well_value, relative_value, 'month')])
+
+        if check_for_number(date_range[0]):
+            valid_mask = valid_mask & (this_col.astype(float) >= date_range[0])
+
+        if check_for_number(date_range[1]):
+            valid_mask = valid_mask & (this_col.astype(float) <= date_range[1])
+    return valid_mask
+
+
+def my_haversine_distances(x_arr, y_arr):
+    part1 = np.square(np.sin((x_arr[:, 0] - y_arr[:, 0]) / 2))
+    part2 = np.square(np.sin((x_arr[:, 1] - y_arr[:, 1]) / 2))
+    part3 = np.cos(x_arr[:, 0]) * np.cos(y_arr[:, 0]) * part2
+    final = 2 * np.arcsin(np.sqrt(part1 + part3))
+    return final
@@ -7,34 +7,31 @@ from typing import Any, AnyStr, Dict, List, Optional, Tuple, Union, TYPE_CHECKIN
 
 from bson import ObjectId
 import numpy as np
-import pandas as pd
 from pymongo.database import Collection
 from pymongo import UpdateOne
 from redis.exceptions import ConnectionError as RedisConnectionError
 
 from combocurve.science.core_function.helper import shift_idx
 from combocurve.science.deterministic_forecast.templates import return_template
-from combocurve.science.diagnostics.diagnostics import ops as scalar_ops
 from combocurve.science.forecast.auto_forecast_warnings import convert_header_to_human_readable
 from combocurve.science.forecast_models.model_manager import mm
 from combocurve.science.forecast_models.shared.parent_model import model_parent
 from combocurve.science.segment_models.multiple_segments import MultipleSegments
-from combocurve.science.type_curve.skeleton_normalize import ops as arr_ops
 from combocurve.science.type_curve.tc_fit_init import tc_init
 from combocurve.science.type_curve.tc_rep_init_helper import WellValidationCriteriaEnum
 from combocurve.science.type_curve.tc_rep_init import rep_init
 from combocurve.services.forecast.mass_modify_well_life_v2 import MassModifyWellLifeService
 from combocurve.services.proximity_forecast.proximity_data_models import (NormalizationMultipliers, ProximityDocument,
                                                                           ProximityFitsContainer)
-from combocurve.services.proximity_forecast.proximity_headers_listing import (headers_map_list, date_headers_list,
-                                                                              mandatory_headers)
+from combocurve.services.proximity_forecast.proximity_candidate_index import CandidateWellIndex, parse_well_header
+from combocurve.services.proximity_forecast.proximity_headers_listing import headers_map_list, mandatory_headers
 from combocurve.services.proximity_forecast.proximity_helpers import (update_ratio_or_P_dict)
 from combocurve.services.proximity_forecast.proximity_data_model_helpers import (create_settings_object,
                                                                                  create_well_forecast_pairs)
 from combocurve.services.type_curve.tc_normalization_data_models import StepsItem
 from combocurve.services.type_curve.type_curve_service import TypeCurveService, generate_forecast_map
 from combocurve.shared.constants import DAYS_IN_MONTH, PHASES, Q_MIN
-from combocurve.shared.date import days_from_1900, index_from_date_str
+from combocurve.shared.date import days_from_1900
 from combocurve.shared.serialization import make_serializable
 from combocurve.science.type_curve.skeleton_TC_new1 import fit_tc
 from combocurve.science.type_curve.skeleton_normalize import linear, one_to_one, power_law
@@ -450,10 +447,11 @@ class ProximityForecastService:
 
         Returns:
             tuple[dict, dict]:
-                candidate_well_data (dict[str, Any]): Two keys
+                candidate_well_data (dict[str, Any]): Three keys
                     well_headers (list[dict]): list of header dictionaries for all candidate wells.
                     well_forecast_pairs (list[dict]): list of dictionaries containing well ids and forecast ids.
                         Used to determine which forecast to pull forecast data from for each candidate well.
+                    candidate_index (CandidateWellIndex): the candidate wells indexed for the neighbor searches.
                 target_wells_header_dict (dict[str, dict]): Maps target well id to target well headers
         '''
         header_project = {k: 1 for k in required_headers}
@@ -483,6 +481,9 @@ class ProximityForecastService:
             logging.warning('Failed to connect to redis.')
             candidate_well_data = self.fetch_candidate_well_headers(selected_forecasts, required_headers)
 
+        # searched once per target well and phase, see get_neighbor_wells
+        candidate_well_data['candidate_index'] = CandidateWellIndex(candidate_well_data)
+
         return candidate_well_data, target_wells_header_dict
 
     def run_proximity_workflow_using_document(self, proximity_document: ProximityDocument):
@@ -1057,29 +1058,23 @@ class ProximityForecastService:
         radius_in_haversine_distance = search_radius / EARTH_RADIUS
 
         target_well_headers = target_well_header_dict[target_well_id_str]
-        candidate_wells = [w for w in candidate_well_data['well_headers'] if str(w['_id']) != target_well_id_str]
-        well_forecast_pairs = candidate_well_data['well_forecast_pairs']
-        well_forecast_pairs = list(filter(lambda x: x['well'] != target_well_id_str, well_forecast_pairs))
+        candidate_index: CandidateWellIndex = candidate_well_data.get('candidate_index')
+        if candidate_index is None:
+            candidate_index = CandidateWellIndex(candidate_well_data)
 
         selected_forecasts: List[AnyStr] = neighbor_dict['selectedForecasts']
         selected_forecasts: List[AnyStr] = sorted(set(selected_forecasts), key=selected_forecasts.index)
 
-        well_forecast_dict: Dict[AnyStr, AnyStr] = {}
-        for forecast in selected_forecasts:
-            wells_with_forecast: List = list(filter(lambda x: str(x['forecast']) == forecast, well_forecast_pairs))
-            for well in wells_with_forecast:
-                if not well_forecast_dict.get(str(well['well'])):
-                    well_forecast_dict[str(well['well'])] = forecast
+        well_forecast_dict: Dict[AnyStr, AnyStr] = candidate_index.well_forecast_dict(selected_forecasts)
 
         target_location = [target_well_headers.get('surfaceLatitude'), target_well_headers.get('surfaceLongitude')]
         if target_location[0] is None or target_location[1] is None:
             return [], {}, {}, [], {}, ProximityErrorType.INVALID_TARGET
         target_in_radians = np.radians(target_location).reshape(-1, 2)
 
-        parsed_neighbor_well_list = list(map(parse_well_header, candidate_wells))
         parsed_target_well_info = parse_well_header(target_well_headers)
         ####### following filtering
-        neighbor_well_df = pd.DataFrame(parsed_neighbor_well_list)
+        neighbor_mask = candidate_index.well_ids != target_well_id_str
         minimum_wells = neighbor_dict['wellCountRange']['start']
         maximum_wells = neighbor_dict['wellCountRange']['end']
 
@@ -1093,35 +1088,27 @@ class ProximityForecastService:
 
         for field in mandatory_fields + optional_fields:
             field_criteria = neighbor_dict[field]
-            valid_mask = get_valid_mask(neighbor_well_df, field_criteria, parsed_target_well_info, field)
+            valid_mask = neighbor_mask & candidate_index.criteria_mask(field, field_criteria, parsed_target_well_info)
             filtered_num = np.sum(valid_mask)
             if filtered_num < minimum_wells:
                 if field_criteria['mandatory']:
-                    neighbor_well_df = neighbor_well_df.loc[valid_mask, :]
+                    neighbor_mask = valid_mask
                     break
                 else:
                     continue
 
-            neighbor_well_df = neighbor_well_df.loc[valid_mask, :]
+            neighbor_mask = valid_mask
 
-        if neighbor_well_df.shape[0] == 0:
+        if not np.any(neighbor_mask):
             return [], {}, {}, [], {}, ProximityErrorType.NO_WELLS
 
-        # Clean up the dataframe a bit
-        neighbor_well_df['_id'] = neighbor_well_df['_id'].astype(str)
-
         # Sort and filter by distance to the target well
-        neighbor_lat_in_radians = np.radians(np.array(neighbor_well_df['surfaceLatitude']))
-        neighbor_long_in_radians = np.radians(np.array(neighbor_well_df['surfaceLongitude']))
-        neighbor_location = np.array([neighbor_lat_in_radians, neighbor_long_in_radians]).transpose()
-        dist = my_haversine_distances(neighbor_location, target_in_radians)
-        neighbor_well_df['ProximityTargetDistance'] = dist
-
-        neighbor_well_df = neighbor_well_df[neighbor_well_df['ProximityTargetDistance'] <= radius_in_haversine_distance]
-        neighbor_well_df = neighbor_well_df.sort_values('ProximityTargetDistance')
-        neighbor_well_df = neighbor_well_df.drop('ProximityTargetDistance', axis=1)
+        neighbor_positions, dist = candidate_index.query_radius(target_in_radians, radius_in_haversine_distance)
+        is_neighbor = neighbor_mask[neighbor_positions]
+        # quicksort, as pandas sort_values, for the same order of the wells at the same distance
+        neighbor_positions = neighbor_positions[is_neighbor][np.argsort(dist[is_neighbor], kind='quicksort')]
 
-        pre_rep_filter_well_list: List[AnyStr] = list(neighbor_well_df['_id'])
+        pre_rep_filter_well_list: List[AnyStr] = list(candidate_index.well_ids[neighbor_positions])
 
         # Setup indices for searching for valid proximity wells
         search_start_idx = 0
@@ -1156,16 +1143,10 @@ class ProximityForecastService:
             # ... and add any valid ones to the valid rep list
             proximity_rep_data_final.extend(proximity_rep_data)
 
-        rep_well_ids: List[AnyStr] = [r_well['well_id'] for r_well in proximity_rep_data_final]
+        rep_well_ids = {r_well['well_id'] for r_well in proximity_rep_data_final}
 
-        neighbor_well_df: pd.DataFrame = neighbor_well_df[neighbor_well_df['_id'].isin(rep_well_ids)]
-
-        # Trim the wells dataframe to the correct size
-        if neighbor_well_df.shape[0] > maximum_wells:
-            neighbor_well_df = neighbor_well_df.iloc[:maximum_wells, :]
-
-        # Final data preparation
-        well_list = list(neighbor_well_df['_id'])
+        # Final data preparation, trimmed to the correct size
+        well_list = [well for well in pre_rep_filter_well_list if well in rep_well_ids][:maximum_wells]
         well_forecast_dict = {k: v for k, v in well_forecast_dict.items() if k in well_list}
         wells_by_forecast = {}
         for well, forecast in well_forecast_dict.items():
@@ -1173,10 +1154,10 @@ class ProximityForecastService:
         proximity_rep_data_final = [x for x in proximity_rep_data_final if x['well_id'] in well_list]
 
         # Final check to ensure we have at least the min number of wells, or set the error type.
-        if neighbor_well_df.shape[0] >= minimum_wells:
+        if len(well_list) >= minimum_wells:
             return (well_list, well_forecast_dict, wells_by_forecast, proximity_rep_data_final, target_well_headers,
                     ProximityErrorType.NONE)
-        elif neighbor_well_df.shape[0] == 0:
+        elif len(well_list) == 0:
             return [], {}, {}, [], {}, ProximityErrorType.NO_WELLS
         else:
             ## well_list: list of well ids
@@ -1685,60 +1666,6 @@ class ProximityForecastService:
         return proximity_fits, update_forecast
 
 
-def parse_well_header(well):
-    updates = {}
-    for k in date_headers_list:
-        if header_value := well.get(k):
-            if type(header_value) in [str]:
-                try:
-                    updates[k] = index_from_date_str(header_value)
-                except Exception:
-                    pass
-            elif type(header_value) in [datetime, date]:
-                updates[k] = days_from_1900(header_value)
-            elif type(header_value) in [np.datetime64]:
-                updates[k] = np.datetime_as_string(header_value)
-            else:
-                # Unsure what other value types we could have.  Possibly indices?  If it is an index,
-                #  no modification would be needed.
-                pass
-
-    return {**well, **updates}
-
-
-def check_for_number(value):
-    return value != '' and type(value) not in [
-        type(None), str
-    ] and (not np.isnan(value)) and (not np.isinf(value)) and type(value) in [
-        int, float, np.int8, np.int16, np.int32, np.int64, np.float16, np.float32, np.float64
-    ]
-
-
-def check_for_date_str(v):
-    return type(v) == str and len(v) > 10
-
-
-def merge_range(range_1, range_2):
-    left_values = []
-    right_values = []
-    if check_for_number(range_1[0]):
-        left_values += [range_1[0]]
-
-    if check_for_number(range_1[1]):
-        right_values += [range_1[1]]
-
-    if check_for_number(range_2[0]):
-        left_values += [range_2[0]]
-
-    if check_for_number(range_2[1]):
-        right_values += [range_2[1]]
-
-    return [
-        None if len(left_values) == 0 else max(left_values),
-        None if len(right_values) == 0 else min(right_values),
-    ]
-
-
 def convert_keys_snake_to_camel(x: Dict) -> Dict:
     '''
     Converts keys of a dictionary from snake case to camel case.
@@ -1758,76 +1685,6 @@ def convert_keys_snake_to_camel(x: Dict) -> Dict:
     return ret
 
 
-def get_valid_mask(neighbor_well_df, field_criteria, parsed_target_well_info, field):
-    fields = field.split('/')
-
-    if len(fields) == 1:
-        dtype_map = {'number': float, 'string': str, 'date': float}
-        target_well_value = parsed_target_well_info.get(fields[0])
-        this_col = np.array(neighbor_well_df.get(fields[0], [None] * neighbor_well_df.shape[0]),
-                            dtype=dtype_map[field_criteria['type']])
-
-    else:
-        target_well_value = scalar_ops['/'](parsed_target_well_info.get(fields[0]),
-                                            parsed_target_well_info.get(fields[1]))
-        numerator_arr = np.array(neighbor_well_df.get(fields[0], [None] * neighbor_well_df.shape[0]), dtype=float)
-        denominator_arr = np.array(neighbor_well_df.get(fields[1], [None] * neighbor_well_df.shape[0]), dtype=float)
-        this_col = arr_ops['/'](numerator_arr, denominator_arr)
-
-    valid_mask = np.ones(neighbor_well_df.shape[0], dtype=bool)
-    if field_criteria['type'] == 'string':
-        if type(target_well_value) == str or target_well_value is None:
-            valid_mask = this_col == target_well_value
-    elif field_criteria['type'] == 'number':
-        absolute_range = field_criteria.get('absoluteRange', {})
-        relative_value = field_criteria.get('relativeValue')
-        relative_percentage = field_criteria.get('relativePercentage')
-        this_col_range = [None, None]
-        if check_for_number(target_well_value):
-            if check_for_number(relative_value):
-                relative_value_range = [target_well_value - relative_value, target_well_value + relative_value]
-                this_col_range = merge_range(this_col_range, relative_value_range)
-
-            if check_for_number(relative_percentage):
-                relative_percentage_range = [
-                    target_well_value * (1 - relative_percentage / 100), target_well_value *
-                    (1 + relative_percentage / 100)
-                ]
-                this_col_range = merge_range(this_col_range, relative_percentage_range)
-        this_col_range = merge_range(this_col_range, [absolute_range.get('start'), absolute_range.get('end')])
-        if check_for_number(this_col_range[0]):
-            valid_mask = valid_mask & (this_col.astype(float) >= this_col_range[0])
-
-        if check_for_number(this_col_range[1]):
-            valid_mask = valid_mask & (this_col.astype(float) <= this_col_range[1])
-    elif field_criteria['type'] == 'date':
-        relative_value = field_criteria.get('relativeValue')
-        absolute_range = [
-            field_criteria.get('absoluteRange', {}).get('start'),
-            field_criteria.get('absoluteRange', {}).get('end')
-        ]
-        date_range = [index_from_date_str(str(x)) if check_for_date_str(x) else None for x in absolute_range]
-        if check_for_number(target_well_value):
-            if check_for_number(relative_value):
-                date_range = merge_range(date_range, [shift_idx(target_well_value, -relative_value, 'month'), None])
-                date_range = merge_range(date_range, [None, shift_idx(target_well_value, relative_value, 'month')])
-
-        if check_for_number(date_range[0]):
-            valid_mask = valid_mask & (this_col.astype(float) >= date_range[0])
-
-        if check_for_number(date_range[1]):
-            valid_mask = valid_mask & (this_col.astype(float) <= date_range[1])
-    return valid_mask
-
-
-def my_haversine_distances(x_arr, y_arr):
-    part1 = np.square(np.sin((x_arr[:, 0] - y_arr[:, 0]) / 2))
-    part2 = np.square(np.sin((x_arr[:, 1] - y_arr[:, 1]) / 2))
-    part3 = np.cos(x_arr[:, 0]) * np.cos(y_arr[:, 0]) * part2
-    final = 2 * np.arcsin(np.sqrt(part1 + part3))
-    return final
-
-
 def check_eur(wells_eur):
     for eur in wells_eur:
         if eur and eur > 0:
@@ -5,9 +5,7 @@ from pymongo import UpdateOne, UpdateMany
 from combocurve.dal.fields import (DAILY_MONGO_TO_PROTO_MAPPING, DAILY_NUMERIC_PHASE_FIELDS,
                                    MONTHLY_MONGO_TO_PROTO_MAPPING, MONTHLY_NUMERIC_PHASE_FIELDS)
 from combocurve.dal.stubs import DailyProduction, MonthlyProduction
-from combocurve.dal.v1.daily_production_pb2 import DailyProductionServiceFetchByWellResponse
-from combocurve.dal.v1.monthly_production_pb2 import MonthlyProductionServiceFetchByWellResponse
-from combocurve.shared.date import date_from_timestamp
+from combocurve.shared.date import date_from_index, datetime_from_index
 
 from combocurve.shared.db_import import bulkwrite_operation
 import numpy as np
@@ -45,21 +43,24 @@ class RemoveLeadingZeroService(object):
         zero_ranges = {}
         first_prods = {}
 
-        well_response: Union[MonthlyProductionServiceFetchByWellResponse, DailyProductionServiceFetchByWellResponse]
-        for well_response in service.fetch_by_well(wells=well_ids):
-            well = well_response.well
-            well_data = np.array([getattr(well_response, field) for field in numeric_fields], dtype=float)
-            no_data_mask = (well_data == 0) | np.isnan(well_data)
-            first_prod_index = np.all(no_data_mask, axis=1).argmin()
-            last_zero_timestamp = well_response.date[first_prod_index - 1].seconds if first_prod_index > 0 else None
+        for well_data in service.fetch_production_by_well(wells=well_ids, fields=numeric_fields):
+            well = str(well_data['_id'])
+            index = well_data['index']
+            if not len(index):
+                continue
+            # dates by fields, a date has no data when all its fields are zero or missing
+            well_values = np.column_stack([well_data[field] for field in numeric_fields])
+            no_data_mask = np.all((well_values == 0) | np.isnan(well_values), axis=1)
+            first_prod_index = no_data_mask.argmin()
+            last_zero_index = index[first_prod_index - 1] if first_prod_index > 0 else None
             if first_prod_index == 0 and np.all(no_data_mask):
                 # There was _no_ production found
                 first_prod_index = None
-                last_zero_timestamp = well_response.date[-1].seconds
+                last_zero_index = index[-1]
             if first_prod_index is not None:
-                first_prods[well] = datetime.utcfromtimestamp(well_response.date[first_prod_index].seconds)
-            if last_zero_timestamp is not None:
-                zero_ranges[well] = [date(1900, 1, 1), date_from_timestamp(last_zero_timestamp)]
+                first_prods[well] = datetime_from_index(int(index[first_prod_index]))
+            if last_zero_index is not None:
+                zero_ranges[well] = [date(1900, 1, 1), date_from_index(int(last_zero_index))]
 
         return zero_ranges, first_prods
 
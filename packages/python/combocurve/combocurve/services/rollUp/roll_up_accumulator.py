@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+from combocurve.shared.date import date_object_array
+
+WELL_COLUMNS = ['well_id', 'group_key', 'well_name', 'well_number', 'inpt_id', 'chosen_id', 'api14', 'rollup_type']
+
+
+def _column_values(values):
+    return np.asarray(date_object_array(values))
+
+
+def _well_values(well_header, group_key, rollup_type):
+    return [
+        str(well_header.get('_id')),
+        group_key,
+        str(well_header.get('well_name')),
+        well_header.get('well_number'),
+        well_header.get('inptID'),
+        well_header.get('chosenID'),
+        well_header.get('api14'),
+        rollup_type,
+    ]
+
+
+def _categorical(values, row_codes):
+    codes, categories = pd.factorize(np.fromiter(values, dtype=object, count=len(values)))
+    return pd.Categorical.from_codes(codes[row_codes], categories)
+
+
+class ColumnBuffers:
+    '''
+        Preallocated NumPy buffers of the volume columns, filled block by block and doubled when full.
+
+        The buffers are allocated on the first block, with room for `expected_blocks` blocks of its length. A buffer is
+        upcast if a block has values of a wider type, the same as concatenating the blocks would.
+    '''
+    def __init__(self, expected_blocks=1):
+        self.expected_blocks = max(expected_blocks, 1)
+        self.size = 0
+        self.buffers = {}
+
+    @property
+    def capacity(self):
+        return len(next(iter(self.buffers.values()))) if self.buffers else 0
+
+    def append(self, block):
+        values = {col: _column_values(block[col]) for col in block}
+        n = len(next(iter(values.values()))) if values else 0
+
+        if not self.buffers:
+            capacity = max(self.expected_blocks * n, 1)
+            self.buffers = {col: np.empty(capacity, dtype=v.dtype) for col, v in values.items()}
+        elif self.size + n > self.capacity:
+            self._grow(max(2 * self.capacity, self.size + n))
+
+        for col, v in values.items():
+            dtype = np.result_type(self.buffers[col], v)
+            if dtype != self.buffers[col].dtype:
+                self.buffers[col] = self.buffers[col].astype(dtype)
+            self.buffers[col][self.size:self.size + n] = v
+
+        self.size += n
+        return n
+
+    def columns(self):
+        return {col: buffer[:self.size] for col, buffer in self.buffers.items()}
+
+    def _grow(self, capacity):
+        for col, buffer in self.buffers.items():
+            grown = np.empty(capacity, dtype=buffer.dtype)
+            grown[:self.size] = buffer[:self.size]
+            self.buffers[col] = grown
+
+
+class ByWellRollUpAccumulator:
+    '''
+        Collects the volumes of every well and roll-up type of a batch in column buffers. The well headers are kept once
+        per well and roll-up type, and expanded to categorical columns when the dataframe is built.
+    '''
+    def __init__(self, expected_blocks=1):
+        self.volumes = ColumnBuffers(expected_blocks)
+        self.well_values = []
+        self.block_lengths = []
+
+    def add(self, well_header, group_key, rollup_type, well_volume):
+        self.block_lengths.append(self.volumes.append(well_volume))
+        self.well_values.append(_well_values(well_header, group_key, rollup_type))
+
+    def to_df(self):
+        if not self.block_lengths:
+            return pd.DataFrame()
+
+        row_codes = np.repeat(np.arange(len(self.block_lengths)), self.block_lengths)
+        well_columns = {
+            col: _categorical([values[i] for values in self.well_values], row_codes)
+            for i, col in enumerate(WELL_COLUMNS)
+        }
+        return pd.DataFrame({**well_columns, **self.volumes.columns()})
+
+
+class GroupRollUpAccumulator:
+    '''
+        Sums the volumes of the wells of every group and roll-up type in place, the wells are added one by one in the
+        same order as before so the sums don't change. The dates of a group and roll-up type are the ones of its first
+        well.
+    '''
+    def __init__(self):
+        # group -> roll-up type -> index in dates and sums, in the order they were first added
+        self.slots = {}
+        self.dates = []
+        self.sums = []
+
+    def add(self, group_key, rollup_type, well_volume):
+        group_slots = self.slots.setdefault(group_key, {})
+        if rollup_type not in group_slots:
+            group_slots[rollup_type] = len(self.dates)
+            self.dates.append(well_volume['date'])
+            self.sums.append({col: np.zeros(len(values)) for col, values in well_volume.items() if col != 'date'})
+
+        sums = self.sums[group_slots[rollup_type]]
+        for col, values in sums.items():
+            np.add(values, well_volume[col], out=values)
+
+    def group_volumes(self, group_key):
+        '''Volumes of every roll-up type of the group as lists'''
+        return {
+            rollup_type: {
+                'date': list(self.dates[slot]),
+                **{col: values.tolist()
+                   for col, values in self.sums[slot].items()}
+            }
+            for rollup_type, slot in self.slots.get(group_key, {}).items()
+        }
+
+    def to_df(self, rollup_type_names):
+        if not self.sums:
+            return pd.DataFrame()
+
+        slots = [(group, rollup_type, slot) for group, types in self.slots.items()
+                 for rollup_type, slot in types.items()]
+        lengths = [len(self.dates[slot]) for _, _, slot in slots]
+
+        return pd.DataFrame({
+            'date': np.concatenate([_column_values(self.dates[slot]) for _, _, slot in slots]),
+            **{col: np.concatenate([self.sums[slot][col] for _, _, slot in slots])
+               for col in self.sums[0]},
+            'group_key': np.repeat(np.array([group for group, _, _ in slots], dtype=object), lengths),
+            'rollup_type': np.repeat(np.array([rollup_type_names[t] for _, t, _ in slots], dtype=object), lengths),
+        })
@@ -1,5 +1,3 @@
-import numpy as np
-import copy
 from combocurve.services.rollUp.roll_up_well_input import RollUpWellInput
 from combocurve.services.rollUp.roll_up_well_result import RollUpWellResult
 from combocurve.science.econ.econ_calculations.factory import (
@@ -18,25 +16,6 @@ ASSUMPTION_KEYS = [
 ]
 
 
-def sum_up_volume(volume_list):
-    if len(volume_list) == 0:
-        return False
-    #
-    ret_dict = copy.deepcopy(volume_list[0])
-    for v in volume_list[1:]:
-        for col in v:
-            if col == 'date':
-                continue
-            else:
-                ret_dict[col] = np.add(ret_dict[col], v[col])
-    ## format adjust
-    for key in ret_dict:
-        if type(ret_dict[key]) == np.ndarray:
-            ret_dict[key] = ret_dict[key].astype(float).tolist()
-
-    return ret_dict
-
-
 def calculate_well_count(well_volume):
     oil = well_volume['gross_oil_well_head_volume'] > 0
     gas = well_volume['gross_gas_well_head_volume'] > 0
@@ -1,15 +1,15 @@
 import datetime
-import pandas as pd
 from bson import ObjectId
 import logging
 from combocurve.services.econ.econ_and_roll_up_batch_query import roll_up_batch_input
+from combocurve.science.econ.econ_use_forecast.shared_predictions import shared_forecast_predictions
 from combocurve.services.rollUp.roll_up_calculation import (
     single_well_volume,
     single_well_volume_daily,
-    sum_up_volume,
     calculate_well_count,
     ASSUMPTION_KEYS,
 )
+from combocurve.services.rollUp.roll_up_accumulator import ByWellRollUpAccumulator, GroupRollUpAccumulator
 from combocurve.services.rollUp.batch_table_schema import (FORECAST_BATCH_TABLE_SCHEMA, SCENARIO_BATCH_TABLE_SCHEMA,
                                                            WELL_TABLE_SCHEMA)
 from combocurve.utils.exceptions import get_exception_info
@@ -17,7 +17,6 @@ from combocurve.services.rollUp.roll_up_forecast import roll_up_forecast_batch_i
 from combocurve.services.econ.econ_output_service import process_output_type
 from combocurve.services.econ.econ_and_roll_up_batch_query import DEFAULT_ASSUMPTION
 from combocurve.shared.parquet_types import build_pyarrow_schema
-from collections import defaultdict
 from combocurve.services.econ.econ_input_batch import update_econ_input_for_ecl_linked_wells, prepare_assignment_ids
 
 DELIMITER = '+-*'
@@ -104,6 +103,36 @@ def get_key(this_input, groups):
     return DELIMITER.join(keys)
 
 
+def well_roll_up_volumes(this_input, volume_type, data_freq, error_log):
+    '''
+        Volumes with well count of the roll-up types selected in volume_type for a well. The types are computed in
+        one pass that predicts the forecast segments of the well once, a type that fails is added to error_log and
+        left out.
+    '''
+    volume_function = single_well_volume if data_freq == 'monthly' else single_well_volume_daily
+    ret = []
+
+    with shared_forecast_predictions():
+        for roll_up_type in ROLL_UP_TYPE:
+            if not volume_type[roll_up_type]:
+                continue
+            if roll_up_type == ONLY_PRODUCTION:
+                this_input_updated = {**this_input, 'forecast_data': NONE_BY_PHASE}
+            elif roll_up_type == ONLY_FORECAST:
+                this_input_updated = {**this_input, 'production_data': NONE_BY_PHASE}
+            else:
+                this_input_updated = {**this_input}
+
+            try:
+                ret.append((roll_up_type, calculate_well_count(volume_function(this_input_updated))))
+            except Exception as e:
+                error_info = get_exception_info(e)
+                error_log.append({'well_id': this_input['well']['_id'], 'error': error_info})
+                logging.error(error_info['message'], extra={'metadata': {'error': error_info}})
+
+    return ret
+
+
 def get_table_path(context, table_name):
     dataset_id = context.tenant_info['big_query_dataset']
     table_path = context.big_query_client.table_path(dataset_id, table_name)
@@ -216,10 +245,10 @@ class RollUpService(object):
         error_log = []  # not used right now
 
         if by_well:
-            df_roll_up = pd.DataFrame()
+            accumulator = ByWellRollUpAccumulator(len(roll_up_inputs) * sum(map(bool, volume_type.values())))
             roll_up_schema = self.roll_up_well_schema
         else:
-            ret = defaultdict(lambda: defaultdict(list))
+            accumulator = GroupRollUpAccumulator()
             roll_up_schema = {}
 
         for this_input in roll_up_inputs:
@@ -232,64 +261,24 @@ class RollUpService(object):
 
             key = get_key(this_input, groups)
 
-            for roll_up_type in ROLL_UP_TYPE:
-                if roll_up_type == ONLY_PRODUCTION:
-                    this_input_updated = {**this_input, 'forecast_data': NONE_BY_PHASE}
-                elif roll_up_type == ONLY_FORECAST:
-                    this_input_updated = {**this_input, 'production_data': NONE_BY_PHASE}
-                else:
-                    this_input_updated = {**this_input}
+            for roll_up_type, this_well_volume in well_roll_up_volumes(this_input, volume_type, data_freq, error_log):
                 if by_well:
-                    well_data = {
-                        'well_id': str(this_input['well'].get('_id')),
-                        'group_key': key,
-                        'well_name': str(this_input['well'].get('well_name')),
-                        'well_number': this_input['well'].get('well_number'),
-                        'inpt_id': this_input['well'].get('inptID'),
-                        'chosen_id': this_input['well'].get('chosenID'),
-                        'api14': this_input['well'].get('api14'),
-                    }
-
-                    if volume_type[roll_up_type]:
-                        try:
-                            well_data['rollup_type'] = STREAM_TYPE_NAME[roll_up_type]
-                            if data_freq == 'monthly':
-                                this_well_volume = calculate_well_count(single_well_volume(this_input_updated))
-                            else:
-                                this_well_volume = calculate_well_count(single_well_volume_daily(this_input_updated))
-
-                            df_one_group = pd.DataFrame(this_well_volume)
-                            well_data_df = pd.DataFrame([well_data] * len(df_one_group))
-                            all_df = pd.concat([well_data_df, df_one_group], axis=1)
-                            df_roll_up = df_roll_up.append(all_df)
-
-                        except Exception as e:
-                            error_log.append({'well_id': this_input['well']['_id'], 'error': get_exception_info(e)})
+                    accumulator.add(this_input['well'], key, STREAM_TYPE_NAME[roll_up_type], this_well_volume)
                 else:
-                    if volume_type[roll_up_type]:
-                        try:
-                            if data_freq == 'monthly':
-                                this_well_volume = calculate_well_count(single_well_volume(this_input_updated))
-                            else:
-                                this_well_volume = calculate_well_count(single_well_volume_daily(this_input_updated))
-
-                            ret[key][roll_up_type] += [this_well_volume]
-                            if groups and is_api:
-                                ret['total'][roll_up_type] += [this_well_volume]
-                        except Exception as e:
-                            error_log.append({'well_id': this_input['well']['_id'], 'error': get_exception_info(e)})
-                            error_info = get_exception_info(e)
-                            logging.error(error_info['message'], extra={'metadata': {'error': error_info}})
-
-        if not by_well:
-            ret_by_group = {group: {t: sum_up_volume(l) for t, l in types.items()} for group, types in ret.items()}
-            df_roll_up = self.group_result_to_df(ret_by_group)
+                    accumulator.add(key, roll_up_type, this_well_volume)
+                    if groups and is_api:
+                        accumulator.add('total', roll_up_type, this_well_volume)
+
+        if by_well:
+            df_roll_up = accumulator.to_df()
+        else:
+            df_roll_up = accumulator.to_df(STREAM_TYPE_NAME)
             df_roll_up['batch_id'] = batch_index
 
         self.process_group_roll_up_df(params, df_roll_up, rollup_module, roll_up_schema)
 
         if is_api:
-            self.roll_up_api(ret_by_group, df_roll_up, rollup_module, data_freq, run_id)
+            self.roll_up_api(accumulator.group_volumes('total'), df_roll_up, rollup_module, data_freq, run_id)
         else:
             self.roll_up_cf(roll_up_schema, df_roll_up, rollup_module, data_freq, batch_index, run_id)
 
@@ -331,9 +320,7 @@ class RollUpService(object):
             timeout=180,
         )
 
-    def roll_up_api(self, ret_by_group, df_roll_up, rollup_module, data_freq, run_id):
-        data = ret_by_group['total']
-
+    def roll_up_api(self, data, df_roll_up, rollup_module, data_freq, run_id):
         for rollup_type in data:
             for key in data[rollup_type]:
                 if key == 'date':
@@ -356,22 +343,6 @@ class RollUpService(object):
 
         self.context.big_query_client.insert_rows_df(table_id, df_roll_up.drop(['batch_id'], axis=1))
 
-    def group_result_to_df(self, ret_by_group):
-        group_dict = defaultdict(list)
-
-        for group in ret_by_group:
-            for roll_up_type in ret_by_group[group]:
-                for col in ret_by_group[group][roll_up_type]:
-                    n = len(ret_by_group[group][roll_up_type][col])
-                    group_dict[col] += ret_by_group[group][roll_up_type][col]
-
-                group_dict['group_key'] += [group] * n
-                group_dict['rollup_type'] += [STREAM_TYPE_NAME[roll_up_type]] * n
-
-        df_roll_up = pd.DataFrame.from_dict(group_dict)
-
-        return df_roll_up
-
     def update_roll_up_input_for_ecl_linked_wells(self, params, roll_up_inputs, assignment_ids):
         updated_assignment_ids, _ = prepare_assignment_ids(self.context, params['scenario_id'], assignment_ids)
         combo_name = params['combos'][0]['name']
@@ -1,13 +1,11 @@
 from typing import TYPE_CHECKING
 from bson.objectid import ObjectId
 from pymongo import UpdateOne
-from combocurve.shared.constants import PHASES
 
 from combocurve.shared.db_import import bulkwrite_operation
 from combocurve.shared.date import index_from_timestamp, parse_datetime
 from combocurve.services.well_calcs.well_calc import well_calc, data_import_well_calc
 from combocurve.shared.db_import import calcs_pipeline
-from combocurve.dal.stubs import production_from_response
 
 if TYPE_CHECKING:
     from cloud_functions.well_calcs.context import WellCalcsContext
@@ -128,9 +126,9 @@ class WellCalculationsService:
         })
 
         daily_production = self._extract_by_well_dal_records(
-            self.context.dal.daily_production.fetch_by_well(wells=well_ids, field_mask=PHASES))
+            self.context.dal.daily_production.fetch_production_by_well(wells=well_ids))
         monthly_production = self._extract_by_well_dal_records(
-            self.context.dal.monthly_production.fetch_by_well(wells=well_ids, field_mask=PHASES))
+            self.context.dal.monthly_production.fetch_production_by_well(wells=well_ids))
 
         for header in headers:
             yield header, monthly_production.get(header['well'], {}), daily_production.get(header['well'], {})
@@ -166,13 +164,8 @@ class WellCalculationsService:
         return well_headers['_id'], {'headers': headers, 'production_data': production_data}
 
     @staticmethod
-    def _extract_by_well_dal_records(records):
-        total = {}
-        for well_response in records:
-            well_id = ObjectId(getattr(well_response, 'well'))
-            total[well_id] = production_from_response(well_response)
-
-        return total
+    def _extract_by_well_dal_records(production):
+        return {well_data['_id']: well_data for well_data in production}
 
     @staticmethod
     def _extract_dal_records(records):
@@ -13,6 +13,9 @@ class BigQueryClient(object):
         self.client = bigquery.Client(project_id)
         self.project_id = project_id
 
+    def close(self):
+        self.client.close()
+
     def table_path(self, dataset_id, table_name):
         return f'{self.project_id}.{dataset_id}.{table_name}'
 
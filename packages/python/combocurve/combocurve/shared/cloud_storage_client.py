@@ -4,3 +4,6 @@ from google.cloud import storage
 class CloudStorageClient(object):
     def __init__(self):
         self.client = storage.Client()
+
+    def close(self):
+        self.client.close()
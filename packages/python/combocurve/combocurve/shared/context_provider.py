@@ -1,12 +1,91 @@
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+
+# contexts of this many tenants are kept at most, unless all of them are handling requests
+MAX_CACHED_CONTEXTS = 32
+# idle contexts are evicted after this many seconds
+CONTEXT_TTL = 30 * 60
+
+
+class _CachedContext(object):
+    def __init__(self, context, now):
+        self.context = context
+        self.last_used = now
+        self.users = 0
+
+
 class ContextProvider(object):
-    def __init__(self, context_class):
+    '''
+        Caches one context per tenant, keyed by connection string.
+
+        Contexts that are not in use are evicted when they have been idle for `ttl` seconds or, least recently used
+        first, when more than `max_size` tenants are cached. Evicted contexts are closed when they have a `close`
+        method, so their channels and clients are released. Use `use_context` so a context is never evicted while a
+        request is using it.
+    '''
+    def __init__(self, context_class, max_size=MAX_CACHED_CONTEXTS, ttl=CONTEXT_TTL, clock=time.monotonic):
         self._context_class = context_class
-        self._context_cache = {}
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        self._context_cache = OrderedDict()
+        self._lock = Lock()
 
     def get_context(self, tenant_info):
+        with self._lock:
+            cached, evicted = self._get_cached(tenant_info)
+        self._close(evicted)
+        return cached.context
+
+    @contextmanager
+    def use_context(self, tenant_info):
+        with self._lock:
+            cached, evicted = self._get_cached(tenant_info)
+            cached.users += 1
+        self._close(evicted)
+        try:
+            yield cached.context
+        finally:
+            with self._lock:
+                cached.users -= 1
+                cached.last_used = self._clock()
+
+    def _get_cached(self, tenant_info):
         cache_key = tenant_info['db_connection_string']
-        context = self._context_cache.get(cache_key)
-        if context is None:
-            context = self._context_class(tenant_info)
-            self._context_cache[cache_key] = context
-        return context
+        now = self._clock()
+        cached = self._context_cache.get(cache_key)
+        if cached is None:
+            # creating a context is cheap, its services and clients are only created when first used
+            cached = _CachedContext(self._context_class(tenant_info), now)
+            self._context_cache[cache_key] = cached
+        else:
+            cached.last_used = now
+        self._context_cache.move_to_end(cache_key)
+        return cached, self._evict(now)
+
+    def _evict(self, now):
+        to_evict = []
+        excess = len(self._context_cache) - self._max_size
+        # least recently used first, the last one was just requested
+        for cache_key, cached in list(self._context_cache.items())[:-1]:
+            if cached.users:
+                continue
+            if excess > 0 or now - cached.last_used > self._ttl:
+                to_evict.append(cache_key)
+                excess -= 1
+
+        return [self._context_cache.pop(cache_key).context for cache_key in to_evict]
+
+    @staticmethod
+    def _close(contexts):
+        for context in contexts:
+            close = getattr(context, 'close', None)
+            if close is None:
+                continue
+            try:
+                close()
+            except Exception:
+                logging.warning('Error closing an evicted context', exc_info=True)
@@ -1,15 +1,18 @@
+from collections import defaultdict
+from functools import lru_cache
 from typing import Optional
-from collections.abc import Mapping, Iterable
+from collections.abc import Mapping, Iterable, Sequence
 
 import pandas as pd
 import numpy as np
 from pyproj import CRS
 from pyproj import Transformer
-from pyproj.aoi import AreaOfInterest
-from pyproj.database import query_utm_crs_info
 
 FEET_TO_METERS = 0.3048
 
+# number of cells of the padded matrices used to accumulate the surveys of a batch
+CUMSUM_CHUNK_CELLS = 1_000_000
+
 
 def _checkarrays(md, inc, azi):
     '''
@@ -304,22 +307,159 @@ def _minimum_curvature(md, inc, azi, course_length=100):
     return tvd, northing, easting, dls
 
 
-def _get_transformer(west, east, north, south, reverse=False):
+def _invalid_surveys(md, inc, azi, offsets):
+    '''
+    Mask of the surveys of a batch that don't meet the preconditions of `_checkarrays`. The surveys are the slices
+    `offsets[i]:offsets[i + 1]` of the flat md, inc, and azi arrays.
+    '''
+    lengths = np.diff(offsets)
+    survey_of_station = np.repeat(np.arange(len(lengths)), lengths)
+    invalid_station = np.isnan(md) | np.isnan(inc) | np.isnan(azi) | (inc % 360 >= 180)
+
+    # pairs of consecutive stations of the same survey
+    same_survey = survey_of_station[1:] == survey_of_station[:-1]
+    not_increasing = same_survey & ~(md[1:] > md[:-1])
+
+    invalid = np.bincount(survey_of_station, weights=invalid_station, minlength=len(lengths)) > 0
+    invalid |= np.bincount(survey_of_station[1:], weights=not_increasing, minlength=len(lengths)) > 0
+    return invalid
+
+
+def _segmented_cumsum(values, offsets):
+    '''
+    Cumulative sum of every slice `offsets[i]:offsets[i + 1]` of values.
+    The slices are padded with zeros into rows of a matrix and summed along the rows, so every sum is the same as
+    calling `np.cumsum` on its slice. The surveys are padded in order of length, in chunks of about
+    `CUMSUM_CHUNK_CELLS` cells, so a long survey doesn't pad all the others.
+    '''
+    lengths = np.diff(offsets)
+    result = np.empty(len(values))
+    order = np.argsort(lengths, kind='stable')
+
+    chunk_start = 0
+    while chunk_start < len(order):
+        max_rows = max(CUMSUM_CHUNK_CELLS // max(lengths[order[chunk_start]], 1), 1)
+        chunk = order[chunk_start:chunk_start + max_rows]
+        # the chunk is sorted by length, its last survey is the longest
+        while len(chunk) > 1 and len(chunk) * lengths[chunk[-1]] > CUMSUM_CHUNK_CELLS:
+            chunk = chunk[:len(chunk) // 2]
+        chunk_start += len(chunk)
+
+        chunk_lengths = lengths[chunk]
+        if not chunk_lengths.any():
+            continue
+        rows = np.repeat(np.arange(len(chunk)), chunk_lengths)
+        cols = np.arange(len(rows)) - np.repeat(np.cumsum(chunk_lengths) - chunk_lengths, chunk_lengths)
+        stations = np.repeat(offsets[:-1][chunk], chunk_lengths) + cols
+
+        padded = np.zeros((len(chunk), chunk_lengths.max()))
+        padded[rows, cols] = values[stations]
+        result[stations] = np.cumsum(padded, axis=1)[rows, cols]
+
+    return result
+
+
+def minimum_curvature_batch(md, inc, azi, offsets, course_length=100):
+    '''Calculate TVD using minimum curvature method for a batch of surveys.
+    The surveys are given as flat arrays of all their stations, survey i being
+    the slice offsets[i]:offsets[i + 1]. The results are the same as calling
+    `_minimum_curvature` for every survey and concatenating them.
+    Parameters
+    ----------
+    md : array_like of float
+        measured depth in m or ft of the stations of all the surveys
+    inc : array_like of float
+        well deviation in degrees of the stations of all the surveys
+    azi : array_like of float
+        well azimuth in degrees of the stations of all the surveys
+    offsets : array_like of int
+        start of every survey in the flat arrays followed by their length
+    course_length : float
+        dogleg normalisation value
+    Returns
+    -------
+    tvd : array_like of float
+        true vertical depth
+    northing : array_like of float
+    easting : array_like of float
+    dls : array_like of float
+        dog leg severity
+    Raises
+    ------
+    ValueError
+        If a survey doesn't meet the preconditions of `_checkarrays`, with the
+        error of the first of them
+    '''
+    try:
+        course_length + 0
+    except TypeError:
+        raise TypeError('course_length must be a float')
+
+    md = np.asarray(md, dtype=float)
+    inc = np.asarray(inc, dtype=float)
+    azi = np.asarray(azi, dtype=float)
+    offsets = np.asarray(offsets, dtype=int)
+
+    if not (md.shape == inc.shape == azi.shape):
+        raise ValueError('Measured Depth, Inclination, and Azimuth must be the same shape')
+
+    invalid = _invalid_surveys(md, inc, azi, offsets)
+    if invalid.any():
+        first = np.flatnonzero(invalid)[0]
+        survey = slice(offsets[first], offsets[first + 1])
+        _checkarrays(md[survey], inc[survey], azi[survey])
+
+    inc = np.deg2rad(inc % 360)
+    azi = np.deg2rad(azi % 360)
+
+    dv = np.column_stack(_direction_vector_radians(inc, azi))
+    upper, lower = dv[:-1], dv[1:]
+    dogleg = _angle_between(upper, lower)
+
+    rf = 2 * np.tan(dogleg / 2)
+    nz = dogleg != 0
+    rf[nz] /= dogleg[nz]
+    rf[~nz] = 1
+
+    md_diff = md[1:] - md[:-1]
+    halfmd = md_diff / 2
+
+    # the pair of stations ending at the first station of a survey belongs to two surveys, the first station is 0
+    starts = offsets[:-1][np.diff(offsets) > 0]
+    tvd, northing, easting, dls = np.zeros((4, len(md)))
+    northing[1:] = halfmd * (upper[:, 0] + lower[:, 0]) * rf
+    easting[1:] = halfmd * (upper[:, 1] + lower[:, 1]) * rf
+    tvd[1:] = halfmd * (upper[:, 2] + lower[:, 2]) * rf
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dls[1:] = np.rad2deg(dogleg) * (course_length / md_diff)
+    for values in (tvd, northing, easting, dls):
+        values[starts] = 0
+
+    return _segmented_cumsum(tvd, offsets), _segmented_cumsum(northing, offsets), _segmented_cumsum(
+        easting, offsets), dls
+
+
+def _utm_crs_code(long, lat):
+    '''
+    EPSG code of the WGS 84 UTM zone of a location, the first zone `query_utm_crs_info` returns for it. The zones are
+    6 degrees of longitude wide, a location on the edge of two zones is in the western one, and on the equator in the
+    northern one.
+    '''
+    if not (-180 <= long <= 180 and -80 <= lat <= 84):
+        raise ValueError(f'Location ({lat}, {long}) is outside of the UTM zones')
+
+    zone = min(max(int(np.ceil((long + 180) / 6)), 1), 60)
+    return (32600 if lat >= 0 else 32700) + zone
+
+
+@lru_cache(maxsize=None)
+def _get_transformer(utm_crs_code, reverse=False):
     '''
-    return the coordinate transformer object.
+    return the coordinate transformer object of a UTM zone, created once per zone.
     If reverse is false: Lat, Long => X, Y
     If reverse is true:  X, Y => Lat, Long
     '''
-    utm_crs_list = query_utm_crs_info(
-        datum_name='WGS84',
-        area_of_interest=AreaOfInterest(
-            west_lon_degree=west,
-            south_lat_degree=south,
-            east_lon_degree=east,
-            north_lat_degree=north,
-        ),
-    )
-    utm_crs = CRS.from_epsg(utm_crs_list[0].code)
+    utm_crs = CRS.from_epsg(utm_crs_code)
     if reverse:
         # transformer from Lat, Long to XY
         return Transformer.from_crs(utm_crs.geodetic_crs, utm_crs)
@@ -328,8 +468,42 @@ def _get_transformer(west, east, north, south, reverse=False):
         return Transformer.from_crs(utm_crs, utm_crs.geodetic_crs)
 
 
+def _deviation_locations(utm_crs_code, well_head_lat, well_head_long, deviationNS, deviationEW):
+    '''
+    Latitude and longitude of the deviations in feet from the well heads, all in the same UTM zone. The well head
+    location arrays are repeated for every deviation.
+    '''
+    well_head_EW, well_head_NS = _get_transformer(utm_crs_code, reverse=True).transform(well_head_lat, well_head_long)
+
+    abs_NS = np.asarray(deviationNS, dtype=float) * FEET_TO_METERS + well_head_NS
+    abs_EW = np.asarray(deviationEW, dtype=float) * FEET_TO_METERS + well_head_EW
+    return _get_transformer(utm_crs_code).transform(abs_EW, abs_NS)
+
+
+def _missing_idx(df: pd.DataFrame, columns):
+    return np.logical_or.reduce([pd.isna(df[col].to_numpy()) for col in columns])
+
+
+def _missing_curvature_idx(df: pd.DataFrame):
+    return _missing_idx(df, ('trueVerticalDepth', 'deviationNS', 'deviationEW'))
+
+
+def _missing_location_idx(df: pd.DataFrame):
+    return _missing_idx(df, ('latitude', 'longitude'))
+
+
+def _float_values(df: pd.DataFrame, col, idx):
+    return np.asarray(df[col].to_numpy()[idx], dtype=float)
+
+
+def _flatten(arrays):
+    offsets = np.zeros(len(arrays) + 1, dtype=int)
+    np.cumsum([len(array) for array in arrays], out=offsets[1:])
+    return (np.concatenate(arrays) if arrays else np.empty(0)), offsets
+
+
 def _add_curvature(df: pd.DataFrame):
-    missing_curvature_idx = df['trueVerticalDepth'].isna() | df['deviationNS'].isna() | df['deviationEW'].isna()
+    missing_curvature_idx = _missing_curvature_idx(df)
 
     if not missing_curvature_idx.any():
         return
@@ -347,7 +521,7 @@ def _add_curvature(df: pd.DataFrame):
 
 
 def _add_location(df: pd.DataFrame, well_head_loc: tuple[float, float]):
-    missing_location_idx = df['latitude'].isna() | df['longitude'].isna()
+    missing_location_idx = _missing_location_idx(df)
 
     if not missing_location_idx.any():
         return
@@ -355,16 +529,8 @@ def _add_location(df: pd.DataFrame, well_head_loc: tuple[float, float]):
     missing_location_df = df[missing_location_idx]
 
     well_head_lat, well_head_long = well_head_loc
-    transformer_1 = _get_transformer(well_head_long, well_head_long, well_head_lat, well_head_lat, reverse=True)
-    transformer_2 = _get_transformer(well_head_long, well_head_long, well_head_lat, well_head_lat, reverse=False)
-    well_head_EW, well_head_NS = transformer_1.transform(well_head_lat, well_head_long)
-
-    deviationNS = missing_location_df['deviationNS']
-    deviationEW = missing_location_df['deviationEW']
-    abs_NS = deviationNS * FEET_TO_METERS + well_head_NS
-    abs_EW = deviationEW * FEET_TO_METERS + well_head_EW
-    new_data = [transformer_2.transform(x, y) for x, y in zip(abs_EW, abs_NS)]
-    [lat, long] = [np.asarray(coords).transpose() for coords in zip(*new_data)]
+    lat, long = _deviation_locations(_utm_crs_code(well_head_long, well_head_lat), well_head_lat, well_head_long,
+                                     missing_location_df['deviationNS'], missing_location_df['deviationEW'])
 
     df.loc[missing_location_idx, 'latitude'] = lat
     df.loc[missing_location_idx, 'longitude'] = long
@@ -378,6 +544,74 @@ def get_missing_columns(input_data: Mapping[str, Iterable[float]], well_head_loc
     return df.to_dict('list')
 
 
+def _add_curvature_batch(dfs: Sequence[pd.DataFrame], errors: list[Optional[ValueError]]):
+    missing = [(i, idx) for i, idx in enumerate(map(_missing_curvature_idx, dfs)) if idx.any()]
+    columns = [[_float_values(dfs[i], col, idx) for i, idx in missing]
+               for col in ('measuredDepth', 'inclination', 'azimuth')]
+
+    (md, offsets), (inc, _), (azi, _) = (_flatten(arrays) for arrays in columns)
+    invalid = _invalid_surveys(md, inc, azi, offsets)
+    for k in np.flatnonzero(invalid):
+        try:
+            _checkarrays(*(arrays[k] for arrays in columns))
+        except ValueError as e:
+            errors[missing[k][0]] = e
+
+    missing = [survey for survey, is_invalid in zip(missing, invalid) if not is_invalid]
+    columns = [[array for array, is_invalid in zip(arrays, invalid) if not is_invalid] for arrays in columns]
+    (md, offsets), (inc, _), (azi, _) = (_flatten(arrays) for arrays in columns)
+    tvd, deviationNS, deviationEW, _ = minimum_curvature_batch(md, inc, azi, offsets, course_length=100)
+
+    for (i, missing_curvature_idx), start, end in zip(missing, offsets[:-1], offsets[1:]):
+        dfs[i].loc[missing_curvature_idx, 'trueVerticalDepth'] = tvd[start:end]
+        dfs[i].loc[missing_curvature_idx, 'deviationNS'] = deviationNS[start:end]
+        dfs[i].loc[missing_curvature_idx, 'deviationEW'] = deviationEW[start:end]
+
+
+def _add_location_batch(dfs: Sequence[pd.DataFrame], well_head_locs: Sequence[Optional[tuple[float, float]]],
+                        errors: list[Optional[ValueError]]):
+    by_zone = defaultdict(list)
+    for i, (df, well_head_loc) in enumerate(zip(dfs, well_head_locs)):
+        if errors[i] or not well_head_loc:
+            continue
+        missing_location_idx = _missing_location_idx(df)
+        if not missing_location_idx.any():
+            continue
+        try:
+            by_zone[_utm_crs_code(well_head_loc[1], well_head_loc[0])].append((i, missing_location_idx))
+        except ValueError as e:
+            errors[i] = e
+
+    for utm_crs_code, surveys in by_zone.items():
+        counts = [int(missing_location_idx.sum()) for _, missing_location_idx in surveys]
+        well_head_lat, well_head_long = (np.repeat([well_head_locs[i][k] for i, _ in surveys], counts) for k in (0, 1))
+        deviationNS, deviationEW = (_flatten([_float_values(dfs[i], col, idx) for i, idx in surveys])[0]
+                                    for col in ('deviationNS', 'deviationEW'))
+        lat, long = _deviation_locations(utm_crs_code, well_head_lat, well_head_long, deviationNS, deviationEW)
+
+        start = 0
+        for (i, missing_location_idx), count in zip(surveys, counts):
+            dfs[i].loc[missing_location_idx, 'latitude'] = lat[start:start + count]
+            dfs[i].loc[missing_location_idx, 'longitude'] = long[start:start + count]
+            start += count
+
+
+def get_missing_columns_batch(input_data: Sequence[Mapping[str, Iterable[float]]],
+                              well_head_locs: Sequence[Optional[tuple[float, float]]]):
+    '''
+    `get_missing_columns` of a batch of surveys. The minimum curvature of all the surveys is calculated at once, and
+    the locations of all the surveys in the same UTM zone are transformed at once.
+    Returns the data of every survey, or the ValueError `get_missing_columns` raises for it.
+    '''
+    dfs = [pd.DataFrame(data) for data in input_data]
+    errors: list[Optional[ValueError]] = [None] * len(dfs)
+
+    _add_curvature_batch(dfs, errors)
+    _add_location_batch(dfs, well_head_locs, errors)
+
+    return [(None, error) if error else (df.to_dict('list'), None) for df, error in zip(dfs, errors)]
+
+
 def is_valid_survey_data(input_data: Mapping[str, Iterable[float]]):
     df = pd.DataFrame(input_data)
 
@@ -22,6 +22,8 @@ PA_TYPE_MAP = {
 # https://stackoverflow.com/questions/59682833/
 PARQUET_ARGS = {'coerce_timestamps': 'us', 'allow_truncated_timestamps': True}
 
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
 
 def to_date(date_or_str):
     # https://cloud.google.com/bigquery/docs/reference/standard-sql/data-types?hl=zh-tw#date_type
@@ -52,9 +54,11 @@ def to_date(date_or_str):
 
 
 def build_pyarrow_schema(bq_schema, df):
+    # df can be a pandas or polars dataframe, a pyarrow table or just the list of column names
+    columns = df.column_names if isinstance(df, pa.Table) else getattr(df, 'columns', df)
     fields = []
     for item, bq_type in bq_schema.items():
-        if item in df.columns:
+        if item in columns:
             pa_type = PA_TYPE_MAP[bq_type]
             fields.append(pa.field(item, pa_type))
     schema = pa.schema(fields)
@@ -79,15 +83,75 @@ def table_to_parquet(df, pa_schema):
     return buffer.read()
 
 
-def df_to_buffer(df, pa_schema):
+def df_to_table(df, pa_schema):
     # output parquet by pandas
     f = io.BytesIO()
     df.to_parquet(f, **PARQUET_ARGS)
     f.seek(0)
     # read parquet generated by pandas
-    table = pq.read_table(f, schema=pa_schema)
+    return pq.read_table(f, schema=pa_schema)
+
+
+def df_to_buffer(df, pa_schema):
+    table = df_to_table(df, pa_schema)
     # ouput parquet generated by pa table
     buffer = io.BytesIO()
     pq.write_table(table, buffer)
     buffer.seek(0)
     return buffer
+
+
+def cast_to_schema(table, pa_schema):
+    # columns not in the schema are dropped and the ones missing from the table are filled with nulls
+    columns = [
+        table[field.name].cast(field.type) if field.name in table.column_names else pa.nulls(len(table), field.type)
+        for field in pa_schema
+    ]
+    return pa.Table.from_arrays(columns, schema=pa_schema)
+
+
+class _WrittenBytes():
+    '''
+        Sink of the parquet writer of `write_parquet_tables`, holding the bytes written until they are taken
+    '''
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def write_parquet_tables(sink, tables, pa_schema, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    '''
+        Writes the pyarrow tables to `sink` as they come, in row groups of at most `row_group_size` rows
+
+        Only the table being written is held in memory, so `tables` can be a generator building them batch by batch.
+        If writing fails nothing more is written to `sink`, in particular not the footer that would make a valid file
+        of the row groups written so far, and the caller has to discard it.
+    '''
+    written = _WrittenBytes()
+    with pq.ParquetWriter(written, pa_schema) as writer:
+        for table in tables:
+            writer.write_table(cast_to_schema(table, pa_schema), row_group_size=row_group_size)
+            sink.write(written.take())
+    # the footer, only written when the writer is closed
+    sink.write(written.take())
@@ -1,3 +1,4 @@
+from threading import Lock
 from typing import Mapping
 from enum import Enum
 from datetime import datetime, timedelta
@@ -62,11 +63,14 @@ class WeightedProgressNotifier(ProgressNotifier):
         self.weights = weights
         self._weight_progress = 0
         self._total_weight = sum(self.weights.values())
+        # partial progress is added from the threads archiving or restoring collections
+        self._lock = Lock()
 
     @property
     def progress(self):
         return self._weight_progress * 100 / self._total_weight
 
     def add_partial_progress(self, category: str, fraction: float):
-        self._weight_progress += self.weights[category] * fraction
-        self.notify(self.progress)
+        with self._lock:
+            self._weight_progress += self.weights[category] * fraction
+            self.notify(self.progress)
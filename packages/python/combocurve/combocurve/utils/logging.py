@@ -71,6 +71,15 @@ def add_to_logging_metadata(metadata):
     root_logger.addFilter(metadata_filter)
 
 
+def get_logging_metadata():
+    root_logger = logging.getLogger()
+    metadata = {}
+    for f in root_logger.filters:
+        if isinstance(f, ExtraMetadataFilter):
+            metadata.update(f.data)
+    return metadata
+
+
 def reset_logging_metadata():
     root_logger = logging.getLogger()
     metadata_filters = [f for f in root_logger.filters if isinstance(f, ExtraMetadataFilter)]
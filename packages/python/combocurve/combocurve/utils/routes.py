@@ -24,7 +24,7 @@ def complete_routing(handler=None, *, formatter=jsonify):
             return formatter(ret), 200
         except Exception as e:
             error_info = get_exception_info(e)
-            status = 400 if error_info['expected'] else 500
+            status = _get_status(e, error_info)
             return formatter({'error': error_info}), status
 
     return decorated
@@ -46,7 +46,7 @@ def complete_routing_cf(handler=None, *, formatter=jsonify):
             return formatter(ret), 200
         except Exception as e:
             error_info = get_exception_info(e)
-            status = 400 if error_info['expected'] else 500
+            status = _get_status(e, error_info)
             return formatter({'error': error_info}), status
 
     return decorated
@@ -83,7 +83,7 @@ def log_request_error(handler=None, *, request=None):
             duration = time.time() - start
 
             error_info = get_exception_info(e)
-            status = 400 if error_info['expected'] else 500
+            status = _get_status(e, error_info)
 
             log_message = error_info['message']
             log_extra = {
@@ -104,6 +104,11 @@ def log_request_error(handler=None, *, request=None):
     return decorated
 
 
+def _get_status(error, error_info):
+    # errors can also define the HTTP status to respond with, i.e: 503 when the server is busy
+    return getattr(error, 'status_code', 400 if error_info['expected'] else 500)
+
+
 def _get_request_info(status, duration, request=None):
     request_info = {
         'status': status,
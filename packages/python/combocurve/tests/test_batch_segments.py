@@ -0,0 +1,178 @@
+import pytest
+import numpy as np
+
+from combocurve.science.segment_models.batch_segments import BatchSegments
+from combocurve.science.segment_models.multiple_segments import MONTHLY_INTEGRAL_RTOL, MultipleSegments
+from combocurve.science.segment_models.shared.helper import sum_forecast_by_month
+from combocurve.shared.date import date_array_to_idx_array
+
+multi_seg = MultipleSegments()
+
+
+def _fill(name, **fields):
+    return MultipleSegments.fill_segment({'name': name, **fields}, name, [])
+
+
+def well_segments(shift=0, scale=1.0):
+    start = 43000 + shift
+    return [
+        _fill('linear', start_idx=start, end_idx=start + 30, q_start=100 * scale, q_end=900 * scale, D_eff=None),
+        _fill('arps_modified', start_idx=start + 31, end_idx=start + 2000, q_start=900 * scale, b=1.1, D_eff=0.7,
+              target_D_eff_sw=0.08),
+        _fill('empty', start_idx=start + 2001, end_idx=start + 2100),
+        _fill('arps', start_idx=start + 2101, end_idx=start + 5000, q_start=300 * scale, b=0.9, D_eff=0.4),
+        _fill('exp_dec', start_idx=start + 5001, end_idx=start + 9000, q_start=80 * scale, D_eff=0.1),
+        _fill('flat', start_idx=start + 9001, end_idx=start + 12000, q_start=20 * scale),
+    ]
+
+
+def legacy_predict(raw_t, forecast_segments, to_fill=0):
+    t = np.array(raw_t)
+    ret = np.full(t.shape, to_fill, dtype=float)
+    for seg in forecast_segments:
+        this_range = (t <= seg['end_idx']) & (t >= seg['start_idx'])
+        ret[this_range] = multi_seg.get_segment_object(seg).predict(t[this_range])
+    return ret
+
+
+def legacy_predict_monthly_volumes(raw_t, forecast_segments):
+    first_month = (np.datetime64('1900-01-01') + int(raw_t[0])).astype('datetime64[M]')
+    last_month = (np.datetime64('1900-01-01') + int(raw_t[-1])).astype('datetime64[M]')
+    t = np.arange(first_month.astype('datetime64[D]'), (last_month + 1).astype('datetime64[D]'))
+    t = (t - np.datetime64('1900-01-01')).astype(int)
+    monthly_volumes, forecast_month = sum_forecast_by_month(legacy_predict(t, forecast_segments), t)
+    return monthly_volumes[np.isin(date_array_to_idx_array(forecast_month, 'monthly'), raw_t)]
+
+
+MODEL_SEGMENTS = {
+    'empty': _fill('empty', start_idx=43000, end_idx=50000),
+    'flat': _fill('flat', start_idx=43000, end_idx=50000, q_start=10),
+    'linear': _fill('linear', start_idx=43000, end_idx=50000, q_start=10, q_end=500, D_eff=None),
+    'exp_inc': _fill('exp_inc', start_idx=43000, end_idx=50000, q_start=10, D_eff=-0.3),
+    'exp_dec': _fill('exp_dec', start_idx=43000, end_idx=50000, q_start=1000, D_eff=0.9),
+    'arps': _fill('arps', start_idx=43000.3, end_idx=50000, q_start=1000, b=2, D_eff=0.95),
+    'arps_harmonic': _fill('arps', start_idx=43000, end_idx=50000, q_start=1000, b=1, D_eff=0.8),
+    'arps_inc': _fill('arps_inc', start_idx=43000, end_idx=50000, q_start=10, b=-0.5, D_eff=-0.4),
+    'arps_modified': _fill('arps_modified', start_idx=43000, end_idx=50000, q_start=1000, b=2, D_eff=0.95,
+                           target_D_eff_sw=0.06),
+}
+
+
+def monthly_idx(start_idx, n_months):
+    month = (np.datetime64('1900-01-01') + start_idx).astype('datetime64[M]')
+    return date_array_to_idx_array(np.arange(month, month + n_months).astype('datetime64[D]'), 'monthly')
+
+
+@pytest.mark.unittest
+def test_predict_matches_per_segment_evaluation():
+    segments = well_segments()
+    t = np.arange(42990, 55100)
+
+    assert np.array_equal(multi_seg.predict(t, segments), legacy_predict(t, segments))
+    assert np.array_equal(multi_seg.predict(t, segments, to_fill=None), legacy_predict(t, segments, to_fill=None),
+                          equal_nan=True)
+    assert multi_seg.predict(43500, segments) == legacy_predict(43500, segments)
+
+
+@pytest.mark.unittest
+def test_predict_all_wells_in_one_pass():
+    wells = [well_segments(shift, scale) for shift, scale in [(0, 1), (17, 2.5), (400, 0.3)]] + [[]]
+    batch = BatchSegments.from_segments(wells)
+    t_per_well = [np.arange(43000, 50000, 7), np.arange(43010, 56000, 3), np.arange(42000, 43500), [43100, 43200]]
+
+    for pred, t, segments in zip(batch.predict(t_per_well), t_per_well, wells):
+        assert np.array_equal(pred, legacy_predict(t, segments))
+
+    shared = np.arange(42990, 55100)
+    expected = np.stack([legacy_predict(shared, segments) for segments in wells])
+    assert np.array_equal(batch.predict_shared(shared), expected)
+
+
+@pytest.mark.unittest
+def test_predict_time_ratio_uses_base_segments():
+    ratio = [_fill('flat', start_idx=43000, end_idx=46000, q_start=2.5)]
+    base = well_segments()
+    t = np.arange(42990, 47000)
+
+    expected = legacy_predict(t, ratio) * legacy_predict(t, base)
+    assert np.array_equal(multi_seg.predict_time_ratio(t, ratio, base), expected)
+
+
+def daily_monthly_volumes(raw_t, forecast_segments):
+    # sums of the daily volumes of each month, without the cumsum of sum_forecast_by_month that loses the digits of
+    # small volumes
+    first_month = (np.datetime64('1900-01-01') + int(raw_t[0])).astype('datetime64[M]')
+    last_month = (np.datetime64('1900-01-01') + int(raw_t[-1])).astype('datetime64[M]')
+    months = np.arange(first_month, last_month + 1).astype('datetime64[D]')
+    month_start = (months - np.datetime64('1900-01-01')).astype(int)
+    t = np.arange(month_start[0], ((last_month + 1).astype('datetime64[D]') - np.datetime64('1900-01-01')).astype(int))
+    monthly_volumes = np.add.reduceat(legacy_predict(t, forecast_segments), month_start - month_start[0])
+    return monthly_volumes[np.isin(date_array_to_idx_array(months, 'monthly'), raw_t)]
+
+
+@pytest.mark.unittest
+def test_predict_monthly_volumes_matches_daily_sum():
+    wells = [well_segments(shift, scale) for shift, scale in [(0, 1), (45, 3)]]
+    raw_t_per_well = [monthly_idx(42980, 420), monthly_idx(43200, 24)[::2]]
+    batch = BatchSegments.from_segments(wells)
+
+    for batch_pred, raw_t, segments in zip(batch.predict_monthly_volumes(raw_t_per_well), raw_t_per_well, wells):
+        expected = daily_monthly_volumes(raw_t, segments)
+        pred = multi_seg.predict_monthly_volumes(raw_t, segments)
+        assert batch_pred.shape == pred.shape == expected.shape
+        assert np.allclose(batch_pred, legacy_predict_monthly_volumes(raw_t, segments), rtol=1e-12, atol=1e-9)
+        assert np.allclose(pred, expected, rtol=MONTHLY_INTEGRAL_RTOL, atol=0)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('model', MODEL_SEGMENTS)
+def test_monthly_integral_of_each_model(model):
+    raw_t = monthly_idx(42980, 240)
+
+    expected = daily_monthly_volumes(raw_t, [MODEL_SEGMENTS[model]])
+    pred = multi_seg.predict_monthly_volumes(raw_t, [MODEL_SEGMENTS[model]])
+    assert np.allclose(pred, expected, rtol=MONTHLY_INTEGRAL_RTOL, atol=0)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('q_start', [0.02, 1000])
+@pytest.mark.parametrize('b, D_eff, target_D_eff_sw', [(0.15, 0.7, 0.16), (1.2, 0.4, 0.2), (2.4, 0.82, 0.82),
+                                                       (0.95, 0.987, 0.91)])
+def test_monthly_integral_of_arps_modified_with_switch_mid_month(q_start, b, D_eff, target_D_eff_sw):
+    def fill(start_idx):
+        return _fill('arps_modified', start_idx=start_idx, end_idx=61000, q_start=q_start, b=b, D_eff=D_eff,
+                     target_D_eff_sw=target_D_eff_sw)
+
+    def switch_day(segment):
+        return (np.datetime64('1900-01-01') + int(segment['sw_idx'])).astype(object).day
+
+    # the switch does not depend on start_idx, move the segment so it switches on the 15th
+    segment = fill(43000.5 + 15 - switch_day(fill(43000.5)))
+    raw_t = monthly_idx(42980, 600)
+    assert segment['sw_idx'] < 61000 and switch_day(segment) == 15
+
+    expected = daily_monthly_volumes(raw_t, [segment])
+    assert np.allclose(multi_seg.predict_monthly_volumes(raw_t, [segment]), expected, rtol=MONTHLY_INTEGRAL_RTOL,
+                       atol=0)
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+def test_performance_of_batch_predict_monthly_volumes(benchmark):
+    wells = [well_segments(shift % 300, 1 + shift / 1000) for shift in range(2000)]
+    raw_t_per_well = [monthly_idx(42980, 600)] * len(wells)
+
+    benchmark(lambda: BatchSegments.from_segments(wells).predict_monthly_volumes(raw_t_per_well))
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('predict_monthly_volumes', [legacy_predict_monthly_volumes, multi_seg.predict_monthly_volumes],
+                         ids=['baseline', 'closed_form'])
+@pytest.mark.parametrize('n_months', [12, 600])
+@pytest.mark.parametrize('model', MODEL_SEGMENTS)
+def test_performance_of_predict_monthly_volumes(benchmark, predict_monthly_volumes, n_months, model):
+    segments = [MODEL_SEGMENTS[model]]
+    raw_t = monthly_idx(42980, n_months)
+
+    benchmark(predict_monthly_volumes, raw_t, segments)
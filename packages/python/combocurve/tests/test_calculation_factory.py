@@ -0,0 +1,157 @@
+import datetime
+import os
+import pickle
+from queue import Queue
+
+import numpy as np
+import pytest
+
+from combocurve.science.econ.econ_calculations.calculation import EconCalculation
+from combocurve.science.econ.econ_calculations.factory import (
+    CALCULATIONS,
+    CalculationFactory,
+    CalculationInputFactory,
+    calculation_function_on_queue,
+    compile_calculation,
+    compile_plan,
+)
+from combocurve.science.econ.econ_calculations.well_result import WellResult
+from combocurve.science.econ.econ_input.well_input import WellInput
+from combocurve.science.econ.well import Well
+
+WELL_INPUT_PICKLES = os.path.join(os.path.dirname(__file__), '..', 'combocurve', 'science', 'econ', 'performance_test',
+                                  'well_input_pickles')
+
+
+class CountedVolume(EconCalculation):
+    REUSABLE = True
+    calls = 0
+
+    def __init__(self, date_dict, volume_model):
+        self.date_dict = date_dict
+        self.volume_model = volume_model
+
+    def result(self, unecon_bool):
+        CountedVolume.calls += 1
+        return {'volume': np.zeros(3) if unecon_bool else np.array(self.volume_model['rows'])}
+
+
+class CountedCashflow(EconCalculation):
+    calls = 0
+
+    def __init__(self, date_dict, ownership_model):
+        self.date_dict = date_dict
+        self.ownership_model = ownership_model
+
+    def result(self, volume):
+        CountedCashflow.calls += 1
+        return {'cashflow': volume * self.ownership_model['wi']}
+
+
+@pytest.fixture
+def simple_econ():
+    CountedVolume.calls = 0
+    CountedCashflow.calls = 0
+    q = Queue()
+    q.put(CountedVolume)
+    q.put(CountedCashflow)
+    return calculation_function_on_queue(q, WellResult, reuse_stages=True)
+
+
+@pytest.fixture
+def well_input():
+    return {
+        'date_dict': {
+            'cf_start_date': datetime.date(2022, 1, 1),
+            'cut_off_date': datetime.date(2030, 1, 1)
+        },
+        'volume_model': {
+            'rows': [10., 20., 30.]
+        },
+        'ownership_model': {
+            'wi': 1.
+        },
+    }
+
+
+@pytest.mark.unittest
+def test_reusable_calculation_runs_once_for_unchanged_inputs(simple_econ, well_input):
+    first = simple_econ(well_input, {})
+    second = simple_econ({**well_input, 'ownership_model': {'wi': .5}}, {})
+
+    assert CountedVolume.calls == 1
+    assert CountedCashflow.calls == 2
+    np.testing.assert_array_equal(first['cashflow'], [10., 20., 30.])
+    np.testing.assert_array_equal(second['cashflow'], [5., 10., 15.])
+
+
+@pytest.mark.unittest
+def test_reusable_calculation_reruns_when_inputs_change(simple_econ, well_input):
+    simple_econ(well_input, {})
+
+    # in place update, as done by WellInput.ecl_capex_update_date_dict
+    well_input['date_dict']['cut_off_date'] = datetime.date(2025, 1, 1)
+    simple_econ(well_input, {})
+    assert CountedVolume.calls == 2
+
+    result = simple_econ({**well_input, 'volume_model': {'rows': [1., 2., 3.]}}, {})
+    assert CountedVolume.calls == 3
+    np.testing.assert_array_equal(result['cashflow'], [1., 2., 3.])
+
+
+@pytest.mark.unittest
+def test_calculations_are_not_reused_by_default(well_input):
+    CountedVolume.calls = 0
+    q = Queue()
+    q.put(CountedVolume)
+    simple_econ = calculation_function_on_queue(q, WellResult)
+
+    simple_econ(well_input, {})
+    simple_econ(well_input, {})
+    assert CountedVolume.calls == 2
+
+
+@pytest.mark.unittest
+def test_plan_is_compiled_once_per_queue():
+    queue = CalculationFactory(CALCULATIONS).econ_calculation_queue(is_fiscal_month=False, income_tax='yes')
+    plan = compile_plan(tuple(queue.queue))
+
+    assert plan is compile_plan(tuple(queue.queue))
+    assert [step.calculation_class for step in plan] == list(queue.queue)
+    assert plan[0] is compile_calculation(CALCULATIONS['WellheadMonthly'])
+
+
+@pytest.mark.unittest
+def test_compiled_params_match_signatures(well_input):
+    step = compile_calculation(CountedCashflow)
+    factory = CalculationInputFactory(well_input, {'unecon_bool': True}, {'flag': True})
+
+    assert [name for name, _ in step.input_params] == ['date_dict', 'ownership_model']
+    assert [name for name, _ in step.result_params] == ['volume']
+    assert not step.takes_feature_flags
+    assert factory.params_from_input(CountedCashflow) == {
+        'date_dict': well_input['date_dict'],
+        'ownership_model': well_input['ownership_model'],
+    }
+    assert factory.params_from_result(CountedVolume) == {'unecon_bool': True}
+    with pytest.raises(KeyError):
+        factory.params_from_result(CountedCashflow)
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('pickle_name', ['extra_756', 'extra_760', 'ownandrev_264'])
+def test_performance_of_calculation_params(benchmark, pickle_name):
+    with open(os.path.join(WELL_INPUT_PICKLES, f'{pickle_name}.pkl'), 'rb') as f:
+        well = Well(WellInput(pickle.load(f)), is_fiscal_month=False)
+    well.well_result_dict()
+    queue = CalculationFactory(CALCULATIONS).econ_calculation_queue(False, well.well_input.tax_option)
+    plan = compile_plan(tuple(queue.queue))
+    calculation_input_factory = CalculationInputFactory(well.well_input, well.well_result)
+
+    def all_params():
+        for step in plan:
+            calculation_input_factory.input_kwargs(step)
+            calculation_input_factory.result_kwargs(step)
+
+    benchmark(all_params)
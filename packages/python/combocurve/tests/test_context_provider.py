@@ -0,0 +1,94 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from combocurve.shared.context_provider import ContextProvider
+
+
+class FakeContext:
+    def __init__(self, tenant_info):
+        self.tenant_info = tenant_info
+        self.close = MagicMock()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def tenant(name):
+    return {'db_connection_string': f'mongodb://{name}', 'db_name': name}
+
+
+@pytest.mark.unittest
+def test_contexts_are_cached_per_tenant():
+    provider = ContextProvider(FakeContext)
+
+    context = provider.get_context(tenant('a'))
+
+    assert provider.get_context(tenant('a')) is context
+    assert provider.get_context(tenant('b')) is not context
+    with provider.use_context(tenant('a')) as used_context:
+        assert used_context is context
+
+
+@pytest.mark.unittest
+def test_least_recently_used_contexts_are_evicted_and_closed():
+    provider = ContextProvider(FakeContext, max_size=2)
+    a = provider.get_context(tenant('a'))
+    b = provider.get_context(tenant('b'))
+    provider.get_context(tenant('a'))
+
+    provider.get_context(tenant('c'))
+
+    b.close.assert_called_once()
+    a.close.assert_not_called()
+    assert provider.get_context(tenant('a')) is a
+    assert provider.get_context(tenant('b')) is not b
+
+
+@pytest.mark.unittest
+def test_idle_contexts_are_evicted_after_the_ttl():
+    clock = FakeClock()
+    provider = ContextProvider(FakeContext, ttl=60, clock=clock)
+    a = provider.get_context(tenant('a'))
+    clock.now = 50
+    b = provider.get_context(tenant('b'))
+
+    clock.now = 100
+    provider.get_context(tenant('c'))
+
+    a.close.assert_called_once()
+    b.close.assert_not_called()
+    assert provider.get_context(tenant('b')) is b
+
+
+@pytest.mark.unittest
+def test_contexts_in_use_are_not_evicted():
+    clock = FakeClock()
+    provider = ContextProvider(FakeContext, max_size=1, ttl=60, clock=clock)
+
+    with provider.use_context(tenant('a')) as a:
+        clock.now = 100
+        b = provider.get_context(tenant('b'))
+        a.close.assert_not_called()
+        assert provider.get_context(tenant('a')) is a
+    # idle since the request ended, evicted once the cache is used again
+    provider.get_context(tenant('c'))
+
+    a.close.assert_called_once()
+    b.close.assert_called_once()
+
+
+@pytest.mark.unittest
+def test_errors_closing_contexts_are_not_raised():
+    provider = ContextProvider(FakeContext, max_size=1)
+    a = provider.get_context(tenant('a'))
+    a.close.side_effect = RuntimeError('channel already closed')
+
+    b = provider.get_context(tenant('b'))
+
+    assert provider.get_context(tenant('b')) is b
@@ -0,0 +1,81 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from combocurve.dal.stubs import MonthlyProduction, production_by_well, production_from_response
+from combocurve.dal.types import to_index_from_timestamp, to_timestamp_from_index
+from combocurve.dal.v1.monthly_production_pb2 import MonthlyProductionServiceFetchByWellResponse
+
+WELL_1 = str(ObjectId())
+WELL_2 = str(ObjectId())
+
+
+def _response(well, index, **fields):
+    return MonthlyProductionServiceFetchByWellResponse(well=well,
+                                                       date=[to_timestamp_from_index(i) for i in index],
+                                                       **fields)
+
+
+@pytest.mark.unittest
+def test_production_from_response_decodes_arrays():
+    # indexes before 1970 have negative timestamps
+    index = [20000, 25567, 25568, 44000]
+    response = _response(WELL_1, index, oil=[1., 2., np.nan, 4.], gas=[5., 6., 7., 8.])
+
+    well_data = production_from_response(response, ['oil', 'gas', 'water'])
+
+    assert well_data['_id'] == ObjectId(WELL_1)
+    assert well_data['index'].dtype == np.int32
+    assert well_data['index'].tolist() == [to_index_from_timestamp(date) for date in response.date] == index
+    assert well_data['oil'].dtype == np.float64
+    np.testing.assert_array_equal(well_data['oil'], [1., 2., np.nan, 4.])
+    np.testing.assert_array_equal(well_data['gas'], [5., 6., 7., 8.])
+    # not in the response
+    assert np.isnan(well_data['water']).all() and len(well_data['water']) == 4
+
+
+@pytest.mark.unittest
+def test_production_by_well_joins_split_wells():
+    responses = [
+        _response(WELL_1, [43000, 43031], oil=[1., 2.], gas=[3., 4.]),
+        _response(WELL_1, [43059], oil=[5.], gas=[6.]),
+        _response(WELL_2, [], oil=[], gas=[]),
+    ]
+
+    well_1, well_2 = production_by_well(iter(responses), ['oil', 'gas'])
+
+    assert well_1['_id'] == ObjectId(WELL_1)
+    assert well_1['index'].tolist() == [43000, 43031, 43059]
+    assert well_1['oil'].tolist() == [1., 2., 5.]
+    assert well_1['gas'].tolist() == [3., 4., 6.]
+    assert well_2['_id'] == ObjectId(WELL_2)
+    assert well_2['index'].dtype == np.int32 and len(well_2['index']) == 0
+    assert len(well_2['oil']) == 0
+
+
+@pytest.mark.unittest
+def test_fetch_production_by_well_masks_fields(mocker):
+    mocker.patch('combocurve.dal.stubs.MonthlyProductionServiceStub')
+    monthly_production = MonthlyProduction(MagicMock())
+    fetch_by_well = monthly_production.monthly_production_stub.FetchByWell
+    fetch_by_well.return_value = iter([_response(WELL_1, [43000], oil=[1.])])
+
+    production = list(monthly_production.fetch_production_by_well(wells=[WELL_1], fields=['oil']))
+
+    request = fetch_by_well.call_args.args[0]
+    assert list(request.field_mask.paths) == ['well', 'date', 'oil']
+    assert list(request.wells) == [WELL_1]
+    assert not request.HasField('date_range')
+    assert production[0]['oil'].tolist() == [1.]
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+def test_performance_of_production_by_well(benchmark):
+    index = np.arange(30000, 50000, 30)
+    values = np.random.default_rng(0).random(len(index)).tolist()
+    responses = [_response(str(ObjectId()), index, oil=values, gas=values, water=values) for _ in range(200)]
+
+    benchmark(lambda: list(production_by_well(responses)))
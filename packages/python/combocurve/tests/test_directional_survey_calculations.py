@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+from pyproj.aoi import AreaOfInterest
+from pyproj.database import query_utm_crs_info
+
+from combocurve.shared.directional_survey_calculations import (_get_transformer, _minimum_curvature, _utm_crs_code,
+                                                               get_missing_columns, get_missing_columns_batch,
+                                                               minimum_curvature_batch)
+
+SURFACE_LOCATIONS = [(31.95, -102.18), (32.02, -96.0), (47.8, -103.3), None]
+
+
+def survey_data(rng, n_stations, missing_curvature=True, missing_location=True):
+    md = np.cumsum(rng.uniform(10, 100, n_stations))
+    inc = np.minimum(np.cumsum(rng.uniform(0, 3, n_stations)), 95)
+    azi = rng.uniform(0, 360) + np.cumsum(rng.uniform(-2, 2, n_stations))
+
+    data = {
+        'measuredDepth': md.tolist(),
+        'inclination': inc.tolist(),
+        'azimuth': azi.tolist(),
+        'trueVerticalDepth': [None] * n_stations,
+        'deviationNS': [None] * n_stations,
+        'deviationEW': [None] * n_stations,
+        'latitude': [None] * n_stations,
+        'longitude': [None] * n_stations,
+    }
+
+    if not missing_curvature:
+        tvd, deviationNS, deviationEW, _ = _minimum_curvature(md, inc, azi)
+        data.update(trueVerticalDepth=tvd.tolist(), deviationNS=deviationNS.tolist(),
+                    deviationEW=deviationEW.tolist())
+    elif n_stations > 4:
+        # some stations have part of the curvature, only the rest of them are calculated
+        data['trueVerticalDepth'][1:3] = [1.0, 2.0]
+        data['deviationNS'][1:3] = [3.0, 4.0]
+        data['deviationEW'][1:3] = [5.0, 6.0]
+
+    if not missing_location:
+        data.update(latitude=[32.0] * n_stations, longitude=[-101.0] * n_stations)
+
+    return data
+
+
+def surveys(n_surveys, seed=0):
+    rng = np.random.default_rng(seed)
+    input_data = [
+        survey_data(rng, int(rng.integers(1, 300)), missing_curvature=i % 5 != 1, missing_location=i % 7 != 2)
+        for i in range(n_surveys)
+    ]
+    well_head_locs = [SURFACE_LOCATIONS[i % len(SURFACE_LOCATIONS)] for i in range(n_surveys)]
+    return input_data, well_head_locs
+
+
+def get_missing_columns_one_by_one(input_data, well_head_locs):
+    results = []
+    for data, well_head_loc in zip(input_data, well_head_locs):
+        try:
+            results.append((get_missing_columns(data, well_head_loc), None))
+        except ValueError as e:
+            results.append((None, e))
+    return results
+
+
+@pytest.mark.unittest
+def test_minimum_curvature_batch_matches_every_survey():
+    rng = np.random.default_rng(1)
+    input_data = [survey_data(rng, n) for n in (1, 2, 250, 40, 3)]
+    md, inc, azi = (np.concatenate([data[col] for data in input_data])
+                    for col in ('measuredDepth', 'inclination', 'azimuth'))
+    offsets = np.cumsum([0] + [len(data['measuredDepth']) for data in input_data])
+
+    batch = minimum_curvature_batch(md, inc, azi, offsets)
+
+    for data, start, end in zip(input_data, offsets[:-1], offsets[1:]):
+        one_survey = _minimum_curvature(data['measuredDepth'], data['inclination'], data['azimuth'])
+        for batch_values, values in zip(batch, one_survey):
+            np.testing.assert_array_equal(batch_values[start:end], values)
+
+
+@pytest.mark.unittest
+def test_minimum_curvature_batch_raises_the_error_of_the_first_invalid_survey():
+    md = [0, 100, 200, 0, 100, 100, 0, np.nan]
+    inc = [0, 10, 20, 0, 10, 20, 0, 10]
+    azi = [0] * 8
+
+    with pytest.raises(ValueError, match='Measured Depth must have strictly increasing values'):
+        minimum_curvature_batch(md, inc, azi, [0, 3, 6, 8])
+
+
+@pytest.mark.unittest
+def test_get_missing_columns_batch_matches_every_survey():
+    input_data, well_head_locs = surveys(60)
+    # invalid surveys keep their error without stopping the batch
+    input_data[3]['measuredDepth'][5] = input_data[3]['measuredDepth'][4]
+    input_data[8]['inclination'][0] = 200
+    input_data[12]['azimuth'][-1] = None
+
+    batch = get_missing_columns_batch(input_data, well_head_locs)
+    one_by_one = get_missing_columns_one_by_one(input_data, well_head_locs)
+
+    assert [str(error) for _, error in batch] == [str(error) for _, error in one_by_one]
+    assert sum(error is not None for _, error in batch) == 3
+    assert [data for data, _ in batch] == [data for data, _ in one_by_one]
+
+
+@pytest.mark.unittest
+def test_array_transforms_match_the_transform_of_every_point():
+    transformer = _get_transformer(_utm_crs_code(-102.18, 31.95))
+    x = np.linspace(700_000, 710_000, 50)
+    y = np.linspace(3_530_000, 3_540_000, 50)
+
+    lat, long = transformer.transform(x, y)
+
+    points = [transformer.transform(point_x, point_y) for point_x, point_y in zip(x, y)]
+    np.testing.assert_array_equal(lat, [point_lat for point_lat, _ in points])
+    np.testing.assert_array_equal(long, [point_long for _, point_long in points])
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('lat, long', [(31.95, -102.18), (32.02, -96.0), (-12.5, -77.1), (0, 0), (60, 5),
+                                       (10, -180), (10, 180)])
+def test_utm_crs_code_is_the_first_zone_of_the_location(lat, long):
+    utm_crs_list = query_utm_crs_info(datum_name='WGS84',
+                                      area_of_interest=AreaOfInterest(west_lon_degree=long,
+                                                                      south_lat_degree=lat,
+                                                                      east_lon_degree=long,
+                                                                      north_lat_degree=lat))
+
+    assert str(_utm_crs_code(long, lat)) == utm_crs_list[0].code
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('batch', [False, True])
+def test_performance_of_get_missing_columns(benchmark, batch):
+    input_data, well_head_locs = surveys(5000)
+
+    if batch:
+        benchmark.pedantic(get_missing_columns_batch, args=(input_data, well_head_locs), rounds=1)
+    else:
+        benchmark.pedantic(get_missing_columns_one_by_one, args=(input_data, well_head_locs), rounds=1)
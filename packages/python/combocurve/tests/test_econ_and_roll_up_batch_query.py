@@ -1,3 +1,13 @@
+import datetime
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from combocurve.services.econ.econ_and_roll_up_batch_query import _batch_get_production
+
+PATH_TO_MODULE = "combocurve.services.econ.econ_and_roll_up_batch_query."
+
 # import mongomock
 # import pytest
 
@@ -111,3 +121,69 @@
 # def test_econ_batch_input_3(context, scenario_id, assignment_ids, assumption_keys, combos, ghg_id, project_id, out):
 #     econ_inputs = econ_batch_input(context, scenario_id, assignment_ids, assumption_keys, combos, ghg_id, project_id)
 #     assert out == econ_inputs
+
+
+def legacy_fill_monthly_gaps(index, value):
+    start_month = (np.datetime64('1900-01-01') + index[0]).astype('datetime64[M]')
+    end_month = (np.datetime64('1900-01-01') + index[-1]).astype('datetime64[M]')
+    monthly_dates = np.arange(start_month, end_month + 1).astype(datetime.datetime)
+    month_index = [(date.replace(day=15) - datetime.date(1900, 1, 1)).days for date in monthly_dates]
+    index = set(index)
+    value = list(value)
+    return month_index, [value.pop(0) if i in index else 0 for i in month_index]
+
+
+def monthly_history(n_years, skip_every=7, seed=0):
+    months = np.arange(np.datetime64('1960-01'), np.datetime64('1960-01') + 12 * n_years)
+    months = months[np.arange(len(months)) % skip_every != 3]
+    index = (months.astype('datetime64[D]') + 14 - np.datetime64('1900-01-01')).astype(int)
+    return index, np.random.default_rng(seed).uniform(0, 1000, len(index))
+
+
+def mock_production(mocker, monthly, daily):
+    def get_production(production_service_stub, well_ids, phases):
+        by_freq = monthly if production_service_stub == 'monthly' else daily
+        return {well_id: by_freq[well_id] for well_id in well_ids if well_id in by_freq}
+
+    mocker.patch(PATH_TO_MODULE + 'get_production_data_from_dal', side_effect=get_production)
+    context = mocker.MagicMock()
+    context.dal.monthly_production = 'monthly'
+    context.dal.daily_production = 'daily'
+    return context
+
+
+@pytest.mark.unittest
+def test_batch_get_production_fills_gaps(mocker):
+    wells = [ObjectId() for _ in range(3)]
+    monthly_index, monthly_value = monthly_history(60)
+    daily_index = np.array([44000, 44001, 44005, 44010])
+    context = mock_production(
+        mocker,
+        monthly={wells[0]: {'index': list(monthly_index), 'oil': list(monthly_value), 'gas': [], 'water': []}},
+        daily={wells[1]: {'index': list(daily_index), 'oil': [1., 2., 3., 4.], 'gas': [], 'water': []}},
+    )
+
+    production = _batch_get_production(context, wells, [None] * 3, ['oil'], ['monthly', 'daily', 'monthly'])
+
+    expected_index, expected_value = legacy_fill_monthly_gaps(monthly_index, monthly_value)
+    np.testing.assert_array_equal(production[0]['oil']['index'], expected_index)
+    np.testing.assert_array_equal(production[0]['oil']['value'], expected_value)
+    assert production[0]['oil']['data_freq'] == 'monthly'
+    np.testing.assert_array_equal(production[1]['oil']['index'], np.arange(44000, 44011))
+    np.testing.assert_array_equal(production[1]['oil']['value'], [1, 2, 0, 0, 0, 3, 0, 0, 0, 0, 4])
+    assert production[2] == {'oil': None}
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+def test_performance_of_batch_get_production(benchmark, mocker):
+    wells = [ObjectId() for _ in range(500)]
+    monthly = {}
+    for seed, well in enumerate(wells):
+        index, value = monthly_history(55, seed=seed)
+        monthly[well] = {phase: list(value) for phase in ['oil', 'gas', 'water']}
+        monthly[well]['index'] = list(index)
+    context = mock_production(mocker, monthly=monthly, daily={})
+
+    benchmark(lambda: _batch_get_production(context, wells, [None] * len(wells), ['oil', 'gas', 'water'],
+                                            ['monthly'] * len(wells)))
@@ -0,0 +1,255 @@
+import datetime
+import gc
+import io
+import pathlib
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import requests
+
+from combocurve.services.econ.econ_output_service import EconOutputService, build_monthly_table, get_schema
+from combocurve.services.econ.econ_big_query_schema import MONTHLY_SCHEMA
+from combocurve.shared.parquet_types import build_pyarrow_schema, write_parquet_tables
+
+PATH_TO_MODULE = "combocurve.services.econ.econ_output_service."
+SESSION_URL = 'https://storage.googleapis.com/upload/storage/v1/b/batch/o?uploadType=resumable&upload_id=session'
+
+RUN_DATA = {'run_id': 'run', 'run_date': datetime.datetime(2023, 1, 5, 10, 30)}
+RESERVES_CATEGORY = {
+    'econ_prms_resources_class': 'reserves',
+    'econ_prms_reserves_category': 'proved',
+    'econ_prms_reserves_sub_category': 'producing',
+}
+
+
+def _output(well_index, n_months=0, error=None):
+    output = {
+        'well': {
+            '_id': f'well{well_index}'
+        },
+        'well_index': well_index,
+        'incremental_name': '',
+        'incremental_index': 0,
+        'reserves_category': RESERVES_CATEGORY,
+        'warning': None,
+        'all_one_liner': {},
+    }
+    if error:
+        output['error'] = {'message': error, 'expected': True}
+        return output
+    dates = np.arange(np.datetime64('2023-01'), np.datetime64('2023-01') + n_months).astype('datetime64[D]')
+    output['all_flat_output'] = {
+        'date': list(dates.astype(str)),
+        'gross_oil_well_head_volume': [100. * well_index + month for month in range(n_months)],
+        'gross_gas_well_head_volume': list(np.full(n_months, 0.1234567891)),
+        'reversion_date': ['2024-01-01'] * n_months,
+        'econ_first_production_date': [datetime.date(2022, 12, 1)] * n_months,
+    }
+    return output
+
+
+class FakeResumableUploads():
+    '''
+        Stand-in for the resumable upload sessions of cloud storage, in place of `requests`. Each chunk sent persists
+        at most `persisted_per_chunk` of its bytes, and a session is only committed by its last chunk, the one with the
+        total size
+    '''
+    def __init__(self, persisted_per_chunk=None):
+        self.persisted_per_chunk = persisted_per_chunk
+        self.sent = {}
+        self.committed = {}
+        self.cancelled = []
+
+    def put(self, url, data, headers, timeout):
+        sent = self.sent.setdefault(url, b'')
+        chunk_range, total = headers['Content-Range'].split(' ')[1].split('/')
+        if chunk_range != '*':
+            first, last = (int(index) for index in chunk_range.split('-'))
+            assert first == len(sent) and last - first + 1 == len(data)
+        if total == '*':
+            data = data[:self.persisted_per_chunk]
+        self.sent[url] = sent = sent + data
+        if total != '*' and len(sent) == int(total):
+            self.commit(url, sent)
+            return _response(200)
+        return _response(308, {'Range': f'bytes=0-{len(sent) - 1}'} if sent else {})
+
+    def delete(self, url, timeout):
+        self.cancelled.append(url)
+        return _response(499)
+
+    def commit(self, url, data):
+        self.committed[url] = data
+
+
+class LocalResumableUploads(FakeResumableUploads):
+    '''
+        Commits the sessions to the local files of their url
+    '''
+    def commit(self, url, data):
+        super().commit(url, data)
+        pathlib.Path(url).write_bytes(data)
+
+
+def _response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+class LocalBlob():
+    def __init__(self, path):
+        self.path = path
+
+    def create_resumable_upload_session(self, **kwargs):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return str(self.path)
+
+
+class LocalStorageClient():
+    '''
+        Stand-in for the cloud storage client that keeps each bucket in a local directory
+    '''
+    def __init__(self, root):
+        self.root = root
+
+    def bucket(self, bucket_name):
+        bucket = MagicMock()
+        bucket.blob.side_effect = lambda file_name: LocalBlob(self.root / bucket_name / file_name)
+        return bucket
+
+
+@pytest.fixture
+def resumable_uploads(mocker):
+    # half of each chunk is sent again, as when the session doesn't persist all of it
+    return mocker.patch(PATH_TO_MODULE + 'requests', FakeResumableUploads(persisted_per_chunk=128 * 1024))
+
+
+@pytest.fixture
+def resumable_upload_context():
+    context = MagicMock()
+    context.tenant_info = {'batch_storage_bucket': 'batch'}
+    blob = context.cloud_storage_client.client.bucket.return_value.blob.return_value
+    blob.create_resumable_upload_session.return_value = SESSION_URL
+    return context
+
+
+@pytest.fixture
+def local_context(tmp_path, mocker):
+    mocker.patch(PATH_TO_MODULE + 'requests', LocalResumableUploads())
+    context = MagicMock()
+    context.tenant_info = {'batch_storage_bucket': 'batch'}
+    context.cloud_storage_client.client = LocalStorageClient(tmp_path)
+    return context
+
+
+@pytest.fixture
+def batch_outputs():
+    return [{
+        'combo': {
+            'name': 'default',
+            'qualifiers': {}
+        },
+        'outputs': [_output(1, 3), _output(2, error='bad well'), _output(3, 2)],
+    }]
+
+
+@pytest.mark.unittest
+def test_build_monthly_table_repeats_base_columns(batch_outputs):
+    table = build_monthly_table(batch_outputs, RUN_DATA, get_schema(MONTHLY_SCHEMA))
+
+    assert table.num_rows == 6
+    assert table['well_id'].to_pylist() == ['well1'] * 3 + ['well2'] + ['well3'] * 2
+    assert table['combo_well_id'].to_pylist()[3:] == ['run.default.well2', 'run.default.well3', 'run.default.well3']
+    assert table['error'].to_pylist() == [None, None, None, 'bad well', None, None]
+    assert table['run_date'].to_pylist() == [datetime.date(2023, 1, 5)] * 6
+    assert table['gross_oil_well_head_volume'].to_pylist() == [100., 101., 102., None, 300., 301.]
+    assert table['date'].type == pa.date32()
+    assert table['date'].to_pylist()[3:] == [None, datetime.date(2023, 1, 1), datetime.date(2023, 2, 1)]
+    assert table['econ_first_production_date'].to_pylist()[2:4] == [datetime.date(2022, 12, 1), None]
+
+
+@pytest.mark.unittest
+def test_monthly_parquet_keeps_bigquery_schema(batch_outputs, local_context, tmp_path, mocker):
+    mocker.patch(PATH_TO_MODULE + 'MONTHLY_OUTPUTS_PER_TABLE', 1)
+    EconOutputService(local_context).write_econ_files(batch_outputs, 0, RUN_DATA)
+
+    parquet_file = pq.ParquetFile(tmp_path / 'batch' / 'econ-runs' / 'run' / 'monthly-parquet' / '0.parquet')
+    monthly = parquet_file.read()
+    monthly_schema = get_schema(MONTHLY_SCHEMA)
+    expected_schema = build_pyarrow_schema(monthly_schema,
+                                           build_monthly_table(batch_outputs, RUN_DATA, monthly_schema))
+    assert monthly.schema.equals(expected_schema)
+    # one row group per output, the errored output has nulls for the flat output columns
+    assert parquet_file.num_row_groups == 3
+    assert monthly['gross_oil_well_head_volume'].to_pylist()[2:5] == [Decimal(102), None, Decimal(300)]
+    assert monthly['gross_gas_well_head_volume'][0].as_py() == Decimal('0.123456789')
+    assert monthly['well_index'].to_pylist() == [1, 1, 1, 2, 3, 3]
+    assert (tmp_path / 'batch' / 'econ-runs' / 'run' / 'one-liner-parquet' / '0.parquet').exists()
+
+
+@pytest.mark.unittest
+def test_write_parquet_tables_bounds_row_groups():
+    schema = pa.schema([pa.field('a', pa.int64()), pa.field('b', pa.decimal128(29, 9))])
+    tables = (pa.table({'a': np.arange(start, start + 25)}) for start in range(0, 100, 25))
+    sink = io.BytesIO()
+
+    write_parquet_tables(sink, tables, schema, row_group_size=10)
+
+    parquet_file = pq.ParquetFile(io.BytesIO(sink.getvalue()))
+    assert [parquet_file.metadata.row_group(i).num_rows for i in range(parquet_file.num_row_groups)] == [10, 10, 5] * 4
+    assert parquet_file.read()['a'].to_pylist() == list(range(100))
+    assert parquet_file.read()['b'].null_count == 100
+
+
+def _random_tables(n_tables, fail=False):
+    rng = np.random.default_rng(0)
+    for _ in range(n_tables):
+        yield pa.table({'a': rng.uniform(size=50_000)})
+    if fail:
+        raise ValueError('failed batch')
+
+
+@pytest.mark.unittest
+def test_parquet_upload_is_committed_on_close(resumable_upload_context, resumable_uploads):
+    schema = pa.schema([pa.field('a', pa.float64())])
+    EconOutputService(resumable_upload_context).upload_parquet_to_batch_bucket('0.parquet',
+                                                                               _random_tables(3),
+                                                                               schema,
+                                                                               chunk_size=256 * 1024)
+
+    table = pq.read_table(io.BytesIO(resumable_uploads.committed[SESSION_URL]))
+    assert table['a'].to_pylist() == pa.concat_tables(_random_tables(3))['a'].to_pylist()
+    assert resumable_uploads.cancelled == []
+
+
+@pytest.mark.unittest
+def test_failed_parquet_upload_is_not_committed(resumable_upload_context, resumable_uploads):
+    schema = pa.schema([pa.field('a', pa.float64())])
+    with pytest.raises(ValueError, match='failed batch'):
+        EconOutputService(resumable_upload_context).upload_parquet_to_batch_bucket('0.parquet',
+                                                                                   _random_tables(3, fail=True),
+                                                                                   schema,
+                                                                                   chunk_size=256 * 1024)
+    # the parquet writer and the upload are gone, neither wrote a footer nor committed the upload when collected
+    gc.collect()
+
+    assert len(resumable_uploads.sent[SESSION_URL]) > 0
+    assert resumable_uploads.committed == {}
+    assert resumable_uploads.cancelled == [SESSION_URL]
+
+
+@pytest.mark.unittest
+def test_get_monthly_df_converts_bigquery_types(batch_outputs):
+    monthly_df = EconOutputService(MagicMock()).get_monthly_df(batch_outputs, RUN_DATA)
+
+    assert len(monthly_df) == 6
+    assert monthly_df['gross_oil_well_head_volume'].tolist()[2:5] == [Decimal(102), None, Decimal(300)]
+    assert monthly_df['date'][0] == datetime.date(2023, 1, 1)
+    assert monthly_df['incremental_index'].dtype == np.int64
+    assert monthly_df['reversion_date'].tolist()[2:4] == ['2024-01-01', None]
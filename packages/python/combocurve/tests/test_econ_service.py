@@ -0,0 +1,223 @@
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from bson import ObjectId
+from deepdiff import DeepDiff
+
+from combocurve.science.econ.default_econ_assumptions import DEFAULT_DICT, get_default
+from combocurve.science.segment_models.multiple_segments import MultipleSegments
+from combocurve.services.econ.econ_service import (
+    ECON_BATCH_WORKERS_ENV,
+    batch_econ_outputs,
+    combo_batch_econ,
+    get_econ_workers,
+    get_well_index,
+    run_econ_tasks,
+    well_batch_econ,
+)
+
+PATH_TO_MODULE = "combocurve.services.econ.econ_service."
+FLAG_MODULES = ['price', 'revenue', 'volume']
+
+
+def _well_input(well_name, well_id=None):
+    return {
+        'well': {
+            '_id': well_id or well_name,
+            'well_name': well_name
+        },
+        'assumptions': {
+            'reserves_category': {
+                'reserves_category': {
+                    'prms_resources_class': 'reserves',
+                    'prms_reserves_category': 'proved',
+                    'prms_reserves_sub_category': 'producing',
+                }
+            }
+        },
+        'columns': [],
+    }
+
+
+def _fill(name, **fields):
+    return MultipleSegments.fill_segment({'name': name, **fields}, name, [])
+
+
+def _rate_forecast(start, q_start):
+    segments = [
+        _fill('arps_modified', start_idx=start, end_idx=start + 3000, q_start=q_start, b=1.1, D_eff=0.7,
+              target_D_eff_sw=0.08),
+        _fill('exp_dec', start_idx=start + 3001, end_idx=start + 15000, q_start=q_start / 8, D_eff=0.1),
+    ]
+    return {
+        'forecastType': 'rate',
+        'forecasted': True,
+        'data_freq': 'monthly',
+        'P_dict': {
+            'best': {
+                'segments': segments
+            }
+        },
+    }
+
+
+def _monthly_production(first_month, n_months, q, rng):
+    months = np.arange(np.datetime64(first_month, 'M'), np.datetime64(first_month, 'M') + n_months)
+    index = ((months.astype('datetime64[D]') + 14) - np.datetime64('1900-01-01')).astype(int)
+    return {'index': index, 'value': rng.uniform(0.5, 1.5, n_months) * q * 30, 'data_freq': 'monthly'}
+
+
+def _econ_well_input(i, rng):
+    first_month = np.datetime64('2017-06') + int(rng.integers(0, 36))
+    n_months = int(rng.integers(6, 48))
+    forecast_start = int((first_month + n_months).astype('datetime64[D]').astype(int)) + 25567
+
+    assumptions = {key: get_default(key) for key in DEFAULT_DICT}
+    assumptions['ownership_reversion']['ownership']['initial_ownership'].update({
+        'working_interest': 100,
+        'original_ownership': {
+            'net_revenue_interest': 80,
+            'lease_net_revenue_interest': 80
+        },
+    })
+    assumptions['general_options']['income_tax'] = {
+        key: {
+            'rows': [{
+                'multiplier': 0,
+                'entire_well_life': 'Flat'
+            }]
+        }
+        for key in ['state_income_tax', 'federal_income_tax']
+    }
+    assumptions['pricing']['price_model']['oil']['rows'][0]['price'] = 60
+    assumptions['pricing']['price_model']['gas']['rows'][0]['dollar_per_mmbtu'] = 3
+
+    return {
+        'well': {
+            '_id': ObjectId(f'{i:024x}'),
+            'well_name': f'well {i}',
+            'perf_lateral_length': 5000,
+            'primary_product': 'oil',
+            'spud_date': None,
+        },
+        'production_data': {
+            phase: _monthly_production(first_month, n_months, q, rng)
+            for phase, q in [('oil', 500), ('gas', 2000), ('water', 300)]
+        },
+        'forecast_data': {phase: _rate_forecast(forecast_start, q)
+                          for phase, q in [('oil', 400), ('gas', 1500), ('water', 250)]},
+        'p_series': 'P50',
+        'schedule': {},
+        'assumptions': assumptions,
+        'network': None,
+        'ghg': None,
+        'apply_normalization': False,
+        'columns': [],
+        'columns_fields': {},
+    }
+
+
+def _well_batch_econ_without_flags(*args):
+    # the workers are new processes, patch the feature flags here instead of with mocker to not reach LaunchDarkly
+    with ExitStack() as stack:
+        for module in FLAG_MODULES:
+            stack.enter_context(
+                patch(f'combocurve.science.econ.econ_calculations.{module}.evaluate_boolean_flag', return_value=False))
+        return well_batch_econ(*args)
+
+
+def mock_economics(well_input, incremental_index, base_case_flat_log, is_fiscal_month, feature_flags=None):
+    if well_input['well']['well_name'] == 'bad':
+        raise ValueError('bad well')
+    flat_log = f"{well_input['well']['well_name']} {incremental_index} {base_case_flat_log}"
+    return 'flat', 'all_flat', 'one_liner', 'all_one_liner', 'nested', 'warning', flat_log, None
+
+
+@pytest.mark.unittest
+def test_get_econ_workers(monkeypatch):
+    monkeypatch.delenv(ECON_BATCH_WORKERS_ENV, raising=False)
+    assert get_econ_workers({}) == 1
+
+    monkeypatch.setenv(ECON_BATCH_WORKERS_ENV, '4')
+    assert get_econ_workers({}) == 4
+    assert get_econ_workers({'batchWorkers': 2}) == 2
+    assert get_econ_workers({'batchWorkers': -1}) == -1
+    assert get_econ_workers({'batchWorkers': -4}) == -1
+    assert get_econ_workers({'batchWorkers': 0}) == 1
+
+    for invalid in ['0', 'abc', '2.5']:
+        monkeypatch.setenv(ECON_BATCH_WORKERS_ENV, invalid)
+        assert get_econ_workers({}) == 1
+    assert get_econ_workers({'batchWorkers': 3}) == 3
+
+
+@pytest.mark.unittest
+def test_run_econ_tasks_keeps_task_order():
+    tasks = [(get_well_index, (batch_index, 7, index)) for batch_index in range(3) for index in range(7)]
+
+    serial = run_econ_tasks(tasks)
+    assert serial == list(range(1, 22))
+    assert run_econ_tasks(tasks, n_workers=2, tenant_info={'db_name': 'test'}) == serial
+    assert run_econ_tasks(tasks, n_workers=0) == serial
+
+
+@pytest.mark.unittest
+def test_parallel_well_batch_econ_is_the_same_as_serial():
+    rng = np.random.default_rng(0)
+    output_params = {'generalOptions': get_default('general_options')}
+    tasks = [(_well_batch_econ_without_flags, (_econ_well_input(i, rng), i + 1, {
+        'is_ghg': False
+    }, output_params, False, {}, True)) for i in range(4)]
+
+    serial = run_econ_tasks(tasks)
+    parallel = run_econ_tasks(tasks, n_workers=2, tenant_info={'db_name': 'test'})
+
+    assert all('error' not in output and np.sum(flat_log['gross_oil_well_head_volume']) > 0
+               for output, flat_log in serial)
+    assert DeepDiff(serial, parallel) == {}
+
+
+@pytest.mark.unittest
+def test_combo_batch_econ_captures_errors_per_well(mocker):
+    mocker.patch(PATH_TO_MODULE + 'economics', side_effect=mock_economics)
+    mocker.patch(PATH_TO_MODULE + 'PostProcess.get_col_number', return_value=3)
+    mocker.patch(PATH_TO_MODULE + 'get_exception_info', side_effect=lambda e: {'message': str(e), 'expected': True})
+    run = {'batchSize': 5, 'outputParams': {'generalOptions': {}}}
+    params = {'batch_index': 1, 'is_ghg': False}
+
+    outputs = combo_batch_econ(run, params, [_well_input('a'), _well_input('bad'), _well_input('c')],
+                               [(_well_input('a'), _well_input('a'))])
+
+    assert [output['well_index'] for output in outputs] == [6, 7, 8, 9]
+    assert [output['incremental_name'] for output in outputs] == ['', '', '', 'a inc1']
+    assert outputs[1]['error'] == {'message': 'bad well', 'expected': True}
+    assert outputs[1]['col_number'] == 3
+    assert all('error' not in outputs[i] and outputs[i]['one_liner'] == 'one_liner' for i in [0, 2, 3])
+
+
+@pytest.mark.unittest
+def test_incremental_cases_reuse_base_case_economics(mocker):
+    economics = mocker.patch(PATH_TO_MODULE + 'economics', side_effect=mock_economics)
+    run = {'batchSize': 5, 'outputParams': {'generalOptions': {}}}
+    params = {'batch_index': 0, 'is_ghg': False}
+    changed_b = {**_well_input('b'), 'columns': [{'key': 'oil_breakeven'}]}
+
+    outputs_by_combo = batch_econ_outputs(
+        run,
+        params,
+        [[_well_input('a')], [_well_input('a')]],
+        [
+            [(_well_input('a'), _well_input('a')), (_well_input('b'), _well_input('b'))],
+            [(_well_input('b'), _well_input('b')), (changed_b, _well_input('b'))],
+        ],
+    )
+
+    base_runs = [call.args[0]['well']['well_name'] for call in economics.call_args_list if call.args[1] == 0]
+    inc_base_logs = [call.args[2] for call in economics.call_args_list if call.args[1] == 1]
+    # 'a' only runs for its two wells, 'b' once for the first two incremental cases and once with other assumptions
+    assert sorted(base_runs) == ['a', 'a', 'b', 'b']
+    assert inc_base_logs == ['a 0 None', 'b 0 None', 'b 0 None', 'b 0 None']
+    assert [[output['well_index'] for output in outputs] for outputs in outputs_by_combo] == [[1, 2, 3], [1, 2, 3]]
+    assert [output['incremental_name'] for output in outputs_by_combo[1]] == ['', 'b inc1', 'b inc1']
@@ -0,0 +1,381 @@
+import copy
+from datetime import date
+from types import SimpleNamespace
+
+import numpy as np
+import polars as pl
+import pytest
+
+from combocurve.science.econ.general_functions import last_day_of_month
+from combocurve.science.econ.group_econ.allocation import (ALLOCATION_RESULT_KEY, ZERO_GROUP_WELL_COUNT,
+                                                           allocate_group_result, allocate_to_wells,
+                                                           find_cropping_indices, get_allocation_ratios,
+                                                           get_well_count_by_combo_by_group, get_well_cutoff)
+from combocurve.science.econ.group_econ.general_functions import COMBO_NAME, ECON_GROUP, cut_group_df, filter_group_df
+from combocurve.science.econ.group_econ.group_econ_defaults import (CANNOT_EXCEED_GROUP, GROUP_INDEPENDENT,
+                                                                    MUST_BE_GROUP, get_allocation_info,
+                                                                    get_allocation_method, get_group_properties)
+from combocurve.science.econ.group_econ.group_econ_query import DEFAULT_COMBO_NAME
+
+ALLOCATION_COLUMNS = [
+    'gross_oil_well_head_volume', 'net_oil_well_head_volume', 'gross_gas_well_head_volume', 'net_gas_well_head_volume',
+    'gross_boe_well_head_volume', 'net_boe_well_head_volume', 'gross_well_count', 'wi_well_count', 'nri_well_count',
+    'total_revenue', 'total_100_pct_wi_revenue', 'net_income'
+]
+GROUPS = ['group 1', 'group 2']
+ALLOCATION_START = np.datetime64('2020-01', 'M')
+ALLOCATION_MONTHS = 120
+# group result starts before the allocation df, as with CF prior to as of date
+GROUP_RESULT_START = np.datetime64('2019-07', 'M')
+GROUP_RESULT_MONTHS = 126
+# well and allocation df column of every allocation method, by whether the allocation method type is gross
+REFERENCE_COLUMNS = {
+    'gas-volume': {True: 'gross_gas_well_head_volume', False: 'net_gas_well_head_volume'},
+    'oil-volume': {True: 'gross_oil_well_head_volume', False: 'net_oil_well_head_volume'},
+    'boe': {True: 'gross_boe_well_head_volume', False: 'net_boe_well_head_volume'},
+    'well-count': {True: 'gross_well_count', False: 'wi_well_count'},
+    'revenue': {True: 'total_100_pct_wi_revenue', False: 'total_revenue'},
+    'income': {True: 'net_income', False: 'net_income'},
+}
+
+
+def month_dates(start, months):
+    return (start + np.arange(months)).astype('datetime64[D]')
+
+
+def group_params_values(rng, months):
+    return {'time': np.arange(months), 'monthly_cost': rng.uniform(0, 1000, months), 'original': 'group'}
+
+
+def group_result(rng, group_ecl):
+    capex_months = [3, 20, 50, 125]
+    capex_dates = [str(month_dates(GROUP_RESULT_START + month, 1)[0]) for month in capex_months]
+    return {
+        'group_cutoff': {
+            'cutoff_date': group_ecl,
+            'unecon_bool': False
+        },
+        ALLOCATION_RESULT_KEY: {
+            'date_list': month_dates(GROUP_RESULT_START, GROUP_RESULT_MONTHS),
+            'fixed_expenses': [group_params_values(rng, GROUP_RESULT_MONTHS) for _ in range(2)],
+            'variable_expenses': [{
+                'oil': group_params_values(rng, GROUP_RESULT_MONTHS),
+                'gas': group_params_values(rng, GROUP_RESULT_MONTHS),
+            }],
+            'water_disposal': [group_params_values(rng, GROUP_RESULT_MONTHS)],
+            'production_tax_dict': {
+                'severance_tax': group_params_values(rng, GROUP_RESULT_MONTHS),
+                'ad_valorem_tax': group_params_values(rng, GROUP_RESULT_MONTHS),
+            },
+            'capex_dict': {
+                'time': np.arange(GROUP_RESULT_MONTHS),
+                'capex_detail': [{
+                    'date': capex_date,
+                    'index': month,
+                    'tangible': rng.uniform(-100, 1000),
+                    'intangible': rng.uniform(0, 1000),
+                    'gross_tangible': rng.uniform(0, 1000),
+                    'gross_intangible': rng.uniform(0, 1000),
+                } for capex_date, month in zip(capex_dates, capex_months)]
+            },
+            'all_capex': [{
+                'date': capex_date,
+                'category': 'drilling'
+            } for capex_date in capex_dates],
+        }
+    }
+
+
+def well_output(rng, econ_group, group_ecl):
+    start_month = int(rng.integers(0, 40))
+    months = int(rng.integers(1, ALLOCATION_MONTHS + 20 - start_month))
+    dates = month_dates(ALLOCATION_START + start_month, months)
+
+    cutoff_month = min(start_month + int(rng.integers(0, months)), ALLOCATION_MONTHS - 1)
+    cutoff_date = min(last_day_of_month(month_dates(ALLOCATION_START + cutoff_month, 1)[0].item()), group_ecl)
+
+    flat_output = {'date': dates.astype(str).tolist()}
+    for col in ALLOCATION_COLUMNS + ['wi_oil', 'nri_oil']:
+        flat_output[col] = rng.uniform(-10, 1000, months).tolist()
+    flat_output['gross_well_count'] = [1] * months
+
+    return {
+        ECON_GROUP: econ_group,
+        'all_flat_output': flat_output,
+        'original_cutoff_info': {
+            'cutoff_date': cutoff_date,
+            'unecon_bool': bool(rng.random() < .2)
+        },
+        'original_well_result_params': {
+            'rev_dates_detail': [],
+            't_ownership': np.arange(months),
+            'ownership_params': {},
+        },
+        'well_input': SimpleNamespace(date_dict={'cf_start_date': dates[0].item()}),
+        't_all': np.arange(months),
+        'one_liner_well_count': {
+            'gross_well_count': 1,
+            'wi_well_count': float(rng.uniform(.5, 1)),
+            'nri_well_count': float(rng.uniform(.3, .5)),
+        },
+    }
+
+
+def allocation_inputs(num_wells, allocation, econ_limit, seed=0):
+    rng = np.random.default_rng(seed)
+    group_ecl = last_day_of_month(month_dates(ALLOCATION_START + ALLOCATION_MONTHS - 10, 1)[0].item())
+
+    wells = [well_output(rng, GROUPS[i % len(GROUPS)], group_ecl) for i in range(num_wells)]
+    wells[1]['error'] = {'message': 'Failed well'}
+
+    allocation_df = pl.DataFrame({
+        COMBO_NAME: [DEFAULT_COMBO_NAME] * ALLOCATION_MONTHS * len(GROUPS),
+        ECON_GROUP: np.repeat(GROUPS, ALLOCATION_MONTHS),
+        'date': np.tile(month_dates(ALLOCATION_START, ALLOCATION_MONTHS).astype(str), len(GROUPS)),
+        **{col: rng.uniform(0, 10000, ALLOCATION_MONTHS * len(GROUPS))
+           for col in ALLOCATION_COLUMNS},
+    })
+    result_by_combo_by_group = {DEFAULT_COMBO_NAME: {group: group_result(rng, group_ecl) for group in GROUPS}}
+    group_settings = {
+        group: {
+            DEFAULT_COMBO_NAME: {
+                'properties': {
+                    'econLimit': econ_limit,
+                    'allocation': allocation
+                }
+            }
+        }
+        for group in GROUPS
+    }
+    batches = [[{'combo': {'name': DEFAULT_COMBO_NAME}, 'outputs': wells[:num_wells // 2]}],
+               [{'combo': {'name': DEFAULT_COMBO_NAME}, 'outputs': wells[num_wells // 2:]}]]
+
+    return result_by_combo_by_group, batches, group_settings, allocation_df
+
+
+def crop_well_values(well_values, group_start_idx, group_end_idx):
+    # well start idx is always 0
+    well_end_idx = group_end_idx - group_start_idx
+    cropped_well_values = well_values[:well_end_idx]
+    if well_end_idx > len(well_values):
+        cropped_well_values = cropped_well_values + [0] * (well_end_idx - len(well_values))
+    cropped_well_values = np.array(cropped_well_values)
+    cropped_well_values[cropped_well_values < 0] = 0  # negative won't get allocation
+
+    return cropped_well_values
+
+
+def allocate(
+    well_date_list,
+    well_t_all,
+    well_values,
+    well_ownership,
+    allocation_date_list,
+    reference_values,
+    cutoff_date,
+    unecon_bool,
+    original_well_result_params,
+    group_result,
+    allocation_bool,
+    allocation_basis,
+    allocation_timing,
+    allocate_by_well_count=False,
+    allocate_by_well_count_capex_ratio=0,
+):
+    allocated_group_params = {
+        'final_cutoff_date': cutoff_date,
+        'rev_dates_detail': original_well_result_params['rev_dates_detail'],
+        'unecon_bool': unecon_bool,
+        'is_complete': True,
+        # ownership t_list doesn't need to be consistent with well's t_list
+        't_ownership': original_well_result_params['t_ownership'],
+        'ownership_params': original_well_result_params['ownership_params'],
+    }
+
+    # crop both values to same length and date range
+    allocation_start_idx, allocation_end_idx = find_cropping_indices(well_date_list, allocation_date_list, cutoff_date)
+    cropped_reference_values = reference_values[allocation_start_idx:allocation_end_idx]
+    reference_values_for_remaining = reference_values[allocation_start_idx:]
+
+    cropped_well_values = crop_well_values(well_values, allocation_start_idx, allocation_end_idx)
+    allocation_ratios = get_allocation_ratios(cropped_well_values, cropped_reference_values,
+                                              reference_values_for_remaining, allocation_bool, allocation_timing,
+                                              unecon_bool)
+    allocation_ratios_tax = allocation_ratios
+
+    # CAPEX is allocated based on total amount over the life of well, but for allocate by well count, it uses monthly
+    capex_well_ratio = 0  # for 1. no allocation, 2. unecon
+    if allocation_bool and not unecon_bool:
+        if allocate_by_well_count:
+            capex_well_ratio = allocate_by_well_count_capex_ratio
+        else:
+            capex_well_ratio = sum(cropped_well_values) / sum(reference_values) if sum(reference_values) > 0 else 0
+
+    allocation_ratio_capex = np.repeat(capex_well_ratio, len(cropped_well_values))
+
+    if allocation_bool and allocation_basis == 'gross' and not unecon_bool:
+        '''
+        when allocation basis is gross, pass in gross (100% WI) group level assumption
+        and multiple by well WI when allocate (for tax multiply well NRI)
+        check `get_econ_models` in `one_group_calculation` function for the first part of the logic
+        '''
+        cropped_well_wi = crop_well_values(well_ownership['wi'], allocation_start_idx, allocation_end_idx)
+        cropped_well_nri = crop_well_values(well_ownership['nri'], allocation_start_idx,
+                                            allocation_end_idx)  # for production tax
+
+        # the order for the following calculation matters allocation_ratios_tax need to be calculated first
+        allocation_ratios_tax = np.multiply(allocation_ratios, cropped_well_nri)
+        allocation_ratios = np.multiply(allocation_ratios, cropped_well_wi)
+        allocation_ratio_capex = np.multiply(allocation_ratio_capex, cropped_well_wi)
+
+    # crop group params, allocate group params to well by allocation_ratios and add to allocated_group_params
+    '''
+    start_idx and end_idx are used to crop group result
+    allocation_start_idx and allocation_end_idx are used to crop allocation df
+    group result date range can be different with allocation df due to CF prior to as of date
+    '''
+    group_start_idx, group_end_idx = find_cropping_indices(well_date_list,
+                                                           group_result[ALLOCATION_RESULT_KEY]['date_list'].astype(str),
+                                                           cutoff_date)
+    allocated_group_params.update(
+        allocate_group_result(group_result, group_start_idx, group_end_idx, allocation_bool, allocation_ratios,
+                              allocation_ratios_tax, allocation_ratio_capex))
+
+    # group params start date
+    allocated_group_params['t_allocation'] = well_t_all[0:allocation_end_idx - allocation_start_idx]
+
+    return allocated_group_params
+
+
+def allocate_one_well(
+    flat_output,
+    original_cutoff_info,
+    original_well_result_params,
+    original_cf_start_date,
+    well_t_all,
+    well_one_liner_well_count,
+    group_properties,
+    group_result,
+    allocation_df,
+    group_well_count,
+):
+    '''
+    reference allocation of one well at a time with python lists, `allocate_to_wells` must match it for every well
+    '''
+    allocation_method = get_allocation_method(group_properties)
+    allocation_method_type, allocation_bool, allocation_basis, allocation_timing = get_allocation_info(group_properties)
+    column = REFERENCE_COLUMNS[allocation_method][allocation_method_type == 'gross']
+
+    group_ecl = group_result['group_cutoff'].get('cutoff_date')
+    cutoff_date, updated_well_unecon_bool = get_well_cutoff(original_cutoff_info, original_cf_start_date,
+                                                            group_properties, group_ecl)
+
+    # cut group_allocation_df to group cutoff date for remaining allocation basis and capex allocation
+    allocation_df = cut_group_df(allocation_df, max_date=group_ecl)
+
+    well_count_kwargs = {}
+    if allocation_method == 'well-count':
+        if allocation_timing == 'remaining':  # to match PHDWin well count remaining calculation
+            allocation_timing = 'monthly'
+        well_count_kwargs = {
+            'allocate_by_well_count': True,
+            'allocate_by_well_count_capex_ratio': well_one_liner_well_count[column] / group_well_count[column],
+        }
+
+    well_ownership = {
+        'wi': flat_output['wi_oil'],  # use oil wi for well wi for now, pass out original wi in future
+        'nri': flat_output['nri_oil']  # use oil nri for well nri for now, pass out original nri in future
+    }
+
+    return allocate(
+        flat_output['date'],
+        well_t_all,
+        flat_output[column],
+        well_ownership,
+        allocation_df['date'].to_list(),
+        np.array(allocation_df[column]),
+        cutoff_date,
+        updated_well_unecon_bool,
+        original_well_result_params,
+        group_result,
+        allocation_bool,
+        allocation_basis,
+        allocation_timing,
+        **well_count_kwargs,
+    )
+
+
+def allocate_one_by_one(result_by_combo_by_group, batches, group_settings, allocation_df):
+    well_count_by_combo_by_group = get_well_count_by_combo_by_group(batches, group_settings)
+    for batch in batches:
+        for combo_output in batch:
+            combo_name = combo_output['combo']['name']
+            for well in combo_output['outputs']:
+                if well.get('error') is not None:
+                    continue
+                econ_group = well[ECON_GROUP]
+                well['group_params'] = allocate_one_well(
+                    well['all_flat_output'], well['original_cutoff_info'], well['original_well_result_params'],
+                    well['well_input'].date_dict['cf_start_date'], well['t_all'], well['one_liner_well_count'],
+                    get_group_properties(group_settings, econ_group, DEFAULT_COMBO_NAME),
+                    result_by_combo_by_group[combo_name][econ_group],
+                    filter_group_df(allocation_df, combo_name, econ_group),
+                    well_count_by_combo_by_group.get(combo_name, {}).get(econ_group, ZERO_GROUP_WELL_COUNT))
+
+
+def assert_identical(actual, expected):
+    assert type(actual) == type(expected)
+    if isinstance(expected, dict):
+        assert list(actual) == list(expected)
+        for key in expected:
+            assert_identical(actual[key], expected[key])
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected)
+        for actual_item, expected_item in zip(actual, expected):
+            assert_identical(actual_item, expected_item)
+    elif isinstance(expected, np.ndarray):
+        assert actual.dtype == expected.dtype
+        np.testing.assert_array_equal(actual, expected)
+    else:
+        assert actual == expected
+
+
+def allocation_settings():
+    for method in ['oil-volume', 'gas-volume', 'boe', 'well-count', 'revenue', 'income']:
+        for timing in ['monthly', 'annual', 'remaining']:
+            for method_type, basis in [('gross', 'net'), ('net', 'gross')]:
+                yield {
+                    'properties': 'individual-wells',
+                    'method': method,
+                    'methodType': method_type,
+                    'basis': basis,
+                    'timing': timing
+                }
+    yield {'properties': 'none', 'method': 'oil-volume'}
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('econ_limit', [GROUP_INDEPENDENT, CANNOT_EXCEED_GROUP, MUST_BE_GROUP])
+@pytest.mark.parametrize('allocation', list(allocation_settings()))
+def test_allocate_to_wells_matches_allocating_every_well(allocation, econ_limit):
+    inputs = allocation_inputs(16, allocation, econ_limit)
+    expected_inputs = copy.deepcopy(inputs)
+
+    allocate_to_wells(*inputs)
+    allocate_one_by_one(*expected_inputs)
+
+    wells = [well for batch in inputs[1] for combo in batch for well in combo['outputs']]
+    expected_wells = [well for batch in expected_inputs[1] for combo in batch for well in combo['outputs']]
+    assert 'group_params' not in wells[1]
+    for well, expected_well in zip(wells, expected_wells):
+        assert_identical(well.get('group_params'), expected_well.get('group_params'))
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('one_by_one', [True, False])
+def test_performance_of_allocate_to_wells(benchmark, one_by_one):
+    allocation = {'properties': 'individual-wells', 'method': 'oil-volume', 'timing': 'remaining'}
+    inputs = allocation_inputs(2000, allocation, CANNOT_EXCEED_GROUP)
+
+    benchmark.pedantic(allocate_one_by_one if one_by_one else allocate_to_wells, args=inputs, rounds=1)
@@ -0,0 +1,154 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from combocurve.science.econ.group_econ.group_econ import batch_outputs_to_pldf
+from combocurve.science.econ.group_econ.group_econ_defaults import (CANNOT_EXCEED_GROUP, GROUP_INDEPENDENT,
+                                                                    MUST_BE_GROUP)
+from combocurve.science.econ.group_econ.group_econ_query import DEFAULT_COMBO_NAME
+from combocurve.science.econ.group_econ.schema import GROUP_PL_DF_SCHEMA
+
+RUN_DATA = {'run_id': 'run', 'run_date': '2023-01-01'}
+START = np.datetime64('2023-01', 'M')
+FLOAT_COLUMNS = [col for col, dtype in GROUP_PL_DF_SCHEMA.items() if dtype == pl.Float64]
+GROUP_ECL = {'group 1': GROUP_INDEPENDENT, 'group 2': CANNOT_EXCEED_GROUP, 'group 3': MUST_BE_GROUP}
+
+
+def all_flat_output(rng, months):
+    dates = (START + np.arange(months)).astype('datetime64[D]').astype('str')
+    output = {'date': dates, 'extra_column': rng.uniform(0, 1, months)}
+    for i, col in enumerate(FLOAT_COLUMNS[:-3]):
+        values = rng.uniform(-100, 1000, months)
+        # outputs have float, object and list columns
+        output[col] = values.astype(object) if i % 3 == 0 else values.tolist() if i % 3 == 1 else values
+    # well counts are ints
+    output['gross_well_count'] = np.ones(months, dtype=int)
+    output['wi_well_count'] = [1] * months
+    output['nri_well_count'] = np.full(months, 0.8)
+    return output
+
+
+def well_output(rng, i, months, econ_group, unecon, cutoff_month):
+    return {
+        'well': {
+            '_id': f'well {i}'
+        },
+        'reserves_category': {},
+        'incremental_name': None,
+        'incremental_index': 0,
+        'well_index': i,
+        'econ_group': econ_group,
+        'original_cutoff_info': {
+            'cutoff_date': str(START + cutoff_month),
+            'unecon_bool': unecon,
+            'cutoff_well_result': None,
+        },
+        'all_flat_output': all_flat_output(rng, months),
+    }
+
+
+def batch_outputs(rng, n_wells):
+    outputs = []
+    for i in range(n_wells):
+        econ_group = list(GROUP_ECL)[i % 3]
+        months = int(rng.integers(1, 60))
+        # cutoff inside, at the end and after the end of the well dates
+        cutoff_month = [months // 2, months - 1, months + 5][i % 4 % 3]
+        outputs.append(well_output(rng, i, months, econ_group, i % 5 == 0, cutoff_month))
+    outputs[1]['error'] = None
+    outputs[2]['error'] = {'message': 'Failed', 'expected': True}
+    return [{'combo': {'name': DEFAULT_COMBO_NAME, 'qualifiers': {}}, 'outputs': outputs}]
+
+
+def group_settings():
+    return {
+        group: {
+            DEFAULT_COMBO_NAME: {
+                'properties': {
+                    'econLimit': ecl
+                }
+            }
+        }
+        for group, ecl in GROUP_ECL.items()
+    }
+
+
+def reference_monthly_rows(output, combo, group_settings):
+    ecl = group_settings[output['econ_group']][DEFAULT_COMBO_NAME]['properties']['econLimit']
+    cut = ecl in [GROUP_INDEPENDENT, CANNOT_EXCEED_GROUP]
+    base = {'econ_group': output['econ_group'], 'combo_name': combo['name']}
+    if 'error' in output:
+        return [base]
+
+    data_dict = output['all_flat_output']
+    cut_date_str = (np.datetime64(output['original_cutoff_info']['cutoff_date'], 'M')
+                    + 1).astype('datetime64[D]').astype('str')
+    cut_index = list(data_dict['date']).index(cut_date_str) if cut_date_str in data_dict['date'] else None
+    data = np.array(list(data_dict.values()), dtype='O')
+    if cut:
+        if output['original_cutoff_info']['unecon_bool']:
+            return []
+        if cut_index is not None:
+            data = data[:, :cut_index]
+
+    return [{**dict(zip(data_dict.keys(), data[:, row_idx])), **base} for row_idx in range(data.shape[1])]
+
+
+def reference_pldf(individual_batch_outputs, group_settings):
+    rows = [
+        row for batch in individual_batch_outputs for combo in batch for output in combo['outputs']
+        if output.get('error') is None for row in reference_monthly_rows(output, combo['combo'], group_settings)
+    ]
+    return pl.from_dicts(rows, infer_schema_length=len(rows)).select(
+        [pl.col(col).cast(dtype) for col, dtype in GROUP_PL_DF_SCHEMA.items()])
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('seed', range(5))
+def test_monthly_df_is_the_same_as_the_monthly_rows(seed):
+    rng = np.random.default_rng(seed)
+    individual_batch_outputs = [batch_outputs(rng, 20), batch_outputs(rng, 7)]
+
+    pldf = batch_outputs_to_pldf(individual_batch_outputs, group_settings(), RUN_DATA, from_cutoff=True)
+
+    assert pldf.schema == GROUP_PL_DF_SCHEMA
+    assert pldf.frame_equal(reference_pldf(individual_batch_outputs, group_settings()), null_equal=True)
+
+
+@pytest.mark.unittest
+def test_monthly_df_skips_unecon_wells_and_cuts_after_cutoff():
+    rng = np.random.default_rng(0)
+    outputs = [
+        well_output(rng, 0, 24, 'group 1', False, 5),
+        well_output(rng, 1, 24, 'group 1', True, 5),
+        well_output(rng, 2, 24, 'group 3', True, 5),
+    ]
+    combo = {'name': DEFAULT_COMBO_NAME, 'qualifiers': {}}
+
+    pldf = batch_outputs_to_pldf([[{'combo': combo, 'outputs': outputs}]], group_settings(), RUN_DATA)
+
+    assert pldf['econ_group'].to_list() == ['group 1'] * 6 + ['group 3'] * 24
+    assert pldf['date'].to_list()[:6] == outputs[0]['all_flat_output']['date'][:6].tolist()
+    assert pldf['gross_well_count'].to_list() == [1.0] * 30
+
+
+@pytest.mark.unittest
+def test_monthly_df_without_wells():
+    rng = np.random.default_rng(0)
+    outputs = [well_output(rng, 0, 24, 'group 1', False, 5)]
+    outputs[0]['error'] = {'message': 'Failed', 'expected': True}
+    combo = {'name': DEFAULT_COMBO_NAME, 'qualifiers': {}}
+
+    for individual_batch_outputs in [[], [[{'combo': combo, 'outputs': outputs}]]]:
+        pldf = batch_outputs_to_pldf(individual_batch_outputs, group_settings(), RUN_DATA)
+        assert pldf.schema == GROUP_PL_DF_SCHEMA
+        assert len(pldf) == 0
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+def test_performance_of_monthly_df(benchmark):
+    rng = np.random.default_rng(0)
+    individual_batch_outputs = [batch_outputs(rng, 500) for _ in range(4)]
+
+    benchmark.pedantic(batch_outputs_to_pldf, args=(individual_batch_outputs, group_settings(), RUN_DATA), rounds=1)
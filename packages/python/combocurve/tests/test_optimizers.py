@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from scipy.optimize import differential_evolution
+
+from combocurve.science.core_function.skeleton_dca import get_dca
+from combocurve.science.forecast_models.model_manager import mm
+from combocurve.science.optimization_module.optimizers import (
+    evaluates_population,
+    my_differential_evolution,
+    population_loss,
+    repeated_differential_evolution,
+)
+
+BOUNDS = [(-5, 5), (-5, 5)]
+T_FIRST = 43000
+
+
+def rosenbrock(x, a):
+    return (a - x[0])**2 + 100 * (x[1] - x[0]**2)**2
+
+
+@evaluates_population
+def rosenbrock_population(population, a):
+    return (a - population[0])**2 + 100 * (population[1] - population[0]**2)**2
+
+
+def arps_data():
+    t = np.arange(T_FIRST, T_FIRST + 30 * 120, 30, dtype=float)
+    noise = np.exp(np.random.default_rng(0).normal(0, .05, t.size))
+    q = 1000 * (1 + 1.2 * 0.003 * (t - t[0]))**(-1 / 1.2) * noise
+    return np.stack([t, q, np.ones_like(t)], axis=1)
+
+
+def deferred_dca(vectorized):
+    dca = get_dca()
+    dca.set_freq('monthly')
+    dca.set_vectorized(vectorized)
+    optimization_para_dict = dca.get_optimization_para_dict
+    dca.get_optimization_para_dict = lambda: {**optimization_para_dict(), 'updating': 'deferred'}
+    return dca
+
+
+@pytest.mark.unittest
+def test_evaluates_population_accepts_one_candidate():
+    population = np.random.default_rng(0).uniform(-5, 5, (2, 10))
+
+    expected = [rosenbrock(x, 1.) for x in population.T]
+    np.testing.assert_allclose(rosenbrock_population(population, 1.), expected, rtol=1e-15)
+    np.testing.assert_allclose(population_loss(rosenbrock)(population, 1.), expected, rtol=1e-15)
+    assert rosenbrock_population(population[:, 0], 1.) == pytest.approx(expected[0], rel=1e-15)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('loss', [rosenbrock_population, population_loss(rosenbrock)])
+def test_vectorized_matches_deferred_updating(loss):
+    para = {'bounds': BOUNDS, 'args': (1., ), 'seed': 3, 'maxiter': 30}
+
+    result = my_differential_evolution(loss, {**para, 'vectorized': True})
+    expected = differential_evolution(rosenbrock, updating='deferred', **para)
+
+    np.testing.assert_array_equal(result.x, expected.x)
+    assert result.fun == expected.fun
+
+
+@pytest.mark.unittest
+def test_seed_workers_match_sequential_seeds():
+    para = {'bounds': BOUNDS, 'args': (1., ), 'maxiter': 20, 'random_seeds': [1, 2, 3]}
+
+    sequential = repeated_differential_evolution(rosenbrock, para)
+    parallel = repeated_differential_evolution(rosenbrock, {**para, 'seed_workers': 2})
+    vectorized = repeated_differential_evolution(rosenbrock_population, {**para, 'seed_workers': 2, 'vectorized': True})
+
+    np.testing.assert_array_equal(parallel.x, sequential.x)
+    deferred = repeated_differential_evolution(rosenbrock, {**para, 'updating': 'deferred'})
+    np.testing.assert_array_equal(vectorized.x, deferred.x)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('model_name', ['arps_wp', 'arps_modified_wp'])
+def test_func_population_matches_func(model_name):
+    model = mm.models[model_name]
+    t = np.arange(T_FIRST, T_FIRST + 3000, 30, dtype=float)
+    p_fixed = [T_FIRST, 60, 1000.]
+    population = np.stack([np.linspace(.3, .9, 7), np.linspace(.1, 1.9, 7)], axis=1)
+
+    expected = np.array([model.func(t, p, p_fixed) for p in population])
+    np.testing.assert_allclose(model.func_population(t, population, p_fixed), expected, rtol=1e-13)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('model_name', ['arps_wp', 'segment_arps_4_wp'])
+def test_vectorized_dca_matches_deferred_updating(model_name):
+    data = arps_data()
+
+    expected = deferred_dca(False).get_params(data, data[0, 0], 8, model_name)
+    result = deferred_dca(True).get_params(data, data[0, 0], 8, model_name)
+
+    np.testing.assert_array_equal(result[0], expected[0])
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('vectorized, seed_workers', [(False, 1), (True, 1), (True, 4)])
+def test_performance_of_repeated_dca(benchmark, vectorized, seed_workers):
+    # the OPS column is the number of fits per second
+    data = arps_data()
+    dca = get_dca()
+    dca.set_freq('monthly')
+    dca.set_optimizer('repeated_differential_evolution')
+    dca.set_seeds([1, 2, 3, 4])
+    dca.set_vectorized(vectorized)
+    dca.set_seed_workers(seed_workers)
+
+    benchmark(lambda: dca.get_params(data, data[0, 0], 8, 'arps_wp'))
@@ -0,0 +1,206 @@
+from concurrent import futures
+from datetime import date
+from unittest.mock import MagicMock
+
+import grpc
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from combocurve.dal.client import DAL
+from combocurve.dal.types import to_index_from_timestamp, to_timestamp_from_index
+from combocurve.dal.v1 import daily_production_pb2, daily_production_pb2_grpc
+from combocurve.dal.v1 import monthly_production_pb2, monthly_production_pb2_grpc
+from combocurve.services.production.production_service import (ProductionService,
+                                                               cums_and_last_prods_from_production)
+from combocurve.shared.date import days_from_1900
+
+PHASES = ['oil', 'gas', 'water']
+
+
+def _production(n_wells, seed=0):
+    rng = np.random.default_rng(seed)
+    production = {}
+    for _ in range(n_wells):
+        index = np.sort(rng.choice(np.arange(40000, 45000), rng.integers(1, 60), replace=False))
+        values = {phase: rng.random(len(index)) * 1000 for phase in PHASES}
+        values['oil'][rng.random(len(index)) < .1] = np.nan
+        production[str(ObjectId())] = {'index': index, **values}
+    return production
+
+
+class MockProductionServicer:
+    '''
+        In memory DAL production server, keeps the size of the responses it streams in `bytes_sent`
+    '''
+    def __init__(self, production, pb2, prefix, sum_by_well=True):
+        self.production = production
+        self.pb2 = pb2
+        self.prefix = prefix
+        self.bytes_sent = 0
+        self.field_masks = []
+        self.fetched_wells = []
+        if not sum_by_well:
+            # the generated servicer answers UNIMPLEMENTED
+            self.SumByWell = None
+
+    def _send(self, response):
+        self.bytes_sent += response.ByteSize()
+        return response
+
+    def FetchByWell(self, request, context):
+        self.field_masks.append(list(request.field_mask.paths))
+        self.fetched_wells.append(sorted(request.wells))
+        fields = [field for field in request.field_mask.paths if field in PHASES]
+        for well in sorted(request.wells):
+            if well in self.production:
+                well_data = self.production[well]
+                in_range = np.ones(len(well_data['index']), dtype=bool)
+                if request.HasField('date_range'):
+                    in_range = ((well_data['index'] >= to_index_from_timestamp(request.date_range.start_date))
+                                & (well_data['index'] <= to_index_from_timestamp(request.date_range.end_date)))
+                if not in_range.any():
+                    continue
+                yield self._send(
+                    getattr(self.pb2, f'{self.prefix}FetchByWellResponse')(
+                        well=well,
+                        date=[to_timestamp_from_index(int(index)) for index in well_data['index'][in_range]],
+                        **{field: well_data[field][in_range]
+                           for field in fields}))
+
+    def SumByWell(self, request, context):
+        self.field_masks.append(list(request.field_mask.paths))
+        fields = [field for field in request.field_mask.paths if field in PHASES]
+        for well in sorted(request.wells):
+            if well in self.production:
+                yield self._send(
+                    getattr(self.pb2, f'{self.prefix}SumByWellResponse')(
+                        well=well, **{field: np.nansum(self.production[well][field])
+                                      for field in fields}))
+
+
+@pytest.fixture
+def mock_dal():
+    servers = []
+
+    def start(daily_production, monthly_production, sum_by_well=True):
+        daily = MockProductionServicer(daily_production, daily_production_pb2, 'DailyProductionService',
+                                       sum_by_well)
+        monthly = MockProductionServicer(monthly_production, monthly_production_pb2, 'MonthlyProductionService',
+                                         sum_by_well)
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+        for servicer, base, add_to_server in [
+            (daily, daily_production_pb2_grpc.DailyProductionServiceServicer,
+             daily_production_pb2_grpc.add_DailyProductionServiceServicer_to_server),
+            (monthly, monthly_production_pb2_grpc.MonthlyProductionServiceServicer,
+             monthly_production_pb2_grpc.add_MonthlyProductionServiceServicer_to_server),
+        ]:
+            methods = {'FetchByWell': servicer.FetchByWell}
+            if servicer.SumByWell:
+                methods['SumByWell'] = servicer.SumByWell
+            add_to_server(type('MockServicer', (base, ), methods)(), server)
+        port = server.add_insecure_port('localhost:0')
+        server.start()
+        servers.append(server)
+
+        context = MagicMock()
+        context.dal = DAL(grpc.insecure_channel(f'localhost:{port}'))
+        return ProductionService(context), daily, monthly
+
+    yield start
+
+    for server in servers:
+        server.stop(None)
+
+
+def _expected(production):
+    return {
+        well: {
+            'last_prod': int(well_data['index'].max()),
+            **{phase: pytest.approx(float(np.nansum(well_data[phase])), rel=1e-12)
+               for phase in PHASES}
+        }
+        for well, well_data in production.items()
+    }
+
+
+@pytest.mark.unittest
+def test_cums_and_last_prods_are_summed_by_the_dal(mock_dal):
+    daily_production, monthly_production = _production(20, seed=1), _production(30, seed=2)
+    production_service, daily, monthly = mock_dal(daily_production, monthly_production)
+    unknown_well = str(ObjectId())
+
+    cums_and_last_prods = production_service.get_cums_and_last_prods(set(daily_production),
+                                                                     {*monthly_production, unknown_well}, PHASES)
+
+    assert cums_and_last_prods == {'daily': _expected(daily_production), 'monthly': _expected(monthly_production)}
+    # only the sums and the dates are streamed, the dates of the last year then all the dates of the wells that did
+    # not produce in it
+    assert sorted(monthly.field_masks) == [['well', 'date'], ['well', 'date'], ['well', *PHASES]]
+    assert daily.field_masks[0] == ['well', *PHASES]
+
+
+@pytest.mark.unittest
+def test_cums_and_last_prods_fall_back_to_fetching_production(mock_dal):
+    daily_production, monthly_production = _production(20, seed=1), _production(30, seed=2)
+    production_service, daily, monthly = mock_dal(daily_production, monthly_production, sum_by_well=False)
+
+    cums_and_last_prods = production_service.get_cums_and_last_prods(daily_production, monthly_production,
+                                                                     ['oil', 'water'])
+
+    for data_freq, production in [('daily', daily_production), ('monthly', monthly_production)]:
+        expected = {well: {key: well_data[key] for key in ['last_prod', 'oil', 'water']}
+                    for well, well_data in _expected(production).items()}
+        assert cums_and_last_prods[data_freq] == expected
+    assert monthly.field_masks == [['well', 'date', 'oil', 'water']]
+
+
+@pytest.mark.unittest
+def test_aggregate_cums_move_less_data(mock_dal):
+    production = _production(200)
+    aggregate_service, _, aggregate = mock_dal({}, production)
+    fallback_service, _, fallback = mock_dal({}, production, sum_by_well=False)
+
+    for production_service in [aggregate_service, fallback_service]:
+        assert production_service.get_cums_and_last_prods([], production, PHASES)['monthly'] == _expected(production)
+    assert aggregate.bytes_sent < fallback.bytes_sent / 2
+
+
+@pytest.mark.unittest
+def test_last_prods_of_recent_wells_only_stream_recent_dates(mock_dal):
+    production = _production(100)
+    recent_wells = list(production)[::2]
+    today = days_from_1900(date.today())
+    for well in recent_wells:
+        production[well]['index'] = production[well]['index'] - production[well]['index'][-1] + today - 30
+    production_service, _, monthly = mock_dal({}, production)
+
+    assert production_service.get_cums_and_last_prods([], production, PHASES)['monthly'] == _expected(production)
+
+    recent_fetch, all_fetch = monthly.fetched_wells
+    assert recent_fetch == sorted(production)
+    assert all_fetch == sorted(set(production) - set(recent_wells))
+    all_dates_bytes = sum(
+        monthly_production_pb2.MonthlyProductionServiceFetchByWellResponse(
+            well=well, date=[to_timestamp_from_index(int(index)) for index in well_data['index']]).ByteSize()
+        for well, well_data in production.items())
+    sums_bytes = sum(
+        monthly_production_pb2.MonthlyProductionServiceSumByWellResponse(well=well, oil=1., gas=1., water=1.).ByteSize()
+        for well in production)
+    assert monthly.bytes_sent - sums_bytes < all_dates_bytes * 0.75
+
+
+@pytest.mark.unittest
+def test_cums_and_last_prods_from_production_skips_missing_values():
+    well_1, well_2, well_3 = ObjectId(), ObjectId(), ObjectId()
+    production = [
+        {'_id': well_1, 'index': np.array([43000, 43031], dtype=np.int32), 'oil': np.array([1., np.nan])},
+        {'_id': well_2, 'index': np.array([], dtype=np.int32), 'oil': np.array([])},
+        {'_id': well_3, 'index': np.array([42000, 43100, 42500], dtype=np.int32), 'oil': np.array([1., 2., 3.])},
+    ]
+
+    assert cums_and_last_prods_from_production(production, ['oil']) == {
+        str(well_1): {'last_prod': 43031, 'oil': 1.},
+        str(well_3): {'last_prod': 43100, 'oil': 6.},
+    }
+    assert cums_and_last_prods_from_production([], ['oil']) == {}
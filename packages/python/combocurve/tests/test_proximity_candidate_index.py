@@ -0,0 +1,159 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+from bson import ObjectId
+
+from combocurve.services.proximity_forecast.proximity_candidate_index import (CandidateWellIndex, get_valid_mask,
+                                                                               my_haversine_distances,
+                                                                               parse_well_header)
+
+EARTH_RADIUS = 3958.8  # mile
+CRITERIA = {
+    'perf_lateral_length': {
+        'type': 'number',
+        'mandatory': True,
+        'relativePercentage': 30
+    },
+    'county': {
+        'type': 'string',
+        'mandatory': False
+    },
+    'total_proppant/perf_lateral_length': {
+        'type': 'number',
+        'mandatory': False,
+        'relativeValue': 500
+    },
+    'first_prod_date': {
+        'type': 'date',
+        'mandatory': False,
+        'relativeValue': 24
+    },
+}
+
+
+def candidate_well_data(n_wells, seed=0):
+    rng = np.random.default_rng(seed)
+    forecasts = [str(ObjectId()) for _ in range(3)]
+    # several wells share the surface location of a pad
+    pads = rng.uniform([31, -103], [33, -101], (max(n_wells // 4, 1), 2))
+    well_headers = []
+    well_forecast_pairs = []
+    for _ in range(n_wells):
+        latitude, longitude = pads[rng.integers(len(pads))]
+        well = {
+            '_id': ObjectId(),
+            'surfaceLatitude': latitude,
+            'surfaceLongitude': longitude,
+            'perf_lateral_length': float(rng.uniform(4000, 12000)) if rng.random() > .1 else None,
+            'total_proppant': float(rng.uniform(1e6, 3e7)),
+            'county': str(rng.choice(['A', 'B', 'C'])),
+            'first_prod_date': f'20{rng.integers(10, 23)}-0{rng.integers(1, 10)}-15T00:00:00.000Z',
+        }
+        well_headers.append(well)
+        for forecast in rng.choice(forecasts, rng.integers(1, 3), replace=False):
+            well_forecast_pairs.append({'_id': ObjectId(), 'well': well['_id'], 'forecast': ObjectId(forecast)})
+    return {'well_headers': well_headers, 'well_forecast_pairs': well_forecast_pairs}, forecasts
+
+
+@pytest.mark.unittest
+def test_query_radius_matches_haversine_distances():
+    data, _ = candidate_well_data(2000)
+    candidate_index = CandidateWellIndex(data)
+    locations = np.radians([[w['surfaceLatitude'], w['surfaceLongitude']] for w in data['well_headers']])
+
+    for search_radius in [0., 5., 30., 200.]:
+        target_in_radians = locations[[7]]
+        all_dist = my_haversine_distances(locations, target_in_radians)
+        expected = np.flatnonzero(all_dist <= search_radius / EARTH_RADIUS)
+
+        positions, dist = candidate_index.query_radius(target_in_radians, search_radius / EARTH_RADIUS)
+
+        np.testing.assert_array_equal(positions, expected)
+        np.testing.assert_array_equal(dist, all_dist[expected])
+
+
+@pytest.mark.unittest
+def test_wells_without_location_are_not_in_radius():
+    data, _ = candidate_well_data(10)
+    data['well_headers'][3]['surfaceLatitude'] = None
+    candidate_index = CandidateWellIndex(data)
+
+    positions, _ = candidate_index.query_radius(np.radians([[32., -102.]]), np.pi)
+
+    assert positions.tolist() == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('field', list(CRITERIA))
+def test_criteria_mask_matches_get_valid_mask(field):
+    data, _ = candidate_well_data(500)
+    candidate_index = CandidateWellIndex(data)
+    neighbor_well_df = pd.DataFrame(list(map(parse_well_header, data['well_headers'])))
+
+    for target in data['well_headers'][:20]:
+        parsed_target_well_info = parse_well_header(target)
+        np.testing.assert_array_equal(
+            candidate_index.criteria_mask(field, CRITERIA[field], parsed_target_well_info),
+            get_valid_mask(neighbor_well_df, CRITERIA[field], parsed_target_well_info, field))
+
+
+@pytest.mark.unittest
+def test_well_forecast_dict_prefers_the_first_selected_forecast():
+    data, forecasts = candidate_well_data(200)
+    candidate_index = CandidateWellIndex(data)
+
+    for selected_forecasts in [forecasts, forecasts[::-1], forecasts[1:]]:
+        expected = {}
+        for forecast in selected_forecasts:
+            for pair in data['well_forecast_pairs']:
+                if str(pair['forecast']) == forecast and not expected.get(str(pair['well'])):
+                    expected[str(pair['well'])] = forecast
+
+        well_forecast_dict = candidate_index.well_forecast_dict(selected_forecasts)
+        assert list(well_forecast_dict.items()) == list(expected.items())
+        # the cached mapping is not shared with the caller
+        well_forecast_dict.clear()
+        assert candidate_index.well_forecast_dict(selected_forecasts) == expected
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('use_index', [False, True])
+def test_performance_of_get_neighbor_wells(benchmark, mocker, use_index):
+    from combocurve.services.proximity_forecast.proximity_forecast_service import ProximityForecastService
+
+    data, forecasts = candidate_well_data(50000)
+    targets = data['well_headers'][:100]
+    target_well_header_dict = {str(well['_id']): well for well in targets}
+    service = ProximityForecastService(MagicMock())
+    mocker.patch.object(service, '_create_proximity_rep_data',
+                        side_effect=lambda *args: [{'well_id': well} for well in args[4]])
+    mocker.patch.object(service, '_filter_valid_rep_data', side_effect=lambda phase, rep_data: rep_data)
+
+    def neighbor_params(target):
+        return {
+            'phase': 'oil',
+            'phase_type': 'rate',
+            'proximity_forecast_id': forecasts[0],
+            'target_well_id': str(target['_id']),
+            'neighbor_dict': {
+                'wellCountRange': {
+                    'start': 5,
+                    'end': 25
+                },
+                'selectedForecasts': forecasts,
+                'searchRadius': 10,
+                'selectedFields': list(CRITERIA),
+                **CRITERIA,
+            },
+        }
+
+    def search_all_targets():
+        # without the index, each search rebuilds it from the headers as before
+        candidates = {**data, 'candidate_index': CandidateWellIndex(data)} if use_index else data
+        for target in targets:
+            service.get_neighbor_wells(neighbor_params(target), candidates, target_well_header_dict)
+
+    benchmark(search_all_targets)
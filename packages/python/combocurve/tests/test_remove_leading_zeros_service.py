@@ -0,0 +1,44 @@
+from datetime import date
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from combocurve.dal.stubs import MonthlyProduction
+from combocurve.dal.types import to_timestamp_from_index
+from combocurve.dal.v1.monthly_production_pb2 import MonthlyProductionServiceFetchByWellResponse
+from combocurve.services.remove_leading_zeros_service import RemoveLeadingZeroService
+from combocurve.shared.date import date_from_index, datetime_from_index
+
+WELL_1 = str(ObjectId())
+WELL_2 = str(ObjectId())
+WELL_3 = str(ObjectId())
+
+
+def _response(well, index, **fields):
+    return MonthlyProductionServiceFetchByWellResponse(well=well,
+                                                       date=[to_timestamp_from_index(i) for i in index],
+                                                       **fields)
+
+
+@pytest.mark.unittest
+def test_zero_ranges_by_well():
+    monthly_production = MonthlyProduction(MagicMock())
+    fetch_by_well = monthly_production.monthly_production_stub.FetchByWell
+    fetch_by_well.return_value = iter([
+        # a date has data when any of its fields does
+        _response(WELL_1, [43000, 43031, 43059, 43090], oil=[0., 0., 5., 0.], gas=[0., np.nan, 0., 1.]),
+        _response(WELL_2, [43000, 43031], oil=[0., 0.], gas=[np.nan, 0.]),
+        _response(WELL_3, [43000, 43031], oil=[1., 0.], gas=[0., 0.]),
+    ])
+
+    zero_ranges, first_prods = RemoveLeadingZeroService._get_zero_ranges_by_well([WELL_1, WELL_2, WELL_3],
+                                                                                 monthly_production, ['oil', 'gas'])
+
+    assert list(fetch_by_well.call_args.args[0].field_mask.paths) == ['well', 'date', 'oil', 'gas']
+    assert first_prods == {WELL_1: datetime_from_index(43059), WELL_3: datetime_from_index(43000)}
+    assert zero_ranges == {
+        WELL_1: [date(1900, 1, 1), date_from_index(43031)],
+        WELL_2: [date(1900, 1, 1), date_from_index(43031)],
+    }
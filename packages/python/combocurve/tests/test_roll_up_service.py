@@ -0,0 +1,321 @@
+import copy
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+from bson import ObjectId
+
+from combocurve.science.econ.econ_use_forecast import shared_predictions
+from combocurve.science.econ.daily_volume import get_daily_forecast
+from combocurve.science.segment_models.multiple_segments import MultipleSegments
+from combocurve.services.econ.econ_and_roll_up_batch_query import DEFAULT_ASSUMPTION
+from combocurve.services.rollUp.roll_up_accumulator import ByWellRollUpAccumulator
+from combocurve.services.rollUp.roll_up_calculation import (calculate_well_count, single_well_volume,
+                                                            single_well_volume_daily)
+from combocurve.services.rollUp.roll_up_service import (FORECAST_ROLL_UP_STREAMS, NONE_BY_PHASE, ONLY_FORECAST,
+                                                        ONLY_PRODUCTION, ROLL_UP_TYPE, STITCH, STREAM_TYPE_NAME,
+                                                        RollUpService, get_key, well_roll_up_volumes)
+
+ALL_VOLUME_TYPES = {ONLY_PRODUCTION: True, ONLY_FORECAST: True, STITCH: True}
+DATES = {'start': '2019-01-01', 'end': '2040-12-31', 'ignoreForecast': None}
+COLUMNS_SELECTED = ['well_count_curve'] + FORECAST_ROLL_UP_STREAMS[1:]
+PARAMS = {
+    'columns_selected': COLUMNS_SELECTED,
+    'dates': DATES,
+    'groups': ['county'],
+    'volume_type': ALL_VOLUME_TYPES,
+    'run_id': str(ObjectId()),
+    'batch_index': 3,
+    'project_id': str(ObjectId()),
+    'project_name': 'project',
+    'user_id': str(ObjectId()),
+    'user_name': 'user',
+    'created_at': '2023-05-01T12:00:00.000Z',
+    'scenario_id': str(ObjectId()),
+    'scenario_name': 'scenario',
+}
+
+
+@pytest.fixture(autouse=True)
+def mock_evaluate_boolean_flag(mocker):
+    # Patch local version of the evaluate_boolean_flag function so we can control the return value and not reach out
+    # to LaunchDarkly
+    mocker.patch('combocurve.science.econ.econ_calculations.volume.evaluate_boolean_flag', return_value=False)
+
+
+def _fill(name, **fields):
+    return MultipleSegments.fill_segment({'name': name, **fields}, name, [])
+
+
+def rate_forecast(start, q_start):
+    segments = [
+        _fill('arps_modified', start_idx=start, end_idx=start + 3000, q_start=q_start, b=1.1, D_eff=0.7,
+              target_D_eff_sw=0.08),
+        _fill('exp_dec', start_idx=start + 3001, end_idx=start + 15000, q_start=q_start / 8, D_eff=0.1),
+    ]
+    return {
+        'forecastType': 'rate',
+        'forecasted': True,
+        'data_freq': 'monthly',
+        'P_dict': {
+            'best': {
+                'segments': segments
+            }
+        },
+    }
+
+
+def ratio_forecast(start, base_phase):
+    segments = [_fill('flat', start_idx=start, end_idx=start + 15000, q_start=0.6)]
+    return {'forecastType': 'ratio', 'forecasted': True, 'data_freq': 'monthly', 'ratio': {
+        'segments': segments,
+        'basePhase': base_phase
+    }}
+
+
+def monthly_production(first_month, n_months, q, rng):
+    months = np.arange(np.datetime64(first_month, 'M'), np.datetime64(first_month, 'M') + n_months)
+    index = ((months.astype('datetime64[D]') + 14) - np.datetime64('1900-01-01')).astype(int)
+    return {'index': index, 'value': rng.uniform(0.5, 1.5, n_months) * q * 30, 'data_freq': 'monthly'}
+
+
+def roll_up_input(i, rng):
+    first_month = np.datetime64('2017-06') + int(rng.integers(0, 36))
+    n_months = int(rng.integers(6, 48))
+    after_production = int((first_month + n_months).astype('datetime64[D]').astype(int)) + 25567
+    # some forecasts are fit from the first production, some start after it
+    forecast_start = after_production - int(rng.integers(0, 2)) * 30 * n_months
+    return {
+        'well': {
+            '_id': ObjectId(f'{i:024x}'),
+            'well_name': f'well {i}',
+            'well_number': None if i % 3 else str(i),
+            'chosenID': str(1000 + i),
+            'api14': None,
+            'county': str(i % 3),
+            'first_prod_date': None,
+        },
+        'production_data': {
+            phase: monthly_production(first_month, n_months, q, rng)
+            for phase, q in [('oil', 500), ('gas', 2000), ('water', 300)]
+        },
+        'forecast_data': {
+            'oil': rate_forecast(forecast_start, 400),
+            'gas': rate_forecast(forecast_start, 1500),
+            'water': ratio_forecast(forecast_start, 'gas') if i % 2 else rate_forecast(forecast_start, 250),
+        },
+        'p_series': 'P50',
+        'assumptions': copy.deepcopy(DEFAULT_ASSUMPTION),
+        'schedule': {},
+        'dates': DATES,
+        'columns_selected': COLUMNS_SELECTED,
+    }
+
+
+def roll_up_inputs(n_wells, seed=0):
+    rng = np.random.default_rng(seed)
+    return [roll_up_input(i, rng) for i in range(n_wells)]
+
+
+def roll_up_types_one_by_one(this_input, volume_type, data_freq):
+    volume_function = single_well_volume if data_freq == 'monthly' else single_well_volume_daily
+    ret = []
+    for roll_up_type in ROLL_UP_TYPE:
+        if not volume_type[roll_up_type]:
+            continue
+        if roll_up_type == ONLY_PRODUCTION:
+            this_input_updated = {**this_input, 'forecast_data': NONE_BY_PHASE}
+        elif roll_up_type == ONLY_FORECAST:
+            this_input_updated = {**this_input, 'production_data': NONE_BY_PHASE}
+        else:
+            this_input_updated = {**this_input}
+        ret.append((roll_up_type, calculate_well_count(volume_function(this_input_updated))))
+    return ret
+
+
+def assert_same_volumes(volumes, expected):
+    assert [roll_up_type for roll_up_type, _ in volumes] == [roll_up_type for roll_up_type, _ in expected]
+    for (_, well_volume), (_, expected_well_volume) in zip(volumes, expected):
+        assert well_volume.keys() == expected_well_volume.keys()
+        for column in expected_well_volume:
+            assert np.array_equal(well_volume[column], expected_well_volume[column]), column
+
+
+@pytest.mark.unittest
+def test_single_pass_roll_up_matches_the_roll_up_types_one_by_one():
+    for this_input in roll_up_inputs(6):
+        error_log = []
+        volumes = well_roll_up_volumes(this_input, ALL_VOLUME_TYPES, 'monthly', error_log)
+
+        assert not error_log
+        assert_same_volumes(volumes, roll_up_types_one_by_one(this_input, ALL_VOLUME_TYPES, 'monthly'))
+
+
+@pytest.mark.unittest
+def test_daily_forecasts_are_sliced_from_the_shared_predictions():
+    forecast_data = roll_up_input(1, np.random.default_rng(0))['forecast_data']
+    start = forecast_data['gas']['P_dict']['best']['segments'][0]['start_idx']
+    days_and_phases = [(days, phase) for days in [(start + 400, start + 9000), (start - 30, start + 12000),
+                                                  (start, start + 500)] for phase in ['gas', 'water']]
+
+    with shared_predictions.shared_forecast_predictions():
+        shared = [get_daily_forecast(*days, forecast_data, phase, 'best') for days, phase in days_and_phases]
+
+    expected = [get_daily_forecast(*days, forecast_data, phase, 'best') for days, phase in days_and_phases]
+    for (index, volumes), (expected_index, expected_volumes) in zip(shared, expected):
+        assert np.array_equal(index, expected_index)
+        assert np.array_equal(volumes, expected_volumes)
+
+
+@pytest.mark.unittest
+def test_only_the_selected_volume_types_are_rolled_up(mocker):
+    this_input = roll_up_inputs(1)[0]
+    volume_type = {ONLY_PRODUCTION: False, ONLY_FORECAST: True, STITCH: True}
+    predict = mocker.spy(shared_predictions.multi_seg, 'predict')
+
+    volumes = well_roll_up_volumes(this_input, volume_type, 'monthly', [])
+
+    # the forecast of every phase is predicted once for both types and their risked and pre-risk volumes
+    assert predict.call_count == 3
+    assert_same_volumes(volumes, roll_up_types_one_by_one(this_input, volume_type, 'monthly'))
+
+
+@pytest.mark.unittest
+def test_failed_roll_up_types_are_logged_and_left_out():
+    this_input = roll_up_inputs(1)[0]
+    this_input['production_data'] = {**this_input['production_data'], 'oil': {'data_freq': 'monthly'}}
+    error_log = []
+
+    volumes = well_roll_up_volumes(this_input, ALL_VOLUME_TYPES, 'monthly', error_log)
+
+    assert [roll_up_type for roll_up_type, _ in volumes] == [ONLY_FORECAST]
+    assert [error['well_id'] for error in error_log] == [this_input['well']['_id']] * 2
+
+
+def appended_well_frames(roll_up_inputs):
+    df_roll_up = pd.DataFrame()
+    for this_input in roll_up_inputs:
+        key = get_key(this_input, PARAMS['groups'])
+        for roll_up_type, this_well_volume in roll_up_types_one_by_one(this_input, ALL_VOLUME_TYPES, 'monthly'):
+            well_data = {
+                'well_id': str(this_input['well'].get('_id')),
+                'group_key': key,
+                'well_name': str(this_input['well'].get('well_name')),
+                'well_number': this_input['well'].get('well_number'),
+                'inpt_id': this_input['well'].get('inptID'),
+                'chosen_id': this_input['well'].get('chosenID'),
+                'api14': this_input['well'].get('api14'),
+                'rollup_type': STREAM_TYPE_NAME[roll_up_type],
+            }
+            df_one_group = pd.DataFrame(this_well_volume)
+            well_data_df = pd.DataFrame([well_data] * len(df_one_group))
+            df_roll_up = pd.concat([df_roll_up, pd.concat([well_data_df, df_one_group], axis=1)])
+    return df_roll_up
+
+
+def summed_group_volumes(roll_up_inputs, with_total=False):
+    ret = {}
+    for this_input in roll_up_inputs:
+        key = get_key(this_input, PARAMS['groups'])
+        for roll_up_type, this_well_volume in roll_up_types_one_by_one(this_input, ALL_VOLUME_TYPES, 'monthly'):
+            for group in [key, 'total'] if with_total else [key]:
+                group_volumes = ret.setdefault(group, {})
+                if roll_up_type not in group_volumes:
+                    group_volumes[roll_up_type] = copy.deepcopy(this_well_volume)
+                else:
+                    for col, values in this_well_volume.items():
+                        if col != 'date':
+                            group_volumes[roll_up_type][col] = np.add(group_volumes[roll_up_type][col], values)
+    return ret
+
+
+def summed_group_frames(ret_by_group):
+    group_dict = {}
+    for group, types in ret_by_group.items():
+        for roll_up_type, volumes in types.items():
+            n = len(volumes['date'])
+            for col, values in volumes.items():
+                group_dict.setdefault(col, []).extend(values if col == 'date' else np.asarray(values, float).tolist())
+            group_dict.setdefault('group_key', []).extend([group] * n)
+            group_dict.setdefault('rollup_type', []).extend([STREAM_TYPE_NAME[roll_up_type]] * n)
+    df_roll_up = pd.DataFrame(group_dict)
+    df_roll_up['batch_id'] = PARAMS['batch_index']
+    return df_roll_up
+
+
+def uploaded_roll_up_df(service, by_well):
+    service.group_roll_up(roll_up_inputs(8), {**PARAMS, 'by_well': by_well})
+    (_, df_roll_up, pa_schema), _ = service.context.econ_output_service.upload_df_to_batch_bucket.call_args
+    return df_roll_up, pa_schema
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('by_well', [True, False])
+def test_roll_up_df_matches_the_frames_of_every_well(by_well):
+    service = RollUpService(MagicMock())
+
+    df_roll_up, pa_schema = uploaded_roll_up_df(service, by_well)
+
+    if by_well:
+        expected, roll_up_schema = appended_well_frames(roll_up_inputs(8)), dict(service.roll_up_well_schema)
+    else:
+        expected, roll_up_schema = summed_group_frames(summed_group_volumes(roll_up_inputs(8))), {}
+    service.process_group_roll_up_df(PARAMS, expected, 'scenario', roll_up_schema)
+    pd.testing.assert_frame_equal(df_roll_up.reset_index(drop=True), expected.reset_index(drop=True))
+    assert pa_schema.names == [name for name in roll_up_schema if name in expected.columns]
+
+
+@pytest.mark.unittest
+def test_api_roll_up_saves_the_total_of_the_groups():
+    context = MagicMock()
+    RollUpService(context).group_roll_up(roll_up_inputs(8), {**PARAMS, 'is_api': True})
+
+    (_, update), _ = context.scen_roll_up_runs_collection.update_one.call_args
+    expected = summed_group_volumes(roll_up_inputs(8), with_total=True)['total']
+    for roll_up_type, volumes in update['$set']['data.monthly'].items():
+        assert volumes['date'] == [str(date) for date in expected[roll_up_type]['date']]
+        for col, values in volumes.items():
+            if col != 'date':
+                assert values == np.asarray(expected[roll_up_type][col], float).tolist()
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('single_pass', [False, True])
+def test_performance_of_roll_up_types(benchmark, single_pass):
+    inputs = roll_up_inputs(20000)
+
+    def roll_up():
+        for this_input in inputs:
+            if single_pass:
+                well_roll_up_volumes(this_input, ALL_VOLUME_TYPES, 'monthly', [])
+            else:
+                roll_up_types_one_by_one(this_input, ALL_VOLUME_TYPES, 'monthly')
+
+    benchmark.pedantic(roll_up, rounds=1)
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('accumulator', [False, True])
+def test_performance_of_by_well_roll_up_df(benchmark, accumulator):
+    well_volume = roll_up_types_one_by_one(roll_up_inputs(1)[0], {**ALL_VOLUME_TYPES, ONLY_PRODUCTION: False},
+                                           'monthly')[0][1]
+    well_header = roll_up_inputs(1)[0]['well']
+
+    def roll_up_df():
+        if accumulator:
+            by_well = ByWellRollUpAccumulator(2000 * 3)
+            for _ in range(2000 * 3):
+                by_well.add(well_header, 'total', 'stitch', well_volume)
+            return by_well.to_df()
+
+        df_roll_up = pd.DataFrame()
+        for _ in range(2000 * 3):
+            df_one_group = pd.DataFrame(well_volume)
+            well_data_df = pd.DataFrame([{'well_id': str(well_header['_id']), 'rollup_type': 'stitch'}] * 264)
+            df_roll_up = pd.concat([df_roll_up, pd.concat([well_data_df, df_one_group], axis=1)])
+        return df_roll_up
+
+    benchmark.pedantic(roll_up_df, rounds=1)
@@ -0,0 +1,159 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from scipy.optimize import differential_evolution
+
+from combocurve.science.forecast_models.model_manager import mm
+from combocurve.science.optimization_module.optimizers import optimizers
+from combocurve.science.type_curve.skeleton_TC_new1 import fit_tc, multi_seg, shifted_sum
+from combocurve.shared.constants import DAYS_IN_MONTH
+
+T_FIRST = 43000
+NUM_MONTH = 240
+P2_SEG_PARA = {
+    't_first': T_FIRST,
+    't_end_data': T_FIRST,
+    't_end_life': T_FIRST + 30 * 365,
+    'q_final': 0.1,
+    'D_lim_eff': 0.06,
+    'enforce_sw': False
+}
+BOUNDS = [(100, 3000), (1e-4, 1e-2)]
+
+
+def legacy_shifted_sum(pred, cum_subind, cum_length):
+    n_wells = cum_subind.shape[0]
+    cum_vecind = np.zeros(n_wells * cum_length, dtype=bool)
+    for i in range(n_wells):
+        cum_vecind[(i * cum_length + cum_subind[i, 0]):(i * cum_length + cum_subind[i, 1])] = True
+    pred_vec = np.zeros(cum_vecind.shape)
+    pred_vec[cum_vecind] = np.tile(pred, n_wells)
+    return np.nansum(pred_vec.reshape((n_wells, -1)), axis=0)
+
+
+def cum_subind_and_hist(n_wells, max_offset=120, seed=0):
+    starts = np.random.default_rng(seed).integers(0, max_offset, n_wells)
+    return np.stack([starts, starts + NUM_MONTH], axis=1), np.bincount(starts).astype(float)
+
+
+def loss_args(target, offset_hist):
+    cum_pred_t_vec = np.round(np.arange(NUM_MONTH, dtype=float) * DAYS_IN_MONTH) + T_FIRST + 15
+    para_insert_list = [{'part': 'p_fixed', 'ind': 3}, {'part': 'p', 'ind': 1}]
+    return ([0, target.shape[0]], np.array([100., 2e-3]), np.array([T_FIRST, 0., 60., 800.]), 'exp_inc_exp_dec',
+            para_insert_list, cum_pred_t_vec, target, offset_hist, P2_SEG_PARA, {'apply': False}, T_FIRST + 60)
+
+
+def predict(para, args):
+    _, benchmark_p, benchmark_p_fixed, TC_model, para_insert_list, cum_pred_t_vec, _, _, p2_seg_para, buildup_dict, t_peak = args  # noqa: E501
+    segments = mm.models[TC_model].TC_cum_p2seg(para, benchmark_p.copy(), benchmark_p_fixed.copy(), para_insert_list,
+                                                t_peak, buildup_dict, p2_seg_para)
+    return multi_seg.predict(cum_pred_t_vec, segments)
+
+
+def legacy_loss(para, *args):
+    *args, cum_subind, loss_name = args
+    target = args[6]
+    this_sum = legacy_shifted_sum(predict(para, args), cum_subind, target.shape[0])
+    this_pred = this_sum if loss_name == 'sum' else np.nancumsum(this_sum)
+    return np.nanmean(np.abs(target - this_pred))
+
+
+@pytest.mark.unittest
+def test_shifted_sum_matches_scattered_wells():
+    cum_subind, offset_hist = cum_subind_and_hist(300)
+    cum_length = cum_subind[:, 1].max()
+    pred = np.random.default_rng(1).random(NUM_MONTH) * 1000
+    pred[[5, 17]] = np.nan
+
+    np.testing.assert_allclose(shifted_sum(pred, offset_hist),
+                               legacy_shifted_sum(pred, cum_subind, cum_length),
+                               rtol=1e-13)
+
+    # infinite predictions stay infinite only where a well covers them
+    pred[30] = np.inf
+    np.testing.assert_allclose(shifted_sum(pred, offset_hist),
+                               legacy_shifted_sum(pred, cum_subind, cum_length),
+                               rtol=1e-13)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('loss_name', ['sum', 'cum'])
+def test_losses_match_scattered_wells(loss_name):
+    cum_subind, offset_hist = cum_subind_and_hist(200)
+    target_sum = legacy_shifted_sum(1000 * np.exp(-np.arange(NUM_MONTH) / 40), cum_subind, cum_subind[:, 1].max())
+    target = target_sum if loss_name == 'sum' else target_sum.cumsum()
+    fit = fit_tc(MagicMock())
+    loss = fit.losses[loss_name]
+    args = loss_args(target, offset_hist)
+
+    for para in np.random.default_rng(2).uniform(*np.array(BOUNDS).T, (20, 2)):
+        expected_sum = legacy_shifted_sum(predict(para, args), cum_subind, target.shape[0])
+        expected = expected_sum if loss_name == 'sum' else np.nancumsum(expected_sum)
+        assert loss(para, *args) == pytest.approx(np.nanmean(np.abs(target - expected)), rel=1e-13)
+
+    # the evolution itself does not depend on how the wells are summed
+    result = differential_evolution(loss, BOUNDS, args=args, seed=1, maxiter=3, polish=False)
+    legacy_result = differential_evolution(legacy_loss,
+                                           BOUNDS,
+                                           args=(*args, cum_subind, loss_name),
+                                           seed=1,
+                                           maxiter=3,
+                                           polish=False)
+    np.testing.assert_array_equal(result.x, legacy_result.x)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('loss_name', ['sum', 'cum'])
+def test_population_losses_match_losses(loss_name):
+    cum_subind, offset_hist = cum_subind_and_hist(200)
+    target_sum = legacy_shifted_sum(1000 * np.exp(-np.arange(NUM_MONTH) / 40), cum_subind, cum_subind[:, 1].max())
+    target = target_sum if loss_name == 'sum' else target_sum.cumsum()
+    fit = fit_tc(MagicMock())
+    args = loss_args(target, offset_hist)
+    population = np.random.default_rng(3).uniform(*np.array(BOUNDS).T, (20, 2)).T
+
+    expected = [fit.losses[loss_name](para, *args) for para in population.T]
+    np.testing.assert_allclose(fit.population_losses[loss_name](population, *args), expected, rtol=1e-13)
+
+    result = optimizers['my_differential_evolution'](fit.population_losses[loss_name], {
+        'bounds': BOUNDS,
+        'args': args,
+        'seed': 1,
+        'maxiter': 3,
+        'polish': False,
+        'vectorized': True
+    })
+    deferred_result = differential_evolution(fit.losses[loss_name],
+                                             BOUNDS,
+                                             args=args,
+                                             seed=1,
+                                             maxiter=3,
+                                             polish=False,
+                                             updating='deferred')
+    np.testing.assert_array_equal(result.x, deferred_result.x)
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('n_wells', [50, 500, 2000])
+def test_performance_of_sum_loss(benchmark, n_wells):
+    cum_subind, offset_hist = cum_subind_and_hist(n_wells)
+    target = legacy_shifted_sum(1000 * np.exp(-np.arange(NUM_MONTH) / 40), cum_subind, cum_subind[:, 1].max())
+    args = loss_args(target, offset_hist)
+
+    benchmark(lambda: fit_tc(MagicMock()).sum(np.array([1000., 1e-3]), *args))
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_performance_of_sum_fit(benchmark, vectorized):
+    # the OPS column is the number of fits per second
+    cum_subind, offset_hist = cum_subind_and_hist(500)
+    target = legacy_shifted_sum(1000 * np.exp(-np.arange(NUM_MONTH) / 40), cum_subind, cum_subind[:, 1].max())
+    fit = fit_tc(MagicMock())
+    loss = fit.population_losses['sum'] if vectorized else fit.losses['sum']
+    para = {'bounds': BOUNDS, 'args': loss_args(target, offset_hist), 'seed': 1, 'maxiter': 5, 'vectorized': vectorized}
+
+    benchmark(lambda: optimizers['my_differential_evolution'](loss, para))
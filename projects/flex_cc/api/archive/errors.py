@@ -1,2 +1,6 @@
 class InvalidProjectError(Exception):
     expected = True
+
+
+class InvalidArchiveError(Exception):
+    pass
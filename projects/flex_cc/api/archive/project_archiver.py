@@ -17,8 +17,10 @@ from combocurve.shared.mongo import (get_ids_query, get_shapefile_belongs_to_pro
                                      get_belongs_to_project_query, get_belongs_to_forecasts_query,
                                      get_belongs_to_type_curves_query)
 from .errors import InvalidProjectError
-from .utils import (generate_version_name, get_docs_file_name, get_ids_file_name, get_storage_directory,
-                    make_archive_cf_request, get_econ_file_names, FILES_BATCH_SIZE)
+from .step_scheduler import StepScheduler
+from .utils import (generate_version_name, get_docs_file_name, get_ids_file_name, get_manifest_file_name,
+                    get_storage_directory, make_archive_cf_request, get_econ_file_names,
+                    is_dal_production_batch_enabled, FILES_BATCH_SIZE, DAL_PRODUCTION_BATCH_SIZE)
 from combocurve.shared.db_context import DbContext
 
 PROJECT_METADATA_LIMIT = 10000
@@ -143,63 +145,72 @@ class ProjectArchiver:
         self.project_custom_headers_datas_ids: Optional[List[ObjectId]] = None
 
     def _archive_collections(self):
-        self._archive_wells()
-        self._archive_monthly_prod_data()
-        self._archive_daily_prod_data()
-        self._archive_well_directional_surveys()
-
-        self._archive_scenarios()
-        self._archive_scenario_well_assignments()
-        self._archive_assumptions()
-
-        self._archive_forecasts()
-        self._archive_forecast_buckets()
-        self._archive_deterministic_forecast_datas()
-        self._archive_forecast_datas()
-        self._archive_forecast_well_assignments()
-        self._archive_proximity_forecast_datas()
-
-        self._archive_type_curves()
-        self._archive_type_curve_normalizations()
-        self._archive_type_curve_fits()
-        self._archive_type_curve_umbrellas()
-        self._archive_type_curve_normalization_wells()
-        self._archive_type_curve_well_assignments()
-
-        self._archive_schedules()
-        self._archive_schedule_settings()
-        self._archive_schedule_constructions()
-        self._archive_schedule_input_qualifiers()
-        self._archive_schedule_well_outputs()
-
-        self._archive_scen_roll_up_runs()
-        self._archive_econ_runs()
-        self._archive_econ_groups()
-        self._archive_econ_runs_datas()
-        self._archive_files()
+        scheduler = StepScheduler()
+
+        scheduler.add('wells', self._archive_wells)
+        scheduler.add('monthly-productions', self._archive_monthly_prod_data, depends_on=['wells'])
+        scheduler.add('daily-productions', self._archive_daily_prod_data, depends_on=['wells'])
+        scheduler.add('well-directional-surveys', self._archive_well_directional_surveys, depends_on=['wells'])
+
+        scheduler.add('scenarios', self._archive_scenarios)
+        scheduler.add('scenario-well-assignments', self._archive_scenario_well_assignments)
+        scheduler.add('assumptions', self._archive_assumptions)
+
+        scheduler.add('forecasts', self._archive_forecasts)
+        scheduler.add('forecast-buckets', self._archive_forecast_buckets, depends_on=['forecasts'])
+        scheduler.add('deterministic-forecast-datas', self._archive_deterministic_forecast_datas)
+        scheduler.add('forecast-datas', self._archive_forecast_datas)
+        scheduler.add('forecast-well-assignments', self._archive_forecast_well_assignments, depends_on=['forecasts'])
+        scheduler.add('proximity-forecast-datas', self._archive_proximity_forecast_datas)
+
+        scheduler.add('type-curves', self._archive_type_curves)
+        scheduler.add('type-curve-normalizations', self._archive_type_curve_normalizations, depends_on=['type-curves'])
+        scheduler.add('type-curve-fits', self._archive_type_curve_fits, depends_on=['type-curves'])
+        scheduler.add('type-curve-umbrellas', self._archive_type_curve_umbrellas, depends_on=['type-curves'])
+        scheduler.add('type-curve-normalization-wells',
+                      self._archive_type_curve_normalization_wells,
+                      depends_on=['type-curves'])
+        scheduler.add('type-curve-well-assignments',
+                      self._archive_type_curve_well_assignments,
+                      depends_on=['type-curves'])
+
+        scheduler.add('schedules', self._archive_schedules)
+        scheduler.add('schedule-settings', self._archive_schedule_settings)
+        scheduler.add('schedule-constructions', self._archive_schedule_constructions)
+        scheduler.add('schedule-input-qualifiers', self._archive_schedule_input_qualifiers)
+        scheduler.add('schedule-well-outputs', self._archive_schedule_well_outputs)
+
+        scheduler.add('scen-roll-up-runs', self._archive_scen_roll_up_runs)
+        scheduler.add('econ-runs', self._archive_econ_runs)
+        scheduler.add('econ-groups', self._archive_econ_groups)
+        scheduler.add('econ-runs-datas', self._archive_econ_runs_datas)
+        scheduler.add('files', self._archive_files, depends_on=['econ-runs'])
 
         ## ghg
-        self._archive_ghg_runs()
-        self._archive_networks()
-        self._archive_facilities()
+        scheduler.add('ghg-runs', self._archive_ghg_runs)
+        scheduler.add('networks', self._archive_networks)
+        scheduler.add('facilities', self._archive_facilities)
 
-        self._archive_lookup_tables()
-        self._archive_forecast_lookup_tables()
-        self._archive_embedded_lookup_tables()
+        scheduler.add('lookup-tables', self._archive_lookup_tables)
+        scheduler.add('forecast-lookup-tables', self._archive_forecast_lookup_tables)
+        scheduler.add('embedded-lookup-tables', self._archive_embedded_lookup_tables)
 
-        self._archive_econ_report_export_configurations()
-        self._archive_econ_report_export_default_user_configurations()
+        scheduler.add('econ-report-export-configurations', self._archive_econ_report_export_configurations)
+        scheduler.add('econ-report-export-default-user-configurations',
+                      self._archive_econ_report_export_default_user_configurations)
 
-        self._archive_shapefiles()
+        scheduler.add('shapefiles', self._archive_shapefiles)
 
-        self._archive_migrations()
+        scheduler.add('migrations', self._archive_migrations)
 
-        self._archive_filters()
+        scheduler.add('filters', self._archive_filters)
 
-        self._archive_project_custom_headers()
-        self._archive_project_custom_headers_datas()
+        scheduler.add('project-custom-headers', self._archive_project_custom_headers)
+        scheduler.add('project-custom-headers-datas', self._archive_project_custom_headers_datas)
 
-        self._archive_project()
+        scheduler.add('projects', self._archive_project)
+
+        scheduler.run()
 
     def cleanup(self):
         execute_all([
@@ -237,6 +248,17 @@ class ProjectArchiver:
 
         make_archive_cf_request(body=body, headers=self.context.headers)
 
+    def _call_archive_production_dal_batch_cf(self, collection_name: str, well_str_ids: List[str], file_name: str):
+        body = {
+            'operation': 'archive-production-dal',
+            'gcp_buckets': self.gcp_buckets,
+            'collectionName': collection_name,
+            'fileName': file_name,
+            'wellIds': well_str_ids
+        }
+
+        make_archive_cf_request(body=body, headers=self.context.headers)
+
     def _call_archive_files_cf(self, source_bucket_name: str, file_names: List[str]):
         body = {
             'operation': 'archive_files',
@@ -253,10 +275,14 @@ class ProjectArchiver:
         self._call_archive_cf(collection_name, str_ids, file_name)
         self.progress_event_receiver.progress(get_progress_name('archive', collection_name), len(batch) / ids_count)
 
-    def _archive_production_dal_batch(self, collection_name: str, batches: int, well_str_id: str, batch_index: int):
+    def _archive_production_dal_well(self, collection_name: str, wells_count: int, well_str_id: str):
         file_name = get_docs_file_name(self.storage_directory, collection_name, well_str_id)
         self._call_archive_production_dal_cf(collection_name, well_str_id, file_name)
-        self.progress_event_receiver.progress(get_progress_name('archive', collection_name), batch_index / batches)
+        self.progress_event_receiver.progress(get_progress_name('archive', collection_name), 1 / wells_count)
+
+    def _archive_production_dal_batch(self, collection_name: str, wells_count: int, file_name: str, batch: List[str]):
+        self._call_archive_production_dal_batch_cf(collection_name, batch, file_name)
+        self.progress_event_receiver.progress(get_progress_name('archive', collection_name), len(batch) / wells_count)
 
     def _archive_collection(self, collection: Collection, ids: List[ObjectId], batch_size=1000):
         collection_name = collection.name
@@ -277,10 +303,15 @@ class ProjectArchiver:
 
         return ids
 
-    def _archive_dal_production(self, collection_name: str, wells: List[str]):
+    def _archive_dal_production(self, collection_name: str, wells: List[str],
+                                batch_size=DAL_PRODUCTION_BATCH_SIZE):
         """
         Method for archiving production data using DAL.
 
+        When the archive cloud function takes batches of wells, wells are archived in batches of `batch_size`, one
+        file per batch, and the manifest file of the collection stores the wells of every batch file for the restore.
+        Otherwise every well is archived to its own file, named after the well id.
+
         Parameters
         ----------
         collection_name : str
@@ -291,10 +322,24 @@ class ProjectArchiver:
         """
 
         with timeit_context(f'Archive {collection_name} with DAL'):
-            archive_fn = partial(self._archive_production_dal_batch, collection_name, len(wells))
-
-            for index, well_str_id in enumerate(wells):
-                archive_fn(well_str_id, index)
+            if is_dal_production_batch_enabled(self.context.tenant_info.get('db_name')):
+                manifest = {
+                    get_docs_file_name(self.storage_directory, collection_name, index): batch
+                    for index, batch in zip(padded_indexes(math.ceil(len(wells) / batch_size)),
+                                            split_in_chunks(wells, batch_size))
+                }
+                archive_fn = partial(self._archive_production_dal_batch, collection_name, len(wells))
+
+                with ThreadPoolExecutor(max_workers=20) as executor:
+                    list(executor.map(archive_fn, list(manifest), list(manifest.values())))
+
+                manifest_file_name = get_manifest_file_name(self.storage_directory, collection_name)
+                self.archive_store_service.store_manifest_to_gcs(manifest, manifest_file_name)
+            else:
+                archive_fn = partial(self._archive_production_dal_well, collection_name, len(wells))
+
+                with ThreadPoolExecutor(max_workers=20) as executor:
+                    list(executor.map(archive_fn, wells))
 
             if not wells:
                 self.progress_event_receiver.progress(get_progress_name('archive', collection_name), 1)
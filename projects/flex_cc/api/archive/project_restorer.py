@@ -6,13 +6,16 @@ from typing import List, Mapping, Optional
 from concurrent.futures import ThreadPoolExecutor
 
 from bson import ObjectId
+from google.api_core.exceptions import NotFound
 
 from api.archive.abstract_progress_event_receiver import AbstractProgressEventReceiver, get_progress_name
 from api.archive.collection_id_mappings import CollectionIdMappings
+from api.archive.errors import InvalidArchiveError
 from api.archive.project_updater import ProjectUpdater
-from api.archive.utils import (get_ids_file_name, get_docs_file_name, get_archive_extra_file_name,
-                               make_archive_cf_request, make_migrate_cf_request, get_econ_file_names, FILES_BATCH_SIZE,
-                               make_cloud_run_request)
+from api.archive.step_scheduler import StepScheduler
+from api.archive.utils import (get_ids_file_name, get_docs_file_name, get_manifest_file_name,
+                               get_archive_extra_file_name, make_archive_cf_request, make_migrate_cf_request,
+                               get_econ_file_names, FILES_BATCH_SIZE, make_cloud_run_request)
 from combocurve.shared.config import COPY_CLOUD_RUN_URL
 from combocurve.models.access_policy import ResourceType, MemberType, PROJECT_ADMIN_ROLE
 from combocurve.models.archived_project import ARCHIVE_PROJECT_VERSIONS
@@ -171,8 +174,11 @@ class ProjectRestorer:
     def _restore_collections(self):
         collection_names_to_restore = self.collection_names + ['migrations']
 
+        # every collection is restored to its own collection in the temporary db, they don't depend on each other
+        scheduler = StepScheduler()
         for collection_name in collection_names_to_restore:
-            self._restore_collection(collection_name)
+            scheduler.add(collection_name, partial(self._restore_collection, collection_name))
+        scheduler.run()
 
     def _update_collections(self):
         # here we use the temporary db as db_context
@@ -329,6 +335,21 @@ class ProjectRestorer:
 
         make_archive_cf_request(body=body, headers=self.context.headers)
 
+    def _call_restore_dal_production_batch_cf(self, collection_name: str, file_name: str, wells: List[str]):
+        restored_project_id = str(self.id_mappings.projects[self.archived_project.projectId])
+
+        body = {
+            'operation': 'restore-production-dal',
+            'gcp_buckets': self.gcp_buckets,
+            'fileName': file_name,
+            'collectionName': collection_name,
+            'restoredProjectId': restored_project_id,
+            'restoredWellIds': {well_id: str(self.id_mappings.wells[ObjectId(well_id)])
+                                for well_id in wells}
+        }
+
+        make_archive_cf_request(body=body, headers=self.context.headers)
+
     def _call_restore_files_cf(self, target_bucket_name: str, file_names_mapping=None):
         if file_names_mapping is None:
             file_names_mapping = {}
@@ -382,17 +403,44 @@ class ProjectRestorer:
             self._call_restore_dal_production_data_from_v1_cf('daily-productions')
             self.progress_event_receiver.progress(get_progress_name('restore', 'daily-productions'), 1)
 
-    def _restore_dal_production_data(self, collection_name: str):
-        with timeit_context(f'Restore {collection_name} DAL'):
-            files_prefix = get_docs_file_name(self.archived_project.storageDirectory, collection_name)
+    def _get_dal_production_batches(self, collection_name: str, files: List[str]):
+        '''Returns the (file name, wells) pairs of the files archived in batches, from the manifest of the collection'''
+        manifest_file_name = get_manifest_file_name(self.archived_project.storageDirectory, collection_name)
+        try:
+            manifest = self.archive_store_service.load_manifest_from_gcs(manifest_file_name)
+        except NotFound:
+            raise InvalidArchiveError(f'Missing the manifest of the archived {collection_name} files')
 
-            files = list(self.archive_store_service.list_files(files_prefix))
+        unmatched_files = [file_name for file_name in files if file_name not in manifest]
+        if unmatched_files:
+            raise InvalidArchiveError(
+                f'Archived {collection_name} files missing from the manifest: {", ".join(unmatched_files)}')
 
-            if files:
-                restore_fn = partial(self._call_restore_dal_production_data_cf, collection_name)
+        return [(file_name, manifest[file_name]) for file_name in files]
 
-                with ThreadPoolExecutor(max_workers=20) as executor:
-                    list(executor.map(restore_fn, files))
+    def _restore_dal_production_data(self, collection_name: str):
+        with timeit_context(f'Restore {collection_name} DAL'):
+            files_prefix = get_docs_file_name(self.archived_project.storageDirectory, collection_name)
+            manifest_file_name = get_manifest_file_name(self.archived_project.storageDirectory, collection_name)
+
+            files = list(self.archive_store_service.list_files(files_prefix, exclude={manifest_file_name}))
+
+            # production archived without batches has one file per well, named after the well id
+            well_files = [file_name for file_name in files if ObjectId.is_valid(file_name.split('_').pop())]
+            batch_files = [file_name for file_name in files if not ObjectId.is_valid(file_name.split('_').pop())]
+            batches = self._get_dal_production_batches(collection_name, batch_files) if batch_files else []
+
+            with ThreadPoolExecutor(max_workers=20) as executor:
+                futures = [
+                    executor.submit(self._call_restore_dal_production_data_cf, collection_name, file_name)
+                    for file_name in well_files
+                ]
+                futures += [
+                    executor.submit(self._call_restore_dal_production_batch_cf, collection_name, file_name, wells)
+                    for file_name, wells in batches
+                ]
+                for future in futures:
+                    future.result()
 
             self.progress_event_receiver.progress(get_progress_name('restore', collection_name), 1)
 
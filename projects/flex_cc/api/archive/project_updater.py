@@ -12,6 +12,7 @@ from pymongo.collection import Collection
 
 from api.archive.abstract_progress_event_receiver import get_progress_name, AbstractProgressEventReceiver
 from api.archive.collection_id_mappings import CollectionIdMappings
+from api.archive.step_scheduler import StepScheduler
 from api.archive.utils import make_archive_cf_request
 from combocurve.shared.db_context import DbContext
 from combocurve.shared.doc_mapper import NEW_INPT_ID
@@ -61,64 +62,68 @@ class ProjectUpdater:
     def update(self):
         self._store_id_mappings()
 
-        self._update_wells()
-        self._update_monthly_prod_data()
-        self._update_daily_prod_data()
-        self._update_well_directional_surveys_data()
-
-        self._update_scenarios()
-        self._update_scenario_well_assignments()
-        self._update_assumptions()
-
-        self._update_forecasts()
-        self._update_forecast_buckets()
-        self._update_deterministic_forecast_datas()
-        self._update_forecast_datas()
-        self._update_forecast_well_assignments()
-        self._update_proximity_forecast_datas()
-
-        self._update_type_curves()
-        self._update_type_curve_normalizations()
-        self._update_type_curve_fits()
-        self._update_type_curve_umbrellas()
-        self._update_type_curve_normalization_wells()
-        self._update_type_curve_well_assignments()
-
-        self._update_schedules()
-        self._update_schedule_settings()
-        self._update_schedule_constructions()
-        self._update_schedule_input_qualifiers()
-        self._update_schedule_well_outputs()
-
-        self._update_shapefiles()
-
-        self._update_scen_roll_up_runs()
-        self._update_econ_runs()
-        self._update_econ_runs_datas()
-        self._update_econ_groups()
+        # the id mappings are stored up front, so each collection is updated independently of the others
+        scheduler = StepScheduler()
+
+        scheduler.add('wells', self._update_wells)
+        scheduler.add('monthly_prod_data', self._update_monthly_prod_data)
+        scheduler.add('daily_prod_data', self._update_daily_prod_data)
+        scheduler.add('well_directional_surveys_data', self._update_well_directional_surveys_data)
+
+        scheduler.add('scenarios', self._update_scenarios)
+        scheduler.add('scenario_well_assignments', self._update_scenario_well_assignments)
+        scheduler.add('assumptions', self._update_assumptions)
+
+        scheduler.add('forecasts', self._update_forecasts)
+        scheduler.add('forecast_buckets', self._update_forecast_buckets)
+        scheduler.add('deterministic_forecast_datas', self._update_deterministic_forecast_datas)
+        scheduler.add('forecast_datas', self._update_forecast_datas)
+        scheduler.add('forecast_well_assignments', self._update_forecast_well_assignments)
+        scheduler.add('proximity_forecast_datas', self._update_proximity_forecast_datas)
+
+        scheduler.add('type_curves', self._update_type_curves)
+        scheduler.add('type_curve_normalizations', self._update_type_curve_normalizations)
+        scheduler.add('type_curve_fits', self._update_type_curve_fits)
+        scheduler.add('type_curve_umbrellas', self._update_type_curve_umbrellas)
+        scheduler.add('type_curve_normalization_wells', self._update_type_curve_normalization_wells)
+        scheduler.add('type_curve_well_assignments', self._update_type_curve_well_assignments)
+
+        scheduler.add('schedules', self._update_schedules)
+        scheduler.add('schedule_settings', self._update_schedule_settings)
+        scheduler.add('schedule_constructions', self._update_schedule_constructions)
+        scheduler.add('schedule_input_qualifiers', self._update_schedule_input_qualifiers)
+        scheduler.add('schedule_well_outputs', self._update_schedule_well_outputs)
+
+        scheduler.add('shapefiles', self._update_shapefiles)
+
+        scheduler.add('scen_roll_up_runs', self._update_scen_roll_up_runs)
+        scheduler.add('econ_runs', self._update_econ_runs)
+        scheduler.add('econ_runs_datas', self._update_econ_runs_datas)
+        scheduler.add('econ_groups', self._update_econ_groups)
 
         # ghg
-        self._update_ghg_runs()
-        self._update_networks()
-        self._update_facilities()
+        scheduler.add('ghg_runs', self._update_ghg_runs)
+        scheduler.add('networks', self._update_networks)
+        scheduler.add('facilities', self._update_facilities)
 
         # lookup tables
-        self._update_lookup_tables()
-        self._update_forecast_lookup_tables()
-        self._update_embedded_lookup_tables()
+        scheduler.add('lookup_tables', self._update_lookup_tables)
+        scheduler.add('forecast_lookup_tables', self._update_forecast_lookup_tables)
+        scheduler.add('embedded_lookup_tables', self._update_embedded_lookup_tables)
 
         # econ report export configurations
-        self._update_econ_report_export_configurations()
-        self._update_econ_report_export_default_user_configurations()
+        scheduler.add('econ_report_export_configurations', self._update_econ_report_export_configurations)
+        scheduler.add('econ_report_export_default_user_configurations',
+                      self._update_econ_report_export_default_user_configurations)
 
-        self._update_filters()
+        scheduler.add('filters', self._update_filters)
 
-        self._update_project_custom_headers()
-        self._update_project_custom_headers_datas()
+        scheduler.add('project_custom_headers', self._update_project_custom_headers)
+        scheduler.add('project_custom_headers_datas', self._update_project_custom_headers_datas)
 
-        new_project_name = self._update_project()
+        scheduler.add('project', self._update_project)
 
-        return new_project_name
+        return scheduler.run()['project']
 
     def _store_id_mappings(self):
         self.collection_mapping = {
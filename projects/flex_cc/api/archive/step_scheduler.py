@@ -0,0 +1,67 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from graphlib import TopologicalSorter
+from typing import Any, Callable, Deque, Dict, Iterable, List
+
+# each step already runs its cloud function calls in its own pool of 20 threads, so this also bounds the number of
+# calls in flight to 20 * MAX_CONCURRENT_STEPS
+MAX_CONCURRENT_STEPS = 4
+
+
+class StepScheduler:
+    """
+    Runs the archive and restore steps, starting each one as soon as the steps it depends on are done
+
+    At most `max_workers` steps run at the same time. When a step fails no other step is started, the steps already
+    running are waited for and the error of the first failed step is raised, so the caller can clean up safely.
+    """
+    def __init__(self, max_workers: int = MAX_CONCURRENT_STEPS):
+        self.max_workers = max_workers
+        self._steps: Dict[str, Callable[[], Any]] = {}
+        self._dependencies: Dict[str, List[str]] = {}
+
+    def add(self, name: str, step: Callable[[], Any], depends_on: Iterable[str] = ()):
+        if name in self._steps:
+            raise ValueError(f'Step {name} was already added')
+
+        self._steps[name] = step
+        self._dependencies[name] = list(depends_on)
+
+    def run(self) -> Dict[str, Any]:
+        """Runs all the steps and returns their results by step name"""
+        unknown_steps = {name for names in self._dependencies.values() for name in names if name not in self._steps}
+        if unknown_steps:
+            raise ValueError(f'Unknown steps in dependencies: {", ".join(sorted(unknown_steps))}')
+
+        sorter = TopologicalSorter(self._dependencies)
+        # raises graphlib.CycleError before any step runs
+        sorter.prepare()
+
+        results = {}
+        error = None
+        ready: Deque[str] = deque()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running: Dict[Future, str] = {}
+
+            while error is None and sorter.is_active():
+                ready.extend(sorter.get_ready())
+                # steps are only submitted when a worker is free, so none is left queued in the executor on failure
+                while ready and len(running) < self.max_workers:
+                    name = ready.popleft()
+                    running[executor.submit(self._steps[name])] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is None:
+                        results[name] = future.result()
+                        sorter.done(name)
+                    elif error is None:
+                        error = future.exception()
+
+        if error is not None:
+            raise error
+
+        return results
@@ -7,12 +7,18 @@ import requests
 from retry import retry
 
 from bson import ObjectId
+from combocurve.services.feature_flags.feature_flag_list import EnabledFeatureFlags
+from combocurve.services.feature_flags.feature_flags_service import (ContextType, LaunchDarklyContext,
+                                                                     evaluate_boolean_flag)
 from combocurve.shared.google_auth import get_auth_headers
 
 from combocurve.shared.urls import get_cf_url, get_migrate_cf_url
 
 FILES_BATCH_SIZE = 100
 
+# wells per production file when archiving with DAL
+DAL_PRODUCTION_BATCH_SIZE = 100
+
 _RETRIES = 5
 
 _DELAY = 3
@@ -35,6 +41,21 @@ def get_ids_file_name(storage_directory, collection_name: str) -> str:
     return f'{storage_directory}/{collection_name}_ids'
 
 
+def get_manifest_file_name(storage_directory, collection_name: str) -> str:
+    return f'{storage_directory}/{collection_name}_manifest'
+
+
+def is_dal_production_batch_enabled(organization_name) -> bool:
+    '''
+    the archive cloud function takes `wellIds` to archive and `restoredWellIds` to restore the production of many
+    wells in one file only from the version rolled out with this flag
+    '''
+    if not organization_name:
+        return False
+    context = LaunchDarklyContext(context_name=organization_name, context_type=ContextType.organization)
+    return evaluate_boolean_flag(EnabledFeatureFlags.roll_out_dal_production_archive_batches, context)
+
+
 @retry((requests.HTTPError), tries=_RETRIES, delay=_DELAY, logger=logging)
 def make_cf_request(cloud_function_name, body, headers):
     url = get_cf_url(cloud_function_name)
@@ -637,6 +637,20 @@ def get_header_index(headers, header_cols):
     return returned_index
 
 
+def group_rows_by_key(array: np.ndarray, keys: np.ndarray) -> Dict[object, np.ndarray]:
+    """
+    Groups the rows of a 2D array by their key, keeping the original order of the rows in each group
+
+    The array is sorted by key once and each group is a view on the sorted array, so getting the rows of a key doesn't
+    scan the whole array. Rows with a missing key are left out since they never compare equal to any key.
+    """
+    codes, uniques = pd.factorize(keys)
+    order = np.argsort(codes, kind='stable')
+    sorted_array = array[order]
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return {key: sorted_array[start:end] for key, start, end in zip(uniques, bounds[:-1], bounds[1:])}
+
+
 def format_start_date(start_date, dates_1_base_date, format=False):
     if start_date is None:
         start_date = format_bad_date(dates_1_base_date)
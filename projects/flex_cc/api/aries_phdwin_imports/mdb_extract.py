@@ -48,7 +48,7 @@ from api.aries_phdwin_imports.aries_import_helpers import (
     convert_str_date_to_datetime_format, format_start_date, get_max_eco_year_from_frame_string,
     set_risk_start_date_to_base_date, clean_overlay_keyword, handle_forecast_overlay_ratio,
     check_if_more_than_one_element, get_major_phase, update_corptax, get_scenario_array_from_dbs_key,
-    change_double_quote_to_previous_keyword, update_well_count_document_with_major_phase_well)
+    change_double_quote_to_previous_keyword, update_well_count_document_with_major_phase_well, group_rows_by_key)
 
 from api.aries_phdwin_imports.aries_forecast_helpers.forecast_import_helpers import (auto_fill_ratio_lines,
                                                                                      get_cums_value,
@@ -1262,6 +1262,10 @@ class AriesDataExtraction(DataExtraction):
             df_array = clean_econ_df(df_array, propnum_index)
             ls_propnum = np.unique(df_array[:, propnum_index])
 
+        # index the rows of every property once, replacing ' ' with nan, instead of filtering the whole table for each
+        # property and scenario
+        property_rows = group_rows_by_key(np.where(df_array == ' ', np.nan, df_array), df_array[:, propnum_index])
+
         # get scenario header columns
         scen_header_cols = [str(header).upper() for header in self.AC_SCENARIO_df.columns]
         # convert dataframe to array
@@ -1295,6 +1299,10 @@ class AriesDataExtraction(DataExtraction):
         for scenario in ls_scenario:
             ls_scenarios_id = []
 
+            selected_scenario_df = scenario_df_array[np.argwhere(
+                scenario_df_array[:, scen_name_index] == scenario).flatten(), :]
+            selected_scenario_df = np.where(selected_scenario_df == ' ', np.nan, selected_scenario_df)
+
             for _id in self.projects_dic:
                 scenarios_default_document = self.get_default_format('scenarios')
                 scenarios_default_document['name'] = scenario
@@ -1312,22 +1320,17 @@ class AriesDataExtraction(DataExtraction):
                 self.scenarios_dic[scenarios_default_document['_id']] = scenarios_default_document
                 self.scenarios_dic[scenarios_default_document['_id']]['aries_id'] = []
 
-                selected_scenario_df = scenario_df_array[np.argwhere(
-                    scenario_df_array[:, scen_name_index] == scenario).flatten(), :]
-                selected_scenario_df = np.where(selected_scenario_df == ' ', np.nan, selected_scenario_df)
                 for idx, property_id in enumerate(ls_propnum):
                     # check if wells exist for this property_id
                     if not self.check_if_well_exist(property_id):
                         continue
 
-                    selected_df = df_array[np.argwhere(df_array[:, propnum_index] == property_id).flatten(), :]
+                    # view on the rows of the property, it is only read below
+                    selected_df = property_rows.get(property_id)
 
-                    if selected_df.size == 0:
+                    if selected_df is None:
                         continue
 
-                    # replace ' ' with nan
-                    selected_df = np.where(selected_df == ' ', np.nan, selected_df)
-
                     # get empty qualifier column
                     qualifier_selected_df = selected_df[np.argwhere(
                         selected_df[:, qualifier_col_index] == '').flatten(), :]
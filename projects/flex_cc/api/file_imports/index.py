@@ -7,6 +7,8 @@ from concurrent.futures.thread import ThreadPoolExecutor
 from itertools import chain
 from pymongo.errors import DocumentTooLarge
 
+import numpy as np
+import pandas as pd
 import requests
 from bson import ObjectId
 from google.api_core.retry import Retry
@@ -124,6 +126,14 @@ class FileImportService:
         original_rows = reader.get_rows()
         return ([self._get_index(row, index) for index in header_indexes] for row in original_rows)
 
+    def _get_batch_row_chunks(self, reader, header_indexes):
+        for original_chunk in reader.get_row_chunks():
+            chunk = np.empty((len(original_chunk), len(header_indexes)), dtype=object)
+            for col, index in enumerate(header_indexes):
+                # same as _get_index, the chosen key header name is the value of its column
+                chunk[:, col] = original_chunk[:, index] if isinstance(index, int) else index
+            yield chunk
+
     def _get_object_property(self, field_object, object_param):
         try:
             return object_param[field_object]
@@ -497,14 +507,14 @@ class FileImportService:
             reader.open()
 
             (headers, headers_indexes) = self._get_batch_headers(file_import_file, reader)
-            rows = self._get_batch_rows(reader, headers_indexes)
+            row_chunks = self._get_batch_row_chunks(reader, headers_indexes)
         else:
             file_name = None
             reader = None
             headers = []
-            rows = []
+            row_chunks = []
 
-        return (file_name, reader, headers, rows)
+        return (file_name, reader, headers, row_chunks)
 
     def start_file_import(self, import_id, user_id, notification_id):
         header_reader = None
@@ -703,27 +713,16 @@ class FileImportService:
                                                  chosen_id, None, None)
                 batches_notifier(i / len(headers_dict))
 
-    def _process_data_file(self, threads_queue, thread_results, executor, base_filename, headers_dict, rows,
+    def _process_data_file(self, threads_queue, thread_results, executor, base_filename, headers_dict, row_chunks,
                            chosen_id_index, title, batches_notifier):
-        # Write each clump of data per chosen_id to storage
-        # Same chosen_id can appear multiple times throughout the file
-        previous_chosen_id = None
-        id_rows = list()
-        counter = 0
-        for row in rows:
-            current_chosen_id = clean_id(row[chosen_id_index])
-            if previous_chosen_id != current_chosen_id:
-                if previous_chosen_id is not None:
-                    counter = counter + 1
+        # Write the rows of each chosen_id in a chunk of the file to storage
+        # Same chosen_id can appear in multiple chunks, its batches are combined afterwards in the order of the file
+        for chunk in row_chunks:
+            for chosen_id, id_rows in _group_rows_by_chosen_id(chunk, chosen_id_index):
+                if chosen_id in headers_dict:
                     self._write_well_data_to_storage(threads_queue, thread_results, executor, base_filename,
-                                                     headers_dict, previous_chosen_id, id_rows, title)
-                    batches_notifier()
-                id_rows = list()
-                previous_chosen_id = current_chosen_id
-            id_rows.append(row)
-
-        self._write_well_data_to_storage(threads_queue, thread_results, executor, base_filename, headers_dict,
-                                         previous_chosen_id, id_rows, title)
+                                                     headers_dict, chosen_id, id_rows.tolist(), title)
+            batches_notifier()
 
     def _get_chosen_id_counter(self, header_data):
         return header_data['monthly_counter'] + header_data['daily_counter'] + header_data['survey_counter']
@@ -792,6 +791,24 @@ class FileImportService:
             raise WellDataLimitExceededError()
 
 
+def _group_rows_by_chosen_id(rows, chosen_id_index):
+    """
+    Yields the chosen ids in a chunk of rows with their rows, in order of first appearance
+
+    Each distinct value is cleaned once, the rows of a chosen id keep their order in the chunk.
+    """
+    value_codes, values = pd.factorize(rows[:, chosen_id_index])
+    codes, chosen_ids = pd.factorize(np.array([clean_id(value) for value in values], dtype=object))
+    # rows without a chosen id (-1) are left out
+    row_codes = np.where(value_codes >= 0, codes[value_codes], -1)
+
+    order = np.argsort(row_codes, kind='stable')
+    bounds = np.searchsorted(row_codes[order], np.arange(len(chosen_ids) + 1))
+    for chosen_id, start, end in zip(chosen_ids, bounds[:-1], bounds[1:]):
+        if chosen_id:
+            yield chosen_id, rows[order[start:end]]
+
+
 class InvalidFileSizeError(Exception):
     expected = True
 
@@ -3,10 +3,17 @@ from io import TextIOWrapper
 from os import SEEK_END
 from abc import ABC, abstractmethod
 import logging
+from combocurve.shared.helpers import split_in_chunks
 from combocurve.utils.exceptions import get_exception_info
 
+import numpy as np
 import xlrd
 
+# rows per chunk when reading the file by chunks, a chunk of rows is kept in memory as an array of strings
+ROWS_CHUNK_SIZE = 50000
+
+_XL_STR_CELL_TYPES = [xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_TEXT, xlrd.XL_CELL_BLANK]
+
 
 def _get_file_size(file):
     current_pos = file.tell()
@@ -34,6 +41,12 @@ class SpreadsheetReader(ABC):
         while False:
             yield []
 
+    @abstractmethod
+    def get_row_chunks(self, chunk_size=ROWS_CHUNK_SIZE):
+        '''Same rows as get_rows, as 2D arrays of (up to) chunk_size rows'''
+        while False:
+            yield np.empty((0, 0), dtype=object)
+
     @abstractmethod
     def get_progress(self):
         return 0
@@ -80,6 +93,41 @@ class ExcelFileReader(SpreadsheetReader):
                 continue
             yield row_values
 
+    def get_row_chunks(self, chunk_size=ROWS_CHUNK_SIZE):
+        for start in range(1, self.sheet.nrows, chunk_size):
+            end = min(start + chunk_size, self.sheet.nrows)
+            chunk = np.empty((end - start, self.sheet.ncols), dtype=object)
+            for col in range(self.sheet.ncols):
+                chunk[:, col] = self._get_str_values(self.sheet.col_values(col, start, end),
+                                                     self.sheet.col_types(col, start, end))
+            self._cur = end
+            chunk = chunk[chunk.astype(bool).any(axis=1)]
+            if len(chunk):
+                yield chunk
+
+    def _get_str_values(self, values, types):
+        '''Same as _get_str_value for the cells of a column'''
+        values = np.array(values, dtype=object)
+        types = np.array(types)
+        res = np.full(values.shape, None, dtype=object)
+
+        str_cells = np.isin(types, _XL_STR_CELL_TYPES)
+        res[str_cells] = values[str_cells]
+
+        number_cells = types == xlrd.XL_CELL_NUMBER
+        res[number_cells] = [str(int(val)) if val.is_integer() else str(val) for val in values[number_cells]]
+
+        boolean_cells = types == xlrd.XL_CELL_BOOLEAN
+        res[boolean_cells] = ["True" if val else "False" for val in values[boolean_cells]]
+
+        date_cells = types == xlrd.XL_CELL_DATE
+        res[date_cells] = [
+            xlrd.xldate.xldate_as_datetime(val, self.sheet.book.datemode).isoformat() + 'Z'
+            for val in values[date_cells]
+        ]
+
+        return res
+
     def _get_str_value(self, row, col):
         cell = self.sheet.cell(row, col)
         if cell.ctype in {xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_TEXT, xlrd.XL_CELL_BLANK}:
@@ -161,6 +209,33 @@ class CsvFileReader(SpreadsheetReader):
 
         return (row for row in all_rows if row is not None)
 
+    def get_row_chunks(self, chunk_size=ROWS_CHUNK_SIZE):
+        self.errors = []
+        self.file.seek(0)
+
+        columns = len(self.get_headers())
+
+        self.current_line = 1
+        for rows in split_in_chunks(self._read_rows(), chunk_size):
+            valid = np.fromiter(map(len, rows), dtype=int, count=len(rows)) == columns
+            if not valid.all():
+                self.errors.extend({
+                    "line": self.current_line + int(i),
+                    "error": "Invalid number of columns"
+                } for i in np.flatnonzero(~valid))
+                rows = [row for row, is_valid in zip(rows, valid) if is_valid]
+            self.current_line += len(valid)
+
+            if not rows:
+                continue
+            chunk = np.empty((len(rows), columns), dtype=object)
+            chunk[:] = rows
+            # the row lists are not needed anymore, don't keep them alive while the chunk is processed
+            rows = None
+            chunk = chunk[chunk.astype(bool).any(axis=1)]
+            if len(chunk):
+                yield chunk
+
     def get_progress(self):
         return self._original_file.tell() / self.file_size
 
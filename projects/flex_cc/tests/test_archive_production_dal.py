@@ -0,0 +1,168 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from google.api_core.exceptions import NotFound
+
+from api.archive.errors import InvalidArchiveError
+from api.archive.project_archiver import ProjectArchiver
+from api.archive.project_restorer import ProjectRestorer
+from api.archive.utils import get_docs_file_name, get_manifest_file_name
+
+PATH_TO_ARCHIVER = 'api.archive.project_archiver'
+PATH_TO_RESTORER = 'api.archive.project_restorer'
+COLLECTION_NAME = 'monthly-productions'
+GCP_BUCKETS = {'archive_storage_bucket': 'archive'}
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    def upload_from_file(self, file, timeout=None):
+        self.bucket.files[self.name] = file.read().encode()
+
+    def download_to_file(self, file):
+        if self.name not in self.bucket.files:
+            raise NotFound(self.name)
+        file.write(self.bucket.files[self.name])
+
+
+class FakeBucket:
+    def __init__(self):
+        self.files = {}
+        self.client = self
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def list_blobs(self, bucket, prefix):
+        return [FakeBlob(bucket, name) for name in sorted(self.files) if name.startswith(prefix)]
+
+
+class FakeArchiveCloudFunction:
+    '''
+    archives and restores the production rows of the wells of `production`, `restored` holds the restored rows by
+    restored well id
+    '''
+    def __init__(self, bucket, production):
+        self.bucket = bucket
+        self.production = production
+        self.restored = {}
+        self.bodies = []
+        self.lock = threading.Lock()
+
+    def __call__(self, body, headers):
+        with self.lock:
+            self.bodies.append(body)
+            if body['operation'] == 'archive-production-dal':
+                wells = body['wellIds'] if 'wellIds' in body else [body['wellId']]
+                rows = [{'well': well, **row} for well in wells for row in self.production[well]]
+                self.bucket.files[body['fileName']] = json.dumps(rows).encode()
+            elif body['operation'] == 'restore-production-dal':
+                restored_wells = body['restoredWellIds'] if 'restoredWellIds' in body else None
+                for row in json.loads(self.bucket.files[body['fileName']]):
+                    well = restored_wells[row['well']] if restored_wells is not None else body['restoredWellId']
+                    self.restored.setdefault(well, []).append({key: row[key] for key in row if key != 'well'})
+
+
+def archived_production(num_wells):
+    return {
+        str(ObjectId()): [{
+            'index': index,
+            'oil': float(well_index * index)
+        } for index in range(well_index % 4)]
+        for well_index in range(num_wells)
+    }
+
+
+def fake_context(bucket, **kwargs):
+    storage_client = SimpleNamespace(get_bucket=lambda _: bucket)
+    return SimpleNamespace(headers={}, google_services=SimpleNamespace(storage_client=storage_client), **kwargs)
+
+
+def archive(mocker, bucket, cloud_function, wells, batch_enabled):
+    mocker.patch(f'{PATH_TO_ARCHIVER}.make_archive_cf_request', side_effect=cloud_function)
+    mocker.patch(f'{PATH_TO_ARCHIVER}.is_dal_production_batch_enabled', return_value=batch_enabled)
+    context = fake_context(bucket, tenant_info={'db_name': 'tenant'})
+    archiver = ProjectArchiver(None, GCP_BUCKETS, context, str(ObjectId()), str(ObjectId()), mocker.Mock(), 'V2')
+    archiver._archive_dal_production(COLLECTION_NAME, wells)
+    return archiver.storage_directory
+
+
+def restorer(mocker, bucket, cloud_function, storage_directory, wells):
+    mocker.patch(f'{PATH_TO_RESTORER}.make_archive_cf_request', side_effect=cloud_function)
+    context = fake_context(bucket, db=SimpleNamespace(name='tenant'))
+    project_restorer = ProjectRestorer(None, GCP_BUCKETS, context, str(ObjectId()), str(ObjectId()), mocker.Mock(),
+                                       'V2')
+    project_id = ObjectId()
+    project_restorer.archived_project = SimpleNamespace(storageDirectory=storage_directory, projectId=project_id)
+    project_restorer.id_mappings = SimpleNamespace(projects={project_id: ObjectId()},
+                                                   wells={ObjectId(well): ObjectId()
+                                                          for well in wells})
+    return project_restorer
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('batch_enabled', [True, False])
+def test_archived_production_is_restored_to_the_restored_wells(mocker, batch_enabled):
+    production = archived_production(250)
+    wells = list(production)
+    bucket = FakeBucket()
+    cloud_function = FakeArchiveCloudFunction(bucket, production)
+
+    storage_directory = archive(mocker, bucket, cloud_function, wells, batch_enabled)
+    project_restorer = restorer(mocker, bucket, cloud_function, storage_directory, wells)
+    project_restorer._restore_dal_production_data(COLLECTION_NAME)
+
+    restored_wells = project_restorer.id_mappings.wells
+    assert cloud_function.restored == {
+        str(restored_wells[ObjectId(well)]): rows
+        for well, rows in production.items() if rows
+    }
+    archive_bodies = [body for body in cloud_function.bodies if body['operation'] == 'archive-production-dal']
+    restore_bodies = [body for body in cloud_function.bodies if body['operation'] == 'restore-production-dal']
+    if batch_enabled:
+        assert len(archive_bodies) == len(restore_bodies) == 3
+        assert all('wellId' not in body for body in archive_bodies)
+        assert all('restoredWellIds' in body for body in restore_bodies)
+    else:
+        # the cloud function without batches only takes one well by request
+        assert len(archive_bodies) == len(restore_bodies) == 250
+        assert all('wellIds' not in body for body in archive_bodies)
+        assert all('restoredWellIds' not in body for body in restore_bodies)
+        assert get_manifest_file_name(storage_directory, COLLECTION_NAME) not in bucket.files
+
+
+@pytest.mark.unittest
+def test_restore_raises_without_manifest(mocker):
+    production = archived_production(20)
+    bucket = FakeBucket()
+    cloud_function = FakeArchiveCloudFunction(bucket, production)
+
+    storage_directory = archive(mocker, bucket, cloud_function, list(production), True)
+    del bucket.files[get_manifest_file_name(storage_directory, COLLECTION_NAME)]
+    project_restorer = restorer(mocker, bucket, cloud_function, storage_directory, list(production))
+
+    with pytest.raises(InvalidArchiveError):
+        project_restorer._restore_dal_production_data(COLLECTION_NAME)
+    assert cloud_function.restored == {}
+
+
+@pytest.mark.unittest
+def test_restore_raises_on_batch_files_missing_from_manifest(mocker):
+    production = archived_production(20)
+    bucket = FakeBucket()
+    cloud_function = FakeArchiveCloudFunction(bucket, production)
+
+    storage_directory = archive(mocker, bucket, cloud_function, list(production), True)
+    extra_file_name = get_docs_file_name(storage_directory, COLLECTION_NAME, '1')
+    bucket.files[extra_file_name] = b'[]'
+    project_restorer = restorer(mocker, bucket, cloud_function, storage_directory, list(production))
+
+    with pytest.raises(InvalidArchiveError, match=extra_file_name):
+        project_restorer._restore_dal_production_data(COLLECTION_NAME)
+    assert cloud_function.restored == {}
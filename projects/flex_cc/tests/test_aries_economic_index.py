@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from api.aries_phdwin_imports.aries_import_helpers import group_rows_by_key
+
+# PROPNUM, SECTION, SEQUENCE, QUALIFIER, KEYWORD, EXPRESSION
+PROPNUM_INDEX = 0
+QUALIFIER_INDEX = 3
+
+
+def ac_economic_array(n_properties, lines_per_property, seed=0):
+    rng = np.random.default_rng(seed)
+    n_rows = n_properties * lines_per_property
+    array = np.empty((n_rows, 6), dtype=object)
+    # the lines of a property are not contiguous in AC_ECONOMIC
+    array[:, PROPNUM_INDEX] = [f'P{propnum}' for propnum in rng.integers(n_properties, size=n_rows)]
+    array[:, 1] = rng.choice([2, 4, 5, 6, 7, 8], n_rows)
+    array[:, 2] = np.arange(n_rows)
+    array[:, QUALIFIER_INDEX] = rng.choice(['', 'RSV', 'PUD', ' '], n_rows)
+    array[:, 4] = rng.choice(['OIL', 'GAS', 'OPC/T', '"', ' '], n_rows)
+    array[:, 5] = rng.choice(['100 X BBL/D 12/2025 EXP 8', '1500 X $/M TO LIFE', ' '], n_rows)
+    return array
+
+
+def rows_by_filtering(df_array, property_id):
+    selected_df = df_array[np.argwhere(df_array[:, PROPNUM_INDEX] == property_id).flatten(), :]
+    return np.where(selected_df == ' ', np.nan, selected_df)
+
+
+@pytest.mark.unittest
+def test_group_rows_by_key_matches_filtering_each_property():
+    df_array = ac_economic_array(50, 20)
+    df_array[[3, 17], PROPNUM_INDEX] = np.nan
+    df_array[5, PROPNUM_INDEX] = 7
+
+    property_rows = group_rows_by_key(np.where(df_array == ' ', np.nan, df_array), df_array[:, PROPNUM_INDEX])
+
+    assert set(property_rows) == {key for key in df_array[:, PROPNUM_INDEX] if key == key}
+    for property_id in property_rows:
+        expected = rows_by_filtering(df_array, property_id)
+        # same rows in the same order, blank cells included
+        np.testing.assert_array_equal(property_rows[property_id].astype(str), expected.astype(str))
+    assert property_rows.get('P1000') is None
+
+
+@pytest.mark.unittest
+def test_group_rows_by_key_returns_views():
+    df_array = ac_economic_array(10, 5)
+
+    property_rows = group_rows_by_key(df_array, df_array[:, PROPNUM_INDEX])
+
+    bases = {id(rows.base) for rows in property_rows.values()}
+    assert len(bases) == 1
+    assert sum(rows.shape[0] for rows in property_rows.values()) == df_array.shape[0]
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('use_index', [False, True])
+def test_performance_of_economic_property_rows(benchmark, use_index):
+    df_array = ac_economic_array(5000, 40)
+    ls_propnum = np.unique(df_array[:, PROPNUM_INDEX])
+
+    def select_all_properties():
+        if use_index:
+            property_rows = group_rows_by_key(np.where(df_array == ' ', np.nan, df_array), df_array[:, PROPNUM_INDEX])
+        for property_id in ls_propnum:
+            selected_df = property_rows[property_id] if use_index else rows_by_filtering(df_array, property_id)
+            selected_df[np.argwhere(selected_df[:, QUALIFIER_INDEX] == '').flatten(), :]
+
+    benchmark(select_all_properties)
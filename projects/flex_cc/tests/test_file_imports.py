@@ -0,0 +1,167 @@
+import datetime
+import json
+from io import BytesIO
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import xlrd
+
+from api.file_imports.index import FileImportService
+from api.file_imports.spreadsheet_readers import CsvFileReader, ExcelFileReader
+from combocurve.shared.helpers import clean_id
+
+HEADERS = ['API 14', 'Date', 'Oil', 'Gas']
+
+
+def production_csv(n_wells, months, interleaved=False, seed=0):
+    rng = np.random.default_rng(seed)
+    lines = [
+        f'42-{well:012d},{month + 1}/1/2020,{rng.random() * 1000:.2f},{rng.integers(0, 5000)}'
+        for well in rng.permutation(n_wells) for month in range(months)
+    ]
+    if interleaved:
+        lines = rng.permutation(lines).tolist()
+    return '\n'.join([','.join(HEADERS), *lines]) + '\n'
+
+
+def csv_reader(content):
+    reader = CsvFileReader(BytesIO(content.encode()))
+    reader.open()
+    return reader
+
+
+class FakeSheet:
+    def __init__(self, cells):
+        # cells as (ctype, value)
+        self.cells = cells
+        self.nrows = len(cells)
+        self.ncols = len(cells[0])
+        self.book = MagicMock(datemode=0)
+
+    def cell(self, row, col):
+        ctype, value = self.cells[row][col]
+        return MagicMock(ctype=ctype, value=value)
+
+    def col_values(self, col, start, end):
+        return [self.cells[row][col][1] for row in range(start, end)]
+
+    def col_types(self, col, start, end):
+        return [self.cells[row][col][0] for row in range(start, end)]
+
+
+def excel_reader(cells):
+    reader = ExcelFileReader(BytesIO())
+    reader.sheet = FakeSheet(cells)
+    reader._total = reader.sheet.nrows
+    return reader
+
+
+def chunked_rows(reader, chunk_size):
+    chunks = list(reader.get_row_chunks(chunk_size))
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+    return [row for chunk in chunks for row in chunk.tolist()]
+
+
+def file_import_service():
+    service = FileImportService(MagicMock())
+    written = []
+    service._write_well_data_to_storage = lambda *args: written.append((args[-3], args[-2], args[-1]))
+    return service, written
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('chunk_size', [1, 3, 1000])
+def test_csv_row_chunks_match_rows(chunk_size):
+    content = 'a,b,c\n1,2,3\n,,\n4,5\n6,7,8\n\n9,10,11,12\n"x,y",z,\n'
+
+    reader = csv_reader(content)
+    rows = list(reader.get_rows())
+    errors = reader.errors
+
+    reader = csv_reader(content)
+    assert chunked_rows(reader, chunk_size) == rows == [['1', '2', '3'], ['6', '7', '8'], ['x,y', 'z', '']]
+    assert reader.errors == errors
+    assert [error["line"] for error in reader.errors] == [3, 5, 6]
+    assert all(type(error["line"]) is int for error in reader.errors)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize('chunk_size', [1, 2, 1000])
+def test_excel_row_chunks_match_rows(chunk_size):
+    date = xlrd.xldate.xldate_from_datetime_tuple((2021, 3, 1, 0, 0, 0), 0)
+    cells = [
+        [(xlrd.XL_CELL_TEXT, 'API 14'), (xlrd.XL_CELL_TEXT, 'Date'), (xlrd.XL_CELL_TEXT, 'Oil')],
+        [(xlrd.XL_CELL_NUMBER, 42.), (xlrd.XL_CELL_DATE, date), (xlrd.XL_CELL_NUMBER, 12.5)],
+        [(xlrd.XL_CELL_EMPTY, ''), (xlrd.XL_CELL_BLANK, ''), (xlrd.XL_CELL_EMPTY, '')],
+        [(xlrd.XL_CELL_TEXT, '42-1'), (xlrd.XL_CELL_BOOLEAN, 1), (xlrd.XL_CELL_ERROR, 7)],
+        [(xlrd.XL_CELL_TEXT, '42-1'), (xlrd.XL_CELL_BOOLEAN, 0), (xlrd.XL_CELL_NUMBER, 1e20)],
+    ]
+
+    rows = list(excel_reader(cells).get_rows())
+
+    reader = excel_reader(cells)
+    assert chunked_rows(reader, chunk_size) == rows
+    assert rows[0] == ['42', datetime.datetime(2021, 3, 1).isoformat() + 'Z', '12.5']
+    assert reader.get_progress() == 1
+
+
+@pytest.mark.unittest
+def test_data_file_rows_are_partitioned_by_chosen_id():
+    content = production_csv(30, 12, interleaved=True)
+    reader = csv_reader(content)
+    rows = list(reader.get_rows())
+    # only some of the wells are imported
+    headers_dict = {clean_id(row[0]): {} for row in rows[::25]}
+    service, written = file_import_service()
+
+    service._process_data_file(None, None, None, 'base', headers_dict,
+                               csv_reader(content).get_row_chunks(100), 0, 'monthly', MagicMock())
+
+    assert {chosen_id for chosen_id, _, _ in written} == set(headers_dict)
+    for chosen_id in headers_dict:
+        written_rows = [row for written_id, id_rows, _ in written if written_id == chosen_id for row in id_rows]
+        assert written_rows == [row for row in rows if clean_id(row[0]) == chosen_id]
+        assert all(isinstance(value, str) for row in written_rows for value in row)
+
+
+@pytest.mark.unittest
+def test_batch_row_chunks_add_the_chosen_key_column():
+    service, _ = file_import_service()
+    reader = csv_reader(production_csv(2, 3))
+
+    chunks = list(service._get_batch_row_chunks(reader, (3, 0, 'API 14')))
+
+    expected = [[row[3], row[0], 'API 14'] for row in csv_reader(production_csv(2, 3)).get_rows()]
+    assert [row for chunk in chunks for row in chunk.tolist()] == expected
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('chunked', [False, True])
+def test_performance_of_partitioning_a_production_file(benchmark, chunked):
+    content = production_csv(5000, 240)
+    headers_dict = {f'42{well:012d}': {} for well in range(5000)}
+
+    def partition_rows():
+        service = FileImportService(MagicMock())
+        # the rows are serialized and dropped as in the batch files
+        service._write_well_data_to_storage = lambda *args: json.dumps(args[-2])
+        if chunked:
+            service._process_data_file(None, None, None, 'base', headers_dict,
+                                       csv_reader(content).get_row_chunks(), 0, 'monthly', MagicMock())
+        else:
+            # what was done before, one row at a time
+            previous_chosen_id = None
+            id_rows = []
+            for row in csv_reader(content).get_rows():
+                chosen_id = clean_id(row[0])
+                if chosen_id != previous_chosen_id:
+                    if previous_chosen_id is not None:
+                        json.dumps(id_rows)
+                    id_rows = []
+                    previous_chosen_id = chosen_id
+                id_rows.append(row)
+            json.dumps(id_rows)
+
+    benchmark(partition_rows)
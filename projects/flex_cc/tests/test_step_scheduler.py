@@ -0,0 +1,103 @@
+import threading
+import time
+from graphlib import CycleError
+
+import pytest
+
+from api.archive.step_scheduler import StepScheduler
+
+
+def recording_step(name, events, duration=0.):
+    def step():
+        events.append(('start', name))
+        time.sleep(duration)
+        events.append(('end', name))
+        return name.upper()
+
+    return step
+
+
+@pytest.mark.unittest
+def test_steps_start_after_their_dependencies():
+    events = []
+    scheduler = StepScheduler(max_workers=4)
+    scheduler.add('wells', recording_step('wells', events, .05))
+    scheduler.add('monthly', recording_step('monthly', events), depends_on=['wells'])
+    scheduler.add('daily', recording_step('daily', events), depends_on=['wells'])
+    scheduler.add('forecasts', recording_step('forecasts', events))
+    scheduler.add('buckets', recording_step('buckets', events), depends_on=['forecasts', 'daily'])
+
+    results = scheduler.run()
+
+    assert results == {name: name.upper() for name in ['wells', 'monthly', 'daily', 'forecasts', 'buckets']}
+    for step, dependency in [('monthly', 'wells'), ('daily', 'wells'), ('buckets', 'forecasts'), ('buckets', 'daily')]:
+        assert events.index(('start', step)) > events.index(('end', dependency))
+    # the independent step does not wait for the slow one
+    assert events.index(('end', 'forecasts')) < events.index(('end', 'wells'))
+
+
+@pytest.mark.unittest
+def test_concurrent_steps_are_bounded():
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def step():
+        with lock:
+            running.append(1)
+            max_running.append(len(running))
+        time.sleep(.02)
+        with lock:
+            running.pop()
+
+    scheduler = StepScheduler(max_workers=3)
+    for index in range(12):
+        scheduler.add(str(index), step)
+    scheduler.run()
+
+    assert max(max_running) == 3
+
+
+@pytest.mark.unittest
+def test_failed_step_stops_the_scheduling():
+    events = []
+
+    def failing_step():
+        time.sleep(.02)
+        raise RuntimeError('archive failed')
+
+    scheduler = StepScheduler(max_workers=2)
+    scheduler.add('slow', recording_step('slow', events, .1))
+    scheduler.add('failing', failing_step)
+    scheduler.add('dependent', recording_step('dependent', events), depends_on=['failing'])
+    for index in range(5):
+        scheduler.add(f'queued_{index}', recording_step(f'queued_{index}', events))
+
+    with pytest.raises(RuntimeError, match='archive failed'):
+        scheduler.run()
+
+    # the running step is finished before the error is raised, nothing else is started
+    assert events == [('start', 'slow'), ('end', 'slow')]
+
+
+@pytest.mark.unittest
+def test_invalid_dependencies_raise_before_running():
+    events = []
+    scheduler = StepScheduler()
+    scheduler.add('wells', recording_step('wells', events))
+    scheduler.add('monthly', recording_step('monthly', events), depends_on=['wells', 'missing'])
+
+    with pytest.raises(ValueError, match='missing'):
+        scheduler.run()
+
+    scheduler = StepScheduler()
+    scheduler.add('forecasts', recording_step('forecasts', events), depends_on=['buckets'])
+    scheduler.add('buckets', recording_step('buckets', events), depends_on=['forecasts'])
+
+    with pytest.raises(CycleError):
+        scheduler.run()
+
+    with pytest.raises(ValueError, match='already added'):
+        scheduler.add('forecasts', recording_step('forecasts', events))
+
+    assert events == []
@@ -7,7 +7,7 @@ from combocurve.shared.context_provider import ContextProvider
 from combocurve.shared.cloud_storage_client import CloudStorageClient
 from combocurve.shared.big_query_client import BigQueryClient
 from combocurve.shared.env import GCP_PRIMARY_PROJECT_ID
-from api.database import get_db
+from api.database import close_db, get_db
 
 from combocurve.services.econ.econ_service import EconService
 from combocurve.services.econ.econ_file_service import EconFileService
@@ -43,30 +43,79 @@ from combocurve.services.feature_flags.feature_flags_service import FeatureFlags
 
 from combocurve.services.carbon.carbon_service import CarbonService
 from combocurve.dal.client import DAL
+from threading import RLock
 import os
 
 FORECAST_LIBRARY_URL = os.environ.get('FORECAST_LIBRARY_URL')
 
 
+# clients and services are created on first access, most requests only use a few of them
+_LAZY_ATTRIBUTES = {
+    # clients
+    'dal': lambda context: DAL.connect(context.subdomain, context.tenant_info['headers']['inpt-dal-url']),
+    'pusher_client': lambda context: init_pusher_client(context.tenant_info),
+    'pusher': lambda context: context.pusher_client,  # for the notification service
+    'cloud_storage_client': lambda context: CloudStorageClient(),
+    'big_query_client': lambda context: BigQueryClient(GCP_PRIMARY_PROJECT_ID),
+    # services
+    'scheduling_data_service': SchedulingDataService,
+    'data_cache_service': DataCacheService,
+    'update_eur_service': UpdateEurService,
+    'tc_normalization_service': TypeCurveNormalizationService,
+    'diagnostic_service': DiagnosticService,
+    'display_templates_service': DisplayTemplatesService,
+    'econ_service': EconService,
+    'econ_output_service': EconOutputService,
+    'econ_file_service': EconFileService,
+    'forecast_service': ForecastService,
+    'forecast_export_service': ForecastExportService,
+    'add_last_segment_service': AddLastSegmentService,
+    'production_service': ProductionService,
+    'roll_up_service': RollUpService,
+    'roll_up_export_service': RollUpExport,
+    'scenario_well_assignments_service': ScenarioWellAssignmentService,
+    'type_curve_service': TypeCurveService,
+    'type_curve_apply_service': TypeCurveApplyService,
+    'deterministic_forecast_service': DeterministicForecastService,
+    'lookup_table_service': LookupTableService,
+    'embedded_lookup_table_service': EmbeddedLookupTableService,
+    'scenario_page_query_service': ScenarioPageQueryService,
+    'mass_modify_well_life_service': MassModifyWellLifeService,
+    'proximity_forecast_service': ProximityForecastService,
+    'mass_shift_segments_service': MassShiftSegmentsService,
+    'notification_service': NotificationService,
+    'file_service': FileService,
+    'mass_adjust_terminal_decline_service': MassAdjustTerminalDeclineService,
+    'custom_fields_service': CustomFieldsService,
+    'tc_chart_export_service': TypeCurveChartExportService,
+    'carbon_service': CarbonService,
+    'well_spacing_service': WellSpacingService,
+    'project_custom_headers_service': ProjectCustomHeadersService,
+    'feature_flags_service': lambda context: FeatureFlagsService(),
+}
+
+# how to release the channels and clients a context created, when it is evicted from the cache
+_CLOSE_ATTRIBUTES = {
+    'dal': lambda dal: dal.close(),
+    'cloud_storage_client': lambda client: client.close(),
+    'big_query_client': lambda client: client.close(),
+    'data_cache_service': lambda service: service.redis_client.close(),
+}
+
+
 class APIContext():
     def __init__(self, tenant_info):
         # This is an initial version of context simplified to minimize the amount of changes required
         # to get a first version of a multi-tenant app.
         # We want context to contain instances of models and services, not db instances
+        self._lock = RLock()
         self.db = get_db(tenant_info)
         self.tenant_info = tenant_info
         self.subdomain = tenant_info['subdomain']
 
-        self.dal = DAL.connect(self.subdomain, tenant_info['headers']['inpt-dal-url'])
-
         if not __debug__:
             config_tenant_logging(tenant_info)
 
-        self.pusher_client = init_pusher_client(tenant_info)
-        self.pusher = self.pusher_client  # for the notification service
-        self.cloud_storage_client = CloudStorageClient()
-        self.big_query_client = BigQueryClient(GCP_PRIMARY_PROJECT_ID)
-
         # urls
         self.forecast_library_url = FORECAST_LIBRARY_URL or 'https://forecast-library-dot-{}.appspot.com'.format(
             FORECAST_LIBRARY_URL)
@@ -110,42 +159,22 @@ class APIContext():
         self.project_custom_headers_datas_collection = self.db['project-custom-headers-datas']
         self.users_collection = self.db['users']
 
-        # services
-        self.scheduling_data_service = SchedulingDataService(self)
-        self.data_cache_service = DataCacheService(self)
-        self.update_eur_service = UpdateEurService(self)
-        self.tc_normalization_service = TypeCurveNormalizationService(self)
-        self.diagnostic_service = DiagnosticService(self)
-        self.display_templates_service = DisplayTemplatesService(self)
-        self.econ_service = EconService(self)
-        self.econ_output_service = EconOutputService(self)
-        self.econ_file_service = EconFileService(self)
-        self.forecast_service = ForecastService(self)
-        self.forecast_export_service = ForecastExportService(self)
-        self.add_last_segment_service = AddLastSegmentService(self)
-        self.production_service = ProductionService(self)
-        self.roll_up_service = RollUpService(self)
-        self.roll_up_export_service = RollUpExport(self)
-        self.scenario_well_assignments_service = ScenarioWellAssignmentService(self)
-        self.type_curve_service = TypeCurveService(self)
-        self.type_curve_apply_service = TypeCurveApplyService(self)
-        self.deterministic_forecast_service = DeterministicForecastService(self)
-        self.lookup_table_service = LookupTableService(self)
-        self.embedded_lookup_table_service = EmbeddedLookupTableService(self)
-        self.scenario_page_query_service = ScenarioPageQueryService(self)
-        self.mass_modify_well_life_service = MassModifyWellLifeService(self)
-        self.proximity_forecast_service = ProximityForecastService(self)
-        self.mass_shift_segments_service = MassShiftSegmentsService(self)
-        self.notification_service = NotificationService(self)
-        self.file_service = FileService(self)
-        self.mass_adjust_terminal_decline_service = MassAdjustTerminalDeclineService(self)
-        self.custom_fields_service = CustomFieldsService(self)
-        self.tc_chart_export_service = TypeCurveChartExportService(self)
-        self.carbon_service = CarbonService(self)
-        self.well_spacing_service = WellSpacingService(self)
-        self.project_custom_headers_service = ProjectCustomHeadersService(self)
-
-        self.feature_flags_service = FeatureFlagsService()
+    def __getattr__(self, name):
+        # only called for attributes that are not set yet
+        create = _LAZY_ATTRIBUTES.get(name)
+        if create is None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        with self._lock:
+            if name not in self.__dict__:
+                self.__dict__[name] = create(self)
+            return self.__dict__[name]
+
+    def close(self):
+        for name, close in _CLOSE_ATTRIBUTES.items():
+            if name in self.__dict__:
+                close(self.__dict__[name])
+        close_db(self.tenant_info)
 
 
 context_provider = ContextProvider(APIContext)
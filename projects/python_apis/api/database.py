@@ -19,3 +19,11 @@ def get_db(tenant_info):
         client = MongoClient(db_connection_string)
         _db_client_cache[db_connection_string] = client
     return client[db_name]
+
+
+def close_db(tenant_info):
+    client = _db_client_cache.pop(tenant_info['db_connection_string'], None)
+
+    if client is not None:
+        logging.info(f'api.connection.close: db_name: {tenant_info["db_name"]}')  # noqa
+        client.close()
@@ -13,8 +13,8 @@ def with_api_context(handler):
     @wraps(handler)
     def decorated(**kwargs):
         tenant_info = get_tenant_info(request.headers)
-        context = context_provider.get_context(tenant_info)
-        current_context.set(context)
-        return handler(context=context, **kwargs)
+        with context_provider.use_context(tenant_info) as context:
+            current_context.set(context)
+            return handler(context=context, **kwargs)
 
     return decorated
@@ -2,6 +2,7 @@ from flask import request, Blueprint
 
 from combocurve.utils.routes import complete_routing
 from api.decorators import with_api_context
+from api.process_pool import run_in_process_pool
 from combocurve.utils.logging import add_to_logging_metadata
 
 forecast_api = Blueprint('forecast_api', __name__)
@@ -28,6 +29,7 @@ def calc_eur(**kwargs):
 
 @forecast_api.route('/forecast', methods=['POST'])
 @complete_routing
+@run_in_process_pool
 @with_api_context
 def forecast(**kwargs):
     context = kwargs['context']
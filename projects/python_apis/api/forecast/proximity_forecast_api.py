@@ -7,6 +7,7 @@ from flask.wrappers import Response
 
 from combocurve.utils.routes import complete_routing
 from api.decorators import with_api_context
+from api.process_pool import run_in_process_pool
 from combocurve.utils.logging import add_to_logging_metadata
 from combocurve.services.proximity_forecast.proximity_forecast_service import ProximityForecastService
 
@@ -19,6 +20,7 @@ if TYPE_CHECKING:
 ## used in getting the background data
 @proximity_forecast_api.route('/get_proximity_well_tc_fit_data', methods=['POST'])
 @complete_routing
+@run_in_process_pool
 @with_api_context
 def get_proximity_well_tc_fit_data(**kwargs):
     context = kwargs['context']
@@ -59,6 +61,7 @@ def get_proximity_well_data(**kwargs):
 
 ## used in fit page
 @proximity_forecast_api.route('/generate_proximity_fits', methods=['POST'])
+@run_in_process_pool
 @with_api_context
 def generate_proximity_fits(**kwargs):
     context = kwargs['context']
@@ -77,6 +80,7 @@ def generate_proximity_fits(**kwargs):
 
 ## used in forecast grid page
 @proximity_forecast_api.route('/proximity_pipeline', methods=['POST'])
+@run_in_process_pool
 @with_api_context
 def proximity_pipeline(**kwargs):
     context = kwargs['context']
@@ -0,0 +1,296 @@
+'''
+    Runs CPU-bound route handlers in a pool of processes, so a long NumPy/SciPy calculation doesn't block the gevent
+    event loop, and with it every other request of the worker.
+
+    Each gunicorn worker has its own pool, created on first use and shut down after PROCESS_POOL_IDLE_TIMEOUT seconds
+    without requests. The processes are spawned, not forked, so they don't inherit the gevent patches nor the gRPC and
+    database connections of the worker, and they create their own tenant contexts through the same decorators the
+    handlers already use.
+
+    Background jobs run in a pool of their own, so they don't hold the processes of the requests, and they are queued
+    without bound nor timeout.
+
+    Every pool process loads the whole api, so the processes are the main memory cost of the pools: up to
+    `workers` * (PROCESS_POOL_SIZE + PROCESS_POOL_BACKGROUND_SIZE) of them, see gunicorn.conf.py.
+'''
+import importlib
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial, wraps
+from threading import Lock, Timer
+
+from flask import Flask, request
+
+from combocurve.utils.logging import add_to_logging_metadata, get_logging_metadata, reset_logging_metadata
+
+# the pool processes of every worker are on top of the `workers` of gunicorn.conf.py
+PROCESS_POOL_SIZE = int(os.environ.get('PROCESS_POOL_SIZE', 1))
+# requests waiting for a free process, more are rejected right away
+PROCESS_POOL_MAX_QUEUED = int(os.environ.get('PROCESS_POOL_MAX_QUEUED', 8))
+# below the timeout of the workers in gunicorn.conf.py, so the worker can still answer
+PROCESS_POOL_TIMEOUT = int(os.environ.get('PROCESS_POOL_TIMEOUT', 280))
+# the processes of a pool without requests for this long are stopped to free their memory
+PROCESS_POOL_IDLE_TIMEOUT = int(os.environ.get('PROCESS_POOL_IDLE_TIMEOUT', 300))
+# processes of every worker for the background jobs, that no request waits for
+PROCESS_POOL_BACKGROUND_SIZE = int(os.environ.get('PROCESS_POOL_BACKGROUND_SIZE', 1))
+
+# handlers that can run in the pool by `module:qualified name`, filled in the pool processes by importing the module
+_handlers = {}
+# used in the pool processes to recreate the request of the handler
+_request_app = Flask(__name__)
+
+
+class ProcessPoolBusyError(Exception):
+    expected = True
+    status_code = 503
+
+
+class ProcessPoolTimeoutError(Exception):
+    expected = False
+    status_code = 504
+
+
+class _HandlerError(Exception):
+    '''Sent back instead of the errors of the handlers that can't be pickled'''
+    def __init__(self, message, expected):
+        super().__init__(message)
+        self.expected = expected
+
+    def __reduce__(self):
+        return (type(self), (self.args[0], self.expected))
+
+
+def _handler_key(handler):
+    return f'{handler.__module__}:{handler.__qualname__}'
+
+
+def _get_handler(key):
+    if key not in _handlers:
+        importlib.import_module(key.split(':')[0])
+    return _handlers[key]
+
+
+def _picklable_error(error):
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return _HandlerError(str(error.args[0]) if error.args else repr(error), getattr(error, 'expected', False))
+
+
+def _picklable_metadata(metadata):
+    try:
+        pickle.dumps(metadata)
+        return metadata
+    except Exception:
+        return {key: repr(value) for key, value in metadata.items()}
+
+
+def _raise_timeout(signum, frame):
+    raise ProcessPoolTimeoutError('The request did not finish in time')
+
+
+def _init_process():
+    if not __debug__:
+        from combocurve.utils.logging import setup_cloud_logging
+        setup_cloud_logging(logger_name='python-combocurve-service')
+    # stops the handlers at the deadline of their request, see `_run_handler`
+    signal.signal(signal.SIGALRM, _raise_timeout)
+
+
+def _run_handler(key, request_info, kwargs, submitted_at, deadline):
+    '''
+        Runs in the pool processes. The handler is stopped with `ProcessPoolTimeoutError` at `deadline`, when the
+        worker stops waiting for it, so it doesn't keep running, i.e. writing forecasts, after the request failed.
+        Handlers still queued at their deadline don't run at all.
+    '''
+    started_at = time.time()
+    result, error = None, None
+    # the logging metadata of the process would otherwise be kept for the next requests and lost for this one
+    reset_logging_metadata()
+    try:
+        if deadline is not None and deadline <= started_at:
+            raise ProcessPoolTimeoutError('The request timed out before it started')
+        with _request_app.test_request_context(**request_info):
+            if deadline is not None:
+                signal.setitimer(signal.ITIMER_REAL, deadline - started_at)
+            try:
+                result = _get_handler(key)(**kwargs)
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except Exception as e:
+        error = _picklable_error(e)
+    metadata = _picklable_metadata(get_logging_metadata())
+    reset_logging_metadata()
+    return result, error, metadata, started_at - submitted_at, time.time() - started_at
+
+
+def _get_request_info():
+    return {
+        'path': request.path,
+        'method': request.method,
+        'headers': list(request.headers.items()),
+        'query_string': request.query_string,
+        'data': request.get_data(),
+    }
+
+
+class ProcessPool:
+    '''
+        Per-worker pool of processes for the handlers decorated with `run_in_process_pool`.
+
+        At most `max_queued` requests wait for a free process, further ones fail right away with
+        `ProcessPoolBusyError`. A request fails with `ProcessPoolTimeoutError` if its handler doesn't finish in
+        `timeout` seconds, and the handler is stopped. `None` doesn't bound the queue or the time. The processes are
+        stopped after `idle_timeout` seconds without requests. The time waiting for a process and running the handler
+        are logged for every request.
+    '''
+    def __init__(self,
+                 processes=PROCESS_POOL_SIZE,
+                 max_queued=PROCESS_POOL_MAX_QUEUED,
+                 timeout=PROCESS_POOL_TIMEOUT,
+                 idle_timeout=PROCESS_POOL_IDLE_TIMEOUT):
+        self.processes = processes
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._idle_timer = None
+        self._lock = Lock()
+
+    def run_in_process_pool(self, handler=None, *, timeout=None):
+        '''
+            A decorator to run a route handler in the pool, the rest of the routes stay on the event loop.
+
+            The handler gets the same request and arguments, its result and errors must be picklable. The logging
+            metadata it adds is added to the request in the worker. `submit` on the decorated handler starts it
+            without waiting for the result nor timing out.
+        '''
+        if handler is None:
+            return partial(self.run_in_process_pool, timeout=timeout)
+
+        key = _handler_key(handler)
+        _handlers[key] = handler
+        timeout = self.timeout if timeout is None else timeout
+
+        @wraps(handler)
+        def decorated(**kwargs):
+            future = self.submit(key, kwargs, timeout)
+            try:
+                result, error, metadata, _, _ = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                # only cancelled if it didn't start, otherwise the process stops it at the same deadline
+                future.cancel()
+                raise ProcessPoolTimeoutError(f'{handler.__name__} did not finish in {timeout} seconds')
+            if metadata:
+                add_to_logging_metadata(metadata)
+            if error is not None:
+                raise error
+            return result
+
+        # nothing waits for the submitted handlers, so they have no deadline
+        decorated.submit = lambda **kwargs: self.submit(key, kwargs)
+        return decorated
+
+    def submit(self, key, kwargs, timeout=None):
+        with self._lock:
+            if self.max_queued is not None and self._pending >= self.processes + self.max_queued:
+                raise ProcessPoolBusyError('The server is busy, please try again later')
+            self._cancel_idle_timer()
+            submitted_at = time.time()
+            deadline = None if timeout is None else submitted_at + timeout
+            task = (_run_handler, key, _get_request_info(), kwargs, submitted_at, deadline)
+            executor = self._get_executor()
+            try:
+                future = executor.submit(*task)
+            except BrokenProcessPool:
+                # a process died, e.g. out of memory, the requests running in it fail but the next ones don't
+                self._executor.shutdown(wait=False)
+                self._executor = None
+                future = self._get_executor().submit(*task)
+            self._pending += 1
+
+        future.add_done_callback(partial(self._on_done, key))
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            self._cancel_idle_timer()
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self):
+        # a pool created before gunicorn forked the worker belongs to the parent process
+        if self._pid != os.getpid():
+            self._executor = None
+            self._pending = 0
+            self._idle_timer = None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.processes,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_process)
+            self._pid = os.getpid()
+        return self._executor
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _shutdown_if_idle(self):
+        with self._lock:
+            if self._pending or self._executor is None or self._pid != os.getpid():
+                return
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._idle_timer = None
+
+    def _on_done(self, key, future):
+        try:
+            self._log_done(key, future)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if not self._pending and self.idle_timeout is not None:
+                    self._cancel_idle_timer()
+                    self._idle_timer = Timer(self.idle_timeout, self._shutdown_if_idle)
+                    self._idle_timer.daemon = True
+                    self._idle_timer.start()
+
+    @staticmethod
+    def _log_done(key, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logging.warning(f'Process pool error: {key}', extra={'metadata': {'process_pool': {'handler': key}}})
+            return
+
+        _, error, metadata, queue_wait, execution_time = future.result()
+        log = logging.info if error is None else logging.warning
+        log(f'Process pool: {key}',
+            extra={
+                'metadata': {
+                    **metadata,
+                    'process_pool': {
+                        'handler': key,
+                        'queue_wait': queue_wait,
+                        'execution_time': execution_time,
+                        'error': None if error is None else str(error),
+                    },
+                }
+            })
+
+process_pool = ProcessPool()
+background_process_pool = ProcessPool(processes=PROCESS_POOL_BACKGROUND_SIZE, max_queued=None, timeout=None)
+
+run_in_process_pool = process_pool.run_in_process_pool
+run_in_background_process_pool = background_process_pool.run_in_process_pool
@@ -1,5 +1,6 @@
 from flask import Blueprint, request
 from api.decorators import with_api_context
+from api.process_pool import run_in_process_pool
 
 from combocurve.utils.routes import complete_routing
 from combocurve.science.type_curve.skeleton_TC_new1 import fit_tc
@@ -10,6 +11,7 @@ fit_percentile_api = Blueprint('fit_percentile_api', __name__)
 
 @fit_percentile_api.route('/fit-percentile', methods=['POST'])
 @complete_routing
+@run_in_process_pool
 @with_api_context
 def generate_data(**kwargs):
     context = kwargs['context']
@@ -1,7 +1,7 @@
 from flask import request, Blueprint
-from threading import Thread
 from combocurve.utils.routes import complete_routing
 from api.decorators import with_api_context
+from api.process_pool import run_in_background_process_pool, run_in_process_pool
 from combocurve.utils.exceptions import get_exception_info
 from combocurve.utils.logging import add_to_logging_metadata
 
@@ -10,32 +10,35 @@ well_spacing_api = Blueprint('well_spacing_api', __name__)
 
 @well_spacing_api.route('/calculating-well-spacing', methods=['POST'])
 @complete_routing
-@with_api_context
 def calculating_well_spacing(**kwargs):
+    # the request doesn't wait for the calculation, the result is notified
+    _calculate_well_spacing.submit()
+    return 'started'
+
+
+@run_in_background_process_pool
+@with_api_context
+def _calculate_well_spacing(**kwargs):
     context = kwargs['context']
     params = request.json
     notification_id = params['notificationId']
 
-    def call_spacing_service():
-        try:
-            context.well_spacing_service.calculate_well_spacing(params)
-        except Exception as e:
-            error_info = get_exception_info(e)
-            add_to_logging_metadata({'well_spacing_calc': params})
-            context.notification_service.update_notification_with_notifying_target(
-                notification_id, {
-                    'status': 'failed',
-                    'extra.error': error_info['message'] if error_info['expected'] else 'Failed. Please, try again.'
-                })
-            raise e
-
-    thread = Thread(target=call_spacing_service)
-    thread.start()
-    return 'started'
+    try:
+        context.well_spacing_service.calculate_well_spacing(params)
+    except Exception as e:
+        error_info = get_exception_info(e)
+        add_to_logging_metadata({'well_spacing_calc': params})
+        context.notification_service.update_notification_with_notifying_target(
+            notification_id, {
+                'status': 'failed',
+                'extra.error': error_info['message'] if error_info['expected'] else 'Failed. Please, try again.'
+            })
+        raise e
 
 
 @well_spacing_api.route('/midpoint-data-validation', methods=['POST'])
 @complete_routing
+@run_in_process_pool
 @with_api_context
 def midpoint_data_validation(**kwargs):
     context = kwargs['context']
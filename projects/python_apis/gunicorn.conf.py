@@ -77,6 +77,12 @@ worker_class = 'gevent'
 timeout = 300  # 5 min
 # keepalive = 2
 
+# CPU-bound handlers run in a pool of PROCESS_POOL_SIZE processes per worker, and background jobs in a pool of
+# PROCESS_POOL_BACKGROUND_SIZE processes, see api/process_pool.py, so they don't block the gevent event loop of the
+# worker. Every pool process loads the whole api, so with the default sizes of 1 the pools can add up to 2 * `workers`
+# processes to the memory of the instance. The processes only run while their worker has such requests or jobs, they
+# are stopped after PROCESS_POOL_IDLE_TIMEOUT seconds without them.
+
 #
 #   spew - Install a trace function that spews every line of Python
 #       that is executed when running the server. This is the
@@ -220,3 +226,10 @@ timeout = 300  # 5 min
 
 # def worker_abort(worker):
 #     worker.log.info("worker received SIGABRT signal")
+
+
+def worker_exit(server, worker):
+    # stop the process pools of the worker with it
+    from api.process_pool import background_process_pool, process_pool
+    process_pool.shutdown()
+    background_process_pool.shutdown()
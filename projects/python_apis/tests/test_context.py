@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+import mongomock
+import pytest
+
+import api.context
+from api.context import _LAZY_ATTRIBUTES, APIContext
+
+TENANT_INFO = {
+    'db_connection_string': 'mongodb://tenant',
+    'db_name': 'tenant',
+    'subdomain': 'tenant',
+    'pusher_app_id': 'app',
+    'pusher_key': 'key',
+    'pusher_secret': 'secret',
+    'pusher_cluster': 'cluster',
+    'redis_host': 'localhost',
+    'redis_port': 6379,
+    'headers': {
+        'inpt-dal-url': 'http://dal'
+    },
+}
+
+
+@pytest.fixture
+def clients(mocker):
+    mocker.patch.object(api.context, 'get_db', return_value=mongomock.MongoClient().db)
+    return {
+        'dal': mocker.patch.object(api.context, 'DAL'),
+        'cloud_storage_client': mocker.patch.object(api.context, 'CloudStorageClient'),
+        'big_query_client': mocker.patch.object(api.context, 'BigQueryClient'),
+        'close_db': mocker.patch.object(api.context, 'close_db'),
+    }
+
+
+@pytest.mark.unittest
+def test_services_are_created_on_first_access(clients):
+    context = APIContext(TENANT_INFO)
+
+    assert not set(_LAZY_ATTRIBUTES) & set(vars(context))
+    clients['dal'].connect.assert_not_called()
+
+    production_service = context.production_service
+
+    clients['dal'].connect.assert_called_once_with('tenant', 'http://dal')
+    assert context.production_service is production_service
+    # services created by other services share the same instances
+    assert context.type_curve_service.production_service is production_service
+    assert set(vars(context)) & set(_LAZY_ATTRIBUTES) == {
+        'dal', 'production_service', 'tc_normalization_service', 'type_curve_service'
+    }
+    clients['big_query_client'].assert_not_called()
+
+    with pytest.raises(AttributeError, match='unknown_service'):
+        context.unknown_service
+
+
+@pytest.mark.unittest
+def test_close_only_closes_the_created_clients(clients):
+    context = APIContext(TENANT_INFO)
+    context.big_query_client
+
+    context.close()
+
+    clients['big_query_client'].return_value.close.assert_called_once()
+    clients['dal'].connect.return_value.close.assert_not_called()
+    clients['cloud_storage_client'].return_value.close.assert_not_called()
+    clients['close_db'].assert_called_once_with(TENANT_INFO)
+
+
+@pytest.mark.skip
+@pytest.mark.benchmark
+@pytest.mark.parametrize('lazy', [False, True])
+def test_performance_of_first_request_context(benchmark, clients, lazy):
+    # the services read the rest of the tenant settings when created
+    tenant_info = defaultdict(str, TENANT_INFO)
+
+    def first_request():
+        context = APIContext(tenant_info)
+        # a cold request only needs a few services, creating them all is what was done before
+        for name in (['forecast_service', 'production_service'] if lazy else _LAZY_ATTRIBUTES):
+            getattr(context, name)
+
+    benchmark(first_request)
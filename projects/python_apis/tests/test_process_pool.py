@@ -0,0 +1,274 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from flask import Flask, request
+
+from api.process_pool import ProcessPool, ProcessPoolBusyError, ProcessPoolTimeoutError, _handler_key
+from combocurve.utils.logging import add_to_logging_metadata, get_logging_metadata, reset_logging_metadata
+from combocurve.utils.routes import complete_routing
+
+pool = ProcessPool(processes=1, max_queued=1, timeout=10)
+background_pool = ProcessPool(processes=1, max_queued=None, timeout=None)
+
+app = Flask(__name__)
+
+
+class NotPicklableError(Exception):
+    expected = True
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.callback = lambda: None
+
+
+@pool.run_in_process_pool
+def echo_request(**kwargs):
+    return {
+        'pid': os.getpid(),
+        'json': request.json,
+        'tenant': request.headers.get('tenant'),
+        'kwargs': kwargs,
+        'logging_metadata': get_logging_metadata(),
+    }
+
+
+@pool.run_in_process_pool
+def failing_handler(**kwargs):
+    add_to_logging_metadata({'failing_handler': request.json})
+    if request.json['picklable']:
+        raise ValueError('Invalid phase')
+    raise NotPicklableError('Invalid forecast')
+
+
+@pool.run_in_process_pool(timeout=1)
+def slow_handler(**kwargs):
+    time.sleep(request.json['seconds'])
+    if 'done_file' in request.json:
+        with open(request.json['done_file'], 'w') as file:
+            file.write('done')
+    return 'done'
+
+
+@background_pool.run_in_process_pool
+def background_job(**kwargs):
+    time.sleep(request.json['seconds'])
+    return os.getpid()
+
+
+@app.route('/busy', methods=['POST'])
+@complete_routing
+def busy_route():
+    raise ProcessPoolBusyError('The server is busy, please try again later')
+
+
+@pytest.fixture(scope='module', autouse=True)
+def shutdown_pool():
+    yield
+    pool.shutdown()
+    background_pool.shutdown()
+
+
+def wait_for_idle_pool():
+    # the futures are done before their callbacks update the pool
+    while pool._pending:
+        time.sleep(.01)
+
+
+def post(json, headers=None):
+    return app.test_request_context('/handler', method='POST', json=json, headers=headers or {})
+
+
+@pytest.mark.unittest
+def test_handlers_run_in_another_process_with_the_same_request():
+    with post({'phases': ['oil']}, {'tenant': 'test'}):
+        result = echo_request(well='w1')
+
+    assert result == {
+        'pid': result['pid'],
+        'json': {
+            'phases': ['oil']
+        },
+        'tenant': 'test',
+        'kwargs': {
+            'well': 'w1'
+        },
+        'logging_metadata': {},
+    }
+    assert result['pid'] != os.getpid()
+
+
+@pytest.mark.unittest
+def test_handler_errors_are_raised_in_the_worker():
+    with post({'picklable': True}), pytest.raises(ValueError, match='Invalid phase'):
+        failing_handler()
+
+    with post({'picklable': False}), pytest.raises(Exception, match='Invalid forecast') as error:
+        failing_handler()
+    assert error.value.expected
+
+
+@pytest.mark.unittest
+def test_handler_logging_metadata_is_added_in_the_worker():
+    reset_logging_metadata()
+    try:
+        with post({'picklable': True}), pytest.raises(ValueError):
+            failing_handler()
+        assert get_logging_metadata() == {'failing_handler': {'picklable': True}}
+    finally:
+        reset_logging_metadata()
+
+    # the metadata doesn't stay in the pool process for the next requests
+    with post({}):
+        assert echo_request()['logging_metadata'] == {}
+
+
+@pytest.mark.unittest
+def test_handlers_that_take_too_long_time_out_and_are_stopped(tmp_path):
+    done_file = tmp_path / 'done'
+    with post({'seconds': 2, 'done_file': str(done_file)}), pytest.raises(ProcessPoolTimeoutError):
+        slow_handler()
+
+    # the process stops the request that timed out and takes the next one
+    started = time.time()
+    with post({'seconds': 0}):
+        assert slow_handler() == 'done'
+    assert time.time() - started < 1
+    time.sleep(1.5)
+    assert not done_file.exists()
+
+
+@pytest.mark.unittest
+def test_handlers_still_queued_at_their_deadline_do_not_run(tmp_path):
+    wait_for_idle_pool()
+    done_file = tmp_path / 'done'
+    with post({'seconds': 1.5}):
+        running = slow_handler.submit()
+    with post({'seconds': 0, 'done_file': str(done_file)}):
+        with pytest.raises(ProcessPoolTimeoutError):
+            slow_handler()
+
+    running.result()
+    wait_for_idle_pool()
+    assert not done_file.exists()
+
+
+@pytest.mark.unittest
+def test_requests_over_the_queue_bound_are_rejected():
+    wait_for_idle_pool()
+    with post({'seconds': .3}):
+        running = [slow_handler.submit(), slow_handler.submit()]
+        with pytest.raises(ProcessPoolBusyError):
+            slow_handler.submit()
+
+    assert [future.result()[0] for future in running] == ['done', 'done']
+    with post({'seconds': 0}):
+        assert slow_handler() == 'done'
+
+
+@pytest.mark.unittest
+def test_queue_wait_and_execution_time_are_logged(caplog):
+    caplog.set_level(logging.INFO)
+
+    with post({'seconds': .2}):
+        slow_handler.submit().result()
+    wait_for_idle_pool()
+
+    record = next(record for record in caplog.records if 'slow_handler' in record.getMessage())
+    metrics = record.metadata['process_pool']
+    assert metrics['handler'] == 'tests.test_process_pool:slow_handler'
+    assert metrics['execution_time'] >= .2
+    assert metrics['queue_wait'] >= 0
+    assert metrics['error'] is None
+
+
+@pytest.mark.unittest
+def test_background_jobs_do_not_hold_the_processes_of_the_requests():
+    wait_for_idle_pool()
+    with post({'seconds': 1}):
+        jobs = [background_job.submit() for _ in range(pool.processes + pool.max_queued + 1)]
+
+    with post({}):
+        request_pid = echo_request()['pid']
+    assert not any(job.done() for job in jobs)
+
+    job_pids = {job.result()[0] for job in jobs}
+    assert request_pid not in job_pids
+
+
+@pytest.mark.unittest
+def test_idle_pools_stop_their_processes():
+    idle_pool = ProcessPool(processes=1, max_queued=0, timeout=10, idle_timeout=.2)
+    try:
+        with post({}):
+            idle_pool.submit(_handler_key(echo_request.__wrapped__), {}).result()
+        assert idle_pool._executor is not None
+
+        time.sleep(.5)
+        assert idle_pool._executor is None
+        with post({'phases': ['gas']}):
+            result = idle_pool.submit(_handler_key(echo_request.__wrapped__), {}).result()[0]
+        assert result['json'] == {'phases': ['gas']}
+    finally:
+        idle_pool.shutdown()
+
+
+@pytest.mark.unittest
+def test_errors_can_define_the_response_status():
+    response = app.test_client().post('/busy')
+
+    assert response.status_code == 503
+    assert response.json['error']['name'] == 'ProcessPoolBusyError'
+
+
+GEVENT_SCRIPT = """
+from gevent import monkey
+monkey.patch_all()
+
+import json
+import gevent
+from tests.test_process_pool import echo_request, pool, post, slow_handler
+from api.process_pool import ProcessPoolTimeoutError
+
+# the first request waits for the process to start
+with post({}):
+    echo_request()
+
+ticks = []
+ticker = gevent.spawn(lambda: [ticks.append(gevent.sleep(.01)) for _ in range(1000)])
+with post({'seconds': .5}):
+    result = slow_handler()
+try:
+    with post({'seconds': 2}):
+        slow_handler()
+    timed_out = False
+except ProcessPoolTimeoutError:
+    timed_out = True
+ticker.kill()
+pool.shutdown()
+print(json.dumps({'result': result, 'timed_out': timed_out, 'ticks': len(ticks)}))
+"""
+
+
+@pytest.mark.unittest
+def test_handlers_do_not_block_the_gevent_event_loop():
+    pytest.importorskip('gevent')
+    # the gevent patches of a gunicorn worker, in another process so they don't change the other tests
+    completed = subprocess.run([sys.executable, '-c', GEVENT_SCRIPT],
+                               capture_output=True,
+                               text=True,
+                               timeout=60,
+                               env={
+                                   **os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)
+                               })
+    assert completed.returncode == 0, completed.stderr
+
+    output = json.loads(completed.stdout.splitlines()[-1])
+    assert output['result'] == 'done'
+    assert output['timed_out']
+    # the greenlet kept running while the handlers ran in the pool
+    assert output['ticks'] > 50